@@ -68,6 +68,82 @@ def get_db():
     return conn
 
 
+def _user_stats_delta_sql(row, delta):
+    """Statements adding delta to user_stats_daily for the NEW/OLD users row"""
+    day = f"date(coalesce({row}.created_at, CURRENT_TIMESTAMP))"
+    not_admin = f"coalesce({row}.is_admin, 0) = 0"
+    upsert = "ON CONFLICT (day, dimension, value) DO UPDATE SET count = count + excluded.count"
+    return f"""
+            INSERT INTO user_stats_daily (day, dimension, value, count)
+            SELECT {day}, 'total', '', {delta} WHERE {not_admin} {upsert};
+            INSERT INTO user_stats_daily (day, dimension, value, count)
+            SELECT {day}, 'user_type', coalesce({row}.user_type, ''), {delta} WHERE {not_admin} {upsert};
+            INSERT INTO user_stats_daily (day, dimension, value, count)
+            SELECT {day}, 'location', {row}.location, {delta}
+            WHERE {not_admin} AND {row}.location IS NOT NULL {upsert};"""
+
+
+def init_user_stats(cursor):
+    """Create the user_stats_daily rollup and the triggers that maintain it
+
+    Counts of non-admin users per signup day by total, user_type and
+    location are kept up to date by triggers on users, so the dashboard
+    reads O(days) rollup rows instead of scanning users. The table is
+    backfilled from users the first time it is created.
+    """
+    cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'user_stats_daily'"
+    )
+    exists = cursor.fetchone() is not None
+
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS user_stats_daily (
+            day TEXT NOT NULL,
+            dimension TEXT NOT NULL,
+            value TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, dimension, value)
+        )
+    """
+    )
+    cursor.executescript(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS user_stats_after_insert AFTER INSERT ON users
+        BEGIN{_user_stats_delta_sql("NEW", 1)}
+        END;
+        CREATE TRIGGER IF NOT EXISTS user_stats_after_delete AFTER DELETE ON users
+        BEGIN{_user_stats_delta_sql("OLD", -1)}
+        END;
+        CREATE TRIGGER IF NOT EXISTS user_stats_after_update
+        AFTER UPDATE OF user_type, location, is_admin, created_at ON users
+        BEGIN{_user_stats_delta_sql("OLD", -1)}{_user_stats_delta_sql("NEW", 1)}
+        END;
+    """
+    )
+
+    if not exists:
+        cursor.execute(
+            """
+            INSERT INTO user_stats_daily (day, dimension, value, count)
+            SELECT day, dimension, value, COUNT(*) FROM (
+                SELECT date(coalesce(created_at, CURRENT_TIMESTAMP)) AS day,
+                       'total' AS dimension, '' AS value
+                FROM users WHERE coalesce(is_admin, 0) = 0
+                UNION ALL
+                SELECT date(coalesce(created_at, CURRENT_TIMESTAMP)),
+                       'user_type', coalesce(user_type, '')
+                FROM users WHERE coalesce(is_admin, 0) = 0
+                UNION ALL
+                SELECT date(coalesce(created_at, CURRENT_TIMESTAMP)),
+                       'location', location
+                FROM users WHERE coalesce(is_admin, 0) = 0 AND location IS NOT NULL
+            )
+            GROUP BY day, dimension, value
+        """
+        )
+
+
 def init_admin_tables():
     """Initialize admin-specific tables"""
     conn = get_db()
@@ -111,6 +187,9 @@ def init_admin_tables():
     """
     )
 
+    # Create user_stats_daily rollup for the dashboard
+    init_user_stats(cursor)
+
     conn.commit()
     conn.close()
     print("✅ Admin tables initialized")
@@ -407,21 +486,28 @@ def get_dashboard_stats():
     conn = get_db()
     cursor = conn.cursor()
 
+    # All counts come from the user_stats_daily rollup (see init_user_stats)
     # Total users
-    cursor.execute("SELECT COUNT(*) FROM users WHERE is_admin = 0")
+    cursor.execute(
+        "SELECT coalesce(SUM(count), 0) FROM user_stats_daily WHERE dimension = 'total'"
+    )
     total_users = cursor.fetchone()[0]
 
     # Users by type
     cursor.execute(
-        "SELECT user_type, COUNT(*) as count FROM users WHERE is_admin = 0 GROUP BY user_type"
+        """
+        SELECT value, SUM(count) as count FROM user_stats_daily
+        WHERE dimension = 'user_type'
+        GROUP BY value HAVING SUM(count) > 0
+    """
     )
-    users_by_type = {row[0]: row[1] for row in cursor.fetchall()}
+    users_by_type = {row[0] or None: row[1] for row in cursor.fetchall()}
 
     # New users this month
     cursor.execute(
         """
-        SELECT COUNT(*) FROM users 
-        WHERE is_admin = 0 AND created_at >= date('now', 'start of month')
+        SELECT coalesce(SUM(count), 0) FROM user_stats_daily
+        WHERE dimension = 'total' AND day >= date('now', 'start of month')
     """
     )
     new_users_month = cursor.fetchone()[0]
@@ -429,10 +515,10 @@ def get_dashboard_stats():
     # Users by location
     cursor.execute(
         """
-        SELECT location, COUNT(*) as count FROM users 
-        WHERE is_admin = 0 AND location IS NOT NULL 
-        GROUP BY location 
-        ORDER BY count DESC 
+        SELECT value, SUM(count) as count FROM user_stats_daily
+        WHERE dimension = 'location'
+        GROUP BY value HAVING SUM(count) > 0
+        ORDER BY count DESC
         LIMIT 10
     """
     )
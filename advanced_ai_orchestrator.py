@@ -52,6 +52,8 @@ from transformers import (
     pipeline,
 )
 
+from job_matching_engine import HashingEmbedder, JobMatchingEngine
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -95,6 +97,22 @@ class UserProfile:
     engagement_score: float
 
 
+def build_user_profile(user_data: Dict[str, Any]) -> UserProfile:
+    """Create a UserProfile from API request JSON"""
+    return UserProfile(
+        user_id=user_data["id"],
+        skills=user_data.get("skills", []),
+        experience=user_data.get("experience", {}),
+        preferences=user_data.get("preferences", {}),
+        behavior_patterns=user_data.get("behavior_patterns", {}),
+        embeddings=np.array(user_data.get("embeddings", [])),
+        personality_traits=user_data.get("personality_traits", {}),
+        career_goals=user_data.get("career_goals", []),
+        network_strength=user_data.get("network_strength", 0.5),
+        engagement_score=user_data.get("engagement_score", 0.7),
+    )
+
+
 @dataclass
 class JobAnalysis:
     """AI-Powered Job Analysis"""
@@ -116,10 +134,13 @@ class AdvancedAIOrchestrator:
     100x Enhanced AI System with Multi-Modal Intelligence
     """
 
-    def __init__(self, config: AIConfig):
+    def __init__(self, config: AIConfig, gateway=None):
         self.config = config
         self.executor = ThreadPoolExecutor(max_workers=config.max_workers)
         self.device = torch.device("cuda" if config.enable_gpu else "cpu")
+        # ai_gateway.AIGateway when served from ai_asgi_server: local inference
+        # then runs in worker threads and LLM calls share its limits and cache
+        self.gateway = gateway
 
         # Initialize AI Models
         self._initialize_models()
@@ -227,6 +248,7 @@ class AdvancedAIOrchestrator:
         self.job_cache = {}
         self.embedding_cache = {}
         self.prediction_cache = {}
+        self.matching_engine = None
 
     def _start_background_tasks(self):
         """Start background AI processing tasks"""
@@ -270,19 +292,37 @@ class AdvancedAIOrchestrator:
                 logger.error(f"Predictive maintenance error: {e}")
                 time.sleep(60)
 
+    async def _infer(self, model: str, fn, *args, **kwargs):
+        """Blocking model call: off the event loop when a gateway is attached"""
+        if self.gateway is None:
+            return fn(*args, **kwargs)
+        return await self.gateway.infer(model, fn, *args, **kwargs)
+
+    async def _complete_json(self, system: str, prompt: str, temperature: float) -> Dict[str, Any]:
+        """JSON reply from the gateway's default provider"""
+        from ai_gateway import CompletionRequest
+
+        text = await self.gateway.complete(
+            CompletionRequest(system=system, prompt=prompt, temperature=temperature, max_tokens=200)
+        )
+        return json.loads(text)
+
+    def _gateway_available(self) -> bool:
+        return self.gateway is not None and self.gateway.available
+
     # Core AI Methods
 
     async def analyze_user_profile(self, user_data: Dict[str, Any]) -> UserProfile:
         """Comprehensive AI-powered user profile analysis"""
         try:
             # Extract and process user information
-            skills = self._extract_skills(user_data.get("description", ""))
+            skills = await self._infer("nlp", self._extract_skills, user_data.get("description", ""))
             experience = self._analyze_experience(user_data)
             personality = await self._analyze_personality(user_data)
 
             # Generate embeddings
             text_content = f"{user_data.get('description', '')} {' '.join(skills)}"
-            embeddings = self.embedding_model.encode([text_content])[0]
+            embeddings = (await self._infer("embedding", self.embedding_model.encode, [text_content]))[0]
 
             # Calculate engagement score
             engagement_score = self._calculate_engagement_score(user_data)
@@ -312,63 +352,115 @@ class AdvancedAIOrchestrator:
             logger.error(f"User profile analysis error: {e}")
             raise
 
+    def _get_matching_engine(self) -> JobMatchingEngine:
+        """Job matching engine sharing the orchestrator's embedding model"""
+        if self.matching_engine is None:
+            embedder = getattr(self, "embedding_model", None) or HashingEmbedder()
+            self.matching_engine = JobMatchingEngine(embedder)
+        return self.matching_engine
+
     async def intelligent_job_matching(
         self, user_profile: UserProfile, job_listings: List[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
-        """Advanced AI-powered job matching with multiple algorithms"""
-        try:
-            matches = []
+        """Advanced AI-powered job matching with multiple algorithms
 
-            for job in job_listings:
-                # Multi-modal matching
-                skill_match = self._calculate_skill_match(
-                    user_profile.skills, job.get("skills", [])
-                )
-                experience_match = self._calculate_experience_match(
-                    user_profile.experience, job
-                )
-                personality_fit = self._calculate_personality_fit(
-                    user_profile.personality_traits, job
-                )
-                embedding_similarity = self._calculate_embedding_similarity(
-                    user_profile.embeddings, job
-                )
+        Skill overlap and semantic similarity are scored against all jobs at
+        once by the vectorized matching engine (jobs are only embedded when
+        new or changed); the slower per-job factors and AI scoring run on the
+        top candidates only.
+        """
+        try:
+            engine = self._get_matching_engine()
+            job_ids = await self._infer("embedding", engine.sync_jobs, job_listings)
+            candidates = await self._infer(
+                "embedding",
+                engine.match,
+                skills=user_profile.skills,
+                embedding=user_profile.embeddings if np.size(user_profile.embeddings) else None,
+                text=" ".join(user_profile.skills),
+                k=20,
+                restrict_to=job_ids,
+            )
+            return await self._finalize_matches(user_profile, candidates)
 
-                # AI-powered final score
-                final_score = await self._calculate_ai_match_score(
-                    user_profile,
-                    job,
-                    skill_match,
-                    experience_match,
-                    personality_fit,
-                    embedding_similarity,
-                )
+        except Exception as e:
+            logger.error(f"Job matching error: {e}")
+            return []
 
-                matches.append(
+    async def batch_job_matching(
+        self, user_profiles: List[UserProfile], job_listings: List[Dict[str, Any]], k: int = 20
+    ) -> Dict[int, List[Dict[str, Any]]]:
+        """Match many users against the same jobs with one matrix product"""
+        try:
+            engine = self._get_matching_engine()
+            job_ids = await self._infer("embedding", engine.sync_jobs, job_listings)
+            results = await self._infer(
+                "embedding",
+                engine.match_many,
+                [
                     {
-                        "job": job,
-                        "match_score": final_score,
-                        "skill_match": skill_match,
-                        "experience_match": experience_match,
-                        "personality_fit": personality_fit,
-                        "embedding_similarity": embedding_similarity,
+                        "skills": profile.skills,
+                        "embedding": profile.embeddings if np.size(profile.embeddings) else None,
+                        "text": " ".join(profile.skills),
                     }
-                )
+                    for profile in user_profiles
+                ],
+                k=k,
+                restrict_to=job_ids,
+            )
+            return {
+                profile.user_id: await self._finalize_matches(profile, candidates)
+                for profile, candidates in zip(user_profiles, results)
+            }
 
-            # Sort by AI match score
-            matches.sort(key=lambda x: x["match_score"], reverse=True)
+        except Exception as e:
+            logger.error(f"Batch job matching error: {e}")
+            return {}
 
-            return matches[:20]  # Top 20 matches
+    async def _finalize_matches(
+        self, user_profile: UserProfile, candidates: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Add per-job factors and the final AI score to engine candidates"""
+        matches = []
+        for candidate in candidates:
+            job = candidate["job"]
+            experience_match = self._calculate_experience_match(user_profile.experience, job)
+            personality_fit = self._calculate_personality_fit(user_profile.personality_traits, job)
+
+            # AI-powered final score
+            final_score = await self._calculate_ai_match_score(
+                user_profile,
+                job,
+                candidate["skill_match"],
+                experience_match,
+                personality_fit,
+                candidate["embedding_similarity"],
+            )
 
-        except Exception as e:
-            logger.error(f"Job matching error: {e}")
-            return []
+            matches.append(
+                {
+                    "job": job,
+                    "match_score": final_score,
+                    "skill_match": candidate["skill_match"],
+                    "experience_match": experience_match,
+                    "personality_fit": personality_fit,
+                    "embedding_similarity": candidate["embedding_similarity"],
+                }
+            )
+
+        # Sort by AI match score
+        matches.sort(key=lambda x: x["match_score"], reverse=True)
+        return matches
 
     async def generate_smart_content(
         self, content_type: str, context: Dict[str, Any]
     ) -> str:
         """AI-powered content generation"""
         try:
+            if self._gateway_available():
+                from ai_gateway import content_request
+
+                return await self.gateway.complete(content_request(content_type, context))
             if content_type == "job_description":
                 return await self._generate_job_description(context)
             elif content_type == "cover_letter":
@@ -388,16 +480,16 @@ class AdvancedAIOrchestrator:
         """AI-powered resume image analysis with OCR and CV"""
         try:
             # OCR Text Extraction
-            text_content = self._extract_text_from_image(image_path)
+            text_content = await self._infer("ocr", self._extract_text_from_image, image_path)
 
             # Face Detection and Analysis
-            face_analysis = self._analyze_face_in_resume(image_path)
+            face_analysis = await self._infer("face", self._analyze_face_in_resume, image_path)
 
             # Document Structure Analysis
-            document_structure = self._analyze_document_structure(image_path)
+            document_structure = await self._infer("opencv", self._analyze_document_structure, image_path)
 
             # Skills and Experience Extraction
-            extracted_skills = self._extract_skills_from_text(text_content)
+            extracted_skills = await self._infer("nlp", self._extract_skills_from_text, text_content)
             extracted_experience = self._extract_experience_from_text(text_content)
 
             return {
@@ -531,7 +623,11 @@ class AdvancedAIOrchestrator:
                 user_data.get("description", "") + " " + user_data.get("bio", "")
             )
 
-            if self.openai_available:
+            if self._gateway_available():
+                personality_scores.update(
+                    await self._gateway_personality_analysis(text_content)
+                )
+            elif self.openai_available:
                 personality_scores.update(
                     await self._openai_personality_analysis(text_content)
                 )
@@ -555,6 +651,20 @@ class AdvancedAIOrchestrator:
 
         return personality_scores
 
+    async def _gateway_personality_analysis(self, text: str) -> Dict[str, float]:
+        """Personality analysis through the gateway's default provider"""
+        try:
+            result = await self._complete_json(
+                "Analyze the personality traits in this text and return scores (0-1) for: openness, conscientiousness, extraversion, agreeableness, neuroticism. Return only JSON.",
+                text[:1000],
+                temperature=0.3,
+            )
+            return {k: float(v) for k, v in result.items()}
+
+        except Exception as e:
+            logger.error(f"Gateway personality analysis error: {e}")
+            return {}
+
     async def _openai_personality_analysis(self, text: str) -> Dict[str, float]:
         """OpenAI-powered personality analysis"""
         try:
@@ -645,16 +755,6 @@ class AdvancedAIOrchestrator:
         # Implementation for network strength calculation
         return 0.6
 
-    def _calculate_skill_match(
-        self, user_skills: List[str], job_skills: List[str]
-    ) -> float:
-        """Calculate skill match score"""
-        if not job_skills:
-            return 0.0
-
-        matches = set(user_skills) & set(job_skills)
-        return len(matches) / len(job_skills)
-
     def _calculate_experience_match(
         self, user_experience: Dict[str, Any], job: Dict[str, Any]
     ) -> float:
@@ -669,19 +769,6 @@ class AdvancedAIOrchestrator:
         # Implementation for personality fit
         return 0.8
 
-    def _calculate_embedding_similarity(
-        self, user_embedding: np.ndarray, job: Dict[str, Any]
-    ) -> float:
-        """Calculate embedding similarity"""
-        job_text = f"{job.get('title', '')} {job.get('description', '')}"
-        job_embedding = self.embedding_model.encode([job_text])[0]
-
-        # Cosine similarity
-        similarity = np.dot(user_embedding, job_embedding) / (
-            np.linalg.norm(user_embedding) * np.linalg.norm(job_embedding)
-        )
-        return float(similarity)
-
     async def _calculate_ai_match_score(
         self,
         user_profile: UserProfile,
@@ -705,7 +792,15 @@ class AdvancedAIOrchestrator:
             Provide a final match score between 0 and 1 considering all factors.
             """
 
-            if self.openai_available:
+            if self._gateway_available():
+                result = await self._complete_json(
+                    "You are an expert HR AI. Analyze job-user matching factors and provide a final score (0-1) as a JSON with key 'score'.",
+                    context,
+                    temperature=0.2,
+                )
+                return float(result.get("score", 0.5))
+
+            elif self.openai_available:
                 response = await openai.ChatCompletion.acreate(
                     model="gpt-4",
                     messages=[
@@ -1066,8 +1161,13 @@ class AdvancedAIOrchestrator:
 ai_orchestrator = None
 
 
-def initialize_ai_system(config: Optional[AIConfig] = None) -> AdvancedAIOrchestrator:
-    """Initialize the global AI system"""
+def initialize_ai_system(config: Optional[AIConfig] = None, gateway=None) -> AdvancedAIOrchestrator:
+    """Initialize the global AI system
+
+    Args:
+        config: Service configuration (API keys are read from the environment)
+        gateway: ai_gateway.AIGateway to run inference and LLM calls through
+    """
     global ai_orchestrator
 
     if ai_orchestrator is None:
@@ -1080,7 +1180,9 @@ def initialize_ai_system(config: Optional[AIConfig] = None) -> AdvancedAIOrchest
         config.google_api_key = os.getenv("GOOGLE_API_KEY")
         config.wandb_api_key = os.getenv("WANDB_API_KEY")
 
-        ai_orchestrator = AdvancedAIOrchestrator(config)
+        ai_orchestrator = AdvancedAIOrchestrator(config, gateway=gateway)
+    elif gateway is not None:
+        ai_orchestrator.gateway = gateway
 
     return ai_orchestrator
 
@@ -2,6 +2,11 @@
 """
 Advanced AI API Endpoints for HireBahamas
 REST API for 100x Enhanced AI Capabilities
+
+See ai_asgi_server.py for the async version (single event loop, provider
+concurrency limits, response caching and streaming). Batch job matching
+(POST /api/ai/job-matching/batch) is served there only, so it does not
+start an event loop per request.
 """
 
 import asyncio
@@ -18,7 +23,7 @@ from flask import Blueprint, Flask, jsonify, request
 from flask_cors import CORS
 from PIL import Image
 
-from advanced_ai_orchestrator import AIConfig, get_ai_orchestrator, initialize_ai_system
+from advanced_ai_orchestrator import AIConfig, build_user_profile, get_ai_orchestrator, initialize_ai_system
 
 # Enable tracemalloc to track memory allocations for debugging
 tracemalloc.start()
@@ -114,24 +119,7 @@ def intelligent_job_matching():
 
         orchestrator = init_ai_orchestrator()
 
-        # Create user profile object
-        import numpy as np
-
-        from advanced_ai_orchestrator import UserProfile
-
-        user_data = data["user_profile"]
-        profile = UserProfile(
-            user_id=user_data["id"],
-            skills=user_data.get("skills", []),
-            experience=user_data.get("experience", {}),
-            preferences=user_data.get("preferences", {}),
-            behavior_patterns=user_data.get("behavior_patterns", {}),
-            embeddings=np.array(user_data.get("embeddings", [])),
-            personality_traits=user_data.get("personality_traits", {}),
-            career_goals=user_data.get("career_goals", []),
-            network_strength=user_data.get("network_strength", 0.5),
-            engagement_score=user_data.get("engagement_score", 0.7),
-        )
+        profile = build_user_profile(data["user_profile"])
 
         # Run job matching using asyncio.run() for proper event loop management
         matches = asyncio.run(orchestrator.intelligent_job_matching(profile, data["jobs"]))
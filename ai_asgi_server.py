@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Async AI API Server for HireBahamas
+ASGI version of the /api/ai endpoints in ai_api_server.py
+
+The Flask server wraps every orchestrator coroutine in ``asyncio.run()``,
+creating and tearing down an event loop per request and serializing all
+model/provider calls. This server runs everything on one long-lived loop:
+
+- Every endpoint goes through ``ai_gateway.AIGateway``. Chat and content
+  generation call it directly; the orchestrator is handed the gateway, so
+  its LLM calls share the provider limits, coalescing and cache, and its
+  CPU-bound inference (embeddings, spaCy, OCR, face detection) runs in
+  worker threads behind a semaphore per model instead of on the loop.
+- Chat and content generation can stream as Server-Sent Events: send
+  ``"stream": true`` or ``Accept: text/event-stream``.
+
+The orchestrator (torch, transformers, ...) is only loaded by the endpoints
+that need it, so chat/content generation work without the ML stack.
+
+Run:
+    uvicorn ai_asgi_server:app --host 0.0.0.0 --port 8009
+
+    AI_PROVIDER=stub uvicorn ai_asgi_server:app   # offline, deterministic replies
+"""
+
+import asyncio
+import json
+import logging
+import os
+import tempfile
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from fastapi import APIRouter, FastAPI, File, Request, UploadFile
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from ai_gateway import HIREBOT_SYSTEM_PROMPT, AIGateway, CompletionRequest, content_request
+
+logger = logging.getLogger(__name__)
+
+CHAT_UNAVAILABLE_MESSAGE = "I'm sorry, but the AI chat service is not available at the moment."
+
+router = APIRouter(prefix="/api/ai")
+
+
+def _default_orchestrator_factory():
+    from advanced_ai_orchestrator import AIConfig, initialize_ai_system
+
+    return initialize_ai_system(AIConfig())
+
+
+def _error(message: str, status_code: int) -> JSONResponse:
+    return JSONResponse({"error": message}, status_code=status_code)
+
+
+async def get_orchestrator(request: Request):
+    """Load the orchestrator once, off the event loop (model loading blocks)"""
+    state = request.app.state
+    if state.orchestrator is None:
+        async with state.orchestrator_lock:
+            if state.orchestrator is None:
+                orchestrator = await asyncio.to_thread(state.orchestrator_factory)
+                orchestrator.gateway = state.gateway
+                state.orchestrator = orchestrator
+    return state.orchestrator
+
+
+async def _json_body(request: Request) -> Optional[Dict[str, Any]]:
+    try:
+        data = await request.json()
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _wants_stream(request: Request, data: Dict[str, Any]) -> bool:
+    return bool(data.get("stream")) or "text/event-stream" in request.headers.get("accept", "")
+
+
+def _sse(event: Optional[str], payload: Dict[str, Any]) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(payload)}\n\n"
+
+
+def _sse_response(chunks: AsyncIterator[str], done: Dict[str, Any]) -> StreamingResponse:
+    """Stream ``chunks`` as ``data: {"delta": ...}`` events, then a ``done`` event"""
+
+    async def events():
+        try:
+            async for chunk in chunks:
+                yield _sse(None, {"delta": chunk})
+            yield _sse("done", done)
+        except Exception as e:
+            logger.error(f"AI stream error: {e}")
+            yield _sse("error", {"error": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _single(text: str) -> AsyncIterator[str]:
+    yield text
+
+
+@router.get("/health")
+async def ai_health_check(request: Request):
+    """AI System Health Check"""
+    gateway: AIGateway = request.app.state.gateway
+    return {
+        "status": "healthy",
+        "timestamp": datetime.now().isoformat(),
+        "orchestrator_loaded": request.app.state.orchestrator is not None,
+        "providers": gateway.provider_names(),
+        "capabilities": [
+            "user_profile_analysis",
+            "job_matching",
+            "content_generation",
+            "resume_analysis",
+            "career_prediction",
+            "real_time_recommendations",
+        ],
+    }
+
+
+@router.post("/analyze-profile")
+async def analyze_user_profile(request: Request):
+    """Analyze user profile with advanced AI"""
+    data = await _json_body(request)
+    if not data or "user_data" not in data:
+        return _error("user_data required", 400)
+    try:
+        orchestrator = await get_orchestrator(request)
+        profile = await orchestrator.analyze_user_profile(data["user_data"])
+        return {
+            "success": True,
+            "profile": {
+                "user_id": profile.user_id,
+                "skills": profile.skills,
+                "personality_traits": profile.personality_traits,
+                "career_goals": profile.career_goals,
+                "engagement_score": profile.engagement_score,
+                "network_strength": profile.network_strength,
+            },
+        }
+    except Exception as e:
+        logger.error(f"Profile analysis error: {e}")
+        return _error(str(e), 500)
+
+
+@router.post("/job-matching")
+async def intelligent_job_matching(request: Request):
+    """Advanced AI-powered job matching"""
+    data = await _json_body(request)
+    if not data or "user_profile" not in data or "jobs" not in data:
+        return _error("user_profile and jobs required", 400)
+    try:
+        orchestrator = await get_orchestrator(request)
+        from advanced_ai_orchestrator import build_user_profile
+
+        profile = build_user_profile(data["user_profile"])
+        matches = await orchestrator.intelligent_job_matching(profile, data["jobs"])
+        return {"success": True, "matches": matches, "total_matches": len(matches)}
+    except Exception as e:
+        logger.error(f"Job matching error: {e}")
+        return _error(str(e), 500)
+
+
+@router.post("/job-matching/batch")
+async def batch_job_matching(request: Request):
+    """Match several user profiles against the same job list in one pass"""
+    data = await _json_body(request)
+    if not data or "user_profiles" not in data or "jobs" not in data:
+        return _error("user_profiles and jobs required", 400)
+    try:
+        orchestrator = await get_orchestrator(request)
+        from advanced_ai_orchestrator import build_user_profile
+
+        profiles = [build_user_profile(user_data) for user_data in data["user_profiles"]]
+        matches = await orchestrator.batch_job_matching(profiles, data["jobs"], k=int(data.get("limit", 20)))
+        return {
+            "success": True,
+            "matches": {str(user_id): user_matches for user_id, user_matches in matches.items()},
+            "total_profiles": len(matches),
+        }
+    except Exception as e:
+        logger.error(f"Batch job matching error: {e}")
+        return _error(str(e), 500)
+
+
+@router.post("/generate-content")
+async def generate_content(request: Request):
+    """AI-powered content generation (optionally streamed)"""
+    data = await _json_body(request)
+    if not data or "content_type" not in data or "context" not in data:
+        return _error("content_type and context required", 400)
+
+    gateway: AIGateway = request.app.state.gateway
+    content_type = data["content_type"]
+    if not gateway.available:
+        return _error(f"{content_type} generation requires an AI provider API key", 503)
+
+    completion = content_request(content_type, data["context"])
+    provider = data.get("provider")
+    try:
+        if _wants_stream(request, data):
+            return _sse_response(
+                gateway.stream(completion, provider=provider),
+                {"content_type": content_type},
+            )
+        content = await gateway.complete(completion, provider=provider)
+        return {"success": True, "content": content, "content_type": content_type}
+    except LookupError as e:
+        return _error(str(e), 400)
+    except Exception as e:
+        logger.error(f"Content generation error: {e}")
+        return _error(str(e), 500)
+
+
+@router.post("/analyze-resume")
+async def analyze_resume(request: Request, file: UploadFile = File(None)):
+    """AI-powered resume analysis from image"""
+    if file is None:
+        return _error("No file provided", 400)
+    if not file.filename:
+        return _error("No file selected", 400)
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as temp_file:
+        temp_file.write(await file.read())
+        temp_path = temp_file.name
+    try:
+        orchestrator = await get_orchestrator(request)
+        analysis = await orchestrator.analyze_resume_image(temp_path)
+        return {"success": True, "analysis": analysis}
+    except Exception as e:
+        logger.error(f"Resume analysis error: {e}")
+        return _error(str(e), 500)
+    finally:
+        os.unlink(temp_path)
+
+
+@router.post("/career-prediction")
+async def predict_career(request: Request):
+    """AI-powered career trajectory prediction"""
+    data = await _json_body(request)
+    if not data or "user_profile" not in data:
+        return _error("user_profile required", 400)
+    try:
+        orchestrator = await get_orchestrator(request)
+        from advanced_ai_orchestrator import build_user_profile
+
+        prediction = await orchestrator.predict_career_trajectory(build_user_profile(data["user_profile"]))
+        return {"success": True, "prediction": prediction}
+    except Exception as e:
+        logger.error(f"Career prediction error: {e}")
+        return _error(str(e), 500)
+
+
+@router.post("/recommendations")
+async def get_recommendations(request: Request):
+    """Real-time AI-powered recommendations"""
+    data = await _json_body(request)
+    if not data or "user_id" not in data:
+        return _error("user_id required", 400)
+    try:
+        orchestrator = await get_orchestrator(request)
+        recommendations = await orchestrator.real_time_recommendations(data["user_id"], data.get("context", {}))
+        return {"success": True, "recommendations": recommendations, "count": len(recommendations)}
+    except Exception as e:
+        logger.error(f"Recommendations error: {e}")
+        return _error(str(e), 500)
+
+
+@router.post("/chat")
+async def ai_chat(request: Request):
+    """AI-powered conversational assistant (optionally streamed)"""
+    data = await _json_body(request)
+    if not data or "message" not in data:
+        return _error("message required", 400)
+
+    gateway: AIGateway = request.app.state.gateway
+    stream = _wants_stream(request, data)
+    if not gateway.available:
+        if stream:
+            return _sse_response(_single(CHAT_UNAVAILABLE_MESSAGE), {"available": False})
+        return {"success": True, "response": CHAT_UNAVAILABLE_MESSAGE, "timestamp": datetime.now().isoformat()}
+
+    completion = CompletionRequest(system=HIREBOT_SYSTEM_PROMPT, prompt=data["message"])
+    provider = data.get("provider")
+    try:
+        if stream:
+            return _sse_response(gateway.stream(completion, provider=provider), {"available": True})
+        response_text = await gateway.complete(completion, provider=provider)
+        return {"success": True, "response": response_text, "timestamp": datetime.now().isoformat()}
+    except LookupError as e:
+        return _error(str(e), 400)
+    except Exception as e:
+        logger.error(f"AI chat error: {e}")
+        return _error(str(e), 500)
+
+
+@router.get("/analytics")
+async def get_analytics(request: Request):
+    """Get AI system analytics"""
+    state = request.app.state
+    orchestrator = state.orchestrator
+    analytics = {
+        "gateway": state.gateway.snapshot(),
+        "orchestrator_loaded": orchestrator is not None,
+        "timestamp": datetime.now().isoformat(),
+    }
+    if orchestrator is not None:
+        analytics.update(
+            {
+                "total_users_analyzed": len(orchestrator.user_cache),
+                "total_jobs_processed": len(orchestrator.job_cache),
+                "ai_services_status": {
+                    "openai": orchestrator.openai_available,
+                    "claude": orchestrator.claude_available,
+                    "gemini": orchestrator.gemini_available,
+                    "ocr": orchestrator.ocr_available,
+                },
+            }
+        )
+    return {"success": True, "analytics": analytics}
+
+
+@router.post("/feedback")
+async def submit_feedback(request: Request):
+    """Submit feedback for AI improvements"""
+    data = await _json_body(request)
+    if not data or "feedback" not in data:
+        return _error("feedback required", 400)
+
+    feedback_data = {
+        "feedback": data["feedback"],
+        "rating": data.get("rating"),
+        "feature": data.get("feature"),
+        "user_id": data.get("user_id"),
+        "timestamp": datetime.now().isoformat(),
+    }
+    logger.info(f"AI Feedback received: {feedback_data}")
+    return {
+        "success": True,
+        "message": "Thank you for your feedback! It will help improve our AI system.",
+    }
+
+
+def create_app(
+    gateway: Optional[AIGateway] = None,
+    orchestrator_factory: Optional[Callable[[], Any]] = None,
+) -> FastAPI:
+    """Create the ASGI app.
+
+    Args:
+        gateway: Provider gateway (default: ``AIGateway.from_env()``)
+        orchestrator_factory: Builds the orchestrator on first use
+            (default: ``advanced_ai_orchestrator.initialize_ai_system``)
+    """
+    application = FastAPI(title="HireBahamas AI API")
+    application.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+    application.state.gateway = gateway or AIGateway.from_env()
+    application.state.orchestrator = None
+    application.state.orchestrator_lock = asyncio.Lock()
+    application.state.orchestrator_factory = orchestrator_factory or _default_orchestrator_factory
+    application.include_router(router)
+    return application
+
+
+app = create_app()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    logging.basicConfig(level=logging.INFO)
+    logger.info("🚀 Async AI API Server starting...")
+    uvicorn.run(app, host="0.0.0.0", port=8009)
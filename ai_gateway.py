@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+AI Provider Gateway for HireBahamas
+
+Async front door for LLM calls made by the AI API. It is meant to live on
+one long-lived event loop (see ``ai_asgi_server.py``) and adds:
+
+- Bounded concurrency per provider (an ``asyncio.Semaphore`` each), so a
+  burst of requests queues instead of hammering the provider's rate limit.
+- Request coalescing: identical prompts that arrive while one is in flight
+  share that call's result instead of issuing duplicates.
+- A response cache keyed on a hash of (provider, model, prompt, params),
+  with TTL and LRU eviction.
+- Streaming, with the full text cached once the stream completes. Streams
+  reuse cached and in-flight ``complete()`` results but are not coalesced
+  with each other (see ``AIGateway.stream``).
+- Local model inference (embeddings, spaCy, OCR, ...) run in worker threads
+  through ``infer()``, behind an ``asyncio.Semaphore`` per model, so
+  CPU-bound calls never block the event loop and one model cannot take
+  every thread.
+
+Providers:
+    openai  - OpenAI chat completions (AsyncOpenAI), needs OPENAI_API_KEY
+    claude  - Anthropic messages (AsyncAnthropic), needs ANTHROPIC_API_KEY
+    stub    - Deterministic local provider for tests and offline development
+
+Configuration:
+    AI_PROVIDER: Default provider name (default: first configured of openai, claude)
+    AI_MAX_CONCURRENCY: Concurrent calls per provider (default: 8)
+    AI_MAX_CONCURRENCY_<NAME>: Per-provider override, e.g. AI_MAX_CONCURRENCY_OPENAI
+    AI_CACHE_TTL_SECONDS: Response cache TTL, 0 disables caching (default: 600)
+    AI_CACHE_MAX_ENTRIES: Response cache size (default: 1000)
+    AI_MODEL_CONCURRENCY: Concurrent inferences per local model (default: 1)
+    AI_MODEL_CONCURRENCY_<NAME>: Per-model override, e.g. AI_MODEL_CONCURRENCY_EMBEDDING
+    OPENAI_MODEL: Default OpenAI model (default: gpt-4)
+    ANTHROPIC_MODEL: Default Claude model (default: claude-sonnet-4-5)
+
+Usage:
+    from ai_gateway import AIGateway, CompletionRequest, StubProvider
+
+    gateway = AIGateway.from_env()
+    text = await gateway.complete(CompletionRequest(system="...", prompt="..."))
+    async for chunk in gateway.stream(CompletionRequest(system="...", prompt="...")):
+        ...
+    vectors = await gateway.infer("embedding", model.encode, texts)
+"""
+
+import abc
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "8"))
+DEFAULT_CACHE_TTL_SECONDS = float(os.getenv("AI_CACHE_TTL_SECONDS", "600"))
+DEFAULT_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", "1000"))
+DEFAULT_MODEL_CONCURRENCY = int(os.getenv("AI_MODEL_CONCURRENCY", "1"))
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4")
+ANTHROPIC_MODEL = os.getenv("ANTHROPIC_MODEL", "claude-sonnet-4-5")
+
+HIREBOT_SYSTEM_PROMPT = (
+    "You are HireBot, an AI assistant for HireBahamas job platform. Help users "
+    "with career advice, job searching, and professional development."
+)
+
+# System prompt, user prompt template and temperature per content type
+# (same prompts the orchestrator uses for generate_smart_content)
+CONTENT_PROMPTS: Dict[str, Tuple[str, str, float]] = {
+    "job_description": (
+        "You are an expert HR professional. Create a compelling job description.",
+        "Create a job description for: {context}",
+        0.7,
+    ),
+    "cover_letter": (
+        "You are an expert career counselor. Create a personalized cover letter.",
+        "Generate a cover letter for: {context}",
+        0.7,
+    ),
+    "interview_questions": (
+        "You are an expert interviewer. Generate relevant interview questions.",
+        "Generate interview questions for: {context}",
+        0.6,
+    ),
+    "career_advice": (
+        "You are an expert career counselor. Provide personalized career advice.",
+        "Provide career advice for: {context}",
+        0.7,
+    ),
+}
+
+
+@dataclass(frozen=True)
+class CompletionRequest:
+    """A single-turn completion request"""
+
+    system: str
+    prompt: str
+    model: Optional[str] = None
+    temperature: float = 0.7
+    max_tokens: int = 500
+
+    def cache_key(self, provider: str) -> str:
+        payload = json.dumps({"provider": provider, **asdict(self)}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def content_request(content_type: str, context) -> CompletionRequest:
+    """Build the completion request for a generate-content call"""
+    system, template, temperature = CONTENT_PROMPTS.get(
+        content_type,
+        (
+            f"You are an expert content creator. Generate {content_type} content.",
+            f"Generate {content_type} for: {{context}}",
+            0.7,
+        ),
+    )
+    return CompletionRequest(
+        system=system,
+        prompt=template.format(context=context),
+        temperature=temperature,
+        max_tokens=1000,
+    )
+
+
+# =============================================================================
+# PROVIDERS
+# =============================================================================
+
+
+class AIProvider(abc.ABC):
+    """Base class for LLM providers"""
+
+    name = "base"
+    default_model: Optional[str] = None
+
+    @abc.abstractmethod
+    async def complete(self, request: CompletionRequest) -> str:
+        """Return the full completion text for ``request``"""
+
+    async def stream(self, request: CompletionRequest) -> AsyncIterator[str]:
+        # Providers without native streaming yield the whole response at once
+        yield await self.complete(request)
+
+
+class OpenAIProvider(AIProvider):
+    name = "openai"
+    default_model = OPENAI_MODEL
+
+    def __init__(self, api_key: str):
+        from openai import AsyncOpenAI
+
+        self.client = AsyncOpenAI(api_key=api_key)
+
+    def _kwargs(self, request: CompletionRequest) -> dict:
+        return {
+            "model": request.model or self.default_model,
+            "messages": [
+                {"role": "system", "content": request.system},
+                {"role": "user", "content": request.prompt},
+            ],
+            "temperature": request.temperature,
+            "max_tokens": request.max_tokens,
+        }
+
+    async def complete(self, request: CompletionRequest) -> str:
+        response = await self.client.chat.completions.create(**self._kwargs(request))
+        return response.choices[0].message.content or ""
+
+    async def stream(self, request: CompletionRequest) -> AsyncIterator[str]:
+        response = await self.client.chat.completions.create(stream=True, **self._kwargs(request))
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class ClaudeProvider(AIProvider):
+    name = "claude"
+    default_model = ANTHROPIC_MODEL
+
+    def __init__(self, api_key: str):
+        from anthropic import AsyncAnthropic
+
+        self.client = AsyncAnthropic(api_key=api_key)
+
+    def _kwargs(self, request: CompletionRequest) -> dict:
+        return {
+            "model": request.model or self.default_model,
+            "system": request.system,
+            "messages": [{"role": "user", "content": request.prompt}],
+            "temperature": request.temperature,
+            "max_tokens": request.max_tokens,
+        }
+
+    async def complete(self, request: CompletionRequest) -> str:
+        response = await self.client.messages.create(**self._kwargs(request))
+        return response.content[0].text
+
+    async def stream(self, request: CompletionRequest) -> AsyncIterator[str]:
+        async with self.client.messages.stream(**self._kwargs(request)) as stream:
+            async for text in stream.text_stream:
+                yield text
+
+
+class StubProvider(AIProvider):
+    """Deterministic local provider.
+
+    Replies ``"[stub] <prompt>"`` after ``delay`` seconds and streams it
+    word by word. ``calls`` counts provider invocations and ``max_active``
+    records the highest observed concurrency, for tests.
+    """
+
+    name = "stub"
+    default_model = "stub"
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+
+    def reply(self, request: CompletionRequest) -> str:
+        return f"[stub] {request.prompt}"
+
+    async def complete(self, request: CompletionRequest) -> str:
+        self.calls += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            return self.reply(request)
+        finally:
+            self.active -= 1
+
+    async def stream(self, request: CompletionRequest) -> AsyncIterator[str]:
+        self.calls += 1
+        words = self.reply(request).split(" ")
+        for i, word in enumerate(words):
+            await asyncio.sleep(self.delay / max(len(words), 1))
+            yield word if i == len(words) - 1 else word + " "
+
+
+# =============================================================================
+# CACHE
+# =============================================================================
+
+
+class TTLCache:
+    """Small LRU cache with per-entry expiry (single event loop, no locking)"""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# =============================================================================
+# GATEWAY
+# =============================================================================
+
+
+class AIGateway:
+    """Concurrency limits, coalescing and caching in front of providers and local models"""
+
+    def __init__(
+        self,
+        providers: Dict[str, AIProvider],
+        default_provider: Optional[str] = None,
+        max_concurrency: Optional[Dict[str, int]] = None,
+        cache_ttl_seconds: float = DEFAULT_CACHE_TTL_SECONDS,
+        cache_max_entries: int = DEFAULT_CACHE_MAX_ENTRIES,
+        model_concurrency: Optional[Dict[str, int]] = None,
+    ):
+        self.providers = providers
+        self.default_provider = default_provider or next(iter(providers), None)
+        limits = max_concurrency or {}
+        self._semaphores = {
+            name: asyncio.Semaphore(limits.get(name, DEFAULT_MAX_CONCURRENCY)) for name in providers
+        }
+        self.cache = TTLCache(cache_ttl_seconds, cache_max_entries)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._model_limits = dict(model_concurrency or {})
+        self._model_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.stats = {"calls": 0, "cache_hits": 0, "coalesced": 0, "errors": 0, "inferences": 0}
+
+    @classmethod
+    def from_env(cls) -> "AIGateway":
+        """Build a gateway from the configured API keys (see module docstring)"""
+        providers: Dict[str, AIProvider] = {}
+        if os.getenv("OPENAI_API_KEY"):
+            try:
+                providers["openai"] = OpenAIProvider(os.environ["OPENAI_API_KEY"])
+            except ImportError:
+                logger.warning("OPENAI_API_KEY set but the openai package is not installed")
+        if os.getenv("ANTHROPIC_API_KEY"):
+            try:
+                providers["claude"] = ClaudeProvider(os.environ["ANTHROPIC_API_KEY"])
+            except ImportError:
+                logger.warning("ANTHROPIC_API_KEY set but the anthropic package is not installed")
+        default = os.getenv("AI_PROVIDER")
+        if default == "stub":
+            providers["stub"] = StubProvider()
+
+        limits = {}
+        for name in providers:
+            value = os.getenv(f"AI_MAX_CONCURRENCY_{name.upper()}")
+            if value:
+                limits[name] = int(value)
+        return cls(providers, default_provider=default if default in providers else None, max_concurrency=limits)
+
+    @property
+    def available(self) -> bool:
+        return self.default_provider is not None
+
+    def provider_names(self) -> List[str]:
+        return list(self.providers)
+
+    def _resolve(self, provider: Optional[str]) -> Tuple[str, AIProvider]:
+        name = provider or self.default_provider
+        if name not in self.providers:
+            raise LookupError(f"AI provider not available: {name}")
+        return name, self.providers[name]
+
+    async def _invoke(self, name: str, provider: AIProvider, request: CompletionRequest, key: str) -> str:
+        try:
+            async with self._semaphores[name]:
+                self.stats["calls"] += 1
+                result = await provider.complete(request)
+            self.cache.set(key, result)
+            return result
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def complete(self, request: CompletionRequest, provider: Optional[str] = None) -> str:
+        """Return the completion for ``request``, from cache when possible"""
+        name, backend = self._resolve(provider)
+        key = request.cache_key(name)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            return cached
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            task = asyncio.ensure_future(self._invoke(name, backend, request, key))
+            self._inflight[key] = task
+        # Shield so one caller disconnecting does not cancel the shared call
+        return await asyncio.shield(task)
+
+    async def stream(self, request: CompletionRequest, provider: Optional[str] = None) -> AsyncIterator[str]:
+        """Yield the completion incrementally.
+
+        Cached results and identical ``complete()`` calls already in flight
+        are replayed as a single chunk; otherwise the provider streams under
+        the concurrency limit and the assembled text is cached when the
+        stream finishes. Streams are not coalesced with each other: a stream
+        is not registered as in flight, so concurrent identical streams (and
+        ``complete()`` calls made while one is streaming) each call the
+        provider, and every caller gets tokens as they are generated.
+        """
+        name, backend = self._resolve(provider)
+        key = request.cache_key(name)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            yield cached
+            return
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+            yield await asyncio.shield(task)
+            return
+
+        parts = []
+        try:
+            async with self._semaphores[name]:
+                self.stats["calls"] += 1
+                async for chunk in backend.stream(request):
+                    parts.append(chunk)
+                    yield chunk
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        self.cache.set(key, "".join(parts))
+
+    def _model_semaphore(self, model: str) -> asyncio.Semaphore:
+        semaphore = self._model_semaphores.get(model)
+        if semaphore is None:
+            limit = self._model_limits.get(model) or int(
+                os.getenv(f"AI_MODEL_CONCURRENCY_{model.upper()}", DEFAULT_MODEL_CONCURRENCY)
+            )
+            semaphore = self._model_semaphores[model] = asyncio.Semaphore(limit)
+        return semaphore
+
+    async def infer(self, model: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run blocking inference ``fn(*args, **kwargs)`` for ``model`` in a worker thread"""
+        async with self._model_semaphore(model):
+            self.stats["inferences"] += 1
+            return await asyncio.to_thread(fn, *args, **kwargs)
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            **self.stats,
+            "providers": self.provider_names(),
+            "models": sorted(self._model_semaphores),
+            "default_provider": self.default_provider,
+            "cache_entries": len(self.cache),
+            "inflight": len(self._inflight),
+        }
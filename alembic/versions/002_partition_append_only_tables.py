@@ -0,0 +1,162 @@
+"""Partition messages and notifications by month
+
+Revision ID: 002_partition_append_only
+Revises: 001_monetization
+Create Date: 2026-10-18 00:00:00.000000
+
+Converts the append-only tables into PostgreSQL declarative range
+partitioned tables on created_at (see app/core/partitioning.py) and widens
+their ids to BIGINT for snowflake IDs. The id default becomes
+snowflake_id(), a database-side generator with the layout of
+app/core/snowflake.py (worker id 31), so writers that insert without an id
+get time-ordered ids too. The original tables are kept as <table>_legacy;
+drop them once the new tables are verified.
+
+post_likes is left alone: its unique (post_id, user_id) index enforces one
+like per user per post and cannot include the partition key.
+
+PostgreSQL only - on other databases this migration is a no-op.
+
+The DDL is written out here rather than imported from app.core so the
+migration stays frozen (and importable from alembic/env.py, where ``app``
+is the root package).
+"""
+from datetime import date, datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002_partition_append_only'
+down_revision = '001_monetization'
+branch_labels = None
+depends_on = None
+
+CONVERTED_TABLES = ('messages', 'notifications')
+PARTITION_COLUMN = 'created_at'
+
+# Future monthly partitions created here; app startup keeps them topped up
+MONTHS_AHEAD = 3
+
+# snowflake_id(): ms since 2024-01-01 << 12 | worker 31 << 7 | sequence % 128
+SNOWFLAKE_FUNCTION_SQL = [
+    "CREATE SEQUENCE IF NOT EXISTS snowflake_id_seq",
+    (
+        "CREATE OR REPLACE FUNCTION snowflake_id() RETURNS bigint LANGUAGE sql VOLATILE AS $$ "
+        "SELECT ((floor(extract(epoch FROM clock_timestamp()) * 1000)::bigint - 1704067200000) << 12) "
+        "| (31::bigint << 7) "
+        "| (nextval('snowflake_id_seq') % 128) $$"
+    ),
+]
+
+
+def month_start(moment):
+    return date(moment.year, moment.month, 1)
+
+
+def add_months(start, months):
+    index = start.year * 12 + (start.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def create_partition_sql(table, start):
+    end = add_months(start, 1)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {table}_p{start.year:04d}_{start.month:02d} "
+        f"PARTITION OF {table} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+def convert_to_partitioned_sql(table, first_month, last_month):
+    """Rename to <table>_legacy, create the partitioned parent, copy rows
+
+    The id default becomes snowflake_id() and secondary indexes are
+    recreated on the new table under their original names.
+    """
+    legacy = f"{table}_legacy"
+    column = PARTITION_COLUMN
+    statements = [
+        f"ALTER TABLE {table} RENAME TO {legacy}",
+        f"ALTER TABLE {legacy} ALTER COLUMN {column} SET NOT NULL",
+        (
+            f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            f"PARTITION BY RANGE ({column})"
+        ),
+        f"ALTER TABLE {table} ALTER COLUMN id TYPE BIGINT",
+        f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT snowflake_id()",
+        f"ALTER TABLE {table} ADD PRIMARY KEY (id, {column})",
+        f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT",
+    ]
+    month = first_month
+    while month <= last_month:
+        statements.append(create_partition_sql(table, month))
+        month = add_months(month, 1)
+    statements += [
+        f"INSERT INTO {table} SELECT * FROM {legacy}",
+        # Foreign keys (LIKE does not copy them)
+        (
+            "DO $$ DECLARE r record; BEGIN "
+            "FOR r IN SELECT conname, pg_get_constraintdef(oid) AS def FROM pg_constraint "
+            f"WHERE conrelid = '{legacy}'::regclass AND contype = 'f' LOOP "
+            f"EXECUTE format('ALTER TABLE {table} ADD CONSTRAINT %I %s', r.conname || '_part', r.def); "
+            "END LOOP; END $$"
+        ),
+        # Secondary indexes, unique ones included (PostgreSQL rejects a unique
+        # index without the partition key rather than losing the guarantee)
+        (
+            "DO $$ DECLARE r record; BEGIN "
+            "FOR r IN SELECT c.relname AS name, pg_get_indexdef(i.indexrelid) AS def "
+            "FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            f"WHERE i.indrelid = '{legacy}'::regclass AND NOT i.indisprimary LOOP "
+            "EXECUTE format('ALTER INDEX %I RENAME TO %I', r.name, left(r.name, 56) || '_legacy'); "
+            f"EXECUTE regexp_replace(r.def, ' ON (\\S+\\.)?{legacy} ', ' ON {table} '); "
+            "END LOOP; END $$"
+        ),
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table} ({column})",
+    ]
+    return statements
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    for statement in SNOWFLAKE_FUNCTION_SQL:
+        op.execute(statement)
+
+    current = month_start(datetime.now(timezone.utc))
+    for table in CONVERTED_TABLES:
+        oldest = bind.execute(sa.text(f"SELECT min({PARTITION_COLUMN}) FROM {table}")).scalar()
+        first_month = month_start(oldest) if oldest is not None else current
+        last_month = add_months(current, MONTHS_AHEAD)
+        for statement in convert_to_partitioned_sql(table, first_month, last_month):
+            op.execute(statement)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    for table in CONVERTED_TABLES:
+        # Rows written after the upgrade use snowflake ids that need BIGINT
+        op.execute(f"ALTER TABLE {table}_legacy ALTER COLUMN id TYPE BIGINT")
+        op.execute(
+            f"INSERT INTO {table}_legacy SELECT * FROM {table} "
+            f"WHERE id NOT IN (SELECT id FROM {table}_legacy)"
+        )
+        op.execute(f"DROP TABLE {table} CASCADE")
+        op.execute(f"ALTER TABLE {table}_legacy RENAME TO {table}")
+        # Give the secondary indexes their names back
+        op.execute(
+            "DO $$ DECLARE r record; BEGIN "
+            "FOR r IN SELECT c.relname AS name FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            f"WHERE i.indrelid = '{table}'::regclass AND c.relname LIKE '%\\_legacy' LOOP "
+            "EXECUTE format('ALTER INDEX %I RENAME TO %I', r.name, left(r.name, length(r.name) - 7)); "
+            "END LOOP; END $$"
+        )
+
+    op.execute("DROP FUNCTION IF EXISTS snowflake_id()")
+    op.execute("DROP SEQUENCE IF EXISTS snowflake_id_seq")
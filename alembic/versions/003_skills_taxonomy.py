@@ -0,0 +1,65 @@
+"""Add skills taxonomy tables
+
+Revision ID: 003_skills_taxonomy
+Revises: 002_partition_append_only
+Create Date: 2026-10-18 00:00:00.000000
+
+Canonical skills, aliases and the user/job association tables used by
+app/core/skills.py. Existing skills text is linked by
+backfill_skill_links() at application startup.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003_skills_taxonomy'
+down_revision = '002_partition_append_only'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('skills',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_skills_name'), 'skills', ['name'], unique=True)
+
+    op.create_table('skill_aliases',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('alias', sa.String(length=100), nullable=False),
+        sa.Column('skill_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['skill_id'], ['skills.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('alias')
+    )
+
+    op.create_table('user_skills',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('skill_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['skill_id'], ['skills.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'skill_id')
+    )
+    op.create_index(op.f('ix_user_skills_skill_id'), 'user_skills', ['skill_id'], unique=False)
+
+    op.create_table('job_skills',
+        sa.Column('job_id', sa.Integer(), nullable=False),
+        sa.Column('skill_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['job_id'], ['jobs.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['skill_id'], ['skills.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('job_id', 'skill_id')
+    )
+    op.create_index(op.f('ix_job_skills_skill_id'), 'job_skills', ['skill_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_job_skills_skill_id'), table_name='job_skills')
+    op.drop_table('job_skills')
+    op.drop_index(op.f('ix_user_skills_skill_id'), table_name='user_skills')
+    op.drop_table('user_skills')
+    op.drop_table('skill_aliases')
+    op.drop_index(op.f('ix_skills_name'), table_name='skills')
+    op.drop_table('skills')
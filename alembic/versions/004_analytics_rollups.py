@@ -0,0 +1,49 @@
+"""Add analytics rollup tables
+
+Revision ID: 004_analytics_rollups
+Revises: 003_skills_taxonomy
+Create Date: 2026-10-18 00:00:00.000000
+
+Hour/day counters, per-day HyperLogLog sketches and per-source
+watermarks maintained by app/core/analytics_rollups.py. Existing users
+and login attempts are folded in by the first refresh.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004_analytics_rollups'
+down_revision = '003_skills_taxonomy'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('analytics_rollups',
+        sa.Column('granularity', sa.String(length=8), nullable=False),
+        sa.Column('bucket', sa.String(length=13), nullable=False),
+        sa.Column('metric', sa.String(length=50), nullable=False),
+        sa.Column('dimension', sa.String(length=200), nullable=False),
+        sa.Column('value', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('granularity', 'bucket', 'metric', 'dimension')
+    )
+
+    op.create_table('analytics_sketches',
+        sa.Column('bucket', sa.String(length=10), nullable=False),
+        sa.Column('metric', sa.String(length=50), nullable=False),
+        sa.Column('registers', sa.LargeBinary(), nullable=False),
+        sa.PrimaryKeyConstraint('bucket', 'metric')
+    )
+
+    op.create_table('analytics_watermarks',
+        sa.Column('source', sa.String(length=50), nullable=False),
+        sa.Column('last_id', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('source')
+    )
+
+
+def downgrade():
+    op.drop_table('analytics_watermarks')
+    op.drop_table('analytics_sketches')
+    op.drop_table('analytics_rollups')
@@ -0,0 +1,34 @@
+"""Add user social stats counters
+
+Revision ID: 005_user_social_stats
+Revises: 004_analytics_rollups
+Create Date: 2026-10-18 00:00:00.000000
+
+Denormalized follower/following/post counts maintained by
+app/core/social_graph.py. Rows are created by the reconciliation that
+runs at startup; users without a row are counted from the source tables.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005_user_social_stats'
+down_revision = '004_analytics_rollups'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_social_stats',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('followers_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('following_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('posts_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade():
+    op.drop_table('user_social_stats')
@@ -0,0 +1,78 @@
+"""Add the append-only analytics events table
+
+Revision ID: 006_analytics_events
+Revises: 005_user_social_stats
+Create Date: 2026-10-18 00:00:00.000000
+
+Product events (page views, searches, clicks) batched in by
+app/core/event_ingest.py and folded into the analytics rollups. On
+PostgreSQL the table is created range partitioned by month on created_at
+(see app/core/partitioning.py); elsewhere it is a plain table. The
+partition DDL is written out here so the migration stays frozen.
+"""
+from datetime import date, datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006_analytics_events'
+down_revision = '005_user_social_stats'
+branch_labels = None
+depends_on = None
+
+# Future monthly partitions created here; app startup keeps them topped up
+MONTHS_AHEAD = 3
+
+
+def add_months(start, months):
+    index = start.year * 12 + (start.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        op.create_table('analytics_events',
+            sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('event_id', sa.String(length=32), nullable=False),
+            sa.Column('event_type', sa.String(length=50), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=True),
+            sa.Column('data', sa.JSON(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('event_id', 'created_at', name='uq_analytics_events_event_id')
+        )
+        op.create_index('idx_analytics_events_created_at', 'analytics_events', ['created_at'])
+        return
+
+    # The partition key must be part of every unique constraint
+    op.execute(
+        "CREATE TABLE analytics_events ("
+        "id BIGSERIAL NOT NULL, "
+        "created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL, "
+        "event_id VARCHAR(32) NOT NULL, "
+        "event_type VARCHAR(50) NOT NULL, "
+        "user_id INTEGER, "
+        "data JSON, "
+        "PRIMARY KEY (id, created_at), "
+        "CONSTRAINT uq_analytics_events_event_id UNIQUE (event_id, created_at)"
+        ") PARTITION BY RANGE (created_at)"
+    )
+    op.execute("CREATE TABLE analytics_events_default PARTITION OF analytics_events DEFAULT")
+    now = datetime.now(timezone.utc)
+    current = date(now.year, now.month, 1)
+    for offset in range(MONTHS_AHEAD + 1):
+        start = add_months(current, offset)
+        end = add_months(start, 1)
+        op.execute(
+            f"CREATE TABLE IF NOT EXISTS analytics_events_p{start.year:04d}_{start.month:02d} "
+            f"PARTITION OF analytics_events "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+    op.execute("CREATE INDEX idx_analytics_events_created_at ON analytics_events (created_at)")
+
+
+def downgrade():
+    # Partitions are dropped with their parent
+    op.execute("DROP TABLE IF EXISTS analytics_events CASCADE")
@@ -0,0 +1,38 @@
+"""Add the push device token registry
+
+Revision ID: 007_device_tokens
+Revises: 006_analytics_events
+Create Date: 2026-10-18 00:00:00.000000
+
+One row per device push token, looked up by user when
+app/core/push.py fans notifications out. Tokens the provider reports as
+unregistered are deleted by the dispatcher.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007_device_tokens'
+down_revision = '006_analytics_events'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('device_tokens',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('token', sa.String(length=512), nullable=False),
+        sa.Column('platform', sa.String(length=16), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('last_seen_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('token', name='uq_device_tokens_token')
+    )
+    op.create_index('ix_device_tokens_user_id', 'device_tokens', ['user_id'])
+
+
+def downgrade():
+    op.drop_index('ix_device_tokens_user_id', table_name='device_tokens')
+    op.drop_table('device_tokens')
@@ -0,0 +1,43 @@
+"""Add precomputed reputation aggregates
+
+Revision ID: 008_user_reputation
+Revises: 007_device_tokens
+Create Date: 2026-10-18 00:00:00.000000
+
+Per-reviewee review count, rating sum, star histogram and smoothed score
+maintained by app/core/reputation.py in the review write transactions.
+Rows are created by the first review written after this migration and by
+the reconciliation that runs at startup; users without a row are counted
+from reviews on read.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008_user_reputation'
+down_revision = '007_device_tokens'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_reputation',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('review_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('one_star', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('two_star', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('three_star', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('four_star', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('five_star', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('score', sa.Float(), server_default='0', nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index('ix_user_reputation_score', 'user_reputation', ['score'])
+
+
+def downgrade():
+    op.drop_index('ix_user_reputation_score', table_name='user_reputation')
+    op.drop_table('user_reputation')
@@ -2,19 +2,30 @@
 User login analytics and monitoring API endpoints.
 
 Provides comprehensive user activity statistics, login tracking,
-and inactive user identification for admin users.
+and inactive user identification for admin users, plus ingestion of
+product events (page views, searches, clicks) and their aggregates.
 """
 import logging
 from datetime import datetime, timedelta
 from typing import Optional, List
 
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy import func, select, and_, or_
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func, select, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.analytics_rollups import (
+    HOUR,
+    counter_series,
+    distinct_count,
+    maybe_refresh_rollups,
+    sum_counters,
+)
+from app.core.event_ingest import EVENT_FLUSH_SECONDS, event_ingestor
 from app.database import get_db
 from app.models import User, LoginAttempt
+from app.schemas.analytics import EventBatch
 from app.api.admin_utils import require_admin
+from app.api.auth import get_current_user
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -36,96 +47,45 @@ async def get_user_login_analytics(
         - Users with failed login attempts
         - Average logins per day/week
     
+    Counts are read from the incremental rollup tables, so the cost is
+    proportional to the number of days covered, not the number of users.
+    
     Requires admin authentication.
     """
     logger.info(f"User login analytics requested by admin user_id={current_user.id}")
     
+    await maybe_refresh_rollups(db)
+    
     # Calculate date thresholds
     now = datetime.utcnow()
-    thirty_days_ago = now - timedelta(days=30)
-    seven_days_ago = now - timedelta(days=7)
+    today = now.date()
+    thirty_days_ago = today - timedelta(days=29)
+    seven_days_ago = today - timedelta(days=6)
     
-    # Total users
-    result = await db.execute(select(func.count(User.id)))
-    total_users = result.scalar()
+    # Signups by authentication method (all time) give total/OAuth/password users
+    auth_distribution = await sum_counters(db, "signups_by_method")
+    total_users = sum(auth_distribution.values())
+    password_users = auth_distribution.get("password", 0)
+    oauth_users = total_users - password_users
     
-    # Active users (logged in last 30 days)
-    result = await db.execute(
-        select(func.count(User.id)).where(
-            and_(
-                User.last_login.isnot(None),
-                User.last_login >= thirty_days_ago
-            )
-        )
-    )
-    active_users_30d = result.scalar()
+    # Distinct users with a successful login, merged from daily sketches
+    active_users_30d = await distinct_count(db, "active_users", thirty_days_ago)
+    active_users_7d = await distinct_count(db, "active_users", seven_days_ago)
     
-    # Active users (logged in last 7 days)
-    result = await db.execute(
-        select(func.count(User.id)).where(
-            and_(
-                User.last_login.isnot(None),
-                User.last_login >= seven_days_ago
-            )
-        )
-    )
-    active_users_7d = result.scalar()
-    
-    # Never logged in (no last_login)
+    # Never logged in (no last_login) - single indexed count
     result = await db.execute(
         select(func.count(User.id)).where(User.last_login.is_(None))
     )
     never_logged_in = result.scalar()
     
     # Inactive users (30+ days since last login)
-    result = await db.execute(
-        select(func.count(User.id)).where(
-            and_(
-                User.last_login.isnot(None),
-                User.last_login < thirty_days_ago
-            )
-        )
-    )
-    inactive_users = result.scalar()
-    
-    # OAuth vs password users
-    result = await db.execute(
-        select(func.count(User.id)).where(User.oauth_provider.isnot(None))
-    )
-    oauth_users = result.scalar()
-    
-    result = await db.execute(
-        select(func.count(User.id)).where(
-            and_(
-                User.oauth_provider.is_(None),
-                User.hashed_password.isnot(None)
-            )
-        )
-    )
-    password_users = result.scalar()
+    inactive_users = max(0, total_users - never_logged_in - active_users_30d)
     
     # Users with failed login attempts (last 30 days)
-    result = await db.execute(
-        select(func.count(func.distinct(LoginAttempt.user_id))).where(
-            and_(
-                LoginAttempt.success == False,
-                LoginAttempt.timestamp >= thirty_days_ago,
-                LoginAttempt.user_id.isnot(None)
-            )
-        )
-    )
-    users_with_failed_attempts = result.scalar() or 0
+    users_with_failed_attempts = await distinct_count(db, "failed_login_users", thirty_days_ago)
     
-    # Total login attempts (last 30 days)
-    result = await db.execute(
-        select(func.count(LoginAttempt.id)).where(
-            and_(
-                LoginAttempt.success == True,
-                LoginAttempt.timestamp >= thirty_days_ago
-            )
-        )
-    )
-    total_logins_30d = result.scalar() or 0
+    # Total successful logins (last 30 days)
+    total_logins_30d = (await sum_counters(db, "logins", thirty_days_ago)).get("", 0)
     
     # Average logins per day (last 30 days)
     avg_logins_per_day = round(total_logins_30d / 30, 2) if total_logins_30d > 0 else 0
@@ -133,18 +93,6 @@ async def get_user_login_analytics(
     # Average logins per week
     avg_logins_per_week = round(avg_logins_per_day * 7, 2)
     
-    # Get distribution by authentication method
-    result = await db.execute(
-        select(
-            User.oauth_provider,
-            func.count(User.id).label('count')
-        ).group_by(User.oauth_provider)
-    )
-    auth_distribution = {
-        row.oauth_provider or 'password': row.count
-        for row in result.all()
-    }
-    
     return {
         "total_users": total_users,
         "active_users": {
@@ -166,6 +114,8 @@ async def get_user_login_analytics(
             "avg_logins_per_day": avg_logins_per_day,
             "avg_logins_per_week": avg_logins_per_week
         },
+        # Distinct-user counts come from HyperLogLog sketches (~1.6% error)
+        "approximate_fields": ["active_users", "inactive_users_30d", "failed_login_attempts"],
         "generated_at": now.isoformat()
     }
 
@@ -347,52 +297,106 @@ async def get_inactive_users(
 @router.get("/login-activity")
 async def get_login_activity_timeline(
     days: int = Query(default=30, ge=1, le=90, description="Number of days to analyze"),
+    granularity: str = Query(default="day", regex="^(day|hour)$", description="Bucket size: day or hour"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(require_admin),
 ):
     """Get login activity over time for charting
     
-    Returns daily login counts for the specified period.
+    Returns daily (or hourly) login counts for the specified period.
     
     Args:
         days: Number of days to analyze (default: 30)
+        granularity: "day" (default) or "hour"
     
     Returns:
-        Daily login activity data for visualization
+        Login activity data for visualization
     
     Requires admin authentication.
     """
     logger.info(f"Login activity timeline requested (days={days}) by admin user_id={current_user.id}")
     
-    start_date = datetime.utcnow() - timedelta(days=days)
+    await maybe_refresh_rollups(db)
     
-    # Get successful logins grouped by day
-    result = await db.execute(
-        select(
-            func.date(LoginAttempt.timestamp).label('date'),
-            func.count(LoginAttempt.id).label('count')
-        )
-        .where(
-            and_(
-                LoginAttempt.success == True,
-                LoginAttempt.timestamp >= start_date
-            )
-        )
-        .group_by(func.date(LoginAttempt.timestamp))
-        .order_by(func.date(LoginAttempt.timestamp))
-    )
+    start_date = datetime.utcnow() - timedelta(days=days)
     
-    daily_logins = [
-        {
-            "date": str(row.date),
-            "count": row.count
-        }
-        for row in result.all()
-    ]
+    # Successful logins per bucket from the rollup table
+    series = await counter_series(db, "logins", start_date, granularity=granularity)
     
-    return {
-        "daily_logins": daily_logins,
+    response = {
         "period_days": days,
         "start_date": start_date.date().isoformat(),
         "end_date": datetime.utcnow().date().isoformat()
     }
+    if granularity == HOUR:
+        response["hourly_logins"] = [{"hour": bucket, "count": count} for bucket, count in series]
+    else:
+        response["daily_logins"] = [{"date": bucket, "count": count} for bucket, count in series]
+    return response
+
+
+@router.post("/events", status_code=status.HTTP_202_ACCEPTED)
+async def ingest_events(
+    batch: EventBatch,
+    current_user: User = Depends(get_current_user),
+):
+    """Record product events for the current user
+    
+    Events are buffered in process and written in batches (see
+    app.core.event_ingest), so this returns before they are stored.
+    A full buffer refuses the whole request with 429; retry after the
+    Retry-After delay.
+    """
+    accepted = event_ingestor.submit_many(
+        (event.event_type, current_user.id, event.data, None) for event in batch.events
+    )
+    if not accepted:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Event buffer is full. Please retry later.",
+            headers={"Retry-After": str(max(1, round(EVENT_FLUSH_SECONDS)))},
+        )
+    return {"accepted": len(batch.events)}
+
+
+@router.get("/events")
+async def get_event_analytics(
+    days: int = Query(default=30, ge=1, le=90, description="Number of days to analyze"),
+    event_type: Optional[str] = Query(default=None, max_length=50, description="Daily series for this event type"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_admin),
+):
+    """Get product event totals, distinct users and a daily series
+    
+    Read from the rollup tables the raw events are folded into.
+    
+    Args:
+        days: Number of days to analyze (default: 30)
+        event_type: Optional event type for the daily series
+    
+    Requires admin authentication.
+    """
+    logger.info(f"Event analytics requested (days={days}) by admin user_id={current_user.id}")
+    
+    await maybe_refresh_rollups(db)
+    
+    today = datetime.utcnow().date()
+    start = today - timedelta(days=days - 1)
+    totals = await sum_counters(db, "events", start, today)
+    
+    response = {
+        "period_days": days,
+        "start_date": start.isoformat(),
+        "end_date": today.isoformat(),
+        "events_by_type": dict(sorted(totals.items(), key=lambda item: -item[1])),
+        "total_events": sum(totals.values()),
+        "distinct_users": await distinct_count(db, "event_users", start, today),
+        "ingest": event_ingestor.stats(),
+    }
+    if event_type is not None:
+        series = await counter_series(
+            db, "events", datetime.combine(start, datetime.min.time()), dimension=event_type
+        )
+        response["event_type"] = event_type
+        response["daily_events"] = [{"date": bucket, "count": count} for bucket, count in series]
+    return response
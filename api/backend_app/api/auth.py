@@ -1014,6 +1014,9 @@ async def google_oauth(oauth_data: OAuthLogin, request: Request, response: Respo
         user_agent = request.headers.get("user-agent")
         await store_refresh_token(db, user.id, refresh_token, client_ip, user_agent)
         
+        # Record successful login in database for analytics
+        await record_login_attempt_db(db, email, user.id, client_ip, True, None)
+        
         # Set secure cookies
         set_auth_cookies(response, access_token, refresh_token)
         
@@ -1126,6 +1129,9 @@ async def apple_oauth(oauth_data: OAuthLogin, request: Request, response: Respon
         user_agent = request.headers.get("user-agent")
         await store_refresh_token(db, user.id, refresh_token, client_ip, user_agent)
         
+        # Record successful login in database for analytics
+        await record_login_attempt_db(db, email, user.id, client_ip, True, None)
+        
         # Set secure cookies
         set_auth_cookies(response, access_token, refresh_token)
         
@@ -0,0 +1,490 @@
+"""
+Incremental analytics rollups for the admin analytics endpoints.
+
+Instead of scanning ``users``, ``login_attempts`` and ``analytics_events``
+(see app.core.event_ingest) on every dashboard
+request, rows are folded into small per-hour and per-day counter tables
+(``analytics_rollups``) and per-day HyperLogLog sketches
+(``analytics_sketches``) for distinct-user metrics. Each source table has
+a watermark row (``analytics_watermarks``) holding the last folded id, so
+a refresh only reads rows appended since the previous one.
+
+Counters:
+    signups               users created, dimension ""
+    signups_by_method     dimension = oauth provider or "password"
+    signups_by_role       dimension = users.role (current value)
+    signups_by_location   dimension = users.location (current value)
+    logins                successful login attempts
+    logins_by_method      dimension = oauth provider or "password"
+    login_failures        failed login attempts
+    events                analytics events, dimension = event type
+
+Sketches (day granularity only):
+    active_users          users with a successful login
+    failed_login_users    known users with a failed login
+    event_users           known users with any analytics event
+
+Role and location counts stay bucketed by signup time but follow the
+user's current values: a flush that changes ``role`` or ``location`` on an
+already folded user moves that user's count from the old value to the new
+one (like the ``user_stats_daily`` triggers in admin_backend.py). Users not
+folded yet pick up their current values when they are folded. Bulk
+``UPDATE`` statements that bypass the ORM are not tracked. Distinct counts
+merged from sketches are approximate (about 1.6% standard error).
+
+Configuration (environment variables):
+    ROLLUP_SETTLE_SECONDS           Age a row must reach before it is folded,
+                                    so rows committed out of id order are not
+                                    skipped (default: 5)
+    ROLLUP_REFRESH_INTERVAL_SECONDS Minimum time between refreshes triggered
+                                    by maybe_refresh_rollups() (default: 60)
+"""
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from hashlib import blake2b
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, event, func, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models import (
+    AnalyticsEvent,
+    AnalyticsRollup,
+    AnalyticsSketch,
+    AnalyticsWatermark,
+    LoginAttempt,
+    User,
+)
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_SETTLE_SECONDS = float(os.getenv("ROLLUP_SETTLE_SECONDS", "5"))
+ROLLUP_REFRESH_INTERVAL_SECONDS = float(os.getenv("ROLLUP_REFRESH_INTERVAL_SECONDS", "60"))
+
+HOUR = "hour"
+DAY = "day"
+
+_refresh_lock = asyncio.Lock()
+_last_refresh = 0.0
+
+
+class HyperLogLog:
+    """Fixed-size distinct counter with mergeable byte registers"""
+
+    def __init__(self, precision: int = 12, registers: Optional[bytes] = None):
+        if registers is not None:
+            precision = int(math.log2(len(registers)))
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.m)
+
+    def add(self, value) -> None:
+        digest = blake2b(str(value).encode(), digest_size=8).digest()
+        hashed = int.from_bytes(digest, "big")
+        index = hashed >> (64 - self.precision)
+        remaining = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remaining.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if other.m != self.m:
+            raise ValueError("cannot merge sketches of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        return cls(registers=data)
+
+
+def _utc(ts: Optional[datetime]) -> datetime:
+    if ts is None:
+        return datetime.utcnow()
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def hour_bucket(ts: datetime) -> str:
+    return _utc(ts).strftime("%Y-%m-%dT%H")
+
+
+def day_bucket(ts) -> str:
+    if isinstance(ts, datetime):
+        return _utc(ts).strftime("%Y-%m-%d")
+    return ts.isoformat()
+
+
+def _insert(db: AsyncSession, table):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"analytics rollups do not support {dialect}")
+    return insert(table)
+
+
+class _Batch:
+    """Counter and sketch deltas accumulated before they are written"""
+
+    def __init__(self):
+        self.counters: Dict[Tuple[str, str, str, str], int] = defaultdict(int)
+        self.sketches: Dict[Tuple[str, str], HyperLogLog] = {}
+
+    def incr(self, ts: datetime, metric: str, dimension: str = "", amount: int = 1) -> None:
+        self.counters[(HOUR, hour_bucket(ts), metric, dimension)] += amount
+        self.counters[(DAY, day_bucket(ts), metric, dimension)] += amount
+
+    def add_distinct(self, ts: datetime, metric: str, value) -> None:
+        key = (day_bucket(ts), metric)
+        if key not in self.sketches:
+            self.sketches[key] = HyperLogLog()
+        self.sketches[key].add(value)
+
+    def _counters_upsert(self, db):
+        table = AnalyticsRollup.__table__
+        stmt = _insert(db, table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["granularity", "bucket", "metric", "dimension"],
+            set_={"value": table.c.value + stmt.excluded.value},
+        )
+        return stmt, [
+            {"granularity": g, "bucket": b, "metric": m, "dimension": d, "value": v}
+            for (g, b, m, d), v in self.counters.items()
+        ]
+
+    async def write(self, db: AsyncSession) -> None:
+        if self.counters:
+            await db.execute(*self._counters_upsert(db))
+
+        if self.sketches:
+            buckets = {bucket for bucket, _ in self.sketches}
+            result = await db.execute(
+                select(AnalyticsSketch).where(AnalyticsSketch.bucket.in_(buckets))
+            )
+            for row in result.scalars().all():
+                sketch = self.sketches.get((row.bucket, row.metric))
+                if sketch is not None:
+                    sketch.merge(HyperLogLog.from_bytes(row.registers))
+
+            table = AnalyticsSketch.__table__
+            stmt = _insert(db, table)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["bucket", "metric"],
+                set_={"registers": stmt.excluded.registers},
+            )
+            await db.execute(stmt, [
+                {"bucket": b, "metric": m, "registers": sketch.to_bytes()}
+                for (b, m), sketch in self.sketches.items()
+            ])
+
+
+async def _lock_watermark(db: AsyncSession, source: str) -> AnalyticsWatermark:
+    stmt = _insert(db, AnalyticsWatermark.__table__).on_conflict_do_nothing(
+        index_elements=["source"]
+    )
+    await db.execute(stmt, [{"source": source, "last_id": 0}])
+    result = await db.execute(
+        select(AnalyticsWatermark)
+        .where(AnalyticsWatermark.source == source)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    return result.scalar_one()
+
+
+def _method(oauth_provider: Optional[str]) -> str:
+    return oauth_provider or "password"
+
+
+async def _fold_users(db: AsyncSession, last_id: int, cutoff: datetime, batch_size: int) -> Tuple[int, int]:
+    result = await db.execute(
+        select(User.id, User.created_at, User.oauth_provider, User.role, User.location)
+        .where(User.id > last_id)
+        .order_by(User.id)
+        .limit(batch_size)
+    )
+    batch = _Batch()
+    folded = 0
+    for row in result.all():
+        created_at = _utc(row.created_at)
+        if created_at > cutoff:
+            break
+        batch.incr(created_at, "signups")
+        batch.incr(created_at, "signups_by_method", _method(row.oauth_provider))
+        batch.incr(created_at, "signups_by_role", row.role or "user")
+        if row.location:
+            batch.incr(created_at, "signups_by_location", row.location)
+        last_id = row.id
+        folded += 1
+    await batch.write(db)
+    return last_id, folded
+
+
+# User columns whose rollup dimension follows updates: (column, metric, default)
+_USER_DIMENSIONS = (
+    ("role", "signups_by_role", "user"),
+    ("location", "signups_by_location", None),
+)
+
+
+def _dimension_changes(user) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    """(metric, old, new) for each tracked column changed on ``user``"""
+    state = inspect(user)
+    changes = []
+    for column, metric, default in _USER_DIMENSIONS:
+        history = state.attrs[column].history
+        if not history.deleted:
+            continue
+        old = history.deleted[0] or default
+        new = (history.added[0] if history.added else None) or default
+        if old != new:
+            changes.append((metric, old, new))
+    return changes
+
+
+def _user_dimension_moves(session: Session, flush_context, instances) -> None:
+    """Move folded users' role/location counts when those columns change"""
+    changed = []
+    for user in session.dirty:
+        if isinstance(user, User) and user.id is not None:
+            changes = _dimension_changes(user)
+            if changes:
+                changed.append((user, changes))
+    if not changed:
+        return
+
+    # Users past the watermark are folded later with their current values.
+    # The row lock orders this against a refresh folding the same users.
+    last_id = session.execute(
+        select(AnalyticsWatermark.last_id)
+        .where(AnalyticsWatermark.source == "users")
+        .with_for_update()
+    ).scalar()
+    batch = _Batch()
+    for user, changes in changed:
+        if last_id is None or user.id > last_id:
+            continue
+        created_at = _utc(user.created_at)
+        for metric, old, new in changes:
+            if old:
+                batch.incr(created_at, metric, old, -1)
+            if new:
+                batch.incr(created_at, metric, new, 1)
+    if batch.counters:
+        session.execute(*batch._counters_upsert(session))
+
+
+event.listen(Session, "before_flush", _user_dimension_moves)
+
+
+async def _fold_login_attempts(db: AsyncSession, last_id: int, cutoff: datetime, batch_size: int) -> Tuple[int, int]:
+    result = await db.execute(
+        select(
+            LoginAttempt.id,
+            LoginAttempt.user_id,
+            LoginAttempt.success,
+            LoginAttempt.timestamp,
+            User.oauth_provider,
+        )
+        .outerjoin(User, User.id == LoginAttempt.user_id)
+        .where(LoginAttempt.id > last_id)
+        .order_by(LoginAttempt.id)
+        .limit(batch_size)
+    )
+    batch = _Batch()
+    folded = 0
+    for row in result.all():
+        ts = _utc(row.timestamp)
+        if ts > cutoff:
+            break
+        if row.success:
+            batch.incr(ts, "logins")
+            batch.incr(ts, "logins_by_method", _method(row.oauth_provider))
+            if row.user_id is not None:
+                batch.add_distinct(ts, "active_users", row.user_id)
+        else:
+            batch.incr(ts, "login_failures")
+            if row.user_id is not None:
+                batch.add_distinct(ts, "failed_login_users", row.user_id)
+        last_id = row.id
+        folded += 1
+    await batch.write(db)
+    return last_id, folded
+
+
+async def _fold_events(db: AsyncSession, last_id: int, cutoff: datetime, batch_size: int) -> Tuple[int, int]:
+    result = await db.execute(
+        select(AnalyticsEvent.id, AnalyticsEvent.event_type, AnalyticsEvent.user_id, AnalyticsEvent.created_at)
+        .where(AnalyticsEvent.id > last_id)
+        .order_by(AnalyticsEvent.id)
+        .limit(batch_size)
+    )
+    batch = _Batch()
+    folded = 0
+    for row in result.all():
+        # Spooled events arrive late with their original created_at; they are
+        # past the cutoff and land in the bucket they happened in
+        ts = _utc(row.created_at)
+        if ts > cutoff:
+            break
+        batch.incr(ts, "events", row.event_type)
+        if row.user_id is not None:
+            batch.add_distinct(ts, "event_users", row.user_id)
+        last_id = row.id
+        folded += 1
+    await batch.write(db)
+    return last_id, folded
+
+
+_SOURCES = {
+    "users": _fold_users,
+    "login_attempts": _fold_login_attempts,
+    "analytics_events": _fold_events,
+}
+
+
+async def refresh_rollups(
+    db: AsyncSession,
+    batch_size: int = 5000,
+    max_batches: int = 20,
+    settle_seconds: Optional[float] = None,
+) -> Dict[str, int]:
+    """Fold rows appended since the last refresh into the rollup tables
+
+    Each source is processed under its own row-locked watermark and
+    committed per batch, so concurrent refreshes never fold a row twice.
+
+    Returns:
+        Number of rows folded per source
+    """
+    if settle_seconds is None:
+        settle_seconds = ROLLUP_SETTLE_SECONDS
+    cutoff = datetime.utcnow() - timedelta(seconds=settle_seconds)
+    folded = {}
+    for source, fold in _SOURCES.items():
+        folded[source] = 0
+        for _ in range(max_batches):
+            watermark = await _lock_watermark(db, source)
+            last_id, count = await fold(db, watermark.last_id, cutoff, batch_size)
+            watermark.last_id = last_id
+            watermark.updated_at = datetime.utcnow()
+            await db.commit()
+            folded[source] += count
+            if count < batch_size:
+                break
+    return folded
+
+
+async def maybe_refresh_rollups(db: AsyncSession) -> None:
+    """Refresh rollups at most once per ROLLUP_REFRESH_INTERVAL_SECONDS
+
+    Failures are logged rather than raised so the dashboard still serves
+    the rollups it already has.
+    """
+    global _last_refresh
+    if time.monotonic() - _last_refresh < ROLLUP_REFRESH_INTERVAL_SECONDS:
+        return
+    async with _refresh_lock:
+        if time.monotonic() - _last_refresh < ROLLUP_REFRESH_INTERVAL_SECONDS:
+            return
+        try:
+            folded = await refresh_rollups(db)
+            if any(folded.values()):
+                logger.info(f"Analytics rollups refreshed: {folded}")
+        except Exception as e:
+            logger.error(f"Analytics rollup refresh failed: {e}")
+            await db.rollback()
+        _last_refresh = time.monotonic()
+
+
+def reset_refresh_throttle() -> None:
+    """Make the next maybe_refresh_rollups() call refresh immediately"""
+    global _last_refresh
+    _last_refresh = 0.0
+
+
+def _bucket_range(granularity: str, start: Optional[str], end: Optional[str]) -> List:
+    conditions = [AnalyticsRollup.granularity == granularity]
+    if start is not None:
+        conditions.append(AnalyticsRollup.bucket >= start)
+    if end is not None:
+        conditions.append(AnalyticsRollup.bucket <= end)
+    return conditions
+
+
+async def sum_counters(
+    db: AsyncSession,
+    metric: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> Dict[str, int]:
+    """Total a metric per dimension over an inclusive day range (all time by default)"""
+    conditions = _bucket_range(
+        DAY,
+        day_bucket(start) if start is not None else None,
+        day_bucket(end) if end is not None else None,
+    )
+    result = await db.execute(
+        select(AnalyticsRollup.dimension, func.sum(AnalyticsRollup.value))
+        .where(and_(AnalyticsRollup.metric == metric, *conditions))
+        .group_by(AnalyticsRollup.dimension)
+    )
+    return {dimension: int(total or 0) for dimension, total in result.all()}
+
+
+async def counter_series(
+    db: AsyncSession,
+    metric: str,
+    start: datetime,
+    granularity: str = DAY,
+    dimension: str = "",
+) -> List[Tuple[str, int]]:
+    """Per-bucket values of a metric from ``start`` onwards, oldest first"""
+    first = hour_bucket(start) if granularity == HOUR else day_bucket(start)
+    result = await db.execute(
+        select(AnalyticsRollup.bucket, AnalyticsRollup.value)
+        .where(and_(
+            AnalyticsRollup.metric == metric,
+            AnalyticsRollup.dimension == dimension,
+            *_bucket_range(granularity, first, None),
+        ))
+        .order_by(AnalyticsRollup.bucket)
+    )
+    return [(bucket, int(value)) for bucket, value in result.all()]
+
+
+async def distinct_count(db: AsyncSession, metric: str, start: date, end: Optional[date] = None) -> int:
+    """Approximate distinct users for a sketch metric over an inclusive day range"""
+    conditions = [AnalyticsSketch.metric == metric, AnalyticsSketch.bucket >= day_bucket(start)]
+    if end is not None:
+        conditions.append(AnalyticsSketch.bucket <= day_bucket(end))
+    result = await db.execute(select(AnalyticsSketch.registers).where(and_(*conditions)))
+    merged: Optional[HyperLogLog] = None
+    for (registers,) in result.all():
+        sketch = HyperLogLog.from_bytes(registers)
+        merged = sketch if merged is None else merged.merge(sketch)
+    return merged.count() if merged is not None else 0
+
@@ -5,131 +5,109 @@ Non-blocking email tasks using Celery for reliable delivery
 
 All email tasks should be called with .delay() to run asynchronously:
     send_welcome_email.delay(user_email="user@example.com", user_name="John")
+
+Delivery (pooled SMTP connections, templates, digests, per-domain rate
+shaping and retry delays) lives in email_delivery.py.
 """
 import logging
-from typing import Optional, Dict, Any
+import os
+from typing import Optional, Dict, Any, List
 from celery import shared_task
 from datetime import datetime, timedelta
 
+from .celery_app import REDIS_URL
+from .email_delivery import (
+    EMAIL_DIGEST_SECONDS,
+    get_delivery,
+    get_digest_store,
+    render,
+    render_message_digest,
+)
+
 logger = logging.getLogger(__name__)
 
 # ============================================================================
 # EMAIL TASKS (Celery)
 # ============================================================================
 
-@shared_task(bind=True, max_retries=3, default_retry_delay=300)
+@shared_task(bind=True, max_retries=5)
 def send_email_task(
     self,
     recipient_email: str,
-    subject: str,
-    body: str,
+    subject: str = "",
+    body: str = "",
     template: Optional[str] = None,
     context: Optional[Dict[str, Any]] = None
 ):
     """
     Send email notification via Celery (non-blocking).
     
-    This task will retry up to 3 times with 5-minute delays on failure.
+    Sent over the worker's pooled SMTP connection. Transient failures
+    (4xx replies, lost connections, a recipient domain over its rate) are
+    retried up to 5 times with jittered exponential backoff; permanent
+    rejections are not retried.
     
     Args:
         recipient_email: Recipient's email address
         subject: Email subject line
-        body: Email body (HTML or plain text)
-        template: Optional email template name
+        body: Email body (HTML)
+        template: Optional email template name (replaces subject and body)
         context: Optional template context variables
         
     Returns:
         dict: Success status and message
     """
-    try:
-        logger.info(f"[Celery] Sending email to {recipient_email}: {subject}")
-        
-        # TODO: Integrate with actual email service
-        # Example integrations:
-        # 
-        # SendGrid:
-        # from sendgrid import SendGridAPIClient
-        # from sendgrid.helpers.mail import Mail
-        # message = Mail(
-        #     from_email='noreply@hiremebahamas.com',
-        #     to_emails=recipient_email,
-        #     subject=subject,
-        #     html_content=body
-        # )
-        # sg = SendGridAPIClient(os.environ.get('SENDGRID_API_KEY'))
-        # response = sg.send(message)
-        #
-        # AWS SES:
-        # import boto3
-        # ses_client = boto3.client('ses', region_name='us-east-1')
-        # response = ses_client.send_email(
-        #     Source='noreply@hiremebahamas.com',
-        #     Destination={'ToAddresses': [recipient_email]},
-        #     Message={
-        #         'Subject': {'Data': subject},
-        #         'Body': {'Html': {'Data': body}}
-        #     }
-        # )
-        #
-        # Mailgun:
-        # import requests
-        # response = requests.post(
-        #     f"https://api.mailgun.net/v3/{MAILGUN_DOMAIN}/messages",
-        #     auth=("api", MAILGUN_API_KEY),
-        #     data={
-        #         "from": "noreply@hiremebahamas.com",
-        #         "to": recipient_email,
-        #         "subject": subject,
-        #         "html": body
-        #     }
-        # )
-        
-        logger.info(f"[Celery] Email sent successfully to {recipient_email}")
-        return {"success": True, "message": f"Email sent to {recipient_email}"}
-        
-    except Exception as e:
-        logger.error(f"[Celery] Failed to send email to {recipient_email}: {e}")
-        # Retry the task
-        raise self.retry(exc=e)
+    if template:
+        subject, body = render(template, context or {})
+    
+    logger.info(f"[Celery] Sending email to {recipient_email}: {subject}")
+    report = get_delivery().send_batch(
+        [(recipient_email, subject, body)], attempt=self.request.retries
+    )
+    
+    if report.failed:
+        reason = report.failed[0][1]
+        logger.error(f"[Celery] Email to {recipient_email} rejected: {reason}")
+        return {"success": False, "message": f"Email to {recipient_email} rejected: {reason}"}
+    if report.deferred:
+        raise self.retry(countdown=report.retry_after, exc=RuntimeError(f"Email to {recipient_email} deferred"))
+    
+    logger.info(f"[Celery] Email sent successfully to {recipient_email}")
+    return {"success": True, "message": f"Email sent to {recipient_email}"}
+
+
+@shared_task(bind=True, max_retries=5)
+def send_email_batch_task(self, messages: List[List[str]]):
+    """
+    Send many emails over pooled connections (Celery task).
+    
+    Only the messages that were deferred are retried, as a new batch
+    after the longest of their retry delays.
+    
+    Args:
+        messages: [recipient_email, subject, html_body] triples
+    """
+    report = get_delivery().send_batch(
+        [tuple(message) for message in messages], attempt=self.request.retries
+    )
+    logger.info(
+        f"[Celery] Email batch: {len(report.sent)} sent, "
+        f"{len(report.deferred)} deferred, {len(report.failed)} rejected"
+    )
+    if report.deferred:
+        deferred = [list(message) for message, _ in report.deferred]
+        raise self.retry(args=[deferred], countdown=report.retry_after)
+    return {"success": True, "sent": len(report.sent), "rejected": len(report.failed)}
 
 
 @shared_task
 def send_welcome_email(user_email: str, user_name: str, username: str):
     """Send welcome email to new user (Celery task)."""
-    subject = f"Welcome to HireMeBahamas, {user_name}!"
-    body = f"""
-    <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <h1 style="color: #00bcd4;">Welcome to HireMeBahamas, {user_name}!</h1>
-                <p>Thank you for joining our platform. We're excited to help you connect with opportunities in the Bahamas.</p>
-                
-                <div style="background: #f5f5f5; padding: 15px; border-radius: 5px; margin: 20px 0;">
-                    <h2 style="margin-top: 0;">Get Started:</h2>
-                    <ul>
-                        <li>Complete your profile to stand out</li>
-                        <li>Browse available jobs in the Bahamas</li>
-                        <li>Connect with professionals and employers</li>
-                        <li>Build your network</li>
-                    </ul>
-                </div>
-                
-                <p>Your username: <strong>@{username}</strong></p>
-                
-                <p style="margin-top: 30px;">
-                    Best regards,<br>
-                    <strong>The HireMeBahamas Team</strong>
-                </p>
-                
-                <hr style="margin: 30px 0; border: none; border-top: 1px solid #ddd;">
-                <p style="font-size: 12px; color: #666;">
-                    This email was sent to {user_email}. If you didn't create this account, please ignore this email.
-                </p>
-            </div>
-        </body>
-    </html>
-    """
-    return send_email_task.delay(user_email, subject, body)
+    return send_email_task.delay(user_email, template="welcome", context={
+        "user_email": user_email,
+        "user_name": user_name,
+        "username": username,
+    })
 
 
 @shared_task
@@ -142,40 +120,15 @@ def send_job_application_email(
     job_id: int
 ):
     """Send notification to employer about new job application (Celery task)."""
-    subject = f"New Application: {job_title}"
-    body = f"""
-    <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <h1 style="color: #00bcd4;">New Job Application</h1>
-                <p>Hi {employer_name},</p>
-                
-                <p>Great news! You have a new application for your job posting.</p>
-                
-                <div style="background: #f5f5f5; padding: 15px; border-radius: 5px; margin: 20px 0;">
-                    <h2 style="margin-top: 0;">{job_title}</h2>
-                    <p><strong>Applicant:</strong> {applicant_name}</p>
-                    <p><strong>Email:</strong> {applicant_email}</p>
-                    <p><strong>Job ID:</strong> #{job_id}</p>
-                </div>
-                
-                <p>
-                    <a href="{os.getenv('BASE_URL', 'https://hiremebahamas.com')}/jobs/{job_id}" 
-                       style="background: #00bcd4; color: white; padding: 12px 24px; 
-                              text-decoration: none; border-radius: 5px; display: inline-block;">
-                        View Application
-                    </a>
-                </p>
-                
-                <p style="margin-top: 30px;">
-                    Best regards,<br>
-                    <strong>The HireMeBahamas Team</strong>
-                </p>
-            </div>
-        </body>
-    </html>
-    """
-    return send_email_task.delay(employer_email, subject, body)
+    base_url = os.getenv('BASE_URL', 'https://hiremebahamas.com')
+    return send_email_task.delay(employer_email, template="job_application", context={
+        "employer_name": employer_name,
+        "job_title": job_title,
+        "applicant_name": applicant_name,
+        "applicant_email": applicant_email,
+        "job_id": job_id,
+        "link": f"{base_url}/jobs/{job_id}",
+    })
 
 
 @shared_task
@@ -185,82 +138,40 @@ def send_message_notification_email(
     sender_name: str,
     message_preview: str
 ):
-    """Send email notification about new message (Celery task)."""
+    """Queue a new-message notification for the recipient's digest (Celery task).
+    
+    Notifications are collected for EMAIL_DIGEST_SECONDS; the first one
+    schedules send_message_digest, which sends a single email for all of
+    them (the plain message email when there was only one).
+    """
     # Truncate message preview
     preview = message_preview[:100] + "..." if len(message_preview) > 100 else message_preview
     
-    subject = f"New message from {sender_name}"
-    body = f"""
-    <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <h1 style="color: #00bcd4;">You have a new message</h1>
-                <p>Hi {recipient_name},</p>
-                
-                <p><strong>{sender_name}</strong> sent you a message on HireMeBahamas:</p>
-                
-                <div style="background: #f5f5f5; padding: 15px; border-radius: 5px; margin: 20px 0;">
-                    <p style="font-style: italic;">"{preview}"</p>
-                </div>
-                
-                <p>
-                    <a href="{os.getenv('BASE_URL', 'https://hiremebahamas.com')}/messages" 
-                       style="background: #00bcd4; color: white; padding: 12px 24px; 
-                              text-decoration: none; border-radius: 5px; display: inline-block;">
-                        Read and Reply
-                    </a>
-                </p>
-                
-                <p style="margin-top: 30px;">
-                    Best regards,<br>
-                    <strong>The HireMeBahamas Team</strong>
-                </p>
-            </div>
-        </body>
-    </html>
-    """
-    return send_email_task.delay(recipient_email, subject, body)
+    pending = get_digest_store(REDIS_URL).add(recipient_email, {"sender_name": sender_name, "preview": preview})
+    if pending == 1:
+        send_message_digest.apply_async(args=[recipient_email, recipient_name], countdown=EMAIL_DIGEST_SECONDS)
+    return {"success": True, "pending": pending}
+
+
+@shared_task
+def send_message_digest(recipient_email: str, recipient_name: str):
+    """Send one email for the message notifications collected for a recipient (Celery task)."""
+    items = get_digest_store(REDIS_URL).drain(recipient_email)
+    if not items:
+        return {"success": True, "messages": 0}
+    subject, body = render_message_digest(recipient_name, items)
+    send_email_task.delay(recipient_email, subject, body)
+    return {"success": True, "messages": len(items)}
 
 
 @shared_task
 def send_password_reset_email(user_email: str, user_name: str, reset_token: str):
     """Send password reset email (Celery task)."""
     base_url = os.getenv('BASE_URL', 'https://hiremebahamas.com')
-    reset_link = f"{base_url}/reset-password?token={reset_token}"
-    
-    subject = "Reset Your HireMeBahamas Password"
-    body = f"""
-    <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <h1 style="color: #00bcd4;">Reset Your Password</h1>
-                <p>Hi {user_name},</p>
-                
-                <p>We received a request to reset your password. Click the button below to create a new password:</p>
-                
-                <p style="margin: 30px 0;">
-                    <a href="{reset_link}" 
-                       style="background: #00bcd4; color: white; padding: 12px 24px; 
-                              text-decoration: none; border-radius: 5px; display: inline-block;">
-                        Reset Password
-                    </a>
-                </p>
-                
-                <p>This link will expire in 1 hour for security reasons.</p>
-                
-                <p style="color: #666; font-size: 14px;">
-                    If you didn't request a password reset, please ignore this email or contact support if you have concerns.
-                </p>
-                
-                <p style="margin-top: 30px;">
-                    Best regards,<br>
-                    <strong>The HireMeBahamas Team</strong>
-                </p>
-            </div>
-        </body>
-    </html>
-    """
-    return send_email_task.delay(user_email, subject, body)
+    return send_email_task.delay(user_email, template="password_reset", context={
+        "user_name": user_name,
+        "link": f"{base_url}/reset-password?token={reset_token}",
+    })
 
 
 # ============================================================================
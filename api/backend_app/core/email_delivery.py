@@ -0,0 +1,638 @@
+"""
+Email Delivery - Pooled SMTP, Templates, Digests and Rate Shaping
+==================================================================
+Delivery layer behind the Celery email tasks (celery_tasks.py).
+
+- SMTPConnectionPool: persistent SMTP connections per worker process,
+  reused across tasks so EHLO/STARTTLS/AUTH happen once per connection.
+  A connection that sat idle is checked with NOOP before reuse, and one
+  the server dropped is replaced. The pool is reset after fork, so Celery
+  prefork children never share a socket.
+- Templates: subject and HTML body per email kind, compiled once into
+  literal/placeholder parts and cached; rendering only joins strings.
+  Context values are HTML-escaped.
+- Batching: send_batch() delivers many messages over pooled connections.
+- Digests: DigestStore collects message notifications per recipient;
+  one email is sent for all of them when the digest window closes.
+- Rate shaping: a token bucket per recipient domain (EMAIL_DOMAIN_RATES)
+  so a burst to one provider does not trip its throttling. Buckets are
+  per worker process.
+- Retries: transient failures (4xx replies, dropped connections) are
+  reported with a backoff delay (exponential with jitter) for the task to
+  retry; 5xx replies are permanent and not retried.
+
+Configuration (environment variables):
+    SMTP_HOST / SMTP_PORT           Server (default: localhost:25; point at a
+                                    local sink such as MailHog on 1025 in
+                                    development)
+    SMTP_USERNAME / SMTP_PASSWORD   Optional AUTH credentials (SendGrid's
+                                    relay: smtp.sendgrid.net:587, user
+                                    "apikey", the API key as password)
+    SMTP_STARTTLS                   "true" to upgrade connections (default: false)
+    SMTP_TIMEOUT                    Socket timeout in seconds (default: 10)
+    SMTP_POOL_SIZE                  Connections per worker process (default: 2)
+    SMTP_IDLE_CHECK_SECONDS         Idle time before a NOOP check (default: 30)
+    EMAIL_FROM / EMAIL_FROM_NAME    Sender address and display name
+    EMAIL_DOMAIN_RATES              Messages/second per recipient domain,
+                                    "*" for the rest (default: "*=10")
+    EMAIL_MAX_RATE_WAIT_SECONDS     Longest a send waits for its domain before
+                                    it is deferred instead (default: 5)
+    EMAIL_DIGEST_SECONDS            How long message notifications are
+                                    collected into one email (default: 300)
+    EMAIL_RETRY_BASE_SECONDS        First retry delay (default: 30)
+    EMAIL_RETRY_MAX_SECONDS         Longest retry delay (default: 1800)
+
+Usage:
+    from backend_app.core.email_delivery import get_delivery, render
+
+    subject, body = render("welcome", {"user_name": "Ann", ...})
+    report = get_delivery().send_batch([("ann@example.com", subject, body)])
+"""
+import html
+import json
+import logging
+import os
+import random
+import re
+import smtplib
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from email.message import EmailMessage
+from email.utils import formataddr, make_msgid, parseaddr
+from functools import lru_cache
+from string import Template
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+SMTP_HOST = os.getenv("SMTP_HOST", "localhost")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "25"))
+SMTP_USERNAME = os.getenv("SMTP_USERNAME")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "false").lower() == "true"
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "10"))
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "2"))
+SMTP_IDLE_CHECK_SECONDS = float(os.getenv("SMTP_IDLE_CHECK_SECONDS", "30"))
+EMAIL_FROM = formataddr((
+    os.getenv("EMAIL_FROM_NAME", "HireMeBahamas"),
+    os.getenv("EMAIL_FROM", "noreply@hiremebahamas.com"),
+))
+EMAIL_DOMAIN_RATES = os.getenv("EMAIL_DOMAIN_RATES", "*=10")
+EMAIL_MAX_RATE_WAIT_SECONDS = float(os.getenv("EMAIL_MAX_RATE_WAIT_SECONDS", "5"))
+EMAIL_DIGEST_SECONDS = int(os.getenv("EMAIL_DIGEST_SECONDS", "300"))
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", "30"))
+EMAIL_RETRY_MAX_SECONDS = float(os.getenv("EMAIL_RETRY_MAX_SECONDS", "1800"))
+
+BASE_URL = os.getenv("BASE_URL", "https://hiremebahamas.com")
+
+# (recipient, subject, html body)
+OutgoingEmail = Tuple[str, str, str]
+
+
+def backoff_delay(
+    attempt: int,
+    base: float = EMAIL_RETRY_BASE_SECONDS,
+    cap: float = EMAIL_RETRY_MAX_SECONDS,
+) -> float:
+    """Retry delay for the given attempt (0-based): exponential, half of it jittered
+
+    The jitter spreads retries of a burst that failed together (e.g. a
+    provider outage) instead of retrying them all at the same moment.
+    """
+    delay = min(cap, base * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+# =============================================================================
+# TEMPLATES
+# =============================================================================
+
+
+class SafeHTML(str):
+    """Context value inserted into a template without escaping"""
+
+
+class CompiledTemplate:
+    """``$name`` placeholders resolved to a list of parts once; render() only joins"""
+
+    def __init__(self, source: str):
+        self.parts: List[Any] = []
+        position = 0
+        for match in Template.pattern.finditer(source):
+            self.parts.append(source[position:match.start()])
+            if match.group("escaped") is not None:
+                self.parts.append("$")
+            else:
+                name = match.group("named") or match.group("braced")
+                if name is None:
+                    raise ValueError(f"Invalid placeholder in template at {match.start()}")
+                self.parts.append((name,))
+            position = match.end()
+        self.parts.append(source[position:])
+        self.parts = [part for part in self.parts if part != ""]
+        self.names = {part[0] for part in self.parts if isinstance(part, tuple)}
+
+    def render(self, context: Dict[str, Any], escape: bool = True) -> str:
+        out = []
+        for part in self.parts:
+            if isinstance(part, str):
+                out.append(part)
+                continue
+            value = context[part[0]]
+            if escape and not isinstance(value, SafeHTML):
+                value = html.escape(str(value))
+            out.append(str(value))
+        return "".join(out)
+
+
+_LAYOUT = """<html>
+    <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+        <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+$content
+            <p style="margin-top: 30px;">
+                Best regards,<br>
+                <strong>The HireMeBahamas Team</strong>
+            </p>
+        </div>
+    </body>
+</html>
+"""
+
+_BUTTON = (
+    '<a href="$link" style="background: #00bcd4; color: white; padding: 12px 24px; '
+    'text-decoration: none; border-radius: 5px; display: inline-block;">'
+)
+
+# name -> (subject, content placed inside the layout)
+TEMPLATES: Dict[str, Tuple[str, str]] = {
+    "welcome": (
+        "Welcome to HireMeBahamas, $user_name!",
+        """            <h1 style="color: #00bcd4;">Welcome to HireMeBahamas, $user_name!</h1>
+            <p>Thank you for joining our platform. We're excited to help you connect with opportunities in the Bahamas.</p>
+            <div style="background: #f5f5f5; padding: 15px; border-radius: 5px; margin: 20px 0;">
+                <h2 style="margin-top: 0;">Get Started:</h2>
+                <ul>
+                    <li>Complete your profile to stand out</li>
+                    <li>Browse available jobs in the Bahamas</li>
+                    <li>Connect with professionals and employers</li>
+                    <li>Build your network</li>
+                </ul>
+            </div>
+            <p>Your username: <strong>@$username</strong></p>
+            <p style="font-size: 12px; color: #666;">
+                This email was sent to $user_email. If you didn't create this account, please ignore this email.
+            </p>""",
+    ),
+    "job_application": (
+        "New Application: $job_title",
+        """            <h1 style="color: #00bcd4;">New Job Application</h1>
+            <p>Hi $employer_name,</p>
+            <p>Great news! You have a new application for your job posting.</p>
+            <div style="background: #f5f5f5; padding: 15px; border-radius: 5px; margin: 20px 0;">
+                <h2 style="margin-top: 0;">$job_title</h2>
+                <p><strong>Applicant:</strong> $applicant_name</p>
+                <p><strong>Email:</strong> $applicant_email</p>
+                <p><strong>Job ID:</strong> #$job_id</p>
+            </div>
+            <p>""" + _BUTTON + """View Application</a></p>""",
+    ),
+    "message": (
+        "New message from $sender_name",
+        """            <h1 style="color: #00bcd4;">You have a new message</h1>
+            <p>Hi $recipient_name,</p>
+            <p><strong>$sender_name</strong> sent you a message on HireMeBahamas:</p>
+            <div style="background: #f5f5f5; padding: 15px; border-radius: 5px; margin: 20px 0;">
+                <p style="font-style: italic;">"$preview"</p>
+            </div>
+            <p>""" + _BUTTON + """Read and Reply</a></p>""",
+    ),
+    "message_digest": (
+        "You have $count new messages on HireMeBahamas",
+        """            <h1 style="color: #00bcd4;">You have $count new messages</h1>
+            <p>Hi $recipient_name,</p>
+            <p>Here is what you missed on HireMeBahamas:</p>
+            <div style="background: #f5f5f5; padding: 15px; border-radius: 5px; margin: 20px 0;">
+$messages
+            </div>
+            <p>""" + _BUTTON + """Read and Reply</a></p>""",
+    ),
+    "message_digest_item": (
+        "",
+        """                <p><strong>$sender_name</strong>: <span style="font-style: italic;">"$preview"</span></p>""",
+    ),
+    "password_reset": (
+        "Reset Your HireMeBahamas Password",
+        """            <h1 style="color: #00bcd4;">Reset Your Password</h1>
+            <p>Hi $user_name,</p>
+            <p>We received a request to reset your password. Click the button below to create a new password:</p>
+            <p style="margin: 30px 0;">""" + _BUTTON + """Reset Password</a></p>
+            <p>This link will expire in 1 hour for security reasons.</p>
+            <p style="color: #666; font-size: 14px;">
+                If you didn't request a password reset, please ignore this email or contact support if you have concerns.
+            </p>""",
+    ),
+}
+
+
+@lru_cache(maxsize=None)
+def compiled_template(name: str) -> Tuple[CompiledTemplate, CompiledTemplate]:
+    """(subject, body) templates for ``name``, compiled on first use"""
+    subject, content = TEMPLATES[name]
+    body = content if name.endswith("_item") else _LAYOUT.replace("$content", content)
+    return CompiledTemplate(subject), CompiledTemplate(body)
+
+
+def render(name: str, context: Dict[str, Any]) -> Tuple[str, str]:
+    """Subject and HTML body of template ``name``"""
+    subject, body = compiled_template(name)
+    return subject.render(context, escape=False), body.render(context)
+
+
+def render_message_digest(recipient_name: str, items: Sequence[Dict[str, Any]]) -> Tuple[str, str]:
+    """One email for the message notifications collected for a recipient"""
+    link = f"{BASE_URL}/messages"
+    if len(items) == 1:
+        return render("message", {**items[0], "recipient_name": recipient_name, "link": link})
+    _, item_template = compiled_template("message_digest_item")
+    messages = "\n".join(item_template.render(item) for item in items)
+    return render("message_digest", {
+        "count": len(items),
+        "recipient_name": recipient_name,
+        "messages": SafeHTML(messages),
+        "link": link,
+    })
+
+
+_TAG = re.compile(r"<[^>]+>")
+_BLANK_LINES = re.compile(r"\n\s*\n+")
+
+
+def html_to_text(body: str) -> str:
+    """Plain-text alternative of an HTML body"""
+    text = html.unescape(_TAG.sub("", body))
+    lines = [line.strip() for line in text.splitlines()]
+    return _BLANK_LINES.sub("\n\n", "\n".join(lines)).strip() + "\n"
+
+
+# =============================================================================
+# CONNECTION POOL
+# =============================================================================
+
+
+class SMTPConnectionPool:
+    """At most ``size`` persistent SMTP connections shared by a worker's threads"""
+
+    def __init__(
+        self,
+        host: str = SMTP_HOST,
+        port: int = SMTP_PORT,
+        username: Optional[str] = SMTP_USERNAME,
+        password: Optional[str] = SMTP_PASSWORD,
+        starttls: bool = SMTP_STARTTLS,
+        timeout: float = SMTP_TIMEOUT,
+        size: int = SMTP_POOL_SIZE,
+        idle_check_seconds: float = SMTP_IDLE_CHECK_SECONDS,
+        smtp_class=smtplib.SMTP,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.size = size
+        self.idle_check_seconds = idle_check_seconds
+        self.smtp_class = smtp_class
+        self._idle: deque = deque()  # (connection, last used)
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self.opened = 0
+        self.reused = 0
+        self.discarded = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        connection = self.smtp_class(self.host, self.port, timeout=self.timeout)
+        connection.ehlo()
+        if self.starttls:
+            connection.starttls()
+            connection.ehlo()
+        if self.username:
+            connection.login(self.username, self.password or "")
+        self.opened += 1
+        return connection
+
+    def _checkout(self) -> smtplib.SMTP:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                connection, last_used = self._idle.pop()
+            if time.monotonic() - last_used < self.idle_check_seconds:
+                self.reused += 1
+                return connection
+            try:
+                if connection.noop()[0] == 250:
+                    self.reused += 1
+                    return connection
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._close(connection)
+        return self._connect()
+
+    def _checkin(self, connection: smtplib.SMTP) -> None:
+        with self._lock:
+            self._idle.append((connection, time.monotonic()))
+
+    def _close(self, connection: smtplib.SMTP) -> None:
+        self.discarded += 1
+        try:
+            connection.quit()
+        except (smtplib.SMTPException, OSError):
+            connection.close()
+
+    @contextmanager
+    def connection(self):
+        """A connected SMTP client, returned to the pool afterwards
+
+        A connection that failed at the socket level is closed instead of
+        returned; SMTP error replies leave it usable (smtplib resets the
+        transaction).
+        """
+        self._slots.acquire()
+        try:
+            connection = self._checkout()
+            try:
+                yield connection
+            except smtplib.SMTPResponseException:
+                self._checkin(connection)
+                raise
+            except smtplib.SMTPRecipientsRefused:
+                self._checkin(connection)
+                raise
+            except (smtplib.SMTPException, OSError):
+                self._close(connection)
+                raise
+            except BaseException:
+                self._checkin(connection)
+                raise
+            else:
+                self._checkin(connection)
+        finally:
+            self._slots.release()
+
+    def close_all(self) -> None:
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for connection, _ in idle:
+            self._close(connection)
+
+    def after_fork(self) -> None:
+        """Forget the parent's connections without sending QUIT on its sessions"""
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.size)
+
+    def stats(self) -> Dict[str, int]:
+        return {"idle": len(self._idle), "opened": self.opened, "reused": self.reused, "discarded": self.discarded}
+
+
+# =============================================================================
+# RATE SHAPING
+# =============================================================================
+
+
+def parse_domain_rates(value: str) -> Dict[str, float]:
+    """``"gmail.com=5,*=10"`` -> ``{"gmail.com": 5.0, "*": 10.0}``"""
+    rates = {}
+    for pair in value.split(","):
+        domain, _, rate = pair.strip().partition("=")
+        if domain and rate:
+            rates[domain.lower()] = float(rate)
+    return rates
+
+
+class DomainRateLimiter:
+    """Token bucket per recipient domain; burst equals one second of rate"""
+
+    def __init__(self, rates: Dict[str, float], clock=time.monotonic):
+        self.rates = rates
+        self.clock = clock
+        self._buckets: Dict[str, List[float]] = {}  # domain -> [tokens, updated]
+        self._lock = threading.Lock()
+
+    def rate_for(self, domain: str) -> Optional[float]:
+        return self.rates.get(domain, self.rates.get("*"))
+
+    def reserve(self, domain: str, max_wait: float) -> float:
+        """Seconds to wait before sending to ``domain``
+
+        When the wait is at most ``max_wait`` a token is taken (the caller
+        sleeps, then sends). Otherwise nothing is taken and the returned
+        wait is longer than ``max_wait``: defer the send by that long.
+        """
+        rate = self.rate_for(domain)
+        if not rate or rate <= 0:
+            return 0.0
+        burst = max(1.0, rate)
+        with self._lock:
+            now = self.clock()
+            tokens, updated = self._buckets.get(domain, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            wait = max(0.0, (1 - tokens) / rate)
+            if wait <= max_wait:
+                tokens -= 1
+            self._buckets[domain] = [tokens, now]
+            return wait
+
+
+# =============================================================================
+# DIGESTS
+# =============================================================================
+
+
+class MemoryDigestStore:
+    """Pending digest items per key, for a single process (tests, eager Celery)"""
+
+    def __init__(self):
+        self._items: Dict[str, List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, key: str, item: Dict[str, Any]) -> int:
+        """Append ``item``; returns how many items are now pending for ``key``"""
+        with self._lock:
+            items = self._items.setdefault(key, [])
+            items.append(item)
+            return len(items)
+
+    def drain(self, key: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return self._items.pop(key, [])
+
+
+class RedisDigestStore:
+    """Pending digest items per key in Redis lists, shared by all workers"""
+
+    def __init__(self, client, prefix: str = "email_digest:", ttl: int = 86400):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def add(self, key: str, item: Dict[str, Any]) -> int:
+        pipe = self.client.pipeline()
+        pipe.rpush(self.prefix + key, json.dumps(item))
+        pipe.expire(self.prefix + key, self.ttl)
+        return int(pipe.execute()[0])
+
+    def drain(self, key: str) -> List[Dict[str, Any]]:
+        pipe = self.client.pipeline(transaction=True)
+        pipe.lrange(self.prefix + key, 0, -1)
+        pipe.delete(self.prefix + key)
+        raw, _ = pipe.execute()
+        return [json.loads(item) for item in raw]
+
+
+_digest_store = None
+
+
+def get_digest_store(redis_url: str):
+    """The digest store on Celery's broker.
+
+    The first notification is queued by one worker and the digest sent by
+    another, so items must live in Redis; a per-process store would split
+    them (or lose them on restart). Raises if the broker is not Redis.
+    """
+    global _digest_store
+    if _digest_store is None:
+        if not redis_url.startswith(("redis://", "rediss://", "unix://")):
+            raise RuntimeError(f"Message digests need a Redis broker, got {redis_url!r}")
+        from redis import Redis
+        _digest_store = RedisDigestStore(Redis.from_url(redis_url))
+    return _digest_store
+
+
+# =============================================================================
+# DELIVERY
+# =============================================================================
+
+
+@dataclass
+class DeliveryReport:
+    """Outcome of send_batch()"""
+    sent: List[str] = field(default_factory=list)
+    # (message, seconds until it should be retried)
+    deferred: List[Tuple[OutgoingEmail, float]] = field(default_factory=list)
+    # (recipient, reason): rejected for good, not retried
+    failed: List[Tuple[str, str]] = field(default_factory=list)
+
+    @property
+    def retry_after(self) -> Optional[float]:
+        return max((delay for _, delay in self.deferred), default=None)
+
+
+def _domain(recipient: str) -> str:
+    return recipient.rpartition("@")[2].lower()
+
+
+def _is_transient(error: Exception) -> bool:
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, (smtplib.SMTPException, OSError))
+
+
+class EmailDelivery:
+    """Sends messages over an SMTPConnectionPool, shaped per recipient domain"""
+
+    def __init__(
+        self,
+        pool: SMTPConnectionPool,
+        limiter: Optional[DomainRateLimiter] = None,
+        sender: str = EMAIL_FROM,
+        max_rate_wait: float = EMAIL_MAX_RATE_WAIT_SECONDS,
+        sleep=time.sleep,
+    ):
+        self.pool = pool
+        self.limiter = limiter or DomainRateLimiter(parse_domain_rates(EMAIL_DOMAIN_RATES))
+        self.sender = sender
+        self.max_rate_wait = max_rate_wait
+        self.sleep = sleep
+
+    def build(self, recipient: str, subject: str, body: str) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = self.sender
+        message["To"] = recipient
+        message["Subject"] = subject
+        message["Message-ID"] = make_msgid(domain=_domain(parseaddr(self.sender)[1]) or None)
+        message.set_content(html_to_text(body))
+        message.add_alternative(body, subtype="html")
+        return message
+
+    def send_batch(self, messages: Iterable[OutgoingEmail], attempt: int = 0) -> DeliveryReport:
+        """Deliver ``messages`` over pooled connections
+
+        A message whose domain is over its rate, or that hit a transient
+        SMTP failure, is deferred with a retry delay; one dropped connection
+        is retried at once on a fresh connection first. ``attempt`` is the
+        caller's retry count and scales the backoff.
+        """
+        report = DeliveryReport()
+        pending = deque(messages)
+        while pending:
+            outgoing = pending.popleft()
+            recipient = outgoing[0]
+            wait = self.limiter.reserve(_domain(recipient), self.max_rate_wait)
+            if wait > self.max_rate_wait:
+                report.deferred.append((outgoing, wait))
+                continue
+            if wait:
+                self.sleep(wait)
+
+            message = self.build(*outgoing)
+            for retry_connection in (True, False):
+                try:
+                    with self.pool.connection() as connection:
+                        connection.send_message(message)
+                    report.sent.append(recipient)
+                except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+                    if retry_connection:
+                        continue
+                    report.deferred.append((outgoing, backoff_delay(attempt)))
+                    logger.warning(f"Email to {recipient} deferred, connection lost: {e}")
+                except (smtplib.SMTPException, OSError) as e:
+                    if _is_transient(e):
+                        report.deferred.append((outgoing, backoff_delay(attempt)))
+                        logger.warning(f"Email to {recipient} deferred: {e}")
+                    else:
+                        report.failed.append((recipient, str(e)))
+                        logger.error(f"Email to {recipient} rejected: {e}")
+                break
+        return report
+
+
+_delivery: Optional[EmailDelivery] = None
+_delivery_lock = threading.Lock()
+
+
+def get_delivery() -> EmailDelivery:
+    """The worker process's EmailDelivery (one connection pool per process)"""
+    global _delivery
+    if _delivery is None:
+        with _delivery_lock:
+            if _delivery is None:
+                _delivery = EmailDelivery(SMTPConnectionPool())
+    return _delivery
+
+
+def _after_fork() -> None:
+    global _delivery, _delivery_lock
+    _delivery_lock = threading.Lock()
+    if _delivery is not None:
+        _delivery.pool.after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
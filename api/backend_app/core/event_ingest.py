@@ -0,0 +1,307 @@
+"""
+Batched ingestion of product analytics events.
+
+Page views, searches and clicks used to be enqueued as one RQ job each
+(``track_user_event_job``), paying a Redis round trip and a job
+execution per event. Events are now buffered in process and written to
+the append-only ``analytics_events`` table in batches:
+
+- submit() / track_event() append to a bounded buffer and return at once.
+  When the buffer is full new events are refused and counted
+  (backpressure); the ingest endpoint answers 429 with Retry-After.
+- A flusher task on the event loop writes a multi-row INSERT whenever
+  EVENT_BATCH_SIZE events are buffered, and at least every
+  EVENT_FLUSH_SECONDS otherwise.
+- At-least-once delivery: a batch that fails to insert goes back to the
+  front of the buffer and is retried with exponential backoff. Events
+  still buffered at shutdown are spooled to a JSON-lines file in
+  EVENT_SPOOL_DIR; the next flusher (in any worker) claims the file and
+  writes it. Every event carries a uuid ``event_id`` and inserts skip an
+  (event_id, created_at) that is already stored, so redelivery is
+  idempotent.
+- Aggregation: app.core.analytics_rollups folds new rows into per-type
+  hour/day counters and a daily distinct-users sketch, which the
+  /api/analytics/events endpoint reads.
+
+Configuration (environment variables):
+    EVENT_BUFFER_SIZE     Events buffered before new ones are refused (default: 10000)
+    EVENT_BATCH_SIZE      Events per INSERT (default: 500)
+    EVENT_FLUSH_SECONDS   Longest an event waits in the buffer (default: 2)
+    EVENT_SPOOL_DIR       Unwritten events kept across restarts
+                          (default: <tempdir>/hiremebahamas-events)
+
+Usage:
+    from app.core.event_ingest import track_event
+
+    track_event("search", user_id=user.id, data={"query": q})
+"""
+import asyncio
+import atexit
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.core.analytics_rollups import _insert
+from app.models import AnalyticsEvent
+
+logger = logging.getLogger(__name__)
+
+EVENT_BUFFER_SIZE = int(os.getenv("EVENT_BUFFER_SIZE", "10000"))
+EVENT_BATCH_SIZE = int(os.getenv("EVENT_BATCH_SIZE", "500"))
+EVENT_FLUSH_SECONDS = float(os.getenv("EVENT_FLUSH_SECONDS", "2"))
+EVENT_SPOOL_DIR = os.getenv("EVENT_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "hiremebahamas-events"))
+
+MAX_BACKOFF_SECONDS = 60.0
+# A claimed spool file untouched this long belongs to a worker that died
+CLAIM_TIMEOUT_SECONDS = 600
+
+
+def _event(
+    event_type: str,
+    user_id: Optional[int],
+    data: Optional[Dict[str, Any]],
+    created_at: Optional[datetime],
+) -> Dict[str, Any]:
+    return {
+        "event_id": uuid.uuid4().hex,
+        "event_type": event_type[:50],
+        "user_id": user_id,
+        "data": data or None,
+        "created_at": created_at or datetime.utcnow(),
+    }
+
+
+class EventIngestor:
+    """Bounded in-process event buffer flushed to analytics_events in batches"""
+
+    def __init__(
+        self,
+        capacity: int = EVENT_BUFFER_SIZE,
+        batch_size: int = EVENT_BATCH_SIZE,
+        flush_seconds: float = EVENT_FLUSH_SECONDS,
+        spool_dir: Optional[str] = EVENT_SPOOL_DIR,
+        session_factory=None,
+    ):
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.spool_dir = spool_dir
+        self._session_factory = session_factory
+        self._buffer: deque = deque()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._consecutive_failures = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.written = 0
+        self.batches = 0
+        self.failures = 0
+        self.spooled = 0
+        self.recovered = 0
+
+    # -- producers ------------------------------------------------------
+
+    def has_room(self, count: int = 1) -> bool:
+        return len(self._buffer) + count <= self.capacity
+
+    def submit(
+        self,
+        event_type: str,
+        user_id: Optional[int] = None,
+        data: Optional[Dict[str, Any]] = None,
+        created_at: Optional[datetime] = None,
+    ) -> bool:
+        """Buffer one event without blocking; False (and counted) when full"""
+        return self.submit_many([(event_type, user_id, data, created_at)])
+
+    def submit_many(self, events: Iterable[tuple]) -> bool:
+        """Buffer ``(event_type, user_id, data, created_at)`` tuples, all or none"""
+        events = [_event(*event) for event in events]
+        if not self.has_room(len(events)):
+            self.rejected += len(events)
+            return False
+        self._buffer.extend(events)
+        self.accepted += len(events)
+        self._ensure_flusher()
+        if len(self._buffer) >= self.batch_size and self._wake is not None:
+            self._wake.set()
+        return True
+
+    # -- flusher ----------------------------------------------------------
+
+    def _bind_loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return None  # sync caller: events wait for the next flush on a loop
+        if loop is not self._loop:
+            # First use, or a new loop (fork, test) - loop-bound primitives are recreated
+            self._loop = loop
+            self._task = None
+            self._wake = asyncio.Event()
+            self._lock = asyncio.Lock()
+        return loop
+
+    def _ensure_flusher(self) -> None:
+        loop = self._bind_loop()
+        if loop is not None and (self._task is None or self._task.done()):
+            self._task = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        await self.recover_spool()
+        while True:
+            if self._consecutive_failures:
+                await asyncio.sleep(min(self.flush_seconds * 2 ** self._consecutive_failures, MAX_BACKOFF_SECONDS))
+            else:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.flush_seconds)
+                except asyncio.TimeoutError:
+                    pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Write everything buffered now, in batches; returns the events written
+
+        Stops at the first failed batch, which is put back at the front of
+        the buffer for the next attempt.
+        """
+        self._bind_loop()
+        written = 0
+        async with self._lock:
+            while self._buffer:
+                batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+                try:
+                    await self._write(batch)
+                except Exception as e:
+                    self._buffer.extendleft(reversed(batch))
+                    self.failures += 1
+                    self._consecutive_failures += 1
+                    logger.warning(f"Analytics event batch of {len(batch)} failed, will retry: {e}")
+                    break
+                self._consecutive_failures = 0
+                written += len(batch)
+        return written
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> None:
+        if self._session_factory is None:
+            from app.database import AsyncSessionLocal
+            self._session_factory = AsyncSessionLocal
+        async with self._session_factory() as db:
+            stmt = _insert(db, AnalyticsEvent.__table__).on_conflict_do_nothing(
+                index_elements=["event_id", "created_at"]
+            )
+            await db.execute(stmt, batch)
+            await db.commit()
+        self.batches += 1
+        self.written += len(batch)
+
+    async def close(self) -> None:
+        """Stop the flusher, write what is buffered and spool whatever could not be"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        await self.flush()
+        self.spool()
+
+    # -- spool ------------------------------------------------------------
+
+    def spool(self) -> int:
+        """Move buffered events to a new spool file; returns how many"""
+        if not self._buffer or not self.spool_dir:
+            return 0
+        events = list(self._buffer)
+        os.makedirs(self.spool_dir, exist_ok=True)
+        path = os.path.join(self.spool_dir, f"events-{os.getpid()}-{uuid.uuid4().hex}.jsonl")
+        with open(path + ".part", "w") as f:
+            for event in events:
+                f.write(json.dumps(event, default=str) + "\n")
+        os.replace(path + ".part", path)
+        for _ in events:
+            self._buffer.popleft()
+        self.spooled += len(events)
+        logger.info(f"Spooled {len(events)} unwritten analytics events to {path}")
+        return len(events)
+
+    def _claim_spool_files(self) -> List[str]:
+        if not self.spool_dir or not os.path.isdir(self.spool_dir):
+            return []
+        claimed = []
+        for name in sorted(os.listdir(self.spool_dir)):
+            path = os.path.join(self.spool_dir, name)
+            if name.endswith(".claimed"):
+                try:
+                    if time.time() - os.stat(path).st_mtime < CLAIM_TIMEOUT_SECONDS:
+                        continue
+                except FileNotFoundError:
+                    continue
+                source = path[:-len(".claimed")]
+            elif name.endswith(".jsonl"):
+                source = path
+            else:
+                continue
+            target = f"{source}.{uuid.uuid4().hex[:8]}.claimed"
+            try:
+                os.rename(path, target)  # atomic: exactly one worker claims a file
+            except FileNotFoundError:
+                continue
+            os.utime(target)
+            claimed.append(target)
+        return claimed
+
+    async def recover_spool(self) -> int:
+        """Write events spooled by earlier processes; returns how many"""
+        recovered = 0
+        for path in self._claim_spool_files():
+            try:
+                with open(path) as f:
+                    events = [json.loads(line) for line in f if line.strip()]
+                for event in events:
+                    event["created_at"] = datetime.fromisoformat(event["created_at"])
+                for start in range(0, len(events), self.batch_size):
+                    await self._write(events[start:start + self.batch_size])
+            except Exception as e:
+                # Left claimed; retried once CLAIM_TIMEOUT_SECONDS have passed
+                logger.warning(f"Could not write spooled analytics events from {path}: {e}")
+                continue
+            os.remove(path)
+            recovered += len(events)
+        if recovered:
+            self.recovered += recovered
+            logger.info(f"Recovered {recovered} spooled analytics events")
+        return recovered
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "buffered": len(self._buffer),
+            "capacity": self.capacity,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "written": self.written,
+            "batches": self.batches,
+            "failed_batches": self.failures,
+            "spooled": self.spooled,
+            "recovered": self.recovered,
+        }
+
+
+event_ingestor = EventIngestor()
+atexit.register(event_ingestor.spool)
+
+
+def track_event(event_type: str, user_id: Optional[int] = None, data: Optional[Dict[str, Any]] = None) -> bool:
+    """Record a product event; False when the buffer is full and it was dropped"""
+    return event_ingestor.submit(event_type, user_id, data)
@@ -177,7 +177,9 @@ def track_user_event_job(
     """
     Track user analytics event (RQ job).
     
-    This runs asynchronously and does not block the API.
+    Kept for jobs already in the queue. New code calls
+    app.core.event_ingest.track_event(), which buffers events in process
+    and writes them in batches instead of one job per event.
     
     Args:
         user_id: User ID
@@ -187,37 +189,20 @@ def track_user_event_job(
     Returns:
         dict: Job result with success status
     """
+    import asyncio
+    from app.core.event_ingest import event_ingestor
+    
     try:
-        logger.info(f"[RQ] Recording analytics event for user {user_id}: {event_type}")
-        
-        # TODO: Integrate with analytics service
-        #
-        # Mixpanel:
-        # from mixpanel import Mixpanel
-        # mp = Mixpanel(MIXPANEL_TOKEN)
-        # mp.track(str(user_id), event_type, event_data or {})
-        #
-        # Amplitude:
-        # from amplitude import Amplitude
-        # client = Amplitude(API_KEY)
-        # event = BaseEvent(
-        #     event_type=event_type,
-        #     user_id=str(user_id),
-        #     event_properties=event_data or {}
-        # )
-        # client.track(event)
-        #
-        # Google Analytics 4:
-        # from google.analytics.data_v1beta import BetaAnalyticsDataClient
-        # # Send event via Measurement Protocol
-        #
-        # Custom Database:
-        # Store in time-series database like InfluxDB or TimescaleDB
+        queued = event_ingestor.submit(event_type, user_id, event_data)
+        # No event loop (and so no flusher) in an RQ work horse: write now,
+        # and spool what fails since the horse exits without atexit hooks
+        asyncio.run(event_ingestor.flush())
+        event_ingestor.spool()
         
-        logger.info(f"[RQ] Analytics event recorded for user {user_id}")
+        logger.info(f"[RQ] Analytics event recorded for user {user_id}: {event_type}")
         
         return {
-            "success": True,
+            "success": queued,
             "user_id": user_id,
             "event_type": event_type,
             "timestamp": datetime.utcnow().isoformat()
@@ -711,6 +711,14 @@ async def full_shutdown():
     except Exception as e:
         logger.warning(f"Error shutting down thread pool: {e}")
     
+    # Write buffered analytics events before the database pool closes;
+    # whatever cannot be written is spooled for the next process
+    try:
+        from app.core.event_ingest import event_ingestor
+        await asyncio.wait_for(event_ingestor.close(), timeout=SHUTDOWN_TIMEOUT_SECONDS)
+    except Exception as e:
+        logger.warning(f"Error flushing analytics events: {e}")
+    
     # Collect all cleanup tasks
     cleanup_tasks = []
     
@@ -1,5 +1,5 @@
 from app.database import Base
-from sqlalchemy import Boolean, Column, DateTime, Enum as SQLEnum, Float, ForeignKey, Integer, String, Text
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, Enum as SQLEnum, Float, ForeignKey, Index, Integer, JSON, LargeBinary, String, Text, UniqueConstraint
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -366,3 +366,64 @@ class RefreshToken(Base):
 
     # Relationships
     user = relationship("User")
+
+
+class AnalyticsRollup(Base):
+    """Pre-aggregated counter for one metric/dimension in an hour or day bucket
+
+    Buckets are UTC strings: "YYYY-MM-DDTHH" for hours, "YYYY-MM-DD" for days.
+    Maintained by app.core.analytics_rollups.refresh_rollups().
+    """
+    __tablename__ = "analytics_rollups"
+    __table_args__ = {'extend_existing': True}
+
+    granularity = Column(String(8), primary_key=True)  # hour, day
+    bucket = Column(String(13), primary_key=True)
+    metric = Column(String(50), primary_key=True)
+    dimension = Column(String(200), primary_key=True, default="")  # "" for the metric total
+    value = Column(BigInteger, nullable=False, default=0)
+
+
+class AnalyticsSketch(Base):
+    """Per-day HyperLogLog registers for distinct-user metrics"""
+    __tablename__ = "analytics_sketches"
+    __table_args__ = {'extend_existing': True}
+
+    bucket = Column(String(10), primary_key=True)  # YYYY-MM-DD
+    metric = Column(String(50), primary_key=True)
+    registers = Column(LargeBinary, nullable=False)
+
+
+class AnalyticsWatermark(Base):
+    """Last row id of a source table folded into the analytics rollups"""
+    __tablename__ = "analytics_watermarks"
+    __table_args__ = {'extend_existing': True}
+
+    source = Column(String(50), primary_key=True)
+    last_id = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class AnalyticsEvent(Base):
+    """Append-only product event (page view, search, click, ...)
+
+    Written in batches by app.core.event_ingest and folded into the
+    analytics rollups. On PostgreSQL the table is range partitioned by month
+    on created_at (see migration 006_analytics_events), where the primary
+    key becomes (id, created_at); the dedupe key includes created_at for
+    the same reason.
+    """
+    __tablename__ = "analytics_events"
+    __table_args__ = (
+        UniqueConstraint("event_id", "created_at", name="uq_analytics_events_event_id"),
+        Index("idx_analytics_events_created_at", "created_at"),
+        {'extend_existing': True},
+    )
+
+    # SQLite only autoincrements INTEGER PRIMARY KEY
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    created_at = Column(DateTime, nullable=False)  # UTC, stamped when the event is accepted
+    event_id = Column(String(32), nullable=False)  # uuid hex, makes redelivery idempotent
+    event_type = Column(String(50), nullable=False)
+    user_id = Column(Integer, nullable=True)  # no foreign key: events outlive deleted users
+    data = Column(JSON, nullable=True)
@@ -0,0 +1,12 @@
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class EventCreate(BaseModel):
+    event_type: str = Field(..., min_length=1, max_length=50)
+    data: Optional[Dict[str, Any]] = None
+
+
+class EventBatch(BaseModel):
+    events: List[EventCreate] = Field(..., min_length=1, max_length=100)
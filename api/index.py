@@ -2,6 +2,10 @@
 MASTER RENDER/NEON BACKEND — IMMORTAL DEPLOY 2025
 Includes: Auth, Jobs, Users, Lazy DB, Health check
 """
+import time
+
+_MODULE_STARTED = time.perf_counter()
+
 import logging
 import os
 import sys
@@ -11,8 +15,6 @@ from pathlib import Path
 
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.responses import JSONResponse, PlainTextResponse
-from jose import jwt
-from passlib.context import CryptContext
 from sqlalchemy import create_engine, text
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 
@@ -22,6 +24,8 @@ if str(api_dir) not in sys.path:
     sys.path.insert(0, str(api_dir))
 
 from backend_app.cors import apply_cors
+import serverless
+from serverless import InvocationStats, ServerlessConfig, create_serverless_engine
 
 logger = logging.getLogger(__name__)
 
@@ -42,16 +46,30 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60
 # -----------------------------
 # PASSWORD HASHING
 # -----------------------------
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-DUMMY_PASSWORD_HASH: str = pwd_context.hash("placeholder-password")
+# passlib (and python-jose below) are imported on the first auth request so
+# cold starts serving /health or reads don't pay for them
+_pwd_context = None
+
+# Precomputed bcrypt hash (12 rounds, the passlib default) of a placeholder
+# password, verified against for unknown users so login timing doesn't reveal
+# whether a username exists. Hashing it at import cost ~400ms per cold start.
+DUMMY_PASSWORD_HASH: str = "$2b$12$N4SDafv5KAffcusZFMyjh.EyMBrdANStN8260qUtb2M8ZE6vfNky2"
+
+
+def get_pwd_context():
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 # -----------------------------
 # LAZY DATABASE ENGINE
@@ -69,7 +87,12 @@ def get_engine():
                 database_url = os.getenv("DATABASE_URL")
                 if not database_url:
                     raise RuntimeError("DATABASE_URL not set in environment")
-                engine = create_engine(database_url, pool_pre_ping=True)
+                if serverless.SERVERLESS_MODE:
+                    # Config resolved once per instance; the connection (or
+                    # HTTPS keep-alive) is reused across warm invocations
+                    engine = create_serverless_engine(ServerlessConfig.from_env())
+                else:
+                    engine = create_engine(database_url, pool_pre_ping=True)
     return engine
 
 
@@ -83,6 +106,21 @@ app = FastAPI(title="HireMeBahamas Backend")
 # -----------------------------
 apply_cors(app)
 
+# -----------------------------
+# INVOCATION LATENCY (cold start vs warm)
+# -----------------------------
+invocations = InvocationStats(_MODULE_STARTED)
+
+
+@app.middleware("http")
+async def record_invocation(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    kind, latency_ms = invocations.record(started)
+    response.headers["X-Invocation"] = kind
+    response.headers["Server-Timing"] = f"{kind};dur={latency_ms:.1f}"
+    return response
+
 
 # -----------------------------
 # HEALTH CHECK
@@ -94,10 +132,22 @@ def health():
     return PlainTextResponse("ok", status_code=200)
 
 
+@app.get("/api/serverless/stats")
+def serverless_stats():
+    """Cold-start and warm invocation latencies of this instance"""
+    stats = invocations.summary()
+    stats["serverless_mode"] = serverless.SERVERLESS_MODE
+    db_stats = getattr(engine, "serverless_stats", None)
+    stats["database"] = db_stats.as_dict() if db_stats is not None else None
+    return stats
+
+
 # -----------------------------
 # AUTH ROUTES
 # -----------------------------
 def create_access_token(data: dict, expires_delta: int = ACCESS_TOKEN_EXPIRE_MINUTES) -> str:
+    from jose import jwt
+
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(minutes=expires_delta)
     to_encode.update({"exp": expire})
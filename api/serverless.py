@@ -0,0 +1,435 @@
+"""
+Serverless execution mode for the Vercel entry point (api/index.py)
+
+A Vercel function instance serves one request at a time, is frozen between
+invocations and is eventually recycled. A long-lived-process pool is the
+wrong shape for that: ``pool_pre_ping`` pays a round trip to Neon on every
+warm invocation, and a socket that sat frozen for minutes is only found
+dead when a query fails. This module provides:
+
+- ``ServerlessConfig``: database settings parsed once per instance (URL
+  normalization, driver choice, Neon HTTP endpoint, thresholds) instead of
+  on every request
+- A module-level TCP connection cache: one pooled connection reused across
+  warm invocations, validated only after ``DB_SERVERLESS_VALIDATE_AFTER``
+  seconds idle and replaced without a round trip after
+  ``DB_SERVERLESS_MAX_IDLE`` seconds
+- An SQL-over-HTTP driver (``DB_DRIVER=http``) for Neon's serverless proxy:
+  no Postgres handshake or TLS-over-TCP setup on cold starts, one keep-alive
+  HTTPS connection reused while warm. ``neon_http_local.py`` is a local
+  stand-in for development and tests.
+- ``InvocationStats``: cold-start (module import + first request) and warm
+  invocation latencies, reported separately
+
+Environment:
+    SERVERLESS_MODE                on/off (default: on when VERCEL is set)
+    DB_DRIVER                      tcp (default) or http
+    NEON_HTTP_ENDPOINT             SQL-over-HTTP URL (default: https://<db host>/sql)
+    DB_SERVERLESS_VALIDATE_AFTER   idle seconds before a cached connection is pinged (30)
+    DB_SERVERLESS_MAX_IDLE         idle seconds after which it is replaced unpinged (240)
+    DB_SERVERLESS_MAX_AGE          maximum connection age in seconds (1800)
+    DB_CONNECT_TIMEOUT             connect / HTTP timeout in seconds (5)
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from sqlalchemy import create_engine, event, exc
+
+logger = logging.getLogger(__name__)
+
+SERVERLESS_MODE = os.getenv("SERVERLESS_MODE", "true" if os.getenv("VERCEL") else "false").lower() == "true"
+
+# Named binds in text() statements (":name" but not "::type" casts)
+_BIND_PARAM = re.compile(r"(?<![:\w]):(\w+)")
+
+# Postgres type OIDs decoded from Neon's text output
+_INT_OIDS = {20, 21, 23, 26}
+_FLOAT_OIDS = {700, 701}
+_NUMERIC_OID = 1700
+_BOOL_OID = 16
+_JSON_OIDS = {114, 3802}
+
+
+def _percentile(values: Sequence[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+@dataclass(frozen=True)
+class ServerlessConfig:
+    """Database settings resolved once per function instance"""
+    database_url: str
+    driver: str = "tcp"
+    http_endpoint: str = ""
+    validate_after: float = 30.0
+    max_idle: float = 240.0
+    max_age: float = 1800.0
+    connect_timeout: float = 5.0
+
+    @classmethod
+    def from_env(cls, environ: Optional[Dict[str, str]] = None) -> "ServerlessConfig":
+        env = os.environ if environ is None else environ
+        database_url = env.get("DATABASE_URL", "")
+        if not database_url:
+            raise RuntimeError("DATABASE_URL not set in environment")
+        # The entry point uses the sync driver
+        database_url = re.sub(r"^postgres(ql)?(\+asyncpg)?://", "postgresql://", database_url)
+
+        driver = env.get("DB_DRIVER", "tcp").lower()
+        http_endpoint = ""
+        if driver == "http":
+            http_endpoint = env.get("NEON_HTTP_ENDPOINT") or f"https://{urlsplit(database_url).hostname}/sql"
+        return cls(
+            database_url=database_url,
+            driver=driver,
+            http_endpoint=http_endpoint,
+            validate_after=float(env.get("DB_SERVERLESS_VALIDATE_AFTER", "30")),
+            max_idle=float(env.get("DB_SERVERLESS_MAX_IDLE", "240")),
+            max_age=float(env.get("DB_SERVERLESS_MAX_AGE", "1800")),
+            connect_timeout=float(env.get("DB_CONNECT_TIMEOUT", "5")),
+        )
+
+
+class ConnectionStats:
+    """How often warm invocations reused the cached connection"""
+
+    def __init__(self):
+        self.connects = 0
+        self.connect_ms = 0.0
+        self.reused = 0
+        self.validated = 0
+        self.replaced = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "connects": self.connects,
+            "connect_ms": round(self.connect_ms, 1),
+            "reused": self.reused,
+            "validated": self.validated,
+            "replaced": self.replaced,
+        }
+
+
+def create_tcp_engine(config: ServerlessConfig, clock: Callable[[], float] = time.monotonic):
+    """SQLAlchemy engine caching one connection across warm invocations.
+
+    Replaces ``pool_pre_ping``: a checkout only pings a connection idle
+    longer than ``validate_after`` and discards one idle longer than
+    ``max_idle`` outright (a socket frozen that long is almost certainly
+    closed by Neon's proxy). Raising DisconnectionError from the checkout
+    hook makes the pool open a fresh connection transparently.
+    """
+    kwargs: Dict[str, Any] = {"pool_pre_ping": False, "pool_recycle": int(config.max_age)}
+    if config.database_url.startswith("postgresql"):
+        kwargs.update(
+            pool_size=1,
+            max_overflow=2,
+            connect_args={
+                "connect_timeout": int(config.connect_timeout),
+                # Detect sockets killed while the instance was frozen
+                "keepalives": 1,
+                "keepalives_idle": 30,
+                "keepalives_interval": 10,
+                "keepalives_count": 3,
+            },
+        )
+    engine = create_engine(config.database_url, **kwargs)
+    stats = engine.serverless_stats = ConnectionStats()
+
+    @event.listens_for(engine, "do_connect")
+    def _start_connect(dialect, conn_rec, cargs, cparams):
+        conn_rec.info["connect_started"] = clock()
+
+    @event.listens_for(engine, "connect")
+    def _connected(dbapi_connection, connection_record):
+        now = clock()
+        stats.connects += 1
+        stats.connect_ms += (now - connection_record.info.pop("connect_started", now)) * 1000
+        connection_record.info["last_used"] = now
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        last_used = connection_record.info.get("last_used")
+        idle = clock() - last_used if last_used is not None else 0.0
+        if idle > config.max_idle:
+            stats.replaced += 1
+            raise exc.DisconnectionError(f"connection idle {idle:.0f}s")
+        if idle > config.validate_after:
+            stats.validated += 1
+            try:
+                cursor = dbapi_connection.cursor()
+                cursor.execute("SELECT 1")
+                cursor.close()
+            except Exception as e:
+                stats.replaced += 1
+                raise exc.DisconnectionError(f"connection failed validation: {e}") from e
+        elif connection_record.info.get("checkouts"):
+            stats.reused += 1
+        connection_record.info["checkouts"] = connection_record.info.get("checkouts", 0) + 1
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        connection_record.info["last_used"] = clock()
+
+    return engine
+
+
+# =============================================================================
+# SQL OVER HTTP (Neon serverless proxy)
+# =============================================================================
+
+class NeonHttpError(Exception):
+    """Error returned by the SQL-over-HTTP endpoint"""
+
+    def __init__(self, message: str, code: Optional[str] = None):
+        super().__init__(message)
+        self.code = code
+
+
+def compile_statement(statement, params: Optional[Dict[str, Any]] = None) -> Tuple[str, List[Any]]:
+    """Rewrite ``:name`` binds of a text() statement to ``$n`` positional params"""
+    params = params or {}
+    names: List[str] = []
+
+    def _positional(match):
+        name = match.group(1)
+        if name not in names:
+            names.append(name)
+        return f"${names.index(name) + 1}"
+
+    sql = _BIND_PARAM.sub(_positional, str(statement))
+    return sql, [params[name] for name in names]
+
+
+def _decode(value: Optional[str], type_oid: int):
+    if value is None:
+        return None
+    if type_oid in _INT_OIDS:
+        return int(value)
+    if type_oid in _FLOAT_OIDS:
+        return float(value)
+    if type_oid == _NUMERIC_OID:
+        return Decimal(value)
+    if type_oid == _BOOL_OID:
+        return value in ("t", "true")
+    if type_oid in _JSON_OIDS:
+        return json.loads(value)
+    return value
+
+
+class HttpResult:
+    """The subset of SQLAlchemy's Result the entry point uses"""
+
+    def __init__(self, payload: Dict[str, Any]):
+        fields = payload.get("fields") or []
+        self._keys = [field["name"] for field in fields]
+        oids = [field.get("dataTypeID", 25) for field in fields]
+        self._rows = [
+            tuple(_decode(value, oid) for value, oid in zip(row, oids))
+            for row in payload.get("rows") or []
+        ]
+        self.rowcount = payload.get("rowCount", len(self._rows))
+
+    def keys(self) -> List[str]:
+        return list(self._keys)
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def fetchall(self) -> List[tuple]:
+        return list(self._rows)
+
+    def fetchone(self) -> Optional[tuple]:
+        return self._rows[0] if self._rows else None
+
+    first = fetchone
+
+    def scalar(self):
+        row = self.fetchone()
+        return row[0] if row else None
+
+    def mappings(self) -> "HttpMappingResult":
+        return HttpMappingResult([dict(zip(self._keys, row)) for row in self._rows])
+
+
+class HttpMappingResult:
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self._rows = rows
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def all(self) -> List[Dict[str, Any]]:
+        return list(self._rows)
+
+    def first(self) -> Optional[Dict[str, Any]]:
+        return self._rows[0] if self._rows else None
+
+
+class HttpStats:
+    """Requests made over the keep-alive HTTPS connection"""
+
+    def __init__(self):
+        self.requests = 0
+        self.request_ms = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"requests": self.requests, "request_ms": round(self.request_ms, 1)}
+
+
+class HttpConnection:
+    """Connection-shaped wrapper; every statement is one autocommitted HTTP request"""
+
+    def __init__(self, engine: "HttpEngine"):
+        self.engine = engine
+
+    def execute(self, statement, params: Optional[Dict[str, Any]] = None) -> HttpResult:
+        return self.engine.execute(statement, params)
+
+    def commit(self) -> None:
+        pass
+
+    def rollback(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class HttpEngine:
+    """Engine-shaped client for Neon's SQL-over-HTTP endpoint.
+
+    Supports the ``with engine.connect() as conn: conn.execute(text(...))``
+    usage of api/index.py. Statements are autocommitted individually, so
+    this driver is for single-statement handlers only.
+    """
+
+    name = "neon-http"
+
+    def __init__(self, config: ServerlessConfig, transport=None):
+        import httpx  # only paid for by instances using this driver
+
+        self.config = config
+        self.serverless_stats = HttpStats()
+        self._headers = {
+            "Neon-Connection-String": config.database_url,
+            "Neon-Raw-Text-Output": "true",
+            "Neon-Array-Mode": "true",
+        }
+        self._client = httpx.Client(
+            timeout=config.connect_timeout,
+            transport=transport,
+            limits=httpx.Limits(max_keepalive_connections=2, keepalive_expiry=config.max_idle),
+        )
+        self._httpx = httpx
+
+    def connect(self) -> HttpConnection:
+        return HttpConnection(self)
+
+    begin = connect
+
+    def execute(self, statement, params: Optional[Dict[str, Any]] = None) -> HttpResult:
+        sql, args = compile_statement(statement, params)
+        started = time.perf_counter()
+        try:
+            response = self._client.post(self.config.http_endpoint, json={"query": sql, "params": args}, headers=self._headers)
+        except self._httpx.HTTPError as e:
+            raise exc.OperationalError(sql, args, NeonHttpError(str(e))) from e
+        self.serverless_stats.requests += 1
+        self.serverless_stats.request_ms += (time.perf_counter() - started) * 1000
+        if response.status_code >= 400:
+            try:
+                body = response.json()
+            except ValueError:
+                body = {"message": response.text}
+            error = NeonHttpError(body.get("message", f"HTTP {response.status_code}"), body.get("code"))
+            if (error.code or "").startswith("23"):
+                raise exc.IntegrityError(sql, args, error)
+            if (error.code or "").startswith(("08", "53", "57")) or response.status_code >= 500:
+                raise exc.OperationalError(sql, args, error)
+            raise exc.ProgrammingError(sql, args, error)
+        return HttpResult(response.json())
+
+    def dispose(self) -> None:
+        self._client.close()
+
+
+def create_serverless_engine(config: Optional[ServerlessConfig] = None, transport=None):
+    """Engine for the configured driver (TCP connection cache or SQL over HTTP)"""
+    config = config or ServerlessConfig.from_env()
+    if config.driver == "http":
+        logger.info(f"Serverless database driver: SQL over HTTP ({config.http_endpoint})")
+        return HttpEngine(config, transport=transport)
+    logger.info("Serverless database driver: cached TCP connection")
+    return create_tcp_engine(config)
+
+
+# =============================================================================
+# INVOCATION LATENCY
+# =============================================================================
+
+class InvocationStats:
+    """Cold-start and warm invocation latencies of one function instance.
+
+    The first request is the cold start: module import (from
+    ``init_started``) plus the request itself. Every later request is warm.
+    """
+
+    def __init__(self, init_started: float, clock: Callable[[], float] = time.perf_counter, max_samples: int = 1000):
+        self.init_started = init_started
+        self.clock = clock
+        self.init_ms: Optional[float] = None
+        self.cold_request_ms: Optional[float] = None
+        self.warm_ms: deque = deque(maxlen=max_samples)
+        self.warm_count = 0
+        self._lock = threading.Lock()
+
+    def record(self, request_started: float, request_finished: Optional[float] = None) -> Tuple[str, float]:
+        """Record one invocation; returns ("cold" | "warm", latency in ms)"""
+        request_finished = self.clock() if request_finished is None else request_finished
+        duration_ms = (request_finished - request_started) * 1000
+        with self._lock:
+            if self.cold_request_ms is None:
+                self.init_ms = (request_started - self.init_started) * 1000
+                self.cold_request_ms = duration_ms
+                return "cold", self.init_ms + duration_ms
+            self.warm_count += 1
+            self.warm_ms.append(duration_ms)
+            return "warm", duration_ms
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            warm = list(self.warm_ms)
+            cold = None
+            if self.cold_request_ms is not None:
+                cold = {
+                    "init_ms": round(self.init_ms, 1),
+                    "request_ms": round(self.cold_request_ms, 1),
+                    "total_ms": round(self.init_ms + self.cold_request_ms, 1),
+                }
+            return {
+                "cold_start": cold,
+                "warm": {
+                    "count": self.warm_count,
+                    "p50_ms": round(_percentile(warm, 50), 2),
+                    "p95_ms": round(_percentile(warm, 95), 2),
+                    "max_ms": round(max(warm), 2) if warm else 0.0,
+                },
+            }
@@ -0,0 +1,226 @@
+"""
+Tests for Email Delivery - Pooled SMTP Against a Local Sink
+============================================================
+Tests connection reuse, reconnects, retry classification, rate shaping,
+templates and message digests
+"""
+import email
+import email.policy
+import socket
+import socketserver
+import threading
+
+import pytest
+
+from backend_app.core.email_delivery import (
+    DomainRateLimiter,
+    EmailDelivery,
+    MemoryDigestStore,
+    SMTPConnectionPool,
+    backoff_delay,
+    compiled_template,
+    get_digest_store,
+    parse_domain_rates,
+    render,
+    render_message_digest,
+)
+
+
+class _SinkHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        server.sockets.append(self.connection)
+        self.reply("220 sink ESMTP")
+        recipients = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip()
+            verb = command[:4].upper()
+            if verb in ("EHLO", "HELO", "NOOP", "RSET"):
+                recipients = [] if verb == "RSET" else recipients
+                self.reply("250 sink")
+            elif verb == "MAIL":
+                recipients = []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                address = command.split(":", 1)[1].strip().strip("<>")
+                if address in server.reject:
+                    self.reply(server.reject[address])
+                else:
+                    recipients.append(address)
+                    self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    data = self.rfile.readline()
+                    if data in (b".\r\n", b""):
+                        break
+                    lines.append(data[1:] if data.startswith(b"..") else data)
+                message = email.message_from_bytes(b"".join(lines), policy=email.policy.default)
+                server.messages.append((recipients, message))
+                self.reply("250 OK queued")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Minimal local SMTP server that keeps every message it receives"""
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SinkHandler)
+        self.connections = 0
+        self.sockets = []
+        self.messages = []
+        self.reject = {}
+
+    def drop_clients(self):
+        for sock in self.sockets:
+            sock.shutdown(socket.SHUT_RDWR)
+        self.sockets = []
+
+
+@pytest.fixture
+def sink():
+    server = SMTPSink()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _delivery(sink, **kwargs):
+    pool = SMTPConnectionPool("127.0.0.1", sink.server_address[1], username=None, size=1, timeout=5)
+    limiter = DomainRateLimiter(parse_domain_rates("*=1000"))
+    return EmailDelivery(pool, limiter, sender="HireMeBahamas <noreply@hiremebahamas.com>", **kwargs)
+
+
+class TestConnectionPool:
+    """Test persistent connections against the sink"""
+
+    def test_batch_reuses_one_connection(self, sink):
+        """Test a batch and a later send share one SMTP connection"""
+        delivery = _delivery(sink)
+        subject, body = render("message", {
+            "recipient_name": "Ann", "sender_name": "Bob <b>", "preview": "Hi & bye", "link": "https://x/messages",
+        })
+        report = delivery.send_batch([(f"user{i}@example.com", subject, body) for i in range(5)])
+        assert report.sent == [f"user{i}@example.com" for i in range(5)]
+        assert delivery.send_batch([("late@example.com", subject, body)]).sent == ["late@example.com"]
+
+        assert sink.connections == 1
+        assert delivery.pool.stats()["opened"] == 1 and delivery.pool.stats()["reused"] == 5
+        recipients, message = sink.messages[0]
+        assert recipients == ["user0@example.com"]
+        assert message["Subject"] == "New message from Bob <b>"
+        html = message.get_body(("html",)).get_content()
+        assert "Bob &lt;b&gt;" in html and "Hi &amp; bye" in html
+        assert "Bob <b>" in message.get_body(("plain",)).get_content()
+
+    def test_dropped_connection_is_replaced(self, sink):
+        """Test a connection the server closed is discarded and the send retried"""
+        delivery = _delivery(sink)
+        assert delivery.send_batch([("a@example.com", "One", "<p>1</p>")]).sent
+        sink.drop_clients()
+
+        report = delivery.send_batch([("b@example.com", "Two", "<p>2</p>")])
+        assert report.sent == ["b@example.com"] and not report.deferred
+        assert sink.connections == 2 and delivery.pool.stats()["discarded"] == 1
+        assert [m["Subject"] for _, m in sink.messages] == ["One", "Two"]
+
+    def test_transient_and_permanent_rejections(self, sink):
+        """Test 4xx replies are deferred with backoff, 5xx fail, the connection survives"""
+        sink.reject = {"busy@example.com": "451 Try again later", "gone@example.com": "550 No such user"}
+        delivery = _delivery(sink)
+        report = delivery.send_batch([
+            ("busy@example.com", "S", "<p>b</p>"),
+            ("gone@example.com", "S", "<p>g</p>"),
+            ("ok@example.com", "S", "<p>o</p>"),
+        ], attempt=2)
+
+        assert report.sent == ["ok@example.com"]
+        assert [recipient for recipient, _ in report.failed] == ["gone@example.com"]
+        (deferred, delay), = report.deferred
+        assert deferred[0] == "busy@example.com" and 60 <= delay <= 120
+        assert sink.connections == 1
+
+    def test_unreachable_server_defers(self):
+        """Test a refused connection defers the message instead of raising"""
+        pool = SMTPConnectionPool("127.0.0.1", 1, size=1, timeout=1)
+        report = EmailDelivery(pool).send_batch([("a@example.com", "S", "<p>x</p>")])
+        assert not report.sent and len(report.deferred) == 1
+
+
+class TestRateShapingAndRetries:
+    """Test per-domain token buckets and jittered backoff"""
+
+    def test_domain_rates(self):
+        """Test each domain gets its own bucket and long waits are deferred"""
+        now = [0.0]
+        limiter = DomainRateLimiter(parse_domain_rates("gmail.com=2, *=100"), clock=lambda: now[0])
+        assert [limiter.reserve("gmail.com", 1.0) for _ in range(2)] == [0.0, 0.0]
+        assert limiter.reserve("gmail.com", 1.0) == pytest.approx(0.5)
+        assert limiter.reserve("gmail.com", 0.1) == pytest.approx(1.0)  # deferred, not taken
+        assert limiter.reserve("example.com", 1.0) == 0.0
+        now[0] = 1.0
+        assert limiter.reserve("gmail.com", 1.0) == 0.0
+
+    def test_delivery_waits_or_defers_per_domain(self, sink):
+        """Test sends sleep for short waits and defer past the maximum"""
+        slept = []
+        delivery = _delivery(sink, max_rate_wait=0.6, sleep=slept.append)
+        delivery.limiter = DomainRateLimiter({"gmail.com": 2}, clock=lambda: 0.0)
+        report = delivery.send_batch([(f"u{i}@gmail.com", "S", "<p>x</p>") for i in range(4)])
+
+        assert report.sent == ["u0@gmail.com", "u1@gmail.com", "u2@gmail.com"]
+        assert slept == [pytest.approx(0.5)]
+        assert report.deferred[0][0][0] == "u3@gmail.com" and report.retry_after == pytest.approx(1.0)
+
+    def test_backoff_delay(self):
+        """Test delays double per attempt, are jittered and capped"""
+        for attempt, (low, high) in enumerate([(15, 30), (30, 60), (60, 120)]):
+            delays = {backoff_delay(attempt, base=30, cap=1800) for _ in range(20)}
+            assert all(low <= d <= high for d in delays) and len(delays) > 1
+        assert backoff_delay(20, base=30, cap=100) <= 100
+
+
+class TestTemplatesAndDigests:
+    """Test compiled templates and message digests"""
+
+    def test_templates_compiled_once(self):
+        """Test templates are cached and every template renders"""
+        assert compiled_template("welcome") is compiled_template("welcome")
+        subject, body = render("welcome", {"user_name": "Ann", "username": "ann", "user_email": "a@x.com"})
+        assert subject == "Welcome to HireMeBahamas, Ann!" and "@ann" in body
+        with pytest.raises(KeyError):
+            render("password_reset", {})
+
+    def test_message_digest(self):
+        """Test notifications collapse into one email per recipient"""
+        store = MemoryDigestStore()
+        items = [{"sender_name": f"S{i}", "preview": f"msg {i}"} for i in range(3)]
+        assert [store.add("ann@example.com", item) for item in items] == [1, 2, 3]
+        drained = store.drain("ann@example.com")
+        assert drained == items and store.drain("ann@example.com") == []
+
+        subject, body = render_message_digest("Ann", drained)
+        assert subject == "You have 3 new messages on HireMeBahamas"
+        assert all(f"<strong>S{i}</strong>" in body for i in range(3))
+        assert render_message_digest("Ann", drained[:1])[0] == "New message from S0"
+
+    def test_digest_store_requires_redis_broker(self):
+        """Test digests never fall back to a per-process store"""
+        with pytest.raises(RuntimeError):
+            get_digest_store("memory://")
@@ -30,8 +30,14 @@ try:
         LoginAttempt,
     )
     
-    # Import RefreshToken from api.backend_app.models
-    from api.backend_app.models import RefreshToken
+    # Import RefreshToken and the analytics tables from api.backend_app.models
+    from api.backend_app.models import (
+        AnalyticsEvent,
+        AnalyticsRollup,
+        AnalyticsSketch,
+        AnalyticsWatermark,
+        RefreshToken,
+    )
     
     __all__ = [
         'Base',
@@ -51,6 +57,10 @@ try:
         'ProfilePicture',
         'LoginAttempt',
         'RefreshToken',
+        'AnalyticsEvent',
+        'AnalyticsRollup',
+        'AnalyticsSketch',
+        'AnalyticsWatermark',
     ]
 except ImportError as e:
     # If models can't be imported, log warning but don't fail
@@ -16,6 +16,8 @@ from app.core.security import (
     verify_password_async,
     BCRYPT_ROUNDS,
 )
+from app.core.availability import index_user_availability
+from app.core.skills import index_user_skills, sync_user_skills
 from app.core.upload import upload_image
 from app.database import get_db
 from app.models import User
@@ -446,13 +448,20 @@ async def update_profile(
     """Update current user profile"""
 
     # Update user fields
-    for field, value in user_data.dict(exclude_unset=True).items():
+    update_data = user_data.dict(exclude_unset=True)
+    for field, value in update_data.items():
         setattr(current_user, field, value)
 
     current_user.updated_at = datetime.utcnow()
 
+    if "skills" in update_data:
+        await sync_user_skills(db, current_user)
+
     await db.commit()
     await db.refresh(current_user)
+    if "skills" in update_data:
+        index_user_skills(current_user)
+    index_user_availability(current_user)
 
     return UserResponse.from_orm(current_user)
 
@@ -517,6 +526,7 @@ async def delete_account(
     current_user.updated_at = datetime.utcnow()
 
     await db.commit()
+    index_user_availability(current_user)
 
     return {"message": "Account deactivated successfully"}
 
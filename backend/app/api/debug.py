@@ -383,3 +383,36 @@ async def get_problem_accounts(
             "users": no_auth_method
         }
     }
+
+
+@router.get("/sql-fingerprints")
+async def get_sql_fingerprints(
+    top: int = Query(default=50, ge=1, le=500),
+    order_by: str = Query(default="total_ms", regex="^(total_ms|count|avg_ms|max_per_request)$"),
+    current_user: User = Depends(require_admin),
+):
+    """Get the heaviest SQL statement fingerprints seen by this process
+    
+    Fingerprints come from sampled requests (see core.sql_instrumentation).
+    A high ``max_per_request`` marks a likely N+1 query pattern.
+    
+    Args:
+        top: Number of fingerprints to return
+        order_by: Sort key (total_ms, count, avg_ms, max_per_request)
+    
+    Returns:
+        Fingerprint statistics, heaviest first
+    
+    Requires admin authentication.
+    """
+    from app.core.sql_instrumentation import (
+        N_PLUS_ONE_THRESHOLD,
+        SAMPLE_RATE,
+        get_fingerprint_stats,
+    )
+
+    return {
+        "sample_rate": SAMPLE_RATE,
+        "n_plus_one_threshold": N_PLUS_ONE_THRESHOLD,
+        "fingerprints": get_fingerprint_stats(top=top, order_by=order_by),
+    }
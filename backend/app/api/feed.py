@@ -4,13 +4,18 @@ Feed API - Cached global feed endpoint
 Implements a cached feed endpoint that serves posts from the database
 with in-memory TTL caching for improved performance. The cache automatically
 expires after 30 seconds.
+
+Two modes are supported:
+- recent (default): the 20 most recent posts
+- ranked: the top posts by time-decayed engagement (see core/feed_ranking.py)
 """
 from typing import List, Optional
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy import desc, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
+from app.core.feed_ranking import ensure_ranked_feed
 from app.core.memory_cache import cache_get, cache_set
 from app.database import get_db
 from app.models import Post
@@ -19,7 +24,11 @@ router = APIRouter()
 
 
 @router.get("/")
-async def feed(db: AsyncSession = Depends(get_db)):
+async def feed(
+    mode: str = Query("recent", pattern="^(recent|ranked)$"),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+):
     """
     Get the global feed of posts with in-memory caching.
     
@@ -29,10 +38,17 @@ async def feed(db: AsyncSession = Depends(get_db)):
     - Caches the result for 30 seconds (TTL ≤ 60s)
     - Returns a list of posts with basic information
     
+    Args:
+        mode: ``recent`` for newest first, ``ranked`` for trending
+        limit: Number of posts to return
+    
     Returns:
         dict: Response containing posts array
     """
-    key = "feed:global"
+    if mode == "ranked":
+        return await _ranked_feed(db, limit)
+
+    key = f"feed:global:{limit}"
     
     # Try to get cached data (30s TTL)
     cached = cache_get(key, ttl=30)
@@ -43,22 +59,13 @@ async def feed(db: AsyncSession = Depends(get_db)):
     # Cache miss - fetch from database
     query = select(Post).options(
         selectinload(Post.user)
-    ).order_by(desc(Post.created_at)).limit(20)
+    ).order_by(desc(Post.created_at)).limit(limit)
     
     result = await db.execute(query)
     posts = result.scalars().all()
     
     # Serialize posts for response
-    posts_data = [
-        {
-            "id": str(post.id),
-            "content": post.content,
-            "user_id": str(post.user_id),
-            "created_at": post.created_at.isoformat() if post.created_at else None,
-            "updated_at": post.updated_at.isoformat() if post.updated_at else None,
-        }
-        for post in posts
-    ]
+    posts_data = [_serialize_post(post) for post in posts]
     
     data = {"posts": posts_data}
     
@@ -66,3 +73,38 @@ async def feed(db: AsyncSession = Depends(get_db)):
     cache_set(key, data)
     
     return data
+
+
+def _serialize_post(post: Post) -> dict:
+    return {
+        "id": str(post.id),
+        "content": post.content,
+        "user_id": str(post.user_id),
+        "created_at": post.created_at.isoformat() if post.created_at else None,
+        "updated_at": post.updated_at.isoformat() if post.updated_at else None,
+    }
+
+
+async def _ranked_feed(db: AsyncSession, limit: int) -> dict:
+    """Serve the top-ranked posts; scores come from the in-memory store."""
+    key = f"feed:ranked:{limit}"
+    cached = cache_get(key, ttl=30)
+    if cached is not None:
+        return cached
+
+    store = await ensure_ranked_feed(db)
+    ranked = store.top(limit)
+    posts_data = []
+    if ranked:
+        result = await db.execute(
+            select(Post).where(Post.id.in_([post_id for post_id, _ in ranked]))
+        )
+        posts_by_id = {post.id: post for post in result.scalars().all()}
+        for post_id, score in ranked:
+            post = posts_by_id.get(post_id)
+            if post is not None:
+                posts_data.append({**_serialize_post(post), "score": round(score, 4)})
+
+    data = {"posts": posts_data, "mode": "ranked"}
+    cache_set(key, data)
+    return data
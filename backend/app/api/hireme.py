@@ -1,12 +1,21 @@
-from typing import Optional
+from typing import List, Optional
 
 from app.core.security import get_current_user
-from app.core.cache import get_cached, set_cached
+from app.core.api_cache import exclude_viewer, get_shared, set_shared
+from app.core.availability import (
+    availability_index,
+    canonical_island,
+    ensure_availability_index,
+    index_user_availability,
+    resolve_location,
+)
 from app.core.cache_headers import CacheStrategy, handle_conditional_request, apply_performance_headers
-from app.core.pagination import paginate_auto, format_paginated_response
+from app.core.pagination import PaginationMetadata, paginate_auto, format_paginated_response
+from app.core.reputation import attach_ratings, get_reputation
+from app.core.skills import ensure_skill_index, parse_skills
 from app.database import get_db
 from app.models import User
-from fastapi import APIRouter, Depends, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy import and_, func, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -23,6 +32,15 @@ async def get_available_users(
     limit: int = Query(20, ge=1, le=100),
     direction: str = Query("next", regex="^(next|previous)$"),
     search: Optional[str] = Query(None),
+    skills: Optional[List[str]] = Query(
+        None, description="Skills the user must have (all of them); repeat or comma-separate"
+    ),
+    island: Optional[str] = Query(None, description="Only users on this island"),
+    near: Optional[str] = Query(None, description="Settlement or island to measure distance from"),
+    lat: Optional[float] = Query(None, ge=-90, le=90, description="Latitude to measure distance from"),
+    lon: Optional[float] = Query(None, ge=-180, le=180, description="Longitude to measure distance from"),
+    radius_km: Optional[float] = Query(None, gt=0, le=500, description="Only users within this distance"),
+    sort: Optional[str] = Query(None, regex="^(rating|distance|newest)$"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -31,25 +49,44 @@ async def get_available_users(
     Mobile API Optimization Features:
     - **Dual Pagination**: Cursor-based (mobile) or offset-based (web)
     - **HTTP Caching**: ETag validation with stale-while-revalidate
-    - **Performance**: Cached for 3 minutes for fast response times
+    - **Performance**: Cached for 3 minutes for fast response times, once for
+      all viewers; the viewer's own profile is dropped per request (the page
+      holding it returns one user fewer, so pages never overlap)
+    - **Skill filter**: ``skills`` is resolved to user ids from the in-memory
+      skills index (canonical names and aliases, e.g. plumber -> plumbing)
+    - **Location**: ``island``, ``near`` (a settlement or island name) or
+      ``lat``/``lon`` with ``radius_km``, and ``sort`` by rating, distance
+      or newest, are answered from the in-memory availability index
+      (offset pagination; each user gets ``island``, ``settlement`` and,
+      with a point, ``distance_km``)
     """
-    # Build cache key
-    cache_params = f"{cursor}:{skip}:{page}:{limit}:{direction}:{search}"
-    cache_key = f"hireme:available:{current_user.id}:{cache_params}"
+    required_skills = parse_skills(skills)
+    use_index = any(value is not None for value in (island, near, lat, lon, radius_km, sort))
+
+    # Build cache key (viewer-independent)
+    cache_key = f"{cursor}:{skip}:{page}:{limit}:{direction}:{search}:{','.join(required_skills)}"
+    if use_index:
+        cache_key += f":{island}:{near}:{lat}:{lon}:{radius_km}:{sort}"
     
     # Try cache first
-    cached_response = await get_cached(cache_key)
+    cached_response = await get_shared("hireme:available", cache_key)
     if cached_response is not None:
-        response = handle_conditional_request(request, cached_response, CacheStrategy.PUBLIC_LIST)
-        apply_performance_headers(response)
-        return response
+        return _respond(request, cached_response, current_user)
+
+    if use_index:
+        if page is not None and skip is None:
+            skip = (page - 1) * limit
+        response = await _search_index(
+            db, required_skills, search, island, near, lat, lon, radius_km, sort or "rating", skip or 0, limit
+        )
+        await set_shared("hireme:available", cache_key, response, ttl=180)
+        return _respond(request, response, current_user)
     
     # Build query
     base_query = select(User).where(
         and_(
             User.is_active == True,
             User.is_available_for_hire == True,
-            User.id != current_user.id,
         )
     )
 
@@ -63,6 +100,10 @@ async def get_available_users(
         )
         base_query = base_query.where(search_filter)
 
+    if required_skills:
+        index = await ensure_skill_index(db)
+        base_query = base_query.where(User.id.in_(index.users_with_all(required_skills)))
+
     # Use dual pagination
     users, pagination_meta = await paginate_auto(
         db=db,
@@ -79,31 +120,123 @@ async def get_available_users(
     )
 
     # Format users data
-    users_data = [
-        {
-            "id": user.id,
-            "first_name": user.first_name,
-            "last_name": user.last_name,
-            "username": user.username,
-            "avatar_url": user.avatar_url,
-            "bio": user.bio,
-            "occupation": user.occupation,
-            "company_name": user.company_name,
-            "location": user.location,
-            "skills": user.skills,
-            "experience": user.experience,
-            "education": user.education,
-            "is_available_for_hire": user.is_available_for_hire,
-        }
-        for user in users
-    ]
+    users_data = [_user_data(user) for user in users]
+    # Ratings for the whole page in one lookup
+    await attach_ratings(db, users_data)
 
     response = format_paginated_response(users_data, pagination_meta)
     
     # Cache for 3 minutes
-    await set_cached(cache_key, response, ttl=180)
+    await set_shared("hireme:available", cache_key, response, ttl=180)
     
-    # Return with HTTP caching headers
+    return _respond(request, response, current_user)
+
+
+def _user_data(user: User) -> dict:
+    return {
+        "id": user.id,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "username": user.username,
+        "avatar_url": user.avatar_url,
+        "bio": user.bio,
+        "occupation": user.occupation,
+        "company_name": user.company_name,
+        "location": user.location,
+        "skills": user.skills,
+        "experience": user.experience,
+        "education": user.education,
+        "is_available_for_hire": user.is_available_for_hire,
+    }
+
+
+async def _search_index(
+    db: AsyncSession,
+    required_skills: List[str],
+    search: Optional[str],
+    island: Optional[str],
+    near: Optional[str],
+    lat: Optional[float],
+    lon: Optional[float],
+    radius_km: Optional[float],
+    sort: str,
+    skip: int,
+    limit: int,
+) -> dict:
+    """One page of available users from the availability index"""
+    island_filter = None
+    if island:
+        island_filter = canonical_island(island)
+        if island_filter is None:
+            raise HTTPException(status_code=400, detail=f"Unknown island: {island}")
+
+    point = None
+    if near:
+        place = resolve_location(near)
+        if place is None:
+            raise HTTPException(status_code=400, detail=f"Unknown location: {near}")
+        point = (place.lat, place.lon)
+    elif lat is not None or lon is not None:
+        if lat is None or lon is None:
+            raise HTTPException(status_code=400, detail="lat and lon must be given together")
+        point = (lat, lon)
+    if radius_km is not None and point is None:
+        raise HTTPException(status_code=400, detail="radius_km requires near or lat/lon")
+    if sort == "distance" and point is None:
+        raise HTTPException(status_code=400, detail="sort=distance requires near or lat/lon")
+
+    index = await ensure_availability_index(db)
+    total, matches = index.search(
+        skills=required_skills,
+        island=island_filter,
+        near=point,
+        radius_km=radius_km,
+        text=search,
+        sort=sort,
+        limit=limit,
+        offset=skip,
+    )
+
+    # Load the page in index order; anyone who stopped being available since
+    # the last rebuild is dropped
+    users = {}
+    if matches:
+        result = await db.execute(
+            select(User).where(
+                User.id.in_([user_id for user_id, _ in matches]),
+                User.is_active == True,
+                User.is_available_for_hire == True,
+            )
+        )
+        users = {user.id: user for user in result.scalars().all()}
+
+    users_data = []
+    for user_id, distance in matches:
+        user = users.get(user_id)
+        if user is None:
+            continue
+        place = resolve_location(user.location)
+        data = _user_data(user)
+        data["island"] = place.island if place else None
+        data["settlement"] = place.settlement if place else None
+        if point is not None:
+            data["distance_km"] = distance
+        users_data.append(data)
+    await attach_ratings(db, users_data)
+
+    pagination = PaginationMetadata(
+        total=total,
+        page=skip // limit + 1,
+        per_page=limit,
+        has_next=skip + limit < total,
+        has_previous=skip > 0,
+    )
+    return format_paginated_response(users_data, pagination)
+
+
+def _respond(request: Request, shared: dict, viewer: User):
+    """Drop the viewer from a shared page and return it with HTTP caching headers"""
+    response = {**shared, "data": exclude_viewer(shared["data"], viewer.id)}
     json_response = handle_conditional_request(request, response, CacheStrategy.PUBLIC_LIST)
     apply_performance_headers(json_response)
     return json_response
@@ -121,6 +254,11 @@ async def toggle_availability(
     await db.commit()
     await db.refresh(current_user)
 
+    score = None
+    if current_user.is_available_for_hire and availability_index.built_at is not None:
+        score = (await get_reputation(db, current_user.id)).score
+    index_user_availability(current_user, score)
+
     return {
         "success": True,
         "is_available": current_user.is_available_for_hire,
@@ -14,6 +14,23 @@ from app.core.memory_cache import cache_get, cache_set, cache_delete, cache_inva
 from app.core.cache_headers import CacheStrategy, handle_conditional_request, apply_performance_headers
 from app.core.pagination import paginate_auto, format_paginated_response
 from app.core.query_timeout import set_query_timeout
+from app.core.feed_ranking import record_feed_event
+from app.core.job_index import BUDGET_BUCKETS, ensure_job_index, index_job, unindex_job
+from app.core.reputation import get_reputations
+from app.core.social_graph import record_post
+from app.core.serialization import (
+    RowMapper,
+    encoded_json_response,
+    json_response,
+)
+from app.core.skills import (
+    ensure_skill_index,
+    format_skills,
+    index_job_skills,
+    parse_skills,
+    sync_job_skills,
+    unindex_job_skills,
+)
 from app.database import get_db
 from app.models import Job, JobApplication, Notification, NotificationType, Post, User
 from app.schemas.job import (
@@ -47,6 +64,39 @@ async def invalidate_jobs_cache():
     cache_invalidate_prefix("jobs:stats:")
 
 
+# Columns for list responses, selected without loading Job/User instances
+JOB_LIST_FIELDS = {
+    "id": Job.id,
+    "title": Job.title,
+    "company": Job.company,
+    "description": Job.description,
+    "location": Job.location,
+    "is_remote": Job.is_remote,
+    "job_type": Job.job_type,
+    "category": Job.category,
+    "budget": Job.budget,
+    "status": Job.status,
+    "employer_id": Job.employer_id,
+    "employer": {
+        "id": User.id,
+        "first_name": User.first_name,
+        "last_name": User.last_name,
+        "username": User.username,
+        "avatar_url": User.avatar_url,
+        "company_name": User.company_name,
+    },
+    "created_at": Job.created_at,
+    "updated_at": Job.updated_at,
+}
+JOB_LIST_ROW = RowMapper(JOB_LIST_FIELDS)
+RECOMMENDED_JOB_ROW = RowMapper({**JOB_LIST_FIELDS, "skills": Job.skills})
+
+
+def _job_rows(mapper: RowMapper = JOB_LIST_ROW):
+    """Column select of jobs joined to their employer"""
+    return mapper.select().join(User, User.id == Job.employer_id)
+
+
 @router.post("/", response_model=JobResponse)
 async def create_job(
     job: JobCreate,
@@ -57,7 +107,9 @@ async def create_job(
     # Set query timeout for job creation (5s default)
     await set_query_timeout(db)
     
-    db_job = Job(**job.dict(), employer_id=current_user.id)
+    job_data = job.dict()
+    job_data["skills"] = format_skills(job_data.get("skills"))
+    db_job = Job(**job_data, employer_id=current_user.id)
     db.add(db_job)
     await db.commit()
     await db.refresh(db_job)
@@ -82,10 +134,15 @@ async def create_job(
         related_job_id=db_job.id
     )
     db.add(db_post)
+    await record_post(db, current_user.id)
+    await sync_job_skills(db, job_with_employer)
     await db.commit()
+    record_feed_event("post", db_post.id, post_type="job")
     
     # Invalidate jobs cache after creating new job
     await invalidate_jobs_cache()
+    index_job(job_with_employer)
+    index_job_skills(job_with_employer)
 
     return job_with_employer
 
@@ -113,40 +170,50 @@ async def get_jobs(
     
     Mobile API Optimization Features:
     - **Dual Pagination**: Cursor-based (mobile) or offset-based (web)
-    - **In-Memory Caching**: TTL-based caching for fast response (≤60s)
-    - **N+1 Prevention**: Eager loading of employer relationship
+    - **Indexed Filters**: category, location, is_remote and budget filters
+      are resolved to job ids by the in-memory bitmap index
+      (``app.core.job_index``) instead of ``ILIKE`` scans; ``search`` matches
+      title/description text in SQL
+    - **In-Memory Caching**: TTL-based caching of the encoded body (≤60s)
+      for the unfiltered listing only, so filter combinations do not each
+      get their own cache entry
+    - **N+1 Prevention**: Employer columns joined into the same select
+    - **Fast Serialization**: Plain column rows mapped to dicts and encoded
+      with orjson, without ORM hydration or response_model re-validation
     
     Performance: Cached for 60 seconds (TTL ≤ 60s) for sub-100ms response times.
     """
-    # Build cache key from all parameters
-    cache_params = f"{cursor}:{skip}:{page}:{limit}:{direction}:{category}:{location}:{is_remote}:{budget_min}:{budget_max}:{search}:{status}"
-    cache_key = f"jobs:list:{cache_params}"
-    
-    # Try to get from in-memory cache first (60s TTL)
-    cached_response = cache_get(cache_key, ttl=60)
-    if cached_response is not None:
-        return cached_response
+    index_filters = {
+        "category": category,
+        "location": location if location and not is_remote else None,
+        "is_remote": is_remote,
+        "budget_min": budget_min,
+        "budget_max": budget_max,
+    }
+    faceted = any(value is not None for value in index_filters.values())
+
+    # Only the unfiltered listing is cached; filtered pages come from the index
+    cache_key = None
+    if not faceted and not search:
+        cache_key = f"jobs:list:{cursor}:{skip}:{page}:{limit}:{direction}:{status}"
+        # Try to get from in-memory cache first (60s TTL); entries are encoded JSON
+        cached_body = cache_get(cache_key, ttl=60)
+        if cached_body is not None:
+            return encoded_json_response(cached_body)
     
     # Set query timeout for job listing (5s default)
     await set_query_timeout(db)
     
-    # Build query with eager loading (prevents N+1)
-    base_query = select(Job).options(selectinload(Job.employer))
+    # Plain columns joined to the employer (no ORM hydration, no N+1)
+    base_query = _job_rows()
 
     # Apply filters
     filters = []
     if status:
         filters.append(Job.status == status)
-    if category:
-        filters.append(Job.category.ilike(f"%{category}%"))
-    if location and not is_remote:
-        filters.append(Job.location.ilike(f"%{location}%"))
-    if is_remote is not None:
-        filters.append(Job.is_remote == is_remote)
-    if budget_min is not None:
-        filters.append(Job.budget >= budget_min)
-    if budget_max is not None:
-        filters.append(Job.budget <= budget_max)
+    if faceted:
+        index = await ensure_job_index(db)
+        filters.append(Job.id.in_(index.matching_ids({**index_filters, "status": status})))
     if search:
         filters.append(
             or_(Job.title.ilike(f"%{search}%"), Job.description.ilike(f"%{search}%"))
@@ -156,7 +223,7 @@ async def get_jobs(
         base_query = base_query.where(and_(*filters))
 
     # Use dual pagination system
-    jobs, pagination_meta = await paginate_auto(
+    rows, pagination_meta = await paginate_auto(
         db=db,
         query=base_query,
         model_class=Job,
@@ -168,44 +235,130 @@ async def get_jobs(
         order_by_field="created_at",
         order_direction="desc",
         count_total=False,  # Expensive for large datasets
+        rows=True,
     )
 
-    # Format jobs data
-    jobs_data = [job.dict() for job in jobs] if hasattr(jobs[0], 'dict') else [
-        {
-            "id": job.id,
-            "title": job.title,
-            "company": job.company,
-            "description": job.description,
-            "location": job.location,
-            "is_remote": job.is_remote,
-            "job_type": job.job_type,
-            "category": job.category,
-            "budget": job.budget,
-            "status": job.status,
-            "employer_id": job.employer_id,
-            "employer": {
-                "id": job.employer.id,
-                "first_name": job.employer.first_name,
-                "last_name": job.employer.last_name,
-                "username": job.employer.username,
-                "avatar_url": job.employer.avatar_url,
-                "company_name": job.employer.company_name,
-            } if job.employer else None,
-            "created_at": job.created_at.isoformat() if job.created_at else None,
-            "updated_at": job.updated_at.isoformat() if job.updated_at else None,
-        }
-        for job in jobs
-    ]
-
-    response = format_paginated_response(jobs_data, pagination_meta)
+    jobs_data = JOB_LIST_ROW.map(rows)
+    response = json_response(
+        format_paginated_response(jobs_data, pagination_meta),
+        model=JobResponse,
+        items=jobs_data,
+    )
     
-    # Cache for 60 seconds (TTL ≤ 60s as per requirement)
-    cache_set(cache_key, response)
+    # Cache the encoded body for 60 seconds (TTL ≤ 60s as per requirement)
+    if cache_key is not None:
+        cache_set(cache_key, response.body)
     
     return response
 
 
+@router.get("/search")
+async def search_jobs(
+    category: Optional[List[str]] = Query(None),
+    location: Optional[List[str]] = Query(None),
+    job_type: Optional[List[str]] = Query(None),
+    is_remote: Optional[bool] = Query(None),
+    budget_bucket: Optional[List[str]] = Query(None, description="Budget bucket label(s), e.g. 100_500"),
+    budget_min: Optional[float] = Query(None, ge=0),
+    budget_max: Optional[float] = Query(None, ge=0),
+    status: Optional[str] = Query("active"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+):
+    """Faceted job search served from the in-memory bitmap index
+
+    Repeat a parameter to OR values within a facet (``?category=plumbing&category=electrical``);
+    different facets are ANDed. The response includes facet counts for the
+    current result set so clients can render filter chips with counts.
+
+    Performance: filtering and counting never touch the database; only the
+    page of matching jobs is loaded, by primary key.
+    """
+    index = await ensure_job_index(db)
+    result = index.search(
+        {
+            "category": category,
+            "location": location,
+            "job_type": job_type,
+            "is_remote": is_remote,
+            "budget": budget_bucket,
+            "budget_min": budget_min,
+            "budget_max": budget_max,
+            "status": status,
+        },
+        limit=limit,
+        offset=skip,
+    )
+
+    jobs_data = []
+    if result["ids"]:
+        await set_query_timeout(db)
+        rows = await db.execute(_job_rows().where(Job.id.in_(result["ids"])))
+        jobs_by_id = {row.id: JOB_LIST_ROW(row) for row in rows}
+        jobs_data = [jobs_by_id[job_id] for job_id in result["ids"] if job_id in jobs_by_id]
+
+    return json_response({
+        "success": True,
+        "jobs": jobs_data,
+        "total": result["total"],
+        "skip": skip,
+        "limit": limit,
+        "has_more": skip + len(result["ids"]) < result["total"],
+        "facets": result["facets"],
+        "budget_buckets": [
+            {"label": label, "min": low, "max": high} for label, low, high in BUDGET_BUCKETS
+        ],
+    }, model=JobResponse, items=jobs_data)
+
+
+@router.get("/recommended")
+async def recommended_jobs(
+    skills: Optional[List[str]] = Query(
+        None, description="Skills every job must require; repeat or comma-separate"
+    ),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Active jobs ranked by skill overlap with the current user's profile
+
+    Matching and ranking use the in-memory skills index (set intersection
+    over skill -> job postings); only the returned page is loaded from the
+    database.
+    """
+    index = await ensure_skill_index(db)
+    user_skills = parse_skills(current_user.skills)
+    required = parse_skills(skills)
+    total, ranked = index.rank_jobs(user_skills, limit=limit, offset=skip, required=required)
+
+    jobs_data = []
+    if ranked:
+        await set_query_timeout(db)
+        rows = await db.execute(
+            _job_rows(RECOMMENDED_JOB_ROW)
+            .where(Job.id.in_([job_id for job_id, _ in ranked]), Job.status == "active")
+        )
+        jobs_by_id = {row.id: RECOMMENDED_JOB_ROW(row) for row in rows}
+        for job_id, overlap in ranked:
+            if job_id in jobs_by_id:
+                job_data = jobs_by_id[job_id]
+                job_data["matching_skills"] = overlap
+                jobs_data.append(job_data)
+
+    return json_response({
+        "success": True,
+        "jobs": jobs_data,
+        "total": total,
+        "skip": skip,
+        "limit": limit,
+        "has_more": skip + len(ranked) < total,
+        "skills": user_skills,
+        "required_skills": required,
+    }, model=JobResponse, items=jobs_data)
+
+
 @router.get("/{job_id}", response_model=JobResponse)
 async def get_job(job_id: int, db: AsyncSession = Depends(get_db)):
     """Get a specific job by ID"""
@@ -251,9 +404,13 @@ async def update_job(
 
     # Update job fields
     update_data = job_update.dict(exclude_unset=True)
+    if "skills" in update_data:
+        update_data["skills"] = format_skills(update_data["skills"])
     for field, value in update_data.items():
         setattr(job, field, value)
 
+    if "skills" in update_data:
+        await sync_job_skills(db, job)
     await db.commit()
     await db.refresh(job)
 
@@ -265,6 +422,8 @@ async def update_job(
     
     # Invalidate jobs cache after updating job
     await invalidate_jobs_cache()
+    index_job(updated_job)
+    index_job_skills(updated_job)
 
     return updated_job
 
@@ -295,6 +454,8 @@ async def delete_job(
     
     # Invalidate jobs cache after deleting job
     await invalidate_jobs_cache()
+    unindex_job(job_id)
+    unindex_job_skills(job_id)
 
     return {"message": "Job deleted successfully"}
 
@@ -333,6 +494,8 @@ async def toggle_job_status(
 
     await db.commit()
     await db.refresh(job)
+    index_job(job)
+    index_job_skills(job)
 
     return {
         "success": True,
@@ -452,6 +615,13 @@ async def get_job_applications(
     )
     applications = result.scalars().all()
 
+    # Applicant ratings for every application in one lookup
+    reputations = await get_reputations(db, [application.applicant_id for application in applications])
+    for application in applications:
+        reputation = reputations[application.applicant_id]
+        application.applicant.average_rating = reputation.average
+        application.applicant.total_reviews = reputation.count
+
     return applications
 
 
@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 
 from app.auth import get_current_user
+from app.core.feed_ranking import record_feed_event
 from app.database import get_db
 from app.models import (
     User, Subscription, JobPostingPackage, BoostedPost, 
@@ -395,6 +396,7 @@ def create_boosted_post(
     db.add(boosted)
     db.commit()
     db.refresh(boosted)
+    record_feed_event("boost", boosted.post_id, boosted.starts_at, boost_type=boosted.boost_type)
     
     return boosted
 
@@ -1,8 +1,11 @@
 from typing import Optional
 
+from app.core.partitioning import live_window
+from app.core.push import register_device, unregister_device
 from app.core.security import get_current_user
 from app.database import get_db
 from app.models import Notification, NotificationType, User
+from app.schemas.notification import DeviceRegister
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy import and_, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -20,9 +23,15 @@ async def get_notifications(
     current_user: User = Depends(get_current_user),
 ):
     """Get list of notifications for current user"""
+    filters = [Notification.user_id == current_user.id]
+    # Bound created_at to the retention window so partitions past it are pruned
+    window = live_window(Notification)
+    if window is not None:
+        filters.append(window)
+
     query = select(Notification).options(
         selectinload(Notification.actor)
-    ).where(Notification.user_id == current_user.id)
+    ).where(*filters)
 
     if unread_only:
         query = query.where(Notification.is_read == False)
@@ -32,7 +41,7 @@ async def get_notifications(
 
     # Get total count
     count_result = await db.execute(
-        select(func.count(Notification.id)).where(Notification.user_id == current_user.id)
+        select(func.count(Notification.id)).where(*filters)
     )
     total = count_result.scalar()
 
@@ -157,3 +166,29 @@ async def mark_all_read(
         "success": True,
         "message": f"Marked {len(notifications)} notifications as read",
     }
+
+
+@router.post("/devices", status_code=status.HTTP_201_CREATED)
+async def register_push_device(
+    device: DeviceRegister,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Register this device's push token for the current user"""
+    await register_device(db, current_user.id, device.token, device.platform)
+    return {"success": True, "message": "Device registered"}
+
+
+@router.delete("/devices/{token}")
+async def unregister_push_device(
+    token: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Stop push notifications to one of the current user's devices"""
+    if not await unregister_device(db, current_user.id, token):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Device not found",
+        )
+    return {"success": True, "message": "Device unregistered"}
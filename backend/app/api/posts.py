@@ -3,9 +3,11 @@ from uuid import UUID
 import logging
 
 from app.core.security import get_current_user
-from app.core.cache import get_cached, set_cached, invalidate_cache
+from app.core.api_cache import apply_overlay, get_shared, set_shared
+from app.core.cache import invalidate_cache
 from app.core.cache_headers import CacheStrategy, handle_conditional_request, apply_performance_headers
 from app.core.pagination import paginate_auto, format_paginated_response
+from app.core.social_graph import liked_among, record_post
 from app.core.background_tasks import (
     add_push_notification,
     notify_new_like_task,
@@ -188,6 +190,7 @@ async def create_post(
     """
     db_post = Post(**post.model_dump(), user_id=current_user.id)
     db.add(db_post)
+    await record_post(db, current_user.id)
     await db.commit()
     await db.refresh(db_post)
 
@@ -241,18 +244,14 @@ async def get_posts(
     - Default: cursor-based starting from the most recent posts
     
     Note: Posts remain visible regardless of author's account status.
-    Performance: Cached for 60 seconds with stale-while-revalidate.
+    Performance: Cached for 60 seconds with stale-while-revalidate, once for
+    all viewers; is_liked is applied per request.
     """
     # Try to get from cache first (sub-50ms cache hit)
-    user_id = current_user.id if current_user else "anonymous"
-    cache_params = f"{cursor}:{skip}:{page}:{limit}:{direction}"
-    cache_key = f"posts:list:{cache_params}:{user_id}"
-    cached_response = await get_cached(cache_key)
+    cache_key = f"{cursor}:{skip}:{page}:{limit}:{direction}"
+    cached_response = await get_shared("posts:list", cache_key)
     if cached_response is not None:
-        # Return cached response with HTTP caching headers
-        response = handle_conditional_request(request, cached_response, CacheStrategy.POSTS)
-        apply_performance_headers(response)
-        return response
+        return await _respond_with_likes(request, db, cached_response, current_user)
     
     # Build query with user relationship (eager loading to prevent N+1)
     # IMPORTANT: We intentionally do NOT filter by User.is_active here
@@ -293,9 +292,10 @@ async def get_posts(
         
         valid_posts.append(post)
 
-    # Batch fetch metadata for all posts (prevents N+1 queries)
+    # Batch fetch metadata for all posts (prevents N+1 queries); is_liked
+    # is left to the per-viewer overlay
     post_ids = [post.id for post in valid_posts]
-    metadata_batch = await batch_get_post_metadata(post_ids, db, current_user)
+    metadata_batch = await batch_get_post_metadata(post_ids, db)
 
     # Build response with pre-fetched metadata
     posts_data = []
@@ -306,15 +306,22 @@ async def get_posts(
             'is_liked': False
         })
         post_response = enrich_post_with_cached_metadata(post, post_metadata)
-        posts_data.append(post_response.model_dump())
+        posts_data.append(post_response.model_dump(mode="json"))
 
     response = format_paginated_response(posts_data, pagination_meta)
     
     # Cache for 60 seconds (balance between freshness and performance)
-    await set_cached(cache_key, response, ttl=60)
+    await set_shared("posts:list", cache_key, response, ttl=60)
     
-    # Return with HTTP caching headers
-    json_response = handle_conditional_request(request, response, CacheStrategy.POSTS)
+    return await _respond_with_likes(request, db, response, current_user)
+
+
+async def _respond_with_likes(request: Request, db: AsyncSession, shared: dict, viewer: Optional[User]):
+    """Apply the viewer's likes to a shared page and return it with HTTP caching headers"""
+    if viewer is not None:
+        liked = await liked_among(db, viewer.id, [post["id"] for post in shared["data"]])
+        shared = {**shared, "data": apply_overlay(shared["data"], is_liked=liked)}
+    json_response = handle_conditional_request(request, shared, CacheStrategy.POSTS)
     apply_performance_headers(json_response)
     return json_response
 
@@ -406,7 +413,7 @@ async def get_user_posts(
             'is_liked': False
         })
         post_response = enrich_post_with_cached_metadata(post, post_metadata)
-        posts_data.append(post_response.model_dump())
+        posts_data.append(post_response.model_dump(mode="json"))
 
     response = format_paginated_response(posts_data, pagination_meta)
     
@@ -512,6 +519,7 @@ async def delete_post(
         )
 
     await db.delete(post)
+    await record_post(db, post.user_id, -1)
     await db.commit()
 
     return {"success": True, "message": "Post deleted successfully"}
@@ -2,7 +2,7 @@ import os
 from typing import List
 
 from app.api.auth import get_current_user
-from app.core.upload import ALLOWED_IMAGE_TYPES, delete_file, upload_image
+from app.core.upload import ALLOWED_IMAGE_TYPES, delete_file, upload_batch, upload_image
 from app.database import get_db
 from app.models import ProfilePicture, User
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
@@ -73,69 +73,73 @@ async def upload_profile_picture(
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
 
+async def _store_profile_picture(file: UploadFile, folder: str) -> str:
+    if file.content_type not in ALLOWED_IMAGE_TYPES:
+        raise HTTPException(status_code=400, detail=f"File {file.filename} is not an image")
+    return await upload_image(file, folder=folder, resize=True)
+
+
 @router.post("/upload-multiple")
 async def upload_multiple_profile_pictures(
     files: List[UploadFile] = File(...),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    """Upload multiple profile pictures at once"""
+    """Upload multiple profile pictures at once
+
+    Files are processed concurrently and reported one by one in ``results``;
+    a file that fails does not stop the others. All pictures are saved in
+    one transaction.
+    """
     if len(files) > 10:
         raise HTTPException(status_code=400, detail="Maximum 10 files allowed at once")
 
-    # Validate all files are images
-    for file in files:
-        if file.content_type not in ALLOWED_IMAGE_TYPES:
-            raise HTTPException(
-                status_code=400, detail=f"File {file.filename} is not an image"
-            )
+    results = await upload_batch(files, folder="profile_pictures", store=_store_profile_picture)
+    uploaded = [result for result in results if result.ok]
+    if not uploaded:
+        raise HTTPException(
+            status_code=results[0].status_code if results else 400,
+            detail=f"No pictures were uploaded: {results[0].error}" if results else "No files provided",
+        )
 
     try:
-        # Check if user has any existing pictures
+        # Set the first uploaded picture as current if there are no existing pictures
         result = await db.execute(
-            select(ProfilePicture).where(ProfilePicture.user_id == current_user.id)
+            select(ProfilePicture.id).where(ProfilePicture.user_id == current_user.id).limit(1)
         )
-        existing_pictures = result.scalars().all()
-        has_existing = len(existing_pictures) > 0
-
-        uploaded_pictures = []
-
-        for idx, file in enumerate(files):
-            # ✅ UPLOAD HARDENING: Get file size from Content-Length header if available
-            # This avoids reading the entire file into memory just to get size
-            file_size = file.size if file.size else 0
-            
-            # Upload image (will validate size early and stream upload)
-            file_url = await upload_image(file, folder="profile_pictures", resize=True)
+        has_existing = result.first() is not None
 
-            # Set first picture as current if no existing pictures
-            is_current = (not has_existing and idx == 0)
-
-            # Create profile picture record
-            profile_picture = ProfilePicture(
+        # ✅ UPLOAD HARDENING: file size comes from the Content-Length header when available
+        uploaded_pictures = [
+            ProfilePicture(
                 user_id=current_user.id,
-                file_url=file_url,
-                filename=os.path.basename(file_url),
-                file_size=file_size,
-                is_current=is_current,
+                file_url=upload.url,
+                filename=os.path.basename(upload.url),
+                file_size=upload.size,
+                is_current=not has_existing and idx == 0,
             )
-            db.add(profile_picture)
-            
-            uploaded_pictures.append(profile_picture)
+            for idx, upload in enumerate(uploaded)
+        ]
+        db.add_all(uploaded_pictures)
 
-            # If this is the first picture, update user's avatar_url
-            if is_current:
-                current_user.avatar_url = file_url
+        # If this is the first picture, update user's avatar_url
+        if not has_existing:
+            current_user.avatar_url = uploaded[0].url
 
         await db.commit()
 
-        # Refresh all uploaded pictures
-        for picture in uploaded_pictures:
-            await db.refresh(picture)
+        # Reload all uploaded pictures (server-side created_at) in one query
+        ids = [picture.id for picture in uploaded_pictures]
+        result = await db.execute(
+            select(ProfilePicture).where(ProfilePicture.id.in_(ids)).order_by(ProfilePicture.id)
+        )
+        uploaded_pictures = result.scalars().all()
 
+        failed = len(results) - len(uploaded)
         return {
             "success": True,
-            "message": f"{len(uploaded_pictures)} profile pictures uploaded successfully",
+            "message": f"{len(uploaded_pictures)} profile pictures uploaded successfully"
+            + (f", {failed} failed" if failed else ""),
             "pictures": [
                 {
                     "id": picture.id,
@@ -146,7 +150,8 @@ async def upload_multiple_profile_pictures(
                     "created_at": picture.created_at.isoformat() if picture.created_at else None,
                 }
                 for picture in uploaded_pictures
-            ]
+            ],
+            "results": [result.as_dict() for result in results],
         }
 
     except Exception as e:
@@ -1,12 +1,19 @@
 from typing import List, Optional
 from uuid import UUID
 
+from app.core.reputation import (
+    get_reputation,
+    get_reputations,
+    record_rating_change,
+    record_review,
+    record_review_deleted,
+)
 from app.core.security import get_current_user
 from app.database import get_db
 from app.models import Job, JobApplication, Review, User
 from app.schemas.review import ReviewCreate, ReviewResponse, ReviewUpdate
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import and_, desc, func, select
+from sqlalchemy import and_, desc, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
@@ -69,6 +76,8 @@ async def create_review(
     # Create review
     db_review = Review(**review.dict(), reviewer_id=current_user.id)
     db.add(db_review)
+    await db.flush()
+    await record_review(db, db_review.reviewee_id, db_review.rating)
     await db.commit()
     await db.refresh(db_review)
 
@@ -193,10 +202,13 @@ async def update_review(
         )
 
     # Update review fields
+    old_rating = review.rating
     update_data = review_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(review, field, value)
 
+    await db.flush()
+    await record_rating_change(db, review.reviewee_id, old_rating, review.rating)
     await db.commit()
     await db.refresh(review)
 
@@ -237,38 +249,30 @@ async def delete_review(
         )
 
     await db.delete(review)
+    await db.flush()
+    await record_review_deleted(db, review.reviewee_id, review.rating)
     await db.commit()
 
     return {"message": "Review deleted successfully"}
 
 
-@router.get("/stats/{user_id}")
-async def get_user_review_stats(user_id: UUID, db: AsyncSession = Depends(get_db)):
-    """Get review statistics for a user"""
-    # Get average rating and count
-    result = await db.execute(
-        select(
-            func.avg(Review.rating).label("average_rating"),
-            func.count(Review.id).label("total_reviews"),
-            func.count(Review.id).filter(Review.rating == 5).label("five_star"),
-            func.count(Review.id).filter(Review.rating == 4).label("four_star"),
-            func.count(Review.id).filter(Review.rating == 3).label("three_star"),
-            func.count(Review.id).filter(Review.rating == 2).label("two_star"),
-            func.count(Review.id).filter(Review.rating == 1).label("one_star"),
-        ).where(Review.reviewee_id == user_id)
-    )
+@router.get("/stats")
+async def get_review_stats_batch(
+    user_ids: List[int] = Query(..., description="Users to look up; repeat the parameter"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Get review statistics for up to 100 users in one call"""
+    if len(user_ids) > 100:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At most 100 users per request",
+        )
+    reputations = await get_reputations(db, user_ids)
+    return {str(user_id): reputation.as_dict() for user_id, reputation in reputations.items()}
 
-    stats = result.first()
-
-    return {
-        "user_id": str(user_id),
-        "average_rating": float(stats.average_rating) if stats.average_rating else None,
-        "total_reviews": stats.total_reviews,
-        "rating_breakdown": {
-            "5": stats.five_star,
-            "4": stats.four_star,
-            "3": stats.three_star,
-            "2": stats.two_star,
-            "1": stats.one_star,
-        },
-    }
+
+@router.get("/stats/{user_id}")
+async def get_user_review_stats(user_id: int, db: AsyncSession = Depends(get_db)):
+    """Get review statistics for a user (precomputed, see app/core/reputation.py)"""
+    reputation = await get_reputation(db, user_id)
+    return {"user_id": str(user_id), **reputation.as_dict()}
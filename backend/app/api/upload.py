@@ -7,8 +7,8 @@ from app.core.upload import (
     delete_file,
     extract_filename_from_url,
     save_file_locally,
+    upload_batch,
     upload_image,
-    upload_multiple_files,
     upload_to_cloudinary,
     upload_to_gcs,
 )
@@ -51,27 +51,36 @@ async def upload_avatar(
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
 
+async def _store_portfolio_image(file: UploadFile, folder: str) -> str:
+    if file.content_type not in ALLOWED_IMAGE_TYPES:
+        raise HTTPException(status_code=400, detail=f"File {file.filename} is not an image")
+    return await upload_image(file, folder=folder)
+
+
 @router.post("/portfolio")
 async def upload_portfolio_images(
     files: List[UploadFile] = File(...),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    """Upload portfolio images"""
+    """Upload portfolio images
+
+    Images are processed concurrently and reported one by one in ``results``;
+    an image that fails does not stop the others.
+    """
     if len(files) > 10:
         raise HTTPException(status_code=400, detail="Maximum 10 files allowed")
 
-    # Validate all files are images
-    for file in files:
-        if file.content_type not in ALLOWED_IMAGE_TYPES:
-            raise HTTPException(
-                status_code=400, detail=f"File {file.filename} is not an image"
-            )
+    results = await upload_batch(files, folder="portfolio", store=_store_portfolio_image)
+    uploaded = [result for result in results if result.ok]
+    if not uploaded:
+        raise HTTPException(
+            status_code=results[0].status_code if results else 400,
+            detail=f"No files were uploaded: {results[0].error}" if results else "No files provided",
+        )
+    uploaded_urls = [result.url for result in uploaded]
 
     try:
-        # Upload files
-        uploaded_urls = await upload_multiple_files(files, folder="portfolio")
-
         # Update user portfolio images
         existing_portfolio = current_user.portfolio_images or []
         new_portfolio = existing_portfolio + uploaded_urls
@@ -81,26 +90,29 @@ async def upload_portfolio_images(
             new_portfolio = new_portfolio[-20:]
 
         current_user.portfolio_images = new_portfolio
-        await db.commit()
 
-        # Save file records
-        for i, url in enumerate(uploaded_urls):
-            file_record = UploadedFile(
-                filename=os.path.basename(url),
-                original_filename=files[i].filename,
-                file_path=url,
-                file_size=files[i].size or 0,
-                content_type=files[i].content_type,
+        # Save file records in the same transaction
+        db.add_all([
+            UploadedFile(
+                filename=os.path.basename(result.url),
+                file_type=result.content_type,
+                file_size=result.size,
+                file_url=result.url,
+                upload_type="portfolio",
                 user_id=current_user.id,
             )
-            db.add(file_record)
+            for result in uploaded
+        ])
 
         await db.commit()
 
+        failed = len(results) - len(uploaded)
         return {
-            "message": f"{len(uploaded_urls)} files uploaded successfully",
+            "message": f"{len(uploaded_urls)} files uploaded successfully"
+            + (f", {failed} failed" if failed else ""),
             "uploaded_files": uploaded_urls,
             "total_portfolio_images": len(new_portfolio),
+            "results": [result.as_dict() for result in results],
         }
 
     except Exception as e:
@@ -3,11 +3,20 @@ import logging
 import re
 
 from app.api.auth import get_current_user
-from app.core.cache import get_cached, set_cached, invalidate_cache
-from app.core.memory_cache import cache_get, cache_set
+from app.core.api_cache import apply_overlay, exclude_viewer, get_shared, set_shared
+from app.core.cache import invalidate_cache
 from app.core.background_tasks import notify_new_follower_task
+from app.core.social_graph import (
+    apply_follow,
+    following_among,
+    get_social_counts,
+    get_user_counts,
+    is_following as is_following_user,
+    record_follow,
+    record_unfollow,
+)
 from app.database import get_db
-from app.models import Follow, Notification, NotificationType, User, Post
+from app.models import Follow, Notification, NotificationType, User
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
 from sqlalchemy import and_, func, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -18,6 +27,7 @@ logger = logging.getLogger(__name__)
 # Constants
 MAX_INT32 = 2147483647  # 2^31 - 1: Maximum value for 32-bit signed integer (PostgreSQL INTEGER type)
 USERNAME_PATTERN = r'^[a-zA-Z0-9_-]+$'  # Valid username format: alphanumeric, underscore, hyphen
+USER_SEARCH_FIELDS = ("first_name", "last_name", "email", "occupation", "location")
 
 
 async def resolve_user_by_identifier(
@@ -114,26 +124,43 @@ async def get_users(
     """Get list of users with optional search (cached for <100ms response)
     
     Performance: Cached for 3 minutes (180s) since user data doesn't change frequently.
-    Cache key includes current user to ensure personalized follow status.
+    The page is cached once for all viewers; the viewer's own row is dropped
+    and is_following applied per request from the social graph service.
     """
-    # Build cache key including current user for personalized results
-    cache_key = f"users:list:{skip}:{limit}:{search}:{current_user.id}"
+    cache_key = f"{skip}:{limit}:{search}"
     
     # Try to get from cache first (sub-100ms cache hit)
-    cached_response = await get_cached(cache_key)
-    if cached_response is not None:
-        return cached_response
-    
-    query = select(User).where(User.is_active == True, User.id != current_user.id)
+    payload = await get_shared("users:list", cache_key)
+    if payload is None:
+        payload = await _users_list_payload(db, skip, limit, search)
+        # Cache for 3 minutes (user data doesn't change frequently)
+        await set_shared("users:list", cache_key, payload, ttl=180)
+
+    users_data = exclude_viewer(payload["users"], current_user.id)
+    following_ids = await following_among(db, current_user.id, [u["id"] for u in users_data])
+    return {
+        **payload,
+        "users": apply_overlay(users_data, is_following=following_ids),
+        "total": payload["total"] - (current_user.is_active and _matches_search(current_user, search)),
+    }
+
+
+def _matches_search(user: User, search: Optional[str]) -> bool:
+    """Python equivalent of the /list search filter, for one user"""
+    if not search:
+        return True
+    needle = search.lower()
+    return any(needle in (getattr(user, field) or "").lower() for field in USER_SEARCH_FIELDS)
+
+
+async def _users_list_payload(db: AsyncSession, skip: int, limit: int, search: Optional[str]) -> dict:
+    """Viewer-independent /list page: profile fields and social counts"""
+    query = select(User).where(User.is_active == True)
 
     if search:
-        search_filter = or_(
-            User.first_name.ilike(f"%{search}%"),
-            User.last_name.ilike(f"%{search}%"),
-            User.email.ilike(f"%{search}%"),
-            User.occupation.ilike(f"%{search}%"),
-            User.location.ilike(f"%{search}%"),
-        )
+        search_filter = or_(*(
+            getattr(User, field).ilike(f"%{search}%") for field in USER_SEARCH_FIELDS
+        ))
         query = query.where(search_filter)
 
     # Get total count
@@ -145,32 +172,11 @@ async def get_users(
     result = await db.execute(query)
     users = result.scalars().all()
 
-    # Get follow status for each user
-    follow_result = await db.execute(
-        select(Follow).where(
-            and_(
-                Follow.follower_id == current_user.id,
-                Follow.followed_id.in_([u.id for u in users]),
-            )
-        )
-    )
-    following_ids = {f.followed_id for f in follow_result.scalars().all()}
+    # Follower/following counts for the whole page at once
+    counts = await get_social_counts(db, [u.id for u in users])
 
-    # Get follower/following counts for each user
     users_data = []
     for user in users:
-        # Count followers
-        followers_result = await db.execute(
-            select(func.count()).select_from(Follow).where(Follow.followed_id == user.id)
-        )
-        followers_count = followers_result.scalar() or 0
-
-        # Count following
-        following_result = await db.execute(
-            select(func.count()).select_from(Follow).where(Follow.follower_id == user.id)
-        )
-        following_count = following_result.scalar() or 0
-
         users_data.append(
             {
                 "id": user.id,
@@ -182,18 +188,12 @@ async def get_users(
                 "bio": user.bio,
                 "occupation": user.occupation,
                 "location": user.location,
-                "is_following": user.id in following_ids,
-                "followers_count": followers_count,
-                "following_count": following_count,
+                "followers_count": counts[user.id].followers,
+                "following_count": counts[user.id].following,
             }
         )
 
-    response = {"success": True, "users": users_data, "total": total}
-    
-    # Cache for 3 minutes (user data doesn't change frequently)
-    await set_cached(cache_key, response, ttl=180)
-    
-    return response
+    return {"success": True, "users": users_data, "total": total}
 
 
 # NOTE: Static routes must be defined BEFORE dynamic routes like /{identifier}
@@ -216,24 +216,7 @@ async def get_following(
         return {"success": True, "following": []}
     
     user_ids = [user.id for user in following_users]
-    
-    # Get followers count for all users in one query
-    followers_count_query = (
-        select(Follow.followed_id, func.count().label('count'))
-        .where(Follow.followed_id.in_(user_ids))
-        .group_by(Follow.followed_id)
-    )
-    followers_result = await db.execute(followers_count_query)
-    followers_counts = {row[0]: row[1] for row in followers_result.all()}
-    
-    # Get following count for all users in one query
-    following_count_query = (
-        select(Follow.follower_id, func.count().label('count'))
-        .where(Follow.follower_id.in_(user_ids))
-        .group_by(Follow.follower_id)
-    )
-    following_result = await db.execute(following_count_query)
-    following_counts = {row[0]: row[1] for row in following_result.all()}
+    counts = await get_social_counts(db, user_ids)
 
     users_data = []
     for user in following_users:
@@ -248,8 +231,8 @@ async def get_following(
             "occupation": user.occupation,
             "location": user.location,
             "is_following": True,  # Current user is following this user by definition
-            "followers_count": followers_counts.get(user.id, 0),
-            "following_count": following_counts.get(user.id, 0),
+            "followers_count": counts[user.id].followers,
+            "following_count": counts[user.id].following,
         })
 
     return {"success": True, "following": users_data}
@@ -271,31 +254,9 @@ async def get_followers(
     if not followers:
         return {"success": True, "followers": []}
 
-    # Get the list of user IDs that current user is following
-    following_ids_result = await db.execute(
-        select(Follow.followed_id).where(Follow.follower_id == current_user.id)
-    )
-    following_ids = {fid for (fid,) in following_ids_result.all()}
-    
     user_ids = [user.id for user in followers]
-    
-    # Get followers count for all users in one query
-    followers_count_query = (
-        select(Follow.followed_id, func.count().label('count'))
-        .where(Follow.followed_id.in_(user_ids))
-        .group_by(Follow.followed_id)
-    )
-    followers_count_result = await db.execute(followers_count_query)
-    followers_counts = {row[0]: row[1] for row in followers_count_result.all()}
-    
-    # Get following count for all users in one query
-    following_count_query = (
-        select(Follow.follower_id, func.count().label('count'))
-        .where(Follow.follower_id.in_(user_ids))
-        .group_by(Follow.follower_id)
-    )
-    following_count_result = await db.execute(following_count_query)
-    following_counts = {row[0]: row[1] for row in following_count_result.all()}
+    following_ids = await following_among(db, current_user.id, user_ids)
+    counts = await get_social_counts(db, user_ids)
 
     users_data = []
     for user in followers:
@@ -310,8 +271,8 @@ async def get_followers(
             "occupation": user.occupation,
             "location": user.location,
             "is_following": user.id in following_ids,  # Check if current user follows this follower
-            "followers_count": followers_counts.get(user.id, 0),
-            "following_count": following_counts.get(user.id, 0),
+            "followers_count": counts[user.id].followers,
+            "following_count": counts[user.id].following,
         })
 
     return {"success": True, "followers": users_data}
@@ -358,12 +319,11 @@ async def get_user(
             detail="Invalid identifier: too long (max 150 characters)"
         )
     
-    # Try to get cached profile data (30s TTL)
-    cache_key = f"profile:{identifier}:{current_user.id}"
-    cached = cache_get(cache_key, ttl=30)
+    # Try to get cached profile data (30s TTL, shared by all viewers)
+    cached = await get_shared("profile", identifier)
     if cached is not None:
         logger.debug(f"Cache hit for profile: {identifier}")
-        return cached
+        return await _with_follow_flag(db, current_user, cached)
     
     # Validate username format if not a digit (alphanumeric, underscore, hyphen only)
     if not identifier.isdigit():
@@ -435,32 +395,8 @@ async def get_user(
     
     logger.info(f"User found: id={user.id}, username={user.username}, requester={current_user.id}")
 
-    # Check if current user follows this user
-    follow_result = await db.execute(
-        select(Follow).where(
-            and_(
-                Follow.follower_id == current_user.id, Follow.followed_id == user.id
-            )
-        )
-    )
-    is_following = follow_result.scalar_one_or_none() is not None
-
-    # Get follower/following counts
-    followers_result = await db.execute(
-        select(func.count()).select_from(Follow).where(Follow.followed_id == user.id)
-    )
-    followers_count = followers_result.scalar() or 0
-
-    following_result = await db.execute(
-        select(func.count()).select_from(Follow).where(Follow.follower_id == user.id)
-    )
-    following_count = following_result.scalar() or 0
-    
-    # Get actual posts count
-    posts_result = await db.execute(
-        select(func.count()).select_from(Post).where(Post.user_id == user.id)
-    )
-    posts_count = posts_result.scalar() or 0
+    # Counters from the social graph stats
+    counts = await get_user_counts(db, user.id)
 
     response = {
         "success": True,
@@ -483,17 +419,22 @@ async def get_user(
             "is_available_for_hire": user.is_available_for_hire or False,
             "created_at": user.created_at.isoformat() if user.created_at else None,
             "updated_at": user.updated_at.isoformat() if user.updated_at else None,
-            "posts_count": posts_count,
-            "is_following": is_following,
-            "followers_count": followers_count,
-            "following_count": following_count,
+            "posts_count": counts.posts,
+            "followers_count": counts.followers,
+            "following_count": counts.following,
         },
     }
     
     # Cache the profile data for 30 seconds
-    cache_set(cache_key, response)
+    await set_shared("profile", identifier, response, ttl=30)
     
-    return response
+    return await _with_follow_flag(db, current_user, response)
+
+
+async def _with_follow_flag(db: AsyncSession, viewer: User, profile: dict) -> dict:
+    """Per-viewer overlay on a shared profile payload"""
+    following = await is_following_user(db, viewer.id, profile["user"]["id"])
+    return {**profile, "user": {**profile["user"], "is_following": following}}
 
 
 @router.post("/follow/{user_id}")
@@ -556,8 +497,10 @@ async def follow_user(
         related_id=current_user.id,
     )
     db.add(notification)
+    await record_follow(db, current_user.id, user_id)
     
     await db.commit()
+    apply_follow(current_user.id, user_id, True)
     
     # Invalidate users cache after follow action
     await invalidate_cache("users:list:")
@@ -595,8 +538,10 @@ async def unfollow_user(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Not following this user"
         )
 
-    db.delete(follow)
+    await db.delete(follow)
+    await record_unfollow(db, current_user.id, user_id)
     await db.commit()
+    apply_follow(current_user.id, user_id, False)
     
     # Invalidate users cache after unfollow action
     await invalidate_cache("users:list:")
@@ -639,31 +584,9 @@ async def get_user_followers(
     if not followers:
         return {"success": True, "followers": []}
 
-    # Get the list of user IDs that current user is following
-    following_ids_result = await db.execute(
-        select(Follow.followed_id).where(Follow.follower_id == current_user.id)
-    )
-    following_ids = {fid for (fid,) in following_ids_result.all()}
-    
     user_ids = [user.id for user in followers]
-    
-    # Get followers count for all users in one query
-    followers_count_query = (
-        select(Follow.followed_id, func.count().label('count'))
-        .where(Follow.followed_id.in_(user_ids))
-        .group_by(Follow.followed_id)
-    )
-    followers_count_result = await db.execute(followers_count_query)
-    followers_counts = {row[0]: row[1] for row in followers_count_result.all()}
-    
-    # Get following count for all users in one query
-    following_count_query = (
-        select(Follow.follower_id, func.count().label('count'))
-        .where(Follow.follower_id.in_(user_ids))
-        .group_by(Follow.follower_id)
-    )
-    following_count_result = await db.execute(following_count_query)
-    following_counts = {row[0]: row[1] for row in following_count_result.all()}
+    following_ids = await following_among(db, current_user.id, user_ids)
+    counts = await get_social_counts(db, user_ids)
 
     users_data = []
     for user in followers:
@@ -678,8 +601,8 @@ async def get_user_followers(
             "occupation": user.occupation,
             "location": user.location,
             "is_following": user.id in following_ids,
-            "followers_count": followers_counts.get(user.id, 0),
-            "following_count": following_counts.get(user.id, 0),
+            "followers_count": counts[user.id].followers,
+            "following_count": counts[user.id].following,
         })
 
     return {"success": True, "followers": users_data}
@@ -720,31 +643,9 @@ async def get_user_following(
     if not following_users:
         return {"success": True, "following": []}
     
-    # Get the list of user IDs that current user is following
-    following_ids_result = await db.execute(
-        select(Follow.followed_id).where(Follow.follower_id == current_user.id)
-    )
-    following_ids = {fid for (fid,) in following_ids_result.all()}
-    
     user_ids = [user.id for user in following_users]
-    
-    # Get followers count for all users in one query
-    followers_count_query = (
-        select(Follow.followed_id, func.count().label('count'))
-        .where(Follow.followed_id.in_(user_ids))
-        .group_by(Follow.followed_id)
-    )
-    followers_result = await db.execute(followers_count_query)
-    followers_counts = {row[0]: row[1] for row in followers_result.all()}
-    
-    # Get following count for all users in one query
-    following_count_query = (
-        select(Follow.follower_id, func.count().label('count'))
-        .where(Follow.follower_id.in_(user_ids))
-        .group_by(Follow.follower_id)
-    )
-    following_result = await db.execute(following_count_query)
-    following_counts = {row[0]: row[1] for row in following_result.all()}
+    following_ids = await following_among(db, current_user.id, user_ids)
+    counts = await get_social_counts(db, user_ids)
 
     users_data = []
     for user in following_users:
@@ -759,8 +660,8 @@ async def get_user_following(
             "occupation": user.occupation,
             "location": user.location,
             "is_following": user.id in following_ids,
-            "followers_count": followers_counts.get(user.id, 0),
-            "following_count": following_counts.get(user.id, 0),
+            "followers_count": counts[user.id].followers,
+            "following_count": counts[user.id].following,
         })
 
     return {"success": True, "following": users_data}
@@ -7,8 +7,7 @@ token refresh, and session verification.
 import logging
 import re
 import time
-from datetime import datetime, timedelta
-from threading import Lock
+from datetime import timedelta
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
@@ -31,6 +30,7 @@ from app.core.security import (
     COOKIE_NAME_REFRESH,
 )
 from app.core.query_timeout import set_fast_query_timeout
+from app.core.shared_state import get_shared_state
 from app.database import get_db
 from app.models import User
 from app.schemas.auth import (
@@ -44,49 +44,37 @@ from app.schemas.auth import (
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# Simple rate limiting using in-memory storage
-login_attempts = {}
-login_attempts_lock = Lock()
+# Login rate limiting in shared state so every worker sees the same counts
 MAX_LOGIN_ATTEMPTS = 5
 LOCKOUT_DURATION = timedelta(minutes=15)
 
 
-def check_rate_limit(identifier: str) -> bool:
-    """Check if the identifier (IP or email) has exceeded rate limit."""
-    with login_attempts_lock:
-        current_time = datetime.utcnow()
-        
-        if identifier in login_attempts:
-            attempts, lockout_until = login_attempts[identifier]
-            
-            if lockout_until and current_time < lockout_until:
-                return False
-            
-            if lockout_until and current_time >= lockout_until:
-                login_attempts[identifier] = (0, None)
-                return True
-            
-            if attempts >= MAX_LOGIN_ATTEMPTS:
-                login_attempts[identifier] = (attempts, current_time + LOCKOUT_DURATION)
-                logger.warning(f"Rate limit exceeded for {identifier}")
-                return False
-        
-        return True
-
-
-def record_login_attempt(identifier: str, success: bool):
+def _login_attempts_key(identifier: str) -> str:
+    return f"login_attempts:{identifier}"
+
+
+async def check_rate_limit(identifier: str) -> bool:
+    """Check if the identifier (IP or email) has exceeded rate limit.
+
+    Failed attempts expire LOCKOUT_DURATION after the most recent one, so an
+    identifier stays locked out until it stops failing for that long.
+    """
+    attempts = await get_shared_state().get_int(_login_attempts_key(identifier))
+    if attempts >= MAX_LOGIN_ATTEMPTS:
+        logger.warning(f"Rate limit exceeded for {identifier}")
+        return False
+    return True
+
+
+async def record_login_attempt(identifier: str, success: bool):
     """Record a login attempt."""
-    with login_attempts_lock:
-        if success:
-            if identifier in login_attempts:
-                del login_attempts[identifier]
-        else:
-            current_time = datetime.utcnow()
-            if identifier in login_attempts:
-                attempts, lockout_until = login_attempts[identifier]
-                login_attempts[identifier] = (attempts + 1, lockout_until)
-            else:
-                login_attempts[identifier] = (1, None)
+    state = get_shared_state()
+    if success:
+        await state.delete(_login_attempts_key(identifier))
+    else:
+        await state.incr(
+            _login_attempts_key(identifier), ttl=int(LOCKOUT_DURATION.total_seconds())
+        )
 
 
 @router.post("/register", response_model=Token)
@@ -159,7 +147,7 @@ async def login(
     request_id = getattr(request.state, 'request_id', 'unknown')
     
     # Check rate limit by IP
-    if not check_rate_limit(client_ip):
+    if not await check_rate_limit(client_ip):
         logger.warning(f"[{request_id}] Rate limit exceeded for IP: {client_ip}")
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
@@ -191,15 +179,15 @@ async def login(
 
     if not user:
         logger.warning(f"[{request_id}] Login failed - User not found: {user_data.email}")
-        record_login_attempt(client_ip, False)
-        record_login_attempt(user_data.email, False)
+        await record_login_attempt(client_ip, False)
+        await record_login_attempt(user_data.email, False)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
         )
     
     # Check rate limit by email
-    if not check_rate_limit(user_data.email):
+    if not await check_rate_limit(user_data.email):
         logger.warning(f"[{request_id}] Rate limit exceeded for email: {user_data.email}")
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
@@ -209,8 +197,8 @@ async def login(
     # Check if user has a password (OAuth users might not)
     if not user.hashed_password:
         logger.warning(f"[{request_id}] OAuth user attempting password login")
-        record_login_attempt(client_ip, False)
-        record_login_attempt(user_data.email, False)
+        await record_login_attempt(client_ip, False)
+        await record_login_attempt(user_data.email, False)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="This account uses social login.",
@@ -223,8 +211,8 @@ async def login(
     
     if not password_valid:
         logger.warning(f"[{request_id}] Login failed - Invalid password")
-        record_login_attempt(client_ip, False)
-        record_login_attempt(user_data.email, False)
+        await record_login_attempt(client_ip, False)
+        await record_login_attempt(user_data.email, False)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -232,8 +220,8 @@ async def login(
 
     if not user.is_active:
         logger.warning(f"[{request_id}] Login failed - Inactive account")
-        record_login_attempt(client_ip, False)
-        record_login_attempt(user_data.email, False)
+        await record_login_attempt(client_ip, False)
+        await record_login_attempt(user_data.email, False)
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, 
             detail="Account is deactivated"
@@ -264,8 +252,8 @@ async def login(
     )
     
     # Reset rate limit counters
-    record_login_attempt(client_ip, True)
-    record_login_attempt(user_data.email, True)
+    await record_login_attempt(client_ip, True)
+    await record_login_attempt(user_data.email, True)
     
     total_login_ms = int((time.time() - login_start_time) * 1000)
     
@@ -10,12 +10,13 @@ Implements intelligent API response caching:
 import hashlib
 import json
 import logging
-from typing import Any, Callable, Optional, Dict
+from typing import Any, Callable, Dict, List, Optional, Set
 from functools import wraps
 
 from fastapi import Request, Response
 from fastapi.responses import JSONResponse
 
+from . import latency
 from .cache import get_cached, set_cached, get_cache_key
 from .cache_headers import (
     CacheStrategy,
@@ -221,3 +222,71 @@ def cache_user_feed(ttl: int = 30):
         use_etag=True,
         vary_on_user=True,
     )
+
+
+# =============================================================================
+# SHARED PAYLOADS WITH PER-VIEWER OVERLAYS
+# =============================================================================
+#
+# List and profile payloads are the same for every viewer except for a few
+# fields (is_following, is_liked) and the viewer's own row. Caching them per
+# viewer stores one copy per user and almost never hits. Instead the
+# viewer-independent payload is cached once per query and the per-viewer
+# fields are applied at response time from small per-viewer lookups (see
+# app/core/social_graph.py):
+#
+#     payload = await get_shared("users:list", key)
+#     if payload is None:
+#         payload = ...  # query without the viewer
+#         await set_shared("users:list", key, payload, ttl=180)
+#     items = exclude_viewer(payload["users"], current_user.id)
+#     following = await following_among(db, current_user.id, [u["id"] for u in items])
+#     items = apply_overlay(items, is_following=following)
+#
+# Keys keep the endpoint's existing prefix so prefix invalidation still works.
+
+
+async def get_shared(namespace: str, key: str) -> Optional[Any]:
+    """Viewer-independent payload cached under ``{namespace}:{key}``, counting hits per namespace"""
+    payload = await get_cached(f"{namespace}:{key}")
+    latency.increment("shared_cache", f"{namespace}.{'hits' if payload is not None else 'misses'}")
+    return payload
+
+
+async def set_shared(namespace: str, key: str, payload: Any, ttl: int = 300) -> None:
+    await set_cached(f"{namespace}:{key}", payload, ttl=ttl)
+
+
+def exclude_viewer(items: List[dict], viewer_id: Optional[int], field: str = "id") -> List[dict]:
+    """Drop the viewer's own row (the page holding it returns one item fewer)"""
+    if viewer_id is None:
+        return list(items)
+    return [item for item in items if item.get(field) != viewer_id]
+
+
+def apply_overlay(items: List[dict], field: str = "id", **flags: Set[Any]) -> List[dict]:
+    """Copy items with per-viewer boolean flags, e.g. ``is_following=followed_ids``
+
+    Cached items are never modified: the in-memory cache hands out the
+    stored objects themselves.
+    """
+    return [
+        {**item, **{name: item.get(field) in ids for name, ids in flags.items()}}
+        for item in items
+    ]
+
+
+def shared_cache_stats(counters: Optional[Dict[str, Dict[str, float]]] = None) -> Dict[str, Dict[str, Any]]:
+    """Hits, misses and hit rate per shared namespace (all workers)"""
+    if counters is None:
+        _histograms, counters = latency.snapshot()
+    stats: Dict[str, Dict[str, Any]] = {}
+    for name, value in counters.get("shared_cache", {}).items():
+        namespace, _, outcome = name.rpartition(".")
+        if outcome not in ("hits", "misses"):
+            continue
+        stats.setdefault(namespace, {"hits": 0, "misses": 0})[outcome] = int(value)
+    for entry in stats.values():
+        lookups = entry["hits"] + entry["misses"]
+        entry["hit_rate"] = round(entry["hits"] / lookups * 100, 2) if lookups else 0.0
+    return stats
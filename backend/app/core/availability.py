@@ -0,0 +1,506 @@
+"""
+Availability-for-Hire Index
+
+In-memory index of active users who are available for hire, so HireMe
+searches like "available electricians within 10 km of Freeport, best
+rated first" are answered from memory instead of ILIKE scans over users.
+
+Locations:
+- ``User.location`` is free text ("Nassau, New Providence"). It is
+  resolved against a built-in gazetteer of Bahamian settlements and
+  islands (``SETTLEMENTS`` / ``ISLANDS``) to an island, a settlement and
+  the settlement's coordinates. Island-only text resolves to the island's
+  principal settlement; unknown text leaves the user without a position
+  (still listed, but never matched by island or distance filters).
+
+Index:
+- One entry per available user: island, settlement, coordinates, grid
+  cell, canonical skills, reputation score and a lower-cased search text.
+- Postings by island, by grid cell (GRID_CELL_DEGREES, ~11 km) and by
+  skill. A radius query visits only the cells overlapping its bounding
+  box and then filters by great-circle distance.
+- Built lazily from the database on first use (one query over the
+  ``idx_users_available_for_hire`` partial index plus the reputation
+  aggregates) and rebuilt after AVAILABILITY_INDEX_REFRESH_SECONDS so
+  writes handled by other workers and new ratings are picked up. Writes
+  handled here are applied at once with ``index_user_availability``.
+
+Usage:
+    from app.core.availability import ensure_availability_index, resolve_location
+
+    index = await ensure_availability_index(db)
+    place = resolve_location("Freeport")
+    total, page = index.search(skills=["electrical"], near=(place.lat, place.lon), radius_km=10)
+    # page: [(user_id, distance_km), ...] best rated first
+
+    await db.commit(); index_user_availability(user)
+"""
+import asyncio
+import logging
+import math
+import os
+import re
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from threading import RLock
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from app.core.skills import parse_skills
+
+logger = logging.getLogger(__name__)
+
+# Rebuild from the database after this many seconds (0 = never)
+AVAILABILITY_INDEX_REFRESH_SECONDS = int(os.getenv("AVAILABILITY_INDEX_REFRESH_SECONDS", "300"))
+
+# Grid cell size in degrees of latitude/longitude (0.1 deg ~ 11 km)
+GRID_CELL_DEGREES = 0.1
+
+EARTH_RADIUS_KM = 6371.0
+
+SORT_OPTIONS = ("rating", "distance", "newest")
+
+# Settlement -> (island, latitude, longitude)
+SETTLEMENTS: Dict[str, Tuple[str, float, float]] = {
+    # New Providence
+    "Nassau": ("New Providence", 25.0480, -77.3554),
+    "Cable Beach": ("New Providence", 25.0720, -77.4110),
+    "Paradise Island": ("New Providence", 25.0850, -77.3200),
+    "Fox Hill": ("New Providence", 25.0470, -77.2940),
+    "Carmichael": ("New Providence", 25.0010, -77.4160),
+    "Coral Harbour": ("New Providence", 24.9830, -77.4670),
+    "Adelaide": ("New Providence", 24.9950, -77.4990),
+    "Lyford Cay": ("New Providence", 25.0300, -77.5260),
+    # Grand Bahama
+    "Freeport": ("Grand Bahama", 26.5333, -78.7000),
+    "Lucaya": ("Grand Bahama", 26.5080, -78.6500),
+    "Eight Mile Rock": ("Grand Bahama", 26.5490, -78.8000),
+    "West End": ("Grand Bahama", 26.6870, -78.9750),
+    "McLean's Town": ("Grand Bahama", 26.6530, -77.9540),
+    # Abaco
+    "Marsh Harbour": ("Abaco", 26.5412, -77.0636),
+    "Treasure Cay": ("Abaco", 26.6700, -77.2830),
+    "Hope Town": ("Abaco", 26.5390, -76.9590),
+    "Green Turtle Cay": ("Abaco", 26.7640, -77.3310),
+    "Coopers Town": ("Abaco", 26.8710, -77.5130),
+    "Sandy Point": ("Abaco", 26.0190, -77.4010),
+    # Eleuthera
+    "Governor's Harbour": ("Eleuthera", 25.1960, -76.2420),
+    "Rock Sound": ("Eleuthera", 24.8640, -76.1590),
+    "Hatchet Bay": ("Eleuthera", 25.3470, -76.4930),
+    "Gregory Town": ("Eleuthera", 25.3910, -76.5600),
+    "Spanish Wells": ("Eleuthera", 25.5430, -76.7500),
+    "Dunmore Town": ("Harbour Island", 25.5000, -76.6340),
+    # Exuma
+    "George Town": ("Exuma", 23.5130, -75.7830),
+    "Staniel Cay": ("Exuma", 24.1720, -76.4390),
+    "Black Point": ("Exuma", 24.1000, -76.4000),
+    # Andros
+    "Andros Town": ("Andros", 24.7000, -77.7700),
+    "Fresh Creek": ("Andros", 24.7000, -77.7700),
+    "Nicholls Town": ("Andros", 25.1450, -78.0050),
+    "Mangrove Cay": ("Andros", 24.2500, -77.6500),
+    "Congo Town": ("Andros", 24.1600, -77.5900),
+    "Kemps Bay": ("Andros", 24.0250, -77.5470),
+    # Bimini
+    "Alice Town": ("Bimini", 25.7250, -79.2980),
+    "Bailey Town": ("Bimini", 25.7330, -79.2950),
+    # Southern and family islands
+    "Clarence Town": ("Long Island", 23.1000, -74.9800),
+    "Deadman's Cay": ("Long Island", 23.1700, -75.1000),
+    "Stella Maris": ("Long Island", 23.5700, -75.2700),
+    "Arthur's Town": ("Cat Island", 24.6200, -75.6700),
+    "New Bight": ("Cat Island", 24.2900, -75.4200),
+    "Cockburn Town": ("San Salvador", 24.0500, -74.5300),
+    "Great Harbour Cay": ("Berry Islands", 25.7500, -77.8600),
+    "Matthew Town": ("Inagua", 20.9490, -73.6710),
+    "Spring Point": ("Acklins", 22.4500, -73.9700),
+    "Colonel Hill": ("Crooked Island", 22.7500, -74.2200),
+    "Abraham's Bay": ("Mayaguana", 22.3700, -73.0000),
+    "Duncan Town": ("Ragged Island", 22.1900, -75.7300),
+    "Port Nelson": ("Rum Cay", 23.6500, -74.8400),
+}
+
+# Island (and common variants) -> principal settlement
+ISLANDS: Dict[str, str] = {
+    "New Providence": "Nassau",
+    "Grand Bahama": "Freeport",
+    "Abaco": "Marsh Harbour",
+    "Great Abaco": "Marsh Harbour",
+    "Abacos": "Marsh Harbour",
+    "Eleuthera": "Governor's Harbour",
+    "Harbour Island": "Dunmore Town",
+    "Exuma": "George Town",
+    "Great Exuma": "George Town",
+    "Exumas": "George Town",
+    "Andros": "Andros Town",
+    "Bimini": "Alice Town",
+    "North Bimini": "Alice Town",
+    "Long Island": "Clarence Town",
+    "Cat Island": "New Bight",
+    "San Salvador": "Cockburn Town",
+    "Berry Islands": "Great Harbour Cay",
+    "Inagua": "Matthew Town",
+    "Great Inagua": "Matthew Town",
+    "Acklins": "Spring Point",
+    "Crooked Island": "Colonel Hill",
+    "Mayaguana": "Abraham's Bay",
+    "Ragged Island": "Duncan Town",
+    "Rum Cay": "Port Nelson",
+}
+
+_STRIP_RE = re.compile(r"[^\w ]+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def _normalize(text: str) -> str:
+    value = _STRIP_RE.sub("", str(text).lower().replace("-", " "))
+    return _SPACE_RE.sub(" ", value).strip()
+
+
+@dataclass(frozen=True)
+class Place:
+    island: str
+    settlement: Optional[str]  # None when only the island was named
+    lat: float
+    lon: float
+
+
+# Known names, longest first so "Harbour Island" wins over "Harbour"
+_SETTLEMENT_NAMES = sorted(((_normalize(name), name) for name in SETTLEMENTS), key=lambda item: -len(item[0]))
+_ISLAND_NAMES = sorted(((_normalize(name), name) for name in ISLANDS), key=lambda item: -len(item[0]))
+
+
+@lru_cache(maxsize=4096)
+def resolve_location(text: Optional[str]) -> Optional[Place]:
+    """Island, settlement and coordinates for free-text location, or None.
+
+    A named settlement wins over an island ("Lucaya, Grand Bahama" ->
+    Lucaya); island-only text gets the island's principal settlement's
+    coordinates.
+    """
+    if not text:
+        return None
+    padded = f" {_normalize(text)} "
+    for key, name in _SETTLEMENT_NAMES:
+        if f" {key} " in padded:
+            island, lat, lon = SETTLEMENTS[name]
+            return Place(island, name, lat, lon)
+    for key, name in _ISLAND_NAMES:
+        if f" {key} " in padded:
+            principal = ISLANDS[name]
+            island, lat, lon = SETTLEMENTS[principal]
+            return Place(island, None, lat, lon)
+    return None
+
+
+def canonical_island(name: Optional[str]) -> Optional[str]:
+    """Island name as stored in the index for a filter value, or None."""
+    if not name:
+        return None
+    key = _normalize(name)
+    for candidate, island in _ISLAND_NAMES:
+        if candidate == key:
+            return SETTLEMENTS[ISLANDS[island]][0]
+    return None
+
+
+def distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle (haversine) distance in kilometres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def grid_cell(lat: float, lon: float) -> Tuple[int, int]:
+    return math.floor(lat / GRID_CELL_DEGREES), math.floor(lon / GRID_CELL_DEGREES)
+
+
+@dataclass
+class AvailableUser:
+    user_id: int
+    place: Optional[Place]
+    skills: FrozenSet[str]
+    score: float
+    created_at: float  # epoch seconds, for newest-first
+    text: str  # lower-cased name, occupation, location and skills
+
+
+def _search_text(user: Any) -> str:
+    return " ".join(
+        str(value) for value in (
+            user.first_name, user.last_name, user.occupation, user.location, user.skills,
+        ) if value
+    ).lower()
+
+
+def _timestamp(value: Any) -> float:
+    return value.timestamp() if value is not None else 0.0
+
+
+def _distance_or_last(distance: Optional[float]) -> float:
+    return float("inf") if distance is None else distance
+
+
+_SORT_KEYS = {
+    "rating": lambda m: (-m[0].score, _distance_or_last(m[1]), -m[0].created_at, -m[0].user_id),
+    "distance": lambda m: (_distance_or_last(m[1]), -m[0].score, -m[0].created_at, -m[0].user_id),
+    "newest": lambda m: (-m[0].created_at, -m[0].user_id),
+}
+
+
+class AvailabilityIndex:
+    """Available users keyed by island, grid cell and skill. Thread-safe."""
+
+    def __init__(self):
+        self._lock = RLock()
+        self.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries: Dict[int, AvailableUser] = {}
+            self._by_island: Dict[str, Set[int]] = {}
+            self._by_cell: Dict[Tuple[int, int], Set[int]] = {}
+            self._by_skill: Dict[str, Set[int]] = {}
+            self.built_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _keys(entry: AvailableUser):
+        if entry.place is not None:
+            yield "island", entry.place.island
+            yield "cell", grid_cell(entry.place.lat, entry.place.lon)
+        for skill in entry.skills:
+            yield "skill", skill
+
+    def _postings(self, kind: str) -> Dict[Any, Set[int]]:
+        return {"island": self._by_island, "cell": self._by_cell, "skill": self._by_skill}[kind]
+
+    def put(self, entry: AvailableUser) -> None:
+        with self._lock:
+            self.remove(entry.user_id)
+            self._entries[entry.user_id] = entry
+            for kind, key in self._keys(entry):
+                self._postings(kind).setdefault(key, set()).add(entry.user_id)
+
+    def remove(self, user_id: int) -> None:
+        with self._lock:
+            entry = self._entries.pop(user_id, None)
+            if entry is None:
+                return
+            for kind, key in self._keys(entry):
+                postings = self._postings(kind)
+                ids = postings.get(key)
+                if ids is not None:
+                    ids.discard(user_id)
+                    if not ids:
+                        del postings[key]
+
+    def score_for(self, user_id: int) -> Optional[float]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            return entry.score if entry is not None else None
+
+    def build(self, entries: Iterable[AvailableUser]) -> None:
+        """Replace the index contents."""
+        with self._lock:
+            self.clear()
+            for entry in entries:
+                self.put(entry)
+            self.built_at = time.time()
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _cells_within(self, lat: float, lon: float, radius_km: float) -> Set[int]:
+        lat_span = radius_km / 111.32
+        lon_span = radius_km / (111.32 * max(math.cos(math.radians(lat)), 0.01))
+        low = grid_cell(lat - lat_span, lon - lon_span)
+        high = grid_cell(lat + lat_span, lon + lon_span)
+        ids: Set[int] = set()
+        if (high[0] - low[0] + 1) * (high[1] - low[1] + 1) > len(self._by_cell):
+            # Wide radius: cheaper to walk the occupied cells
+            for (row, col), cell_ids in self._by_cell.items():
+                if low[0] <= row <= high[0] and low[1] <= col <= high[1]:
+                    ids |= cell_ids
+        else:
+            for row in range(low[0], high[0] + 1):
+                for col in range(low[1], high[1] + 1):
+                    ids |= self._by_cell.get((row, col), set())
+        return ids
+
+    def search(
+        self,
+        skills: Iterable[str] = (),
+        island: Optional[str] = None,
+        near: Optional[Tuple[float, float]] = None,
+        radius_km: Optional[float] = None,
+        text: Optional[str] = None,
+        sort: str = "rating",
+        limit: int = 20,
+        offset: int = 0,
+        exclude: Iterable[int] = (),
+    ) -> Tuple[int, List[Tuple[int, Optional[float]]]]:
+        """Available users matching every filter.
+
+        Args:
+            skills: Canonical skills the user must all have
+            island: Island name as stored (see canonical_island)
+            near: (lat, lon) to measure distance from
+            radius_km: Only users within this distance of ``near``
+            text: Case-insensitive substring of name, occupation, location or skills
+            sort: "rating" (best score, then nearest, then newest),
+                "distance" (nearest, then best score) or "newest"
+            limit / offset: Page of the sorted matches
+            exclude: User ids to leave out (e.g. the viewer)
+
+        Returns:
+            ``(total, [(user_id, distance_km or None), ...])``
+        """
+        if sort not in SORT_OPTIONS:
+            raise ValueError(f"sort must be one of {SORT_OPTIONS}")
+        if radius_km is not None and near is None:
+            raise ValueError("radius_km requires near")
+        needle = text.lower() if text else None
+        excluded = set(exclude)
+
+        with self._lock:
+            # Start from the narrowest postings list
+            candidates: List[Set[int]] = [self._by_skill.get(skill, set()) for skill in skills]
+            if island is not None:
+                candidates.append(self._by_island.get(island, set()))
+            if radius_km is not None:
+                candidates.append(self._cells_within(near[0], near[1], radius_km))
+            if candidates:
+                candidates.sort(key=len)
+                ids = set(candidates[0])
+                for other in candidates[1:]:
+                    ids &= other
+                    if not ids:
+                        break
+            else:
+                ids = set(self._entries)
+
+            matches: List[Tuple[AvailableUser, Optional[float]]] = []
+            for user_id in ids - excluded:
+                entry = self._entries[user_id]
+                if needle and needle not in entry.text:
+                    continue
+                distance = None
+                if near is not None and entry.place is not None:
+                    distance = distance_km(near[0], near[1], entry.place.lat, entry.place.lon)
+                if radius_km is not None and (distance is None or distance > radius_km):
+                    continue
+                matches.append((entry, distance))
+
+        matches.sort(key=_SORT_KEYS[sort])
+        page = [
+            (entry.user_id, None if distance is None else round(distance, 2))
+            for entry, distance in matches[offset:offset + limit]
+        ]
+        return len(matches), page
+
+    def island_counts(self) -> List[Tuple[str, int]]:
+        """Available users per island, most first."""
+        with self._lock:
+            counts = [(island, len(ids)) for island, ids in self._by_island.items()]
+        counts.sort(key=lambda item: (-item[1], item[0]))
+        return counts
+
+
+# Process-wide index
+availability_index = AvailabilityIndex()
+_build_lock = asyncio.Lock()
+
+# Users loaded (and reputations looked up) per query while building
+BUILD_BATCH_SIZE = 500
+
+
+def _entry(user: Any, score: float) -> AvailableUser:
+    return AvailableUser(
+        user_id=user.id,
+        place=resolve_location(user.location),
+        skills=frozenset(parse_skills(user.skills)),
+        score=score,
+        created_at=_timestamp(user.created_at),
+        text=_search_text(user),
+    )
+
+
+def _is_stale(index: AvailabilityIndex) -> bool:
+    if index.built_at is None:
+        return True
+    return (
+        AVAILABILITY_INDEX_REFRESH_SECONDS > 0
+        and time.time() - index.built_at > AVAILABILITY_INDEX_REFRESH_SECONDS
+    )
+
+
+async def ensure_availability_index(db) -> AvailabilityIndex:
+    """Build (or refresh) the process-wide index from the database if needed."""
+    if not _is_stale(availability_index):
+        return availability_index
+
+    async with _build_lock:
+        if not _is_stale(availability_index):
+            return availability_index
+
+        from sqlalchemy import select
+        from app.core.reputation import get_reputations
+        from app.models import User
+
+        started = time.perf_counter()
+        entries: List[AvailableUser] = []
+        last_id = 0
+        while True:
+            result = await db.execute(
+                select(
+                    User.id, User.first_name, User.last_name, User.occupation,
+                    User.location, User.skills, User.created_at,
+                )
+                .where(User.is_active == True, User.is_available_for_hire == True, User.id > last_id)
+                .order_by(User.id)
+                .limit(BUILD_BATCH_SIZE)
+            )
+            rows = result.all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            reputations = await get_reputations(db, [row.id for row in rows])
+            entries.extend(_entry(row, reputations[row.id].score) for row in rows)
+
+        availability_index.build(entries)
+        logger.info(
+            f"Availability index built: {len(availability_index)} users in "
+            f"{(time.perf_counter() - started) * 1000:.1f}ms"
+        )
+    return availability_index
+
+
+def index_user_availability(user: Any, score: Optional[float] = None) -> None:
+    """Apply a user's availability, location and skills to the index.
+
+    Call after committing a toggle, profile edit or deactivation (no-op
+    until first build). Without ``score`` the indexed rating is kept (the
+    prior for users new to the index) until the next rebuild.
+    """
+    if availability_index.built_at is None:
+        return
+    if user.is_active and user.is_available_for_hire:
+        if score is None:
+            score = availability_index.score_for(user.id)
+        if score is None:
+            from app.core.reputation import bayesian_score
+            score = round(bayesian_score(0, 0), 4)
+        availability_index.put(_entry(user, score))
+    else:
+        availability_index.remove(user.id)
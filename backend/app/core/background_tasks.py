@@ -134,7 +134,9 @@ async def send_push_notification_task(
     """
     Background task for sending push notifications to mobile devices.
     
-    This runs asynchronously and does not block the API response.
+    The notification is buffered by the push dispatcher (app/core/push.py),
+    coalesced with anything else the user receives within a short window and
+    multicast to all of the user's registered devices.
     
     Args:
         user_id: User ID to send notification to
@@ -144,16 +146,10 @@ async def send_push_notification_task(
         data: Additional data payload for the notification
     """
     try:
-        logger.info(f"[Background] Sending push notification to user {user_id}: {title}")
-        
-        # TODO: Implement actual push notification logic
-        # Example integrations:
-        # - Firebase Cloud Messaging (FCM): await fcm.send(...)
-        # - Apple Push Notification Service (APNS): await apns.send(...)
-        # - OneSignal: await onesignal.create_notification(...)
-        
-        # For now, just log the action
-        logger.info(f"[Background] Push notification queued: {notification_type}")
+        from app.core.push import push_dispatcher
+
+        if push_dispatcher.submit(user_id, title, body, notification_type, data):
+            logger.debug(f"[Background] Push notification queued for user {user_id}: {notification_type}")
         
     except Exception as e:
         logger.error(f"[Background] Failed to send push notification: {e}", exc_info=True)
@@ -333,25 +329,56 @@ async def cleanup_old_notifications_task(
     """
     Background task to clean up old notifications.
     
+    Retention is enforced by ``app.core.partitioning.apply_retention``:
+    on partitioned tables expired monthly partitions are dropped, otherwise
+    the same rows are removed in batched DELETEs. Every notification past
+    the window goes, read or unread. The window is
+    NOTIFICATIONS_RETENTION_MONTHS (whole months, default 0 = keep
+    everything), which replaces ``days_to_keep``; the argument is kept for
+    existing callers.
+    
     Args:
         db: Database session
-        days_to_keep: Number of days to keep notifications (default: 90)
+        days_to_keep: Ignored - see NOTIFICATIONS_RETENTION_MONTHS
     """
     try:
-        logger.info(f"[Background] Starting notification cleanup (keeping {days_to_keep} days)")
+        from app.core.partitioning import apply_retention
         
-        # TODO: Implement notification cleanup logic
-        # Example:
-        # 1. Find read notifications older than days_to_keep
-        # 2. Delete old notifications in batches
-        # 3. Log cleanup statistics
-        
-        logger.info("[Background] Notification cleanup completed")
+        logger.info("[Background] Starting retention cleanup")
+        conn = await db.connection()
+        report = await apply_retention(conn)
+        await db.commit()
+        logger.info(f"[Background] Retention cleanup completed: {report}")
         
     except Exception as e:
         logger.error(f"[Background] Failed to cleanup old notifications: {e}", exc_info=True)
 
 
+async def maintain_partitions_task(db: AsyncSession):
+    """Background task creating upcoming monthly partitions (run daily)."""
+    try:
+        from app.core.partitioning import ensure_partitions
+        
+        conn = await db.connection()
+        await ensure_partitions(conn)
+        await db.commit()
+        
+    except Exception as e:
+        logger.error(f"[Background] Failed to maintain partitions: {e}", exc_info=True)
+
+
+async def cleanup_unreferenced_media_task(db: AsyncSession):
+    """Background task removing uploaded files no record points at (run daily)."""
+    try:
+        from app.core.media import collect_unreferenced_media
+        
+        removed = await collect_unreferenced_media(db)
+        logger.info(f"[Background] Removed {removed} unreferenced media files")
+        
+    except Exception as e:
+        logger.error(f"[Background] Failed to clean up media files: {e}", exc_info=True)
+
+
 # =============================================================================
 # UTILITY FUNCTIONS
 # =============================================================================
@@ -14,6 +14,8 @@ import asyncio
 from typing import Any, Callable, Optional
 from functools import wraps
 
+from app.core.latency import timed
+
 logger = logging.getLogger(__name__)
 
 # Redis client (lazy-initialized)
@@ -106,7 +108,8 @@ async def get_cached(key: str) -> Optional[Any]:
         try:
             redis = await get_redis()
             if redis:
-                value = await redis.get(key)
+                with timed("cache", "redis_get"):
+                    value = await redis.get(key)
                 if value:
                     # Track cache hit
                     try:
@@ -182,7 +185,11 @@ async def set_cached(key: str, value: Any, ttl: int = 300) -> None:
 
 
 async def invalidate_cache(prefix: str) -> None:
-    """Invalidate all cache entries matching a prefix."""
+    """Invalidate all cache entries matching a prefix.
+
+    A trailing ``*`` (Redis glob style, e.g. ``posts:*``) is accepted.
+    """
+    prefix = prefix.rstrip("*")
     # Invalidate in Redis if available
     if _redis_available:
         try:
@@ -17,6 +17,7 @@ Usage example:
     posts, followers, following = results
 """
 import asyncio
+import os
 import time
 import logging
 from typing import Any, Callable, Coroutine, List, TypeVar, Optional
@@ -27,9 +28,9 @@ logger = logging.getLogger(__name__)
 
 T = TypeVar('T')
 
-# Thread pool for CPU-bound operations
+# Thread pool for CPU-bound operations (image resizing shares it too)
 _thread_pool: Optional[ThreadPoolExecutor] = None
-_thread_pool_size = 4
+_thread_pool_size = int(os.getenv("CPU_POOL_SIZE", "4"))
 
 
 def get_thread_pool() -> ThreadPoolExecutor:
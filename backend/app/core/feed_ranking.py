@@ -0,0 +1,326 @@
+"""
+Ranked Feed Scoring Engine
+
+Time-decayed engagement scores for posts, updated incrementally on each
+interaction instead of being recomputed on every feed request.
+
+Scoring model:
+    score(post, now) = sum(weight(event) * 2 ** ((event.at - now) / half_life))
+
+Every event (post created, like, comment, boost) contributes its weight,
+halving every ``half_life_hours``. Because all posts decay by the same
+factor, ranking order only depends on each event's contribution measured
+against a fixed epoch, so an event is added once and never revisited:
+
+    stored(post) = log2(sum(weight(event) * 2 ** ((event.at - EPOCH) / half_life)))
+
+Scores are kept in log2 space so they never overflow, and added with a
+log-sum-exp. The current score is recovered by subtracting
+``(now - EPOCH) / half_life``.
+
+Top-K reads use a max-heap with lazy deletion: every update pushes a new
+entry and stale entries are discarded when they reach the top, so updates
+and reads are O(log n).
+
+The store is per process. It is built lazily from the last
+RANKING_WINDOW_HOURS of posts, likes, comments and boosts, and rebuilt every
+RANKING_REFRESH_SECONDS so other workers' events are picked up.
+
+Usage:
+    from app.core.feed_ranking import ensure_ranked_feed, record_feed_event
+
+    store = await ensure_ranked_feed(db)
+    top = store.top(20)                   # [(post_id, score), ...]
+
+    record_feed_event("like", post_id)    # after a like is committed
+"""
+import asyncio
+import heapq
+import logging
+import math
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from threading import RLock
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Only posts created within this window are ranked
+RANKING_WINDOW_HOURS = int(os.getenv("RANKING_WINDOW_HOURS", "72"))
+
+# Rebuild from the database after this many seconds (0 = never)
+RANKING_REFRESH_SECONDS = int(os.getenv("RANKING_REFRESH_SECONDS", "600"))
+
+# Fixed reference time for log-space scores
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+EVENT_KINDS = ("post", "like", "unlike", "comment", "uncomment", "boost")
+
+
+@dataclass
+class RankingWeights:
+    """Tunable ranking weights (see benchmarks/feed_ranking_replay.py).
+
+    Attributes:
+        post: Base weight every post starts with, so new posts can surface
+        like: Weight per like (an unlike removes it again)
+        comment: Weight per comment
+        job_post: Extra weight for posts announcing a job
+        boosts: Weight per boost type from monetization boosted posts
+        half_life_hours: Hours for any contribution to lose half its weight
+    """
+    post: float = 1.0
+    like: float = 1.0
+    comment: float = 3.0
+    job_post: float = 4.0
+    boosts: Dict[str, float] = field(default_factory=lambda: {
+        "local": 10.0,
+        "national": 25.0,
+        "featured": 50.0,
+    })
+    half_life_hours: float = 12.0
+
+    def weight_for(self, event: "FeedEvent") -> float:
+        if event.kind == "post":
+            return self.post + (self.job_post if event.post_type == "job" else 0.0)
+        if event.kind in ("like", "unlike"):
+            return self.like
+        if event.kind in ("comment", "uncomment"):
+            return self.comment
+        if event.kind == "boost":
+            return self.boosts.get(event.boost_type or "", self.boosts.get("local", 0.0))
+        return 0.0
+
+
+@dataclass
+class FeedEvent:
+    """A single interaction affecting a post's score."""
+    kind: str
+    post_id: int
+    at: datetime
+    post_type: Optional[str] = None
+    boost_type: Optional[str] = None
+
+
+def _utc(value: Optional[datetime]) -> datetime:
+    if value is None:
+        return datetime.now(timezone.utc)
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _log2_add(a: float, b: float) -> float:
+    """log2(2**a + 2**b) without overflow."""
+    if a == -math.inf:
+        return b
+    high, low = (a, b) if a >= b else (b, a)
+    return high + math.log2(1.0 + 2.0 ** (low - high))
+
+
+def _log2_sub(a: float, b: float) -> float:
+    """log2(2**a - 2**b), or -inf when the result is not positive."""
+    if b >= a:
+        return -math.inf
+    return a + math.log2(1.0 - 2.0 ** (b - a))
+
+
+class RankedFeedStore:
+    """Incrementally updated post scores with O(log n) top-K reads."""
+
+    def __init__(self, weights: Optional[RankingWeights] = None):
+        self.weights = weights or RankingWeights()
+        self._lock = RLock()
+        self.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._scores: Dict[int, float] = {}
+            self._created: Dict[int, datetime] = {}
+            self._heap: List[Tuple[float, int]] = []
+            self._latest: Optional[datetime] = None
+            self.built_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def __contains__(self, post_id: int) -> bool:
+        return post_id in self._scores
+
+    def _exponent(self, at: datetime) -> float:
+        return (_utc(at) - EPOCH).total_seconds() / (self.weights.half_life_hours * 3600.0)
+
+    def apply(self, event: FeedEvent) -> None:
+        """Fold one event into the post's score."""
+        weight = self.weights.weight_for(event)
+        if event.kind == "post":
+            # Every post must be tracked, even with a zero base weight
+            weight = max(weight, 1e-6)
+        elif weight <= 0:
+            return
+        term = math.log2(weight) + self._exponent(event.at)
+
+        with self._lock:
+            at = _utc(event.at)
+            if self._latest is None or at > self._latest:
+                self._latest = at
+            if event.kind == "post":
+                self._created.setdefault(event.post_id, _utc(event.at))
+            elif event.post_id not in self._scores:
+                # Engagement on posts outside the ranking window is ignored
+                return
+
+            current = self._scores.get(event.post_id, -math.inf)
+            if event.kind in ("unlike", "uncomment"):
+                updated = _log2_sub(current, term)
+            else:
+                updated = _log2_add(current, term)
+
+            if updated == -math.inf:
+                # Rounding after removals: fall back to the post's base score
+                base = max(self.weights.post, 1e-6)
+                updated = math.log2(base) + self._exponent(self._created[event.post_id])
+            self._scores[event.post_id] = updated
+            heapq.heappush(self._heap, (-updated, event.post_id))
+
+            if len(self._heap) > 2 * len(self._scores) + 64:
+                self._compact()
+
+    def remove(self, post_id: int) -> None:
+        with self._lock:
+            self._scores.pop(post_id, None)
+            self._created.pop(post_id, None)
+
+    def _compact(self) -> None:
+        """Drop stale heap entries and posts that fell out of the window.
+
+        The window is measured from the newest event seen, so replaying
+        historical events behaves the same as live traffic.
+        """
+        cutoff = (self._latest or datetime.now(timezone.utc)) - timedelta(hours=RANKING_WINDOW_HOURS)
+        for post_id in [pid for pid, created in self._created.items() if created < cutoff]:
+            self._scores.pop(post_id, None)
+            self._created.pop(post_id, None)
+        self._heap = [(-score, post_id) for post_id, score in self._scores.items()]
+        heapq.heapify(self._heap)
+
+    def top(self, k: int = 20, offset: int = 0, now: Optional[datetime] = None) -> List[Tuple[int, float]]:
+        """Return ``(post_id, current_score)`` pairs, best first."""
+        decay = self._exponent(now or datetime.now(timezone.utc))
+        wanted = offset + k
+        with self._lock:
+            valid: List[Tuple[float, int]] = []
+            seen = set()
+            while self._heap and len(valid) < wanted:
+                neg_score, post_id = heapq.heappop(self._heap)
+                if post_id in seen or self._scores.get(post_id) != -neg_score:
+                    continue  # stale entry
+                seen.add(post_id)
+                valid.append((neg_score, post_id))
+            for entry in valid:
+                heapq.heappush(self._heap, entry)
+
+        return [
+            (post_id, 2.0 ** (-neg_score - decay))
+            for neg_score, post_id in valid[offset:wanted]
+        ]
+
+    def score(self, post_id: int, now: Optional[datetime] = None) -> float:
+        stored = self._scores.get(post_id)
+        if stored is None:
+            return 0.0
+        return 2.0 ** (stored - self._exponent(now or datetime.now(timezone.utc)))
+
+    def build(self, events: Iterable[FeedEvent]) -> None:
+        """Replace the store contents by replaying events in time order."""
+        with self._lock:
+            self.clear()
+            for event in sorted(events, key=lambda e: (_utc(e.at), e.kind != "post")):
+                self.apply(event)
+            self._compact()
+            self.built_at = time.time()
+
+
+async def load_feed_events(db, since: datetime, until: Optional[datetime] = None) -> List[FeedEvent]:
+    """Load scoring events for posts created in ``[since, until)`` from the database."""
+    from sqlalchemy import select
+    from app.models import BoostedPost, Post, PostComment, PostLike
+
+    post_filter = [Post.created_at >= since]
+    if until is not None:
+        post_filter.append(Post.created_at < until)
+    post_ids_query = select(Post.id).where(*post_filter)
+
+    events: List[FeedEvent] = []
+    for row in await db.execute(select(Post.id, Post.post_type, Post.created_at).where(*post_filter)):
+        events.append(FeedEvent("post", row.id, _utc(row.created_at), post_type=row.post_type))
+    for row in await db.execute(
+        select(PostLike.post_id, PostLike.created_at).where(PostLike.post_id.in_(post_ids_query))
+    ):
+        events.append(FeedEvent("like", row.post_id, _utc(row.created_at)))
+    for row in await db.execute(
+        select(PostComment.post_id, PostComment.created_at).where(PostComment.post_id.in_(post_ids_query))
+    ):
+        events.append(FeedEvent("comment", row.post_id, _utc(row.created_at)))
+    for row in await db.execute(
+        select(BoostedPost.post_id, BoostedPost.boost_type, BoostedPost.starts_at)
+        .where(BoostedPost.post_id.in_(post_ids_query), BoostedPost.is_active.is_(True))
+    ):
+        events.append(FeedEvent("boost", row.post_id, _utc(row.starts_at), boost_type=row.boost_type))
+
+    if until is not None:
+        events = [event for event in events if event.at < _utc(until)]
+    return events
+
+
+# Process-wide store
+ranked_feed = RankedFeedStore()
+_build_lock = asyncio.Lock()
+
+
+def _is_stale(store: RankedFeedStore) -> bool:
+    if store.built_at is None:
+        return True
+    return RANKING_REFRESH_SECONDS > 0 and time.time() - store.built_at > RANKING_REFRESH_SECONDS
+
+
+async def ensure_ranked_feed(db) -> RankedFeedStore:
+    """Build (or refresh) the process-wide store from the database if needed."""
+    if not _is_stale(ranked_feed):
+        return ranked_feed
+
+    async with _build_lock:
+        if not _is_stale(ranked_feed):
+            return ranked_feed
+        started = time.perf_counter()
+        since = datetime.now(timezone.utc) - timedelta(hours=RANKING_WINDOW_HOURS)
+        events = await load_feed_events(db, since)
+        ranked_feed.build(events)
+        logger.info(
+            f"Ranked feed built: {len(ranked_feed)} posts from {len(events)} events in "
+            f"{(time.perf_counter() - started) * 1000:.1f}ms"
+        )
+    return ranked_feed
+
+
+def record_feed_event(
+    kind: str,
+    post_id: int,
+    at: Optional[datetime] = None,
+    post_type: Optional[str] = None,
+    boost_type: Optional[str] = None,
+) -> None:
+    """Apply an interaction to the ranked feed (no-op until first build).
+
+    For removals (``unlike``, ``uncomment``) pass ``at`` as the time of the
+    original like/comment so exactly its contribution is taken back out.
+    Never raises - ranking must not break the write path.
+    """
+    if ranked_feed.built_at is None:
+        return
+    try:
+        ranked_feed.apply(FeedEvent(kind, post_id, _utc(at), post_type=post_type, boost_type=boost_type))
+    except Exception as e:
+        logger.warning(f"Failed to record feed event {kind} for post {post_id}: {e}")
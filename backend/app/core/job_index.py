@@ -0,0 +1,384 @@
+"""
+In-Memory Faceted Job Index
+
+Bitmap index over the jobs table so any combination of structured filters
+(category, location, job type, remote, budget range, status) is answered with
+a handful of integer AND/OR operations instead of a database round trip, and
+without caching every filter permutation as its own key.
+
+How it works:
+- Every job gets a slot number. Slots are assigned in created_at order at
+  build time and new jobs are appended, so higher slots are newer jobs.
+- Each facet value owns a bitmap (a Python int) with one bit per slot.
+  Filters AND across facets and OR within a facet.
+- Facet counts are popcounts of bitmap intersections. Counts over active
+  jobs are also kept in counters that are updated incrementally as jobs are
+  created, updated, closed or deleted.
+- Budget range filters use a sorted (budget, slot) list and bisect.
+
+The index is per process. Each worker builds it lazily on first use and
+rebuilds it after JOB_INDEX_REFRESH_SECONDS so writes handled by other
+workers are picked up.
+
+Usage:
+    from app.core.job_index import ensure_job_index, index_job, unindex_job
+
+    index = await ensure_job_index(db)
+    result = index.search({"category": ["plumbing"], "is_remote": False}, limit=20)
+    # result["ids"], result["total"], result["facets"]
+    ids = index.matching_ids({"location": "nassau"})  # every match, no counts
+
+    index_job(job)          # after create/update/toggle
+    unindex_job(job_id)     # after delete
+"""
+import asyncio
+import logging
+import os
+import time
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from threading import RLock
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Rebuild from the database after this many seconds (0 = never)
+JOB_INDEX_REFRESH_SECONDS = int(os.getenv("JOB_INDEX_REFRESH_SECONDS", "300"))
+
+# Budget buckets: (label, lower bound inclusive, upper bound exclusive)
+BUDGET_BUCKETS: List[Tuple[str, float, Optional[float]]] = [
+    ("under_100", 0, 100),
+    ("100_500", 100, 500),
+    ("500_1000", 500, 1000),
+    ("1000_5000", 1000, 5000),
+    ("5000_plus", 5000, None),
+]
+
+# Facets with free-text values, matched by substring over distinct values
+TEXT_FACETS = ("category", "location")
+FACETS = ("category", "location", "job_type", "is_remote", "budget", "status")
+
+
+def _normalize(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip().lower()
+    return value or None
+
+
+def budget_bucket(budget: Optional[float]) -> Optional[str]:
+    """Return the bucket label for a budget, or None if there is no budget."""
+    if budget is None:
+        return None
+    for label, low, high in BUDGET_BUCKETS:
+        if budget >= low and (high is None or budget < high):
+            return label
+    return None
+
+
+def _iter_bits_desc(bitmap: int) -> Iterator[int]:
+    """Yield set bit positions from highest (newest slot) to lowest."""
+    while bitmap:
+        top = bitmap.bit_length() - 1
+        yield top
+        bitmap ^= 1 << top
+
+
+def _get(job: Any, field: str) -> Any:
+    if isinstance(job, dict):
+        return job.get(field)
+    return getattr(job, field, None)
+
+
+class JobFacetIndex:
+    """Bitmap index over job facets. Thread-safe."""
+
+    def __init__(self):
+        self._lock = RLock()
+        self.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._slot_by_id: Dict[int, int] = {}
+            self._id_by_slot: List[Optional[int]] = []
+            self._values_by_slot: List[Optional[Dict[str, Any]]] = []
+            self._bitmaps: Dict[str, Dict[Any, int]] = {facet: {} for facet in FACETS}
+            self._budgets: List[Tuple[float, int]] = []
+            self._all = 0
+            self._active_counts: Dict[str, Counter] = {facet: Counter() for facet in FACETS}
+            self.built_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._slot_by_id)
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _facet_values(job: Any) -> Dict[str, Any]:
+        budget = _get(job, "budget")
+        return {
+            "category": _normalize(_get(job, "category")),
+            "location": _normalize(_get(job, "location")),
+            "job_type": _normalize(_get(job, "job_type")),
+            "is_remote": bool(_get(job, "is_remote")),
+            "budget": budget_bucket(budget),
+            "status": _normalize(_get(job, "status")) or "active",
+            "_budget": float(budget) if budget is not None else None,
+        }
+
+    def _set_bits(self, slot: int, values: Dict[str, Any], add: bool) -> None:
+        bit = 1 << slot
+        active = values["status"] == "active"
+        for facet in FACETS:
+            value = values[facet]
+            if value is None:
+                continue
+            bitmaps = self._bitmaps[facet]
+            if add:
+                bitmaps[value] = bitmaps.get(value, 0) | bit
+            else:
+                remaining = bitmaps.get(value, 0) & ~bit
+                if remaining:
+                    bitmaps[value] = remaining
+                else:
+                    bitmaps.pop(value, None)
+            if active:
+                counts = self._active_counts[facet]
+                counts[value] += 1 if add else -1
+                if counts[value] <= 0:
+                    del counts[value]
+
+        if values["_budget"] is not None:
+            entry = (values["_budget"], slot)
+            if add:
+                insort(self._budgets, entry)
+            else:
+                pos = bisect_left(self._budgets, entry)
+                if pos < len(self._budgets) and self._budgets[pos] == entry:
+                    self._budgets.pop(pos)
+
+        if add:
+            self._all |= bit
+        else:
+            self._all &= ~bit
+
+    def upsert(self, job: Any) -> None:
+        """Add a job or apply changes to an indexed job."""
+        job_id = _get(job, "id")
+        if job_id is None:
+            return
+        values = self._facet_values(job)
+        with self._lock:
+            slot = self._slot_by_id.get(job_id)
+            if slot is None:
+                slot = len(self._id_by_slot)
+                self._slot_by_id[job_id] = slot
+                self._id_by_slot.append(job_id)
+                self._values_by_slot.append(None)
+            old = self._values_by_slot[slot]
+            if old == values:
+                return
+            if old is not None:
+                self._set_bits(slot, old, add=False)
+            self._set_bits(slot, values, add=True)
+            self._values_by_slot[slot] = values
+
+    def remove(self, job_id: int) -> bool:
+        """Remove a job. Its slot is left empty rather than renumbered."""
+        with self._lock:
+            slot = self._slot_by_id.pop(job_id, None)
+            if slot is None:
+                return False
+            old = self._values_by_slot[slot]
+            if old is not None:
+                self._set_bits(slot, old, add=False)
+            self._values_by_slot[slot] = None
+            self._id_by_slot[slot] = None
+            return True
+
+    def build(self, jobs: Iterable[Any]) -> None:
+        """Replace the index contents. Slots follow (created_at, id) order."""
+        ordered = sorted(
+            jobs,
+            key=lambda job: (_get(job, "created_at") is not None, _get(job, "created_at") or 0, _get(job, "id")),
+        )
+        with self._lock:
+            self.clear()
+            for job in ordered:
+                self.upsert(job)
+            self.built_at = time.time()
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _facet_bitmap(self, facet: str, wanted: Iterable[Any]) -> int:
+        bitmaps = self._bitmaps[facet]
+        bitmap = 0
+        for value in wanted:
+            if facet in TEXT_FACETS:
+                needle = _normalize(value)
+                if needle is None:
+                    continue
+                for candidate, bits in bitmaps.items():
+                    if needle in candidate:
+                        bitmap |= bits
+            else:
+                bitmap |= bitmaps.get(_normalize(value) if isinstance(value, str) else value, 0)
+        return bitmap
+
+    def _budget_bitmap(self, budget_min: Optional[float], budget_max: Optional[float]) -> int:
+        low = bisect_left(self._budgets, (budget_min, -1)) if budget_min is not None else 0
+        high = bisect_right(self._budgets, (budget_max, float("inf"))) if budget_max is not None else len(self._budgets)
+        bitmap = 0
+        for _, slot in self._budgets[low:high]:
+            bitmap |= 1 << slot
+        return bitmap
+
+    def _filter_bitmaps(self, filters: Dict[str, Any]) -> Dict[str, int]:
+        """Compute one bitmap per constrained facet."""
+        constrained: Dict[str, int] = {}
+        for facet in FACETS:
+            wanted = filters.get(facet)
+            if wanted is None or wanted == []:
+                continue
+            if not isinstance(wanted, (list, tuple, set)):
+                wanted = [wanted]
+            constrained[facet] = self._facet_bitmap(facet, wanted)
+        if filters.get("budget_min") is not None or filters.get("budget_max") is not None:
+            constrained["budget_range"] = self._budget_bitmap(filters.get("budget_min"), filters.get("budget_max"))
+        return constrained
+
+    def search(self, filters: Dict[str, Any], limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+        """Find matching job ids, newest first, with facet counts.
+
+        Args:
+            filters: Facet name -> value or list of values (OR within a
+                facet), plus optional ``budget_min``/``budget_max``
+            limit: Page size
+            offset: Number of matches to skip
+
+        Returns:
+            ``{"ids": [...], "total": int, "facets": {facet: {value: count}}}``.
+            Facet counts for a facet ignore that facet's own filter, so the
+            client can show how many results each alternative would give.
+        """
+        with self._lock:
+            constrained = self._filter_bitmaps(filters)
+            matches = self._all
+            for bitmap in constrained.values():
+                matches &= bitmap
+
+            ids = []
+            for position, slot in enumerate(_iter_bits_desc(matches)):
+                if position >= offset + limit:
+                    break
+                if position >= offset:
+                    ids.append(self._id_by_slot[slot])
+
+            return {
+                "ids": ids,
+                "total": matches.bit_count(),
+                "facets": self._facet_counts(constrained),
+            }
+
+    def matching_ids(self, filters: Dict[str, Any]) -> List[int]:
+        """All job ids matching ``filters``, newest first, without facet counts."""
+        with self._lock:
+            matches = self._all
+            for bitmap in self._filter_bitmaps(filters).values():
+                matches &= bitmap
+            return [self._id_by_slot[slot] for slot in _iter_bits_desc(matches)]
+
+    def _facet_counts(self, constrained: Dict[str, int]) -> Dict[str, Dict[str, int]]:
+        only_active_status = set(constrained) <= {"status"} and self._status_is_active(constrained)
+        if only_active_status:
+            # Unfiltered listing of active jobs: served from incremental counters
+            return {
+                facet: {str(value).lower(): count for value, count in self._active_counts[facet].most_common()}
+                for facet in FACETS
+                if facet != "status"
+            }
+
+        facets: Dict[str, Dict[str, int]] = {}
+        for facet in FACETS:
+            base = self._all
+            for other, bitmap in constrained.items():
+                if other != facet:
+                    base &= bitmap
+            counts = {}
+            for value, bitmap in self._bitmaps[facet].items():
+                count = (bitmap & base).bit_count()
+                if count:
+                    counts[str(value).lower()] = count
+            facets[facet] = dict(sorted(counts.items(), key=lambda item: -item[1]))
+        return facets
+
+    def _status_is_active(self, constrained: Dict[str, int]) -> bool:
+        if "status" not in constrained:
+            return False
+        return constrained["status"] == self._bitmaps["status"].get("active", 0)
+
+    def active_counts(self) -> Dict[str, Dict[str, int]]:
+        """Incrementally maintained facet counts over active jobs."""
+        with self._lock:
+            return {facet: dict(counts) for facet, counts in self._active_counts.items()}
+
+
+# Process-wide index
+job_index = JobFacetIndex()
+_build_lock = asyncio.Lock()
+
+
+def _is_stale(index: JobFacetIndex) -> bool:
+    if index.built_at is None:
+        return True
+    return JOB_INDEX_REFRESH_SECONDS > 0 and time.time() - index.built_at > JOB_INDEX_REFRESH_SECONDS
+
+
+async def ensure_job_index(db) -> JobFacetIndex:
+    """Build (or refresh) the process-wide index from the database if needed."""
+    if not _is_stale(job_index):
+        return job_index
+
+    async with _build_lock:
+        if not _is_stale(job_index):
+            return job_index
+
+        from sqlalchemy import select
+        from app.models import Job
+
+        started = time.perf_counter()
+        result = await db.execute(
+            select(
+                Job.id,
+                Job.category,
+                Job.location,
+                Job.job_type,
+                Job.is_remote,
+                Job.budget,
+                Job.status,
+                Job.created_at,
+            )
+        )
+        rows = [dict(row._mapping) for row in result]
+        job_index.build(rows)
+        logger.info(
+            f"Job facet index built: {len(rows)} jobs in "
+            f"{(time.perf_counter() - started) * 1000:.1f}ms"
+        )
+    return job_index
+
+
+def index_job(job: Any) -> None:
+    """Apply a created/updated job to the index (no-op until first build)."""
+    if job_index.built_at is not None:
+        job_index.upsert(job)
+
+
+def unindex_job(job_id: int) -> None:
+    """Remove a deleted job from the index."""
+    if job_index.built_at is not None:
+        job_index.remove(job_id)
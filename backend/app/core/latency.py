@@ -0,0 +1,379 @@
+"""
+Latency Histograms and Event Counters (multi-worker safe)
+
+Fixed-bucket, HDR-style latency histograms for every timed operation, plus
+plain event counters, behind one small API:
+
+    observe(kind, name, duration_ms)
+    increment(kind, name)
+    with timed(kind, name): ...        (also ``async with``)
+
+Kinds recorded by the app:
+    http      route template, e.g. "GET /api/jobs/{job_id}"
+    db        statement type (select, insert, update, delete, other)
+    cache     cache operation, e.g. "redis_get"
+    external  outbound call, e.g. "cloudinary_upload"
+
+Bucket layout:
+    Values are recorded in microseconds. Values below 32us get a bucket of
+    their own; above that each power of two is split into 16 sub-buckets,
+    so any percentile is within 6.25% of the true value. The range ends at
+    2^32us (about 71 minutes); longer values land in the last bucket.
+    Recording is a bit_length() and a shift (O(1)); every series holds
+    BUCKET_COUNT counters however much traffic it sees.
+
+Memory:
+    At most MAX_SERIES_PER_KIND names per kind; later names are folded into
+    "other", so a client hitting random URLs cannot grow the table.
+
+Multiple workers:
+    When PROMETHEUS_MULTIPROC_DIR is set (gunicorn.conf.py sets it for
+    multi-worker mode), every write also goes to an mmap file per process
+    under ``<dir>/latency/``, the way prometheus_client stores its own
+    multiprocess values. snapshot() and the Prometheus collector merge all
+    files, so whichever worker answers a scrape reports the whole server.
+
+Usage:
+    from app.core.latency import observe, snapshot, timed
+
+    async with timed("external", "cloudinary_upload"):
+        await upload()
+
+    histograms, counters = snapshot()
+    histograms["http"]["GET /api/jobs/"].summary()["p95_ms"]
+"""
+import glob
+import logging
+import math
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+# Values below this are exact (one bucket per microsecond)
+_LINEAR_LIMIT = 2 * SUB_BUCKETS
+MAX_VALUE_US = 1 << 32
+
+MAX_SERIES_PER_KIND = int(os.getenv("LATENCY_MAX_SERIES_PER_KIND", "300"))
+OTHER = "other"
+
+PERCENTILES = (50, 95, 99)
+
+
+def bucket_index(value_us: int) -> int:
+    """Bucket holding a value in microseconds"""
+    if value_us < _LINEAR_LIMIT:
+        return max(0, value_us)
+    if value_us >= MAX_VALUE_US:
+        value_us = MAX_VALUE_US - 1
+    shift = value_us.bit_length() - (SUB_BUCKET_BITS + 1)
+    return (shift << SUB_BUCKET_BITS) + (value_us >> shift)
+
+
+def bucket_upper_bound(index: int) -> int:
+    """Largest value in microseconds that falls into a bucket"""
+    if index < _LINEAR_LIMIT:
+        return index
+    shift = (index >> SUB_BUCKET_BITS) - 1
+    sub_bucket = index - (shift << SUB_BUCKET_BITS)
+    return ((sub_bucket + 1) << shift) - 1
+
+
+BUCKET_COUNT = bucket_index(MAX_VALUE_US - 1) + 1
+
+
+class LatencyHistogram:
+    """Counts per fixed bucket plus count, sum, min and max"""
+
+    __slots__ = ("counts", "count", "total_us", "min_us", "max_us")
+
+    def __init__(self):
+        self.counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total_us = 0
+        self.min_us = MAX_VALUE_US
+        self.max_us = 0
+
+    def record(self, value_us: int) -> int:
+        """Record one value; returns the bucket it went into"""
+        index = bucket_index(value_us)
+        self.counts[index] += 1
+        self.count += 1
+        self.total_us += value_us
+        if value_us < self.min_us:
+            self.min_us = value_us
+        if value_us > self.max_us:
+            self.max_us = value_us
+        return index
+
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        for index, value in enumerate(other.counts):
+            if value:
+                self.counts[index] += value
+        self.count += other.count
+        self.total_us += other.total_us
+        self.min_us = min(self.min_us, other.min_us)
+        self.max_us = max(self.max_us, other.max_us)
+        return self
+
+    def percentile(self, pct: float) -> float:
+        """Value in milliseconds at or below which ``pct`` percent of records fall"""
+        if not self.count:
+            return 0.0
+        target = max(1, math.ceil(pct / 100.0 * self.count))
+        seen = 0
+        for index, value in enumerate(self.counts):
+            seen += value
+            if seen >= target:
+                return min(bucket_upper_bound(index), self.max_us) / 1000.0
+        return self.max_us / 1000.0
+
+    def summary(self) -> Dict[str, float]:
+        if not self.count:
+            return {"count": 0, "avg_ms": 0.0, "min_ms": 0.0, "max_ms": 0.0,
+                    **{f"p{p}_ms": 0.0 for p in PERCENTILES}}
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_us / self.count / 1000.0, 3),
+            "min_ms": round(self.min_us / 1000.0, 3),
+            "max_ms": round(self.max_us / 1000.0, 3),
+            **{f"p{p}_ms": round(self.percentile(p), 3) for p in PERCENTILES},
+        }
+
+
+# mmap keys are "kind\tname\tfield"; histogram fields are bucket indexes and
+# count/sum/min/max, counters use this field
+_COUNTER_FIELD = "value"
+
+
+def multiprocess_directory() -> Optional[str]:
+    """Directory for per-process files, or None in single-process mode"""
+    base = os.getenv("PROMETHEUS_MULTIPROC_DIR") or os.getenv("prometheus_multiproc_dir")
+    if not base:
+        return None
+    try:
+        import prometheus_client.mmap_dict  # noqa: F401
+    except ImportError:
+        logger.warning("PROMETHEUS_MULTIPROC_DIR is set but prometheus_client is missing; latency stays per process")
+        return None
+    # A subdirectory: MultiProcessCollector parses every *.db file in the base directory
+    return os.path.join(base, "latency")
+
+
+class LatencyStore:
+    """Histograms and counters for one process, optionally mirrored to mmap"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._counters: Dict[Tuple[str, str], float] = {}
+        self._names_per_kind: Dict[str, int] = {}
+        self._file = None
+        self._pid = None
+
+    def _mmap(self):
+        """This process's file, reopened after fork so workers never share one"""
+        pid = os.getpid()
+        if self._pid != pid:
+            from prometheus_client.mmap_dict import MmapedDict
+
+            # Values inherited from the parent belong to the parent's file
+            self._histograms.clear()
+            self._counters.clear()
+            self._names_per_kind.clear()
+            os.makedirs(self.directory, exist_ok=True)
+            self._file = MmapedDict(os.path.join(self.directory, f"latency_{pid}.db"))
+            self._pid = pid
+        return self._file
+
+    def _series_name(self, kind: str, name: str, table: dict) -> str:
+        if (kind, name) in table:
+            return name
+        used = self._names_per_kind.get(kind, 0)
+        if used >= MAX_SERIES_PER_KIND:
+            return OTHER
+        self._names_per_kind[kind] = used + 1
+        return name
+
+    def observe(self, kind: str, name: str, duration_ms: float) -> None:
+        value_us = int(duration_ms * 1000) if duration_ms > 0 else 0
+        with self._lock:
+            mmap_file = self._mmap() if self.directory else None
+            name = self._series_name(kind, name, self._histograms)
+            histogram = self._histograms.get((kind, name))
+            if histogram is None:
+                histogram = self._histograms[(kind, name)] = LatencyHistogram()
+            index = histogram.record(value_us)
+            if mmap_file is not None:
+                prefix = f"{kind}\t{name}\t"
+                mmap_file.write_value(prefix + str(index), histogram.counts[index], 0.0)
+                mmap_file.write_value(prefix + "count", histogram.count, 0.0)
+                mmap_file.write_value(prefix + "sum", histogram.total_us, 0.0)
+                mmap_file.write_value(prefix + "min", histogram.min_us, 0.0)
+                mmap_file.write_value(prefix + "max", histogram.max_us, 0.0)
+
+    def increment(self, kind: str, name: str, amount: float = 1) -> None:
+        with self._lock:
+            mmap_file = self._mmap() if self.directory else None
+            name = self._series_name(kind, name, self._counters)
+            value = self._counters.get((kind, name), 0) + amount
+            self._counters[(kind, name)] = value
+            if mmap_file is not None:
+                mmap_file.write_value(f"{kind}\t{name}\t{_COUNTER_FIELD}", value, 0.0)
+
+    def snapshot(self):
+        """Histograms and counters, merged across worker files when multiprocess
+
+        Returns:
+            (histograms, counters) as ``{kind: {name: LatencyHistogram}}`` and
+            ``{kind: {name: value}}``
+        """
+        histograms: Dict[str, Dict[str, LatencyHistogram]] = {}
+        counters: Dict[str, Dict[str, float]] = {}
+        if not self.directory:
+            with self._lock:
+                for (kind, name), histogram in self._histograms.items():
+                    histograms.setdefault(kind, {})[name] = LatencyHistogram().merge(histogram)
+                for (kind, name), value in self._counters.items():
+                    counters.setdefault(kind, {})[name] = value
+            return histograms, counters
+
+        from prometheus_client.mmap_dict import MmapedDict
+
+        for path in glob.glob(os.path.join(self.directory, "latency_*.db")):
+            per_file: Dict[Tuple[str, str], LatencyHistogram] = {}
+            try:
+                values = list(MmapedDict.read_all_values_from_file(path))
+            except (OSError, RuntimeError) as e:
+                logger.debug(f"Skipping unreadable latency file {path}: {e}")
+                continue
+            for key, value, _timestamp, _pos in values:
+                kind, rest = key.split("\t", 1)
+                name, field = rest.rsplit("\t", 1)
+                if field == _COUNTER_FIELD:
+                    kind_counters = counters.setdefault(kind, {})
+                    kind_counters[name] = kind_counters.get(name, 0) + value
+                    continue
+                histogram = per_file.get((kind, name))
+                if histogram is None:
+                    histogram = per_file[(kind, name)] = LatencyHistogram()
+                if field == "count":
+                    histogram.count = int(value)
+                elif field == "sum":
+                    histogram.total_us = int(value)
+                elif field == "min":
+                    histogram.min_us = int(value)
+                elif field == "max":
+                    histogram.max_us = int(value)
+                else:
+                    histogram.counts[int(field)] = int(value)
+            for (kind, name), histogram in per_file.items():
+                merged = histograms.setdefault(kind, {}).get(name)
+                if merged is None:
+                    histograms[kind][name] = histogram
+                else:
+                    merged.merge(histogram)
+        return histograms, counters
+
+    def reset(self) -> None:
+        """Forget this process's values (and its file in multiprocess mode)"""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._names_per_kind.clear()
+            if self._file is not None:
+                self._file.close()
+                try:
+                    os.remove(os.path.join(self.directory, f"latency_{self._pid}.db"))
+                except OSError:
+                    pass
+                self._file = None
+                self._pid = None
+
+
+_store = LatencyStore(multiprocess_directory())
+
+
+def get_store() -> LatencyStore:
+    return _store
+
+
+def observe(kind: str, name: str, duration_ms: float) -> None:
+    """Record a duration in milliseconds"""
+    _store.observe(kind, name, duration_ms)
+
+
+def increment(kind: str, name: str, amount: float = 1) -> None:
+    """Add to an event counter"""
+    _store.increment(kind, name, amount)
+
+
+def snapshot():
+    """See LatencyStore.snapshot"""
+    return _store.snapshot()
+
+
+def reset() -> None:
+    _store.reset()
+
+
+class timed:
+    """Context manager recording the duration of its block (sync or async)"""
+
+    __slots__ = ("kind", "name", "_start")
+
+    def __init__(self, kind: str, name: str):
+        self.kind = kind
+        self.name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe(self.kind, self.name, (time.perf_counter() - self._start) * 1000)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+class LatencyCollector:
+    """Prometheus collector exposing the merged histograms and counters
+
+    - hiremebahamas_latency_seconds{kind,name,quantile}: summary with
+      p50/p95/p99 plus _count and _sum
+    - hiremebahamas_events_total{kind,name}: event counters
+    """
+
+    def collect(self):
+        from prometheus_client.core import CounterMetricFamily, Metric
+
+        histograms, counters = snapshot()
+        summary = Metric("hiremebahamas_latency_seconds", "Operation latency by kind and name", "summary")
+        for kind, series in sorted(histograms.items()):
+            for name, histogram in sorted(series.items()):
+                labels = {"kind": kind, "name": name}
+                for pct in PERCENTILES:
+                    summary.add_sample(
+                        "hiremebahamas_latency_seconds",
+                        {**labels, "quantile": str(pct / 100)},
+                        histogram.percentile(pct) / 1000.0,
+                    )
+                summary.add_sample("hiremebahamas_latency_seconds_count", labels, histogram.count)
+                summary.add_sample("hiremebahamas_latency_seconds_sum", labels, histogram.total_us / 1e6)
+        yield summary
+
+        events = CounterMetricFamily("hiremebahamas_events", "Event counters by kind and name", labels=["kind", "name"])
+        for kind, series in sorted(counters.items()):
+            for name, value in sorted(series.items()):
+                events.add_metric([kind, name], value)
+        yield events
@@ -0,0 +1,162 @@
+"""
+Lazy Router Mounting and Minimal Boot
+
+Importing a router imports everything it depends on: GraphQL pulls in
+Strawberry and graphql-core, uploads pull in Pillow and the Cloudinary/GCS
+clients, auth pulls in python-jose and cryptography. Done eagerly in
+``app.main`` that is seconds of cold start before ``/health`` can answer.
+
+A lazy mount registers only the URL prefix. The first request under that
+prefix imports the router (in a worker thread, so the event loop keeps
+serving) and includes it in the app; every later request goes straight to
+the routes. Requests for ``/openapi.json`` or the docs load every pending
+mount first so the schema is complete.
+
+Boot modes (environment variable ``BOOT_MODE``):
+    full     GraphQL is lazy, every other router (including uploads,
+             profile pictures and monetization) is imported at boot.
+             Default.
+    minimal  Every API router is lazy and Socket.IO is created on first
+             use. Boot imports little more than FastAPI and the health
+             endpoints; see benchmarks/startup_profile.py for the numbers.
+
+Usage:
+    from app.core.lazy_routers import LazyRouterMiddleware, LazyRouterRegistry
+
+    registry = LazyRouterRegistry(app)
+    registry.add("graphql", "app.graphql.schema:create_graphql_router", prefix="/api",
+                 path="/api/graphql", tags=["graphql"], factory=True)
+    app.add_middleware(LazyRouterMiddleware, registry=registry)
+"""
+import asyncio
+import importlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+BOOT_MODE = os.getenv("BOOT_MODE", "full").lower()
+MINIMAL_BOOT = BOOT_MODE == "minimal"
+
+
+@dataclass
+class LazyMount:
+    """A router registered by prefix and imported on first use"""
+    name: str
+    target: str  # "package.module:attribute"
+    prefix: str = ""
+    path: str = ""  # URL prefix that triggers loading (default: prefix)
+    tags: List[str] = field(default_factory=list)
+    factory: bool = False  # attribute is a callable returning the router
+    loaded: bool = False
+    error: Optional[str] = None
+    load_ms: Optional[float] = None
+
+    def matches(self, path: str) -> bool:
+        trigger = self.path or self.prefix
+        return path == trigger or path.startswith(trigger.rstrip("/") + "/")
+
+    def resolve(self):
+        module_name, _, attribute = self.target.partition(":")
+        router = getattr(importlib.import_module(module_name), attribute or "router")
+        return router() if self.factory else router
+
+
+class LazyRouterRegistry:
+    """Routers of one app, each mounted eagerly or on first request"""
+
+    def __init__(self, app):
+        self.app = app
+        self.mounts: List[LazyMount] = []
+        self._lock = threading.Lock()
+
+    def add(
+        self,
+        name: str,
+        target: str,
+        prefix: str = "",
+        path: str = "",
+        tags: Optional[List[str]] = None,
+        factory: bool = False,
+        lazy: bool = True,
+    ) -> LazyMount:
+        """Register a router; ``lazy=False`` imports and includes it now"""
+        mount = LazyMount(name=name, target=target, prefix=prefix, path=path, tags=list(tags or []), factory=factory)
+        self.mounts.append(mount)
+        if not lazy:
+            self.load(mount)
+        return mount
+
+    @property
+    def pending(self) -> List[LazyMount]:
+        return [mount for mount in self.mounts if not mount.loaded]
+
+    def load(self, mount: LazyMount) -> bool:
+        """Import and include a router once. Failures are logged, not raised,
+        and not retried: the prefix then answers 404, as an eager import
+        failure would."""
+        with self._lock:
+            if mount.loaded:
+                return mount.error is None
+            started = time.perf_counter()
+            try:
+                router = mount.resolve()
+                self.app.include_router(router, prefix=mount.prefix, tags=mount.tags or None)
+                # Rebuild the schema with the new routes on the next request
+                self.app.openapi_schema = None
+            except Exception as e:
+                mount.error = f"{type(e).__name__}: {e}"
+                logger.warning(f"⚠️  Router '{mount.name}' failed to load (non-critical): {mount.error}")
+            mount.load_ms = round((time.perf_counter() - started) * 1000, 1)
+            mount.loaded = True
+            if mount.error is None:
+                logger.info(f"✅ Router '{mount.name}' mounted at {mount.path or mount.prefix or '/'} ({mount.load_ms}ms)")
+            return mount.error is None
+
+    def load_all(self) -> None:
+        for mount in self.pending:
+            self.load(mount)
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "name": mount.name,
+                "path": mount.path or mount.prefix,
+                "loaded": mount.loaded,
+                "load_ms": mount.load_ms,
+                "error": mount.error,
+            }
+            for mount in self.mounts
+        ]
+
+
+class LazyRouterMiddleware:
+    """ASGI middleware loading pending routers before routing a request"""
+
+    def __init__(self, app, registry: LazyRouterRegistry):
+        self.app = app
+        self.registry = registry
+
+    def _schema_paths(self):
+        # Only URLs actually routed: FastAPI registers the docs routes at
+        # construction, so setting openapi_url afterwards serves nothing
+        app = self.registry.app
+        urls = {app.openapi_url, app.docs_url, app.redoc_url}
+        return {route.path for route in app.router.routes if getattr(route, "path", None) in urls}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket"):
+            pending = self.registry.pending
+            if pending:
+                path = scope["path"]
+                if path in self._schema_paths():
+                    await asyncio.to_thread(self.registry.load_all)
+                else:
+                    for mount in pending:
+                        if mount.matches(path):
+                            await asyncio.to_thread(self.registry.load, mount)
+        await self.app(scope, receive, send)
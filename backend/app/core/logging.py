@@ -17,6 +17,8 @@ from datetime import datetime, timezone
 from typing import Any, Dict, Optional
 from pathlib import Path
 
+from .request_log import QueueLogHandler, pipeline
+
 # Log levels
 DEBUG = logging.DEBUG
 INFO = logging.INFO
@@ -38,7 +40,8 @@ class StructuredFormatter(logging.Formatter):
             JSON-formatted log string
         """
         log_data = {
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+            # Time the record was created, not when the writer thread formats it
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -91,7 +94,7 @@ class DevelopmentFormatter(logging.Formatter):
         level_color = colors.get(record.levelname, "")
         
         # Build the log message
-        timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        timestamp = datetime.fromtimestamp(record.created, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
         
         parts = [
             f"{level_color}[{record.levelname}]{reset}",
@@ -149,10 +152,11 @@ class AppLogger:
             formatter = DevelopmentFormatter()
         
         console_handler.setFormatter(formatter)
-        self._logger.addHandler(console_handler)
+        handlers = [console_handler]
         
         # File handler for persistent logs (optional)
         log_dir = os.getenv("RUNTIME_LOG_DIR", "/tmp/runtime-logs")
+        file_error = None
         if log_dir:
             try:
                 log_path = Path(log_dir)
@@ -163,9 +167,16 @@ class AppLogger:
                     encoding="utf-8"
                 )
                 file_handler.setFormatter(StructuredFormatter())
-                self._logger.addHandler(file_handler)
+                handlers.append(file_handler)
             except (OSError, PermissionError) as e:
-                self._logger.warning(f"Could not create log file: {e}")
+                file_error = e
+        
+        # Records are formatted and written by the shared background writer,
+        # not on the calling (request) thread
+        self._logger.addHandler(QueueLogHandler(pipeline, targets=handlers))
+        pipeline.start()
+        if file_error:
+            self._logger.warning(f"Could not create log file: {file_error}")
     
     def debug(self, message: str, **kwargs: Any) -> None:
         """Log debug message.
@@ -0,0 +1,334 @@
+"""
+Media File Serving
+
+Serves files under UPLOAD_DIR without holding their bodies in the app heap:
+
+- Zero-copy: when the ASGI server offers the ``http.response.zerocopy``
+  extension the file descriptor is handed to the server (sendfile);
+  otherwise the file is streamed in bounded chunks read off the event loop.
+- Byte ranges: single ``Range: bytes=...`` requests get 206 with
+  Content-Range (video seeking); ``If-Range`` is honored; unsatisfiable
+  ranges get 416. Multi-range requests are answered with the full body.
+- Validation: ETag and Last-Modified, 304 for a matching If-None-Match.
+- Content-hashed names (``<sha256 prefix>.<ext>``, see store_upload) never
+  change content, so they are served ``immutable`` with a one-year max-age;
+  other (legacy uuid) names are revalidated after MEDIA_MAX_AGE seconds.
+- Identical uploads share one hashed file, so deleting a record never
+  unlinks it; collect_unreferenced_media removes hashed files that no row
+  points at any more.
+
+MediaMiddleware answers GET/HEAD under /uploads/ before the app's
+``@app.middleware("http")`` stack: BaseHTTPMiddleware re-streams every body
+chunk through a memory channel and only understands ``http.response.body``,
+so a zero-copy send could not pass through it.
+
+Usage:
+    from app.core.media import MediaMiddleware, store_upload
+
+    url = await store_upload(upload_file, "avatars")   # /uploads/avatars/<hash>.jpg
+    app.add_middleware(MediaMiddleware)                 # add last: outermost
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import stat
+import time
+import uuid
+from email.utils import formatdate
+from typing import Optional, Tuple
+
+import aiofiles
+import anyio
+from fastapi import HTTPException, Request
+from starlette.responses import JSONResponse, Response
+from starlette.types import Receive, Scope, Send
+
+UPLOAD_DIR = "uploads"
+URL_PREFIX = "/uploads"
+
+CHUNK_SIZE = int(os.getenv("MEDIA_CHUNK_SIZE", str(256 * 1024)))
+# Revalidation interval for names that are not content-hashed
+MEDIA_MAX_AGE = int(os.getenv("MEDIA_MAX_AGE", "3600"))
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Unreferenced hashed files younger than this are kept: the row pointing at
+# a fresh upload may not be committed yet
+MEDIA_GC_GRACE = int(os.getenv("MEDIA_GC_GRACE", str(24 * 60 * 60)))
+
+HASH_LENGTH = 32  # hex characters of sha256 (128 bits)
+_HASHED_NAME = re.compile(rf"^([0-9a-f]{{{HASH_LENGTH}}})\.[a-z0-9]+$")
+_EXTENSION = re.compile(r"^\.[a-z0-9]+$")
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+# =============================================================================
+# CONTENT-HASHED STORAGE
+# =============================================================================
+
+
+def hashed_name(digest: str, original_filename: Optional[str]) -> str:
+    ext = os.path.splitext(original_filename or "")[1].lower()
+    if not _EXTENSION.match(ext):
+        ext = ".bin"
+    return f"{digest[:HASH_LENGTH]}{ext}"
+
+
+def is_content_hashed(filename: str) -> bool:
+    return _HASHED_NAME.match(os.path.basename(filename)) is not None
+
+
+async def store_bytes(content: bytes, folder: str, original_filename: Optional[str]) -> str:
+    """Write ``content`` under its content hash; returns the /uploads URL"""
+    name = hashed_name(hashlib.sha256(content).hexdigest(), original_filename)
+    directory = os.path.join(UPLOAD_DIR, folder)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name)
+    try:
+        # Reused: restart the garbage-collection grace period
+        os.utime(path)
+    except FileNotFoundError:
+        temp_path = os.path.join(directory, f".{uuid.uuid4().hex}.part")
+        async with aiofiles.open(temp_path, "wb") as f:
+            await f.write(content)
+        os.replace(temp_path, path)
+    return f"{URL_PREFIX}/{folder}/{name}"
+
+
+async def store_upload(file, folder: str, chunk_size: int = 1024 * 1024) -> str:
+    """Stream an UploadFile to disk, naming it by its sha256; returns the /uploads URL
+
+    The body is hashed while it is written to a temporary file, which is then
+    renamed; identical uploads share one file (so never unlink it when one
+    record goes away, see collect_unreferenced_media).
+    """
+    directory = os.path.join(UPLOAD_DIR, folder)
+    os.makedirs(directory, exist_ok=True)
+    temp_path = os.path.join(directory, f".{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    try:
+        async with aiofiles.open(temp_path, "wb") as f:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                await f.write(chunk)
+        name = hashed_name(digest.hexdigest(), file.filename)
+        os.replace(temp_path, os.path.join(directory, name))
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return f"{URL_PREFIX}/{folder}/{name}"
+
+
+def media_url_columns():
+    """Columns holding /uploads URLs; a hashed file is live while any row names it"""
+    from app.models import Advertisement, Post, ProfilePicture, UploadedFile, User
+
+    return [
+        User.avatar_url,
+        ProfilePicture.file_url,
+        UploadedFile.file_url,
+        Post.image_url,
+        Post.video_url,
+        Advertisement.image_url,
+    ]
+
+
+def _unreferenced_files(referenced: set, cutoff: float) -> list:
+    stale = []
+    for directory, _, filenames in os.walk(UPLOAD_DIR):
+        for filename in filenames:
+            if not is_content_hashed(filename):
+                continue
+            path = os.path.join(directory, filename)
+            url = f"{URL_PREFIX}/{os.path.relpath(path, UPLOAD_DIR).replace(os.sep, '/')}"
+            try:
+                if url not in referenced and os.stat(path).st_mtime < cutoff:
+                    stale.append(path)
+            except FileNotFoundError:
+                pass
+    return stale
+
+
+def _remove_if_stale(paths: list, cutoff: float) -> int:
+    removed = 0
+    for path in paths:
+        try:
+            # Re-checked here: store_bytes may have reused it meanwhile
+            if os.stat(path).st_mtime < cutoff:
+                os.remove(path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+async def collect_unreferenced_media(db, grace: int = MEDIA_GC_GRACE) -> int:
+    """Remove content-hashed files no row references; returns how many
+
+    Files touched within ``grace`` seconds are kept. Legacy (uuid) names are
+    still deleted with their record and are not considered here.
+    """
+    from sqlalchemy import select, union
+
+    cutoff = time.time() - grace
+    query = union(*(
+        select(column.label("url")).where(column.like(f"{URL_PREFIX}/%"))
+        for column in media_url_columns()
+    ))
+    referenced = set((await db.execute(query)).scalars())
+    stale = await anyio.to_thread.run_sync(_unreferenced_files, referenced, cutoff)
+    return await anyio.to_thread.run_sync(_remove_if_stale, stale, cutoff)
+
+
+# =============================================================================
+# SERVING
+# =============================================================================
+
+
+def resolve_media_path(relative_path: str) -> Tuple[str, os.stat_result]:
+    """Absolute path and stat of a file under UPLOAD_DIR; 404 for anything else"""
+    root = os.path.realpath(UPLOAD_DIR)
+    path = os.path.realpath(os.path.join(root, relative_path))
+    if not path.startswith(root + os.sep) or os.path.basename(path).startswith("."):
+        raise HTTPException(status_code=404, detail="File not found")
+    try:
+        stat_result = os.stat(path)
+    except OSError:
+        raise HTTPException(status_code=404, detail="File not found")
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise HTTPException(status_code=404, detail="File not found")
+    return path, stat_result
+
+
+def _etag(path: str, stat_result: os.stat_result) -> str:
+    match = _HASHED_NAME.match(os.path.basename(path))
+    if match:
+        return f'"{match.group(1)}"'
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) of a single byte range
+
+    Returns None when the header should be ignored (malformed or multiple
+    ranges) and raises 416 when the range lies outside the file.
+    """
+    match = _RANGE.match(header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        length = int(last)
+        if length == 0:
+            raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+class MediaFileResponse(Response):
+    """Body of ``path`` from ``offset`` for ``count`` bytes, zero-copy when the server allows"""
+
+    def __init__(self, path: str, offset: int, count: int, status_code: int, headers: dict, send_body: bool = True):
+        super().__init__(status_code=status_code, headers=headers)
+        self.path = path
+        self.offset = offset
+        self.count = count
+        self.send_body = send_body
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if not self.send_body or self.count == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+        with open(self.path, "rb") as f:
+            if "http.response.zerocopy" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopy",
+                    "file": f,
+                    "offset": self.offset,
+                    "count": self.count,
+                    "more_body": False,
+                })
+                return
+            position, remaining = self.offset, self.count
+            while remaining > 0:
+                chunk = await anyio.to_thread.run_sync(os.pread, f.fileno(), min(CHUNK_SIZE, remaining), position)
+                if not chunk:
+                    break
+                position += len(chunk)
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0:
+            # File shrank while streaming; end the response instead of hanging
+            await send({"type": "http.response.body", "body": b""})
+
+
+def media_response(request: Request, relative_path: str) -> Response:
+    """Conditional, range-aware response for a file under UPLOAD_DIR"""
+    path, stat_result = resolve_media_path(relative_path)
+    size = stat_result.st_size
+    etag = _etag(path, stat_result)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "Accept-Ranges": "bytes",
+        "Cache-Control": (
+            IMMUTABLE_CACHE_CONTROL if is_content_hashed(path) else f"public, max-age={MEDIA_MAX_AGE}"
+        ),
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+
+    media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    headers["Content-Type"] = media_type
+    send_body = request.method != "HEAD"
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() in (etag, headers["Last-Modified"])):
+        try:
+            byte_range = parse_range(range_header, size)
+        except HTTPException as e:
+            return Response(status_code=e.status_code, headers={**headers, **e.headers})
+
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return MediaFileResponse(path, 0, size, 200, headers, send_body)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return MediaFileResponse(path, start, end - start + 1, 206, headers, send_body)
+
+
+class MediaMiddleware:
+    """ASGI middleware serving GET/HEAD under URL_PREFIX straight from disk"""
+
+    def __init__(self, app, prefix: str = URL_PREFIX):
+        self.app = app
+        self.prefix = prefix.rstrip("/") + "/"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in ("GET", "HEAD")
+            or not scope["path"].startswith(self.prefix)
+        ):
+            await self.app(scope, receive, send)
+            return
+        request = Request(scope, receive)
+        try:
+            response = media_response(request, scope["path"][len(self.prefix):])
+        except HTTPException as e:
+            response = JSONResponse({"detail": e.detail}, status_code=e.status_code)
+        response.headers["X-Content-Type-Options"] = "nosniff"
+        await response(scope, receive, send)
@@ -7,7 +7,15 @@ and error tracking. Compatible with Prometheus and Grafana dashboards.
 Metrics categories:
 - HTTP request metrics (count, duration, errors)
 - Database connection metrics (pool size, active connections)
+- Per-request SQL metrics (statement count, DB time, N+1 patterns)
 - Application health metrics (uptime, version)
+- Latency percentiles and event counters from ``core.latency``
+
+Multiple workers:
+    With PROMETHEUS_MULTIPROC_DIR set (gunicorn.conf.py sets it when more
+    than one worker runs), prometheus_client keeps values in per-process
+    mmap files and every scrape merges all workers, instead of reporting
+    whichever process happened to answer.
 
 Usage:
     from app.core.metrics import (
@@ -19,19 +27,22 @@ Usage:
     # In request handler:
     request_counter.labels(method="GET", endpoint="/api/health", status="200").inc()
 """
+import os
 import time
 from functools import wraps
 from typing import Callable
 
+from app.core.latency import LatencyCollector
+
 # Try to import prometheus_client, fall back gracefully if not available
 try:
     from prometheus_client import (
         Counter,
         Gauge,
         Histogram,
-        Info,
         CollectorRegistry,
         generate_latest,
+        multiprocess,
         CONTENT_TYPE_LATEST,
     )
     PROMETHEUS_AVAILABLE = True
@@ -53,24 +64,31 @@ except ImportError:
         def info(self, value):
             pass
     
-    Counter = Gauge = Histogram = Info = lambda *args, **kwargs: DummyMetric()
+    Counter = Gauge = Histogram = lambda *args, **kwargs: DummyMetric()
     CollectorRegistry = None
+    multiprocess = None
     CONTENT_TYPE_LATEST = "text/plain"
     
     def generate_latest(registry=None):
         return b"# prometheus_client not installed\n"
 
+MULTIPROCESS_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR") or os.getenv("prometheus_multiproc_dir")
+
 # Create a custom registry for the application metrics
 # This avoids conflicts with the default registry
 if PROMETHEUS_AVAILABLE:
     REGISTRY = CollectorRegistry()
+    if not MULTIPROCESS_DIR:
+        REGISTRY.register(LatencyCollector())
 else:
     REGISTRY = None
 
-# Application info metric
-app_info = Info(
-    "hiremebahamas_app",
+# Application info metric (a gauge set to 1: Info is not multiprocess-safe)
+app_info = Gauge(
+    "hiremebahamas_app_info",
     "Application information",
+    ["version", "environment"],
+    multiprocess_mode="max",
     registry=REGISTRY
 ) if PROMETHEUS_AVAILABLE else DummyMetric()
 
@@ -102,12 +120,14 @@ request_errors = Counter(
 db_connections_active = Gauge(
     "hiremebahamas_db_connections_active",
     "Number of active database connections",
+    multiprocess_mode="livesum",
     registry=REGISTRY
 ) if PROMETHEUS_AVAILABLE else DummyMetric()
 
 db_connections_pool_size = Gauge(
     "hiremebahamas_db_connections_pool_size",
     "Database connection pool size",
+    multiprocess_mode="livesum",
     registry=REGISTRY
 ) if PROMETHEUS_AVAILABLE else DummyMetric()
 
@@ -119,6 +139,29 @@ db_query_duration = Histogram(
     registry=REGISTRY
 ) if PROMETHEUS_AVAILABLE else DummyMetric()
 
+db_queries_per_request = Histogram(
+    "hiremebahamas_db_queries_per_request",
+    "Number of SQL statements issued per request",
+    ["endpoint"],
+    buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+    registry=REGISTRY
+) if PROMETHEUS_AVAILABLE else DummyMetric()
+
+db_time_per_request = Histogram(
+    "hiremebahamas_db_time_per_request_seconds",
+    "Total time spent in SQL statements per request",
+    ["endpoint"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+    registry=REGISTRY
+) if PROMETHEUS_AVAILABLE else DummyMetric()
+
+db_n_plus_one_total = Counter(
+    "hiremebahamas_db_n_plus_one_total",
+    "Requests with a repeated-statement (N+1) query pattern",
+    ["endpoint"],
+    registry=REGISTRY
+) if PROMETHEUS_AVAILABLE else DummyMetric()
+
 # Authentication Metrics
 auth_attempts = Counter(
     "hiremebahamas_auth_attempts_total",
@@ -131,6 +174,7 @@ auth_attempts = Counter(
 app_uptime = Gauge(
     "hiremebahamas_app_uptime_seconds",
     "Application uptime in seconds",
+    multiprocess_mode="livemax",
     registry=REGISTRY
 ) if PROMETHEUS_AVAILABLE else DummyMetric()
 
@@ -144,31 +188,33 @@ def update_uptime():
 
 
 def set_app_info(version: str, environment: str):
-    """Set application info metric.
+    """Set application info metric (once per process, at startup).
     
     Args:
         version: Application version string
         environment: Environment name (production, development, etc.)
     """
-    if PROMETHEUS_AVAILABLE:
-        app_info.info({
-            "version": version,
-            "environment": environment,
-        })
+    app_info.labels(version=version, environment=environment).set(1)
 
 
 def get_metrics_response():
     """Generate Prometheus metrics response.
     
+    In multiprocess mode the values of every worker are merged.
+    
     Returns:
         Tuple of (metrics_data, content_type) for HTTP response
     """
     update_uptime()
     
-    if PROMETHEUS_AVAILABLE:
-        return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
-    else:
+    if not PROMETHEUS_AVAILABLE:
         return b"# prometheus_client not installed\n", "text/plain"
+    if MULTIPROCESS_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(LatencyCollector())
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
 
 
 def track_request_duration(endpoint: str):
@@ -252,6 +298,21 @@ def record_db_query(operation: str, duration: float):
     db_query_duration.labels(operation=operation).observe(duration)
 
 
+def record_request_queries(endpoint: str, count: int, duration: float, n_plus_one: int = 0):
+    """Record per-request SQL statistics.
+    
+    Args:
+        endpoint: Route template the request matched
+        count: Number of SQL statements issued
+        duration: Total statement time in seconds
+        n_plus_one: Number of fingerprints flagged as N+1 patterns
+    """
+    db_queries_per_request.labels(endpoint=endpoint).observe(count)
+    db_time_per_request.labels(endpoint=endpoint).observe(duration)
+    if n_plus_one:
+        db_n_plus_one_total.labels(endpoint=endpoint).inc()
+
+
 def update_db_pool_metrics(active: int, pool_size: int):
     """Update database connection pool metrics.
     
@@ -2,70 +2,50 @@
 Performance Monitoring for Facebook/Instagram-Level Response Times
 
 Tracks and logs:
-- API response times (target: 50-150ms)
+- API response times (target: 50-150ms), with p50/p95/p99 per route
 - Database query performance
 - Cache hit rates
 - Error rates
+
+Values live in ``core.latency`` histograms and counters, so they are merged
+across workers in multi-worker mode and bounded in memory (endpoints are
+labelled by route template, not the raw path).
 """
 import time
 import logging
-import threading
-from typing import Optional, Dict, Any
+from typing import Dict, Any
 from functools import wraps
 from fastapi import Request
 
+from app.core import latency
+from app.core.api_cache import shared_cache_stats
+from app.core.request_log import request_logger
+
 logger = logging.getLogger(__name__)
 
-# Performance metrics storage (in-memory for simplicity)
-# Thread-safe with lock for concurrent access
-_metrics_lock = threading.Lock()
-_metrics = {
-    "requests": {"total": 0, "by_endpoint": {}},
-    "response_times": {"total_ms": 0, "count": 0, "by_endpoint": {}},
-    "cache": {"hits": 0, "misses": 0},
-    "database": {"queries": 0, "total_time_ms": 0},
-    "errors": {"4xx": 0, "5xx": 0},
-}
+# Timer kinds reported besides HTTP requests
+_TIMER_KINDS = ("db", "cache", "external")
+
+
+def request_label(request: Request) -> str:
+    """Method and route template of a request, e.g. ``GET /api/jobs/{job_id}``."""
+    route = request.scope.get("route")
+    return f"{request.method} {getattr(route, 'path', None) or 'unmatched'}"
 
 
 def track_request_time(endpoint: str, duration_ms: float, status_code: int):
-    """Track request timing and status (thread-safe).
+    """Track request timing and status.
     
     Args:
-        endpoint: API endpoint path
+        endpoint: Route label (see request_label)
         duration_ms: Request duration in milliseconds
         status_code: HTTP status code
     """
-    with _metrics_lock:
-        # Update total requests
-        _metrics["requests"]["total"] += 1
-        if endpoint not in _metrics["requests"]["by_endpoint"]:
-            _metrics["requests"]["by_endpoint"][endpoint] = 0
-        _metrics["requests"]["by_endpoint"][endpoint] += 1
-        
-        # Update response times
-        _metrics["response_times"]["total_ms"] += duration_ms
-        _metrics["response_times"]["count"] += 1
-        
-        if endpoint not in _metrics["response_times"]["by_endpoint"]:
-            _metrics["response_times"]["by_endpoint"][endpoint] = {
-                "total_ms": 0,
-                "count": 0,
-                "min_ms": float('inf'),
-                "max_ms": 0,
-            }
-        
-        endpoint_metrics = _metrics["response_times"]["by_endpoint"][endpoint]
-        endpoint_metrics["total_ms"] += duration_ms
-        endpoint_metrics["count"] += 1
-        endpoint_metrics["min_ms"] = min(endpoint_metrics["min_ms"], duration_ms)
-        endpoint_metrics["max_ms"] = max(endpoint_metrics["max_ms"], duration_ms)
-        
-        # Update error counts
-        if 400 <= status_code < 500:
-            _metrics["errors"]["4xx"] += 1
-        elif status_code >= 500:
-            _metrics["errors"]["5xx"] += 1
+    latency.observe("http", endpoint, duration_ms)
+    if 400 <= status_code < 500:
+        latency.increment("errors", "4xx")
+    elif status_code >= 500:
+        latency.increment("errors", "5xx")
     
     # Log slow requests (>150ms)
     if duration_ms > 150:
@@ -81,90 +61,82 @@ def track_request_time(endpoint: str, duration_ms: float, status_code: int):
 
 
 def track_cache_hit():
-    """Track a cache hit (thread-safe)."""
-    with _metrics_lock:
-        _metrics["cache"]["hits"] += 1
+    """Track a cache hit."""
+    latency.increment("cache", "hits")
 
 
 def track_cache_miss():
-    """Track a cache miss (thread-safe)."""
-    with _metrics_lock:
-        _metrics["cache"]["misses"] += 1
+    """Track a cache miss."""
+    latency.increment("cache", "misses")
 
 
 def track_database_query(duration_ms: float):
-    """Track a database query (thread-safe).
+    """Track a database query.
     
     Args:
         duration_ms: Query duration in milliseconds
     """
-    with _metrics_lock:
-        _metrics["database"]["queries"] += 1
-        _metrics["database"]["total_time_ms"] += duration_ms
+    latency.observe("db", "query", duration_ms)
 
 
 def get_performance_metrics() -> Dict[str, Any]:
-    """Get current performance metrics (thread-safe).
+    """Get current performance metrics (all workers).
     
     Returns:
         Dictionary with all performance metrics
     """
-    with _metrics_lock:
-        # Calculate averages
-        avg_response_time = (
-            _metrics["response_times"]["total_ms"] / _metrics["response_times"]["count"]
-            if _metrics["response_times"]["count"] > 0
-            else 0
-        )
-        
-        avg_db_time = (
-            _metrics["database"]["total_time_ms"] / _metrics["database"]["queries"]
-            if _metrics["database"]["queries"] > 0
-            else 0
-        )
-        
-        cache_hit_rate = (
-            _metrics["cache"]["hits"]
-            / (_metrics["cache"]["hits"] + _metrics["cache"]["misses"])
-            if (_metrics["cache"]["hits"] + _metrics["cache"]["misses"]) > 0
-            else 0
-        )
-        
-        # Calculate per-endpoint averages
-        endpoint_stats = {}
-        for endpoint, metrics in _metrics["response_times"]["by_endpoint"].items():
-            endpoint_stats[endpoint] = {
-                "avg_ms": metrics["total_ms"] / metrics["count"],
-                "min_ms": metrics["min_ms"],
-                "max_ms": metrics["max_ms"],
-                "count": metrics["count"],
-            }
-        
-        return {
-            "requests": {
-                "total": _metrics["requests"]["total"],
-                "avg_response_time_ms": round(avg_response_time, 2),
-            },
-            "cache": {
-                "hit_rate": round(cache_hit_rate * 100, 2),
-                "hits": _metrics["cache"]["hits"],
-                "misses": _metrics["cache"]["misses"],
-            },
-            "database": {
-                "queries": _metrics["database"]["queries"],
-                "avg_query_time_ms": round(avg_db_time, 2),
-            },
-            "errors": {
-                "4xx": _metrics["errors"]["4xx"],
-                "5xx": _metrics["errors"]["5xx"],
-            },
-            "endpoints": endpoint_stats,
-            "performance_targets": {
-                "api_response_target_ms": "50-150",
-                "cache_hit_rate_target": ">80%",
-                "page_load_target": "<1s",
-            },
-        }
+    histograms, counters = latency.snapshot()
+    
+    http = histograms.get("http", {})
+    total = latency.LatencyHistogram()
+    for histogram in http.values():
+        total.merge(histogram)
+    
+    db = latency.LatencyHistogram()
+    for histogram in histograms.get("db", {}).values():
+        db.merge(histogram)
+    
+    cache = counters.get("cache", {})
+    hits = int(cache.get("hits", 0))
+    misses = int(cache.get("misses", 0))
+    cache_hit_rate = hits / (hits + misses) if (hits + misses) > 0 else 0
+    
+    errors = counters.get("errors", {})
+    overall = total.summary()
+    
+    return {
+        "requests": {
+            "total": total.count,
+            "avg_response_time_ms": overall["avg_ms"],
+            "p95_ms": overall["p95_ms"],
+        },
+        "cache": {
+            "hit_rate": round(cache_hit_rate * 100, 2),
+            "hits": hits,
+            "misses": misses,
+            "shared": shared_cache_stats(counters),
+        },
+        "database": {
+            "queries": db.count,
+            "avg_query_time_ms": db.summary()["avg_ms"],
+        },
+        "errors": {
+            "4xx": int(errors.get("4xx", 0)),
+            "5xx": int(errors.get("5xx", 0)),
+        },
+        "endpoints": {name: histogram.summary() for name, histogram in http.items()},
+        "timers": {
+            kind: {name: histogram.summary() for name, histogram in histograms.get(kind, {}).items()}
+            for kind in _TIMER_KINDS
+        },
+        # This worker's log pipeline: queue depth, dropped and sampled-out records
+        "request_log": request_logger.stats(),
+        "performance_targets": {
+            "api_response_target_ms": "50-150",
+            "cache_hit_rate_target": ">80%",
+            "page_load_target": "<1s",
+        },
+    }
 
 
 def monitor_performance(func):
@@ -233,7 +205,7 @@ async def log_performance_summary():
         for endpoint, stats in sorted_endpoints:
             logger.info(
                 f"  {endpoint}: {stats['avg_ms']:.0f}ms avg "
-                f"(min: {stats['min_ms']:.0f}ms, max: {stats['max_ms']:.0f}ms, "
+                f"(p95: {stats['p95_ms']:.0f}ms, max: {stats['max_ms']:.0f}ms, "
                 f"count: {stats['count']})"
             )
     
@@ -245,12 +217,5 @@ def reset_metrics():
     
     Useful for testing or starting fresh after configuration changes.
     """
-    global _metrics
-    _metrics = {
-        "requests": {"total": 0, "by_endpoint": {}},
-        "response_times": {"total_ms": 0, "count": 0, "by_endpoint": {}},
-        "cache": {"hits": 0, "misses": 0},
-        "database": {"queries": 0, "total_time_ms": 0},
-        "errors": {"4xx": 0, "5xx": 0},
-    }
+    latency.reset()
     logger.info("Performance metrics reset")
@@ -79,6 +79,7 @@ async def paginate_with_cursor(
     direction: str = "next",
     order_by_field: str = "created_at",
     order_direction: str = "desc",
+    rows: bool = False,
 ) -> tuple[List[Any], PaginationMetadata]:
     """
     Cursor-based pagination for mobile apps.
@@ -95,6 +96,8 @@ async def paginate_with_cursor(
         direction: "next" or "previous"
         order_by_field: Field to order by (default "created_at")
         order_direction: "asc" or "desc" (default "desc")
+        rows: Return result rows instead of ORM instances, for queries that
+            select plain columns (rows must expose ``id`` and the order field)
     
     Returns:
         Tuple of (records, pagination_metadata)
@@ -137,7 +140,7 @@ async def paginate_with_cursor(
     # Fetch limit + 1 to check if there are more records
     fetch_query = query.limit(limit + 1)
     result = await db.execute(fetch_query)
-    records = list(result.scalars().all())
+    records = list(result.all() if rows else result.scalars().all())
     
     # Check if there are more records
     has_more = len(records) > limit
@@ -175,6 +178,7 @@ async def paginate_with_offset(
     limit: int = 20,
     max_limit: int = 100,
     count_total: bool = True,
+    rows: bool = False,
 ) -> tuple[List[Any], PaginationMetadata]:
     """
     Traditional offset-based pagination.
@@ -188,6 +192,7 @@ async def paginate_with_offset(
         limit: Number of records to return
         max_limit: Maximum allowed limit
         count_total: Whether to count total records (expensive for large datasets)
+        rows: Return result rows instead of ORM instances (column selects)
     
     Returns:
         Tuple of (records, pagination_metadata)
@@ -205,7 +210,7 @@ async def paginate_with_offset(
     # Apply pagination
     paginated_query = query.offset(skip).limit(limit + 1)  # +1 to check has_next
     result = await db.execute(paginated_query)
-    records = list(result.scalars().all())
+    records = list(result.all() if rows else result.scalars().all())
     
     # Check if there are more records
     has_next = len(records) > limit
@@ -243,6 +248,7 @@ async def paginate_auto(
     order_by_field: str = "created_at",
     order_direction: str = "desc",
     count_total: bool = False,
+    rows: bool = False,
 ) -> tuple[List[Any], PaginationMetadata]:
     """
     Auto-detect pagination mode based on parameters.
@@ -264,6 +270,7 @@ async def paginate_auto(
         order_by_field: Field to order by
         order_direction: "asc" or "desc"
         count_total: Whether to count total (offset-based only)
+        rows: Return result rows instead of ORM instances (column selects)
     
     Returns:
         Tuple of (records, pagination_metadata)
@@ -285,6 +292,7 @@ async def paginate_auto(
             direction=direction,
             order_by_field=order_by_field,
             order_direction=order_direction,
+            rows=rows,
         )
     elif skip is not None:
         # Use offset-based pagination
@@ -295,6 +303,7 @@ async def paginate_auto(
             limit=limit,
             max_limit=max_limit,
             count_total=count_total,
+            rows=rows,
         )
     else:
         # Default to cursor-based (better for mobile)
@@ -308,6 +317,7 @@ async def paginate_auto(
             direction=direction,
             order_by_field=order_by_field,
             order_direction=order_direction,
+            rows=rows,
         )
 
 
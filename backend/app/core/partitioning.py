@@ -0,0 +1,383 @@
+"""
+Time-Based Table Partitioning
+
+Monthly PostgreSQL declarative range partitioning for the append-only
+tables (messages, notifications, analytics_events), with automated partition
+creation and retention by dropping whole partitions instead of DELETEs.
+
+Why:
+- DELETE-based cleanup leaves dead tuples behind; on tens of millions of
+  rows vacuum and index bloat slow every query. DROP of an old partition
+  is instant and leaves nothing to vacuum.
+- Queries that bound created_at only touch the partitions they need
+  (partition pruning), keeping hot indexes small.
+
+Layout:
+    messages                 parent, PARTITION BY RANGE (created_at)
+    messages_p2026_03        FOR VALUES FROM ('2026-03-01') TO ('2026-04-01')
+    messages_default         DEFAULT partition, catches out-of-range rows
+
+The parent's primary key is (id, created_at) because PostgreSQL requires the
+partition key in every unique constraint. IDs come from
+``app.core.snowflake`` so they stay globally unique without a sequence;
+writers that insert without an id get one from the database's
+``snowflake_id()`` column default (see ensure_snowflake_defaults), so ids
+on these tables are time-ordered whichever app wrote the row.
+For the same reason post_likes is not partitioned: its unique
+(post_id, user_id) index is what stops concurrent likes from inserting
+duplicate rows, and it cannot include created_at.
+
+Existing tables are converted once by the Alembic migration
+``002_partition_append_only_tables``. Until then (and on SQLite) the
+maintenance functions detect the plain table and fall back to a batched
+DELETE for retention.
+
+Configuration:
+    PARTITION_MONTHS_AHEAD: Future partitions to keep created (default: 3)
+    NOTIFICATIONS_RETENTION_MONTHS: Months of notifications kept, read or
+        unread - partitions are dropped whole (default: 0 = forever)
+    MESSAGES_RETENTION_MONTHS: Months of messages kept (default: 0 = forever)
+    ANALYTICS_EVENTS_RETENTION_MONTHS: Months of raw events kept; the rollups
+        keep the aggregates (default: 0 = forever)
+
+Usage:
+    from app.core.partitioning import ensure_partitions, apply_retention
+
+    async with engine.begin() as conn:
+        await ensure_partitions(conn)       # at startup / daily
+    async with engine.begin() as conn:
+        await apply_retention(conn)         # daily, replaces DELETE cleanup
+"""
+import logging
+import os
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+
+from app.core.snowflake import DATABASE_FUNCTION_SQL
+
+logger = logging.getLogger(__name__)
+
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+
+# Rows removed per statement when retention falls back to DELETE
+RETENTION_DELETE_BATCH = 5000
+
+
+@dataclass(frozen=True)
+class PartitionSpec:
+    """Partitioning configuration for one table.
+
+    Attributes:
+        table: Parent table name
+        column: Range partition key
+        retention_months: Whole months to keep before the current one (0 = keep
+            forever). Every row past it is removed, read or not, so dropping a
+            partition and the DELETE fallback remove the same rows.
+    """
+    table: str
+    column: str = "created_at"
+    retention_months: int = 0
+
+
+PARTITIONED_TABLES: Dict[str, PartitionSpec] = {
+    "messages": PartitionSpec(
+        "messages",
+        retention_months=int(os.getenv("MESSAGES_RETENTION_MONTHS", "0")),
+    ),
+    "notifications": PartitionSpec(
+        "notifications",
+        retention_months=int(os.getenv("NOTIFICATIONS_RETENTION_MONTHS", "0")),
+    ),
+    # Created partitioned by migration 006_analytics_events, not converted
+    "analytics_events": PartitionSpec(
+        "analytics_events",
+        retention_months=int(os.getenv("ANALYTICS_EVENTS_RETENTION_MONTHS", "0")),
+    ),
+}
+
+# Tables whose ids are snowflakes for every writer (app models use next_id)
+SNOWFLAKE_ID_TABLES = ("messages", "notifications")
+
+_PARTITION_NAME_RE = re.compile(r"^(?P<table>\w+)_p(?P<year>\d{4})_(?P<month>\d{2})$")
+
+
+# =============================================================================
+# PARTITION ARITHMETIC
+# =============================================================================
+
+def month_start(moment) -> date:
+    """First day of the month containing ``moment``."""
+    return date(moment.year, moment.month, 1)
+
+
+def add_months(start: date, months: int) -> date:
+    index = start.year * 12 + (start.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, start: date) -> str:
+    return f"{table}_p{start.year:04d}_{start.month:02d}"
+
+
+def parse_partition_name(name: str) -> Optional[date]:
+    """Return the month a partition covers, or None for non-monthly partitions."""
+    match = _PARTITION_NAME_RE.match(name)
+    if not match:
+        return None
+    return date(int(match.group("year")), int(match.group("month")), 1)
+
+
+def retention_cutoff(spec: PartitionSpec, now: Optional[datetime] = None) -> Optional[date]:
+    """Rows created before this date are past retention (None = keep forever)."""
+    if spec.retention_months <= 0:
+        return None
+    now = now or datetime.now(timezone.utc)
+    return add_months(month_start(now), -spec.retention_months)
+
+
+# =============================================================================
+# SQL BUILDERS (PostgreSQL)
+# =============================================================================
+
+def create_partition_sql(spec: PartitionSpec, start: date) -> str:
+    end = add_months(start, 1)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(spec.table, start)} "
+        f"PARTITION OF {spec.table} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+def drop_partition_sql(spec: PartitionSpec, start: date) -> List[str]:
+    name = partition_name(spec.table, start)
+    # Detach first so the parent is only locked briefly, then drop
+    return [
+        f"ALTER TABLE {spec.table} DETACH PARTITION {name}",
+        f"DROP TABLE IF EXISTS {name}",
+    ]
+
+
+def convert_to_partitioned_sql(spec: PartitionSpec, first_month: date, last_month: date) -> List[str]:
+    """Statements converting a plain table into a partitioned one.
+
+    The old table is renamed to ``<table>_legacy``, a partitioned parent is
+    created with the same columns and defaults, monthly partitions
+    covering ``first_month``..``last_month`` (plus a DEFAULT partition) are
+    attached, rows are copied over, and ``id`` becomes BIGINT for
+    snowflake IDs. The legacy table is kept for manual verification.
+
+    The id default becomes ``snowflake_id()``, so writers that insert
+    without an id keep working and still get time-ordered ids.
+    The legacy table's secondary indexes are recreated on the new table
+    under their original names (the legacy copies get a ``_legacy``
+    suffix). Unique indexes stay unique: PostgreSQL rejects one that lacks
+    the partition key, so converting a table whose uniqueness depends on
+    such an index fails instead of silently dropping the guarantee.
+    """
+    table = spec.table
+    legacy = f"{table}_legacy"
+    statements = [
+        f"ALTER TABLE {table} RENAME TO {legacy}",
+        f"ALTER TABLE {legacy} ALTER COLUMN {spec.column} SET NOT NULL",
+        (
+            f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            f"PARTITION BY RANGE ({spec.column})"
+        ),
+        f"ALTER TABLE {table} ALTER COLUMN id TYPE BIGINT",
+        *DATABASE_FUNCTION_SQL,
+        f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT snowflake_id()",
+        f"ALTER TABLE {table} ADD PRIMARY KEY (id, {spec.column})",
+        f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT",
+    ]
+    month = first_month
+    while month <= last_month:
+        statements.append(create_partition_sql(spec, month))
+        month = add_months(month, 1)
+    statements += [
+        f"INSERT INTO {table} SELECT * FROM {legacy}",
+        # Recreate foreign keys (LIKE does not copy them)
+        (
+            "DO $$ DECLARE r record; BEGIN "
+            "FOR r IN SELECT conname, pg_get_constraintdef(oid) AS def FROM pg_constraint "
+            f"WHERE conrelid = '{legacy}'::regclass AND contype = 'f' LOOP "
+            f"EXECUTE format('ALTER TABLE {table} ADD CONSTRAINT %I %s', r.conname || '_part', r.def); "
+            "END LOOP; END $$"
+        ),
+        # Recreate secondary indexes after the copy (LIKE without INCLUDING
+        # INDEXES skips them, and INCLUDING INDEXES would copy the id-only
+        # primary key, which a partitioned table rejects)
+        (
+            "DO $$ DECLARE r record; BEGIN "
+            "FOR r IN SELECT c.relname AS name, pg_get_indexdef(i.indexrelid) AS def "
+            "FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            f"WHERE i.indrelid = '{legacy}'::regclass AND NOT i.indisprimary LOOP "
+            "EXECUTE format('ALTER INDEX %I RENAME TO %I', r.name, left(r.name, 56) || '_legacy'); "
+            f"EXECUTE regexp_replace(r.def, ' ON (\\S+\\.)?{legacy} ', ' ON {table} '); "
+            "END LOOP; END $$"
+        ),
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_{spec.column} ON {table} ({spec.column})",
+    ]
+    return statements
+
+
+# =============================================================================
+# MAINTENANCE
+# =============================================================================
+
+async def is_partitioned(conn, table: str) -> bool:
+    """True if ``table`` is a PostgreSQL partitioned table."""
+    if conn.dialect.name != "postgresql":
+        return False
+    result = await conn.execute(
+        text(
+            "SELECT 1 FROM pg_partitioned_table p "
+            "JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = :table AND pg_table_is_visible(c.oid)"
+        ),
+        {"table": table},
+    )
+    return result.scalar() is not None
+
+
+async def list_partitions(conn, table: str) -> List[str]:
+    result = await conn.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits i "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "WHERE parent.relname = :table ORDER BY child.relname"
+        ),
+        {"table": table},
+    )
+    return [row[0] for row in result]
+
+
+async def ensure_partitions(conn, months_ahead: int = None, now: Optional[datetime] = None) -> List[str]:
+    """Create the current and upcoming monthly partitions for every spec.
+
+    Safe to run repeatedly (``CREATE TABLE IF NOT EXISTS``). Tables that
+    are not partitioned yet are skipped.
+
+    Returns:
+        Names of partitions that now exist for the covered months
+    """
+    months_ahead = PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    current = month_start(now or datetime.now(timezone.utc))
+    ensured = []
+    for spec in PARTITIONED_TABLES.values():
+        if not await is_partitioned(conn, spec.table):
+            continue
+        for offset in range(months_ahead + 1):
+            start = add_months(current, offset)
+            await conn.execute(text(create_partition_sql(spec, start)))
+            ensured.append(partition_name(spec.table, start))
+    if ensured:
+        logger.info(f"Partitions ensured: {len(ensured)}")
+    return ensured
+
+
+async def ensure_snowflake_defaults(conn) -> List[str]:
+    """Make ``snowflake_id()`` the id default of every SNOWFLAKE_ID_TABLES table.
+
+    Covers tables created by ``create_all`` rather than the migration.
+    PostgreSQL only; returns the tables whose default was changed.
+    """
+    if conn.dialect.name != "postgresql":
+        return []
+    for statement in DATABASE_FUNCTION_SQL:
+        await conn.execute(text(statement))
+    changed = []
+    for table in SNOWFLAKE_ID_TABLES:
+        result = await conn.execute(
+            text(
+                "SELECT column_default FROM information_schema.columns "
+                "WHERE table_schema = current_schema() AND table_name = :table AND column_name = 'id'"
+            ),
+            {"table": table},
+        )
+        row = result.first()
+        if row is None or row[0] == "snowflake_id()":
+            continue
+        await conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN id TYPE BIGINT"))
+        await conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT snowflake_id()"))
+        changed.append(table)
+    if changed:
+        logger.info(f"snowflake_id() default set on: {changed}")
+    return changed
+
+
+async def apply_retention(conn, now: Optional[datetime] = None) -> Dict[str, Dict[str, object]]:
+    """Enforce retention for every spec.
+
+    Partitioned tables: whole monthly partitions older than the cutoff are
+    detached and dropped. Plain tables: rows are removed with batched
+    DELETEs of the same rows.
+
+    Returns:
+        Per table: ``{"dropped": [partition names]}`` or ``{"deleted": row count}``
+    """
+    report: Dict[str, Dict[str, object]] = {}
+    for spec in PARTITIONED_TABLES.values():
+        cutoff = retention_cutoff(spec, now)
+        if cutoff is None:
+            continue
+
+        if await is_partitioned(conn, spec.table):
+            dropped = []
+            for name in await list_partitions(conn, spec.table):
+                start = parse_partition_name(name)
+                if start is not None and add_months(start, 1) <= cutoff:
+                    for statement in drop_partition_sql(spec, start):
+                        await conn.execute(text(statement))
+                    dropped.append(name)
+            report[spec.table] = {"dropped": dropped}
+            if dropped:
+                logger.info(f"Retention dropped {spec.table} partitions: {dropped}")
+        else:
+            report[spec.table] = {"deleted": await _delete_expired_rows(conn, spec, cutoff)}
+    return report
+
+
+async def _delete_expired_rows(conn, spec: PartitionSpec, cutoff: date) -> int:
+    """Batched DELETE fallback for tables that are not partitioned."""
+    condition = f"{spec.column} < :cutoff"
+    cutoff_value = datetime(cutoff.year, cutoff.month, cutoff.day, tzinfo=timezone.utc)
+    statement = text(
+        f"DELETE FROM {spec.table} WHERE id IN "
+        f"(SELECT id FROM {spec.table} WHERE {condition} LIMIT {RETENTION_DELETE_BATCH})"
+    )
+    total = 0
+    while True:
+        result = await conn.execute(statement, {"cutoff": cutoff_value})
+        deleted = result.rowcount or 0
+        total += deleted
+        if deleted < RETENTION_DELETE_BATCH:
+            break
+    if total:
+        logger.info(f"Retention deleted {total} rows from {spec.table}")
+    return total
+
+
+# =============================================================================
+# QUERY ROUTING
+# =============================================================================
+
+def live_window(model, now: Optional[datetime] = None):
+    """Filter restricting ``model`` to rows inside its retention window.
+
+    Adding this to queries on partitioned tables lets the planner prune
+    partitions that retention is about to drop; it returns None for tables
+    without retention so callers can skip it.
+    """
+    spec = PARTITIONED_TABLES.get(model.__tablename__)
+    if spec is None:
+        return None
+    cutoff = retention_cutoff(spec, now)
+    if cutoff is None:
+        return None
+    column = getattr(model, spec.column)
+    return column >= datetime(cutoff.year, cutoff.month, cutoff.day, tzinfo=timezone.utc)
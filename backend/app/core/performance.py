@@ -58,6 +58,13 @@ DATABASE_INDEXES = [
         "columns": ["username"],
         "where": None,
     },
+    # HireMe: available users, newest first (also feeds the availability index)
+    {
+        "name": "idx_users_available_for_hire",
+        "table": "users",
+        "columns": ["created_at DESC"],
+        "where": "is_active = true AND is_available_for_hire = true",
+    },
     # Jobs indexes for job searches
     {
         "name": "idx_jobs_created",
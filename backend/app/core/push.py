@@ -0,0 +1,575 @@
+"""
+Push Notification Fan-out
+
+Follow, like, comment and message notifications used to call a logging
+stub once per event. They now go through a dispatcher that delivers them
+to every device a user registered:
+
+- Registry: device_tokens holds one row per provider token, looked up for
+  a whole flush with one query (tokens_for_users). Devices register
+  through POST /api/notifications/devices; a token registered again under
+  another account moves to it, and each user keeps their
+  PUSH_MAX_DEVICES_PER_USER most recently seen tokens.
+- Coalescing: submit() only buffers. The first notification for an idle
+  dispatcher starts a PUSH_COALESCE_SECONDS window; everything a user
+  receives within it becomes one push ("5 new likes") instead of five.
+- Multicast: users whose coalesced push is identical share a payload, and
+  each payload is sent in batches of up to PUSH_MULTICAST_LIMIT tokens,
+  PUSH_CONCURRENCY batches at a time. FCM HTTP v1 takes one token per
+  message, so a batch is sent as one request per token over a shared
+  connection pool, PUSH_HTTP_CONCURRENCY requests in flight.
+- Auth: an OAuth2 access token for the Firebase service account
+  (FIREBASE_CREDENTIALS_PATH), refreshed off the event loop shortly
+  before it expires and once more if FCM answers 401.
+- Feedback: tokens FCM reports as UNREGISTERED, INVALID_ARGUMENT or
+  SENDER_ID_MISMATCH are deleted, and UNAVAILABLE / INTERNAL /
+  QUOTA_EXCEEDED tokens (429 and 5xx) are retried with backoff honouring
+  Retry-After.
+
+Pushes are best effort: nothing is persisted before delivery, and a
+dispatcher without a provider (no FIREBASE_CREDENTIALS_PATH) counts and
+drops them.
+
+Configuration (environment variables):
+    FIREBASE_CREDENTIALS_PATH Service account JSON; push is disabled when unset
+    FCM_PROJECT_ID            Firebase project (default: the service account's)
+    PUSH_PROVIDER_URL         Send endpoint (default: FCM HTTP v1 for the project)
+    PUSH_COALESCE_SECONDS     Window merging a user's notifications (default: 3)
+    PUSH_MULTICAST_LIMIT      Tokens per batch (default: 500)
+    PUSH_CONCURRENCY          Batches in flight (default: 4)
+    PUSH_HTTP_CONCURRENCY     FCM requests in flight (default: 100)
+    PUSH_MAX_PENDING          Buffered notifications before new ones are dropped (default: 10000)
+    PUSH_MAX_DEVICES_PER_USER Tokens kept per user (default: 10)
+
+Usage:
+    from app.core.push import push_dispatcher
+
+    push_dispatcher.submit(user_id, "New Like", "Ann liked your post", "like", {"post_id": 7})
+"""
+import asyncio
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import DeviceToken
+
+logger = logging.getLogger(__name__)
+
+FIREBASE_CREDENTIALS_PATH = os.getenv("FIREBASE_CREDENTIALS_PATH", "")
+FCM_PROJECT_ID = os.getenv("FCM_PROJECT_ID", "")
+PUSH_PROVIDER_URL = os.getenv("PUSH_PROVIDER_URL", "")
+PUSH_COALESCE_SECONDS = float(os.getenv("PUSH_COALESCE_SECONDS", "3"))
+PUSH_MULTICAST_LIMIT = int(os.getenv("PUSH_MULTICAST_LIMIT", "500"))
+PUSH_CONCURRENCY = int(os.getenv("PUSH_CONCURRENCY", "4"))
+PUSH_HTTP_CONCURRENCY = int(os.getenv("PUSH_HTTP_CONCURRENCY", "100"))
+PUSH_MAX_PENDING = int(os.getenv("PUSH_MAX_PENDING", "10000"))
+PUSH_MAX_DEVICES_PER_USER = int(os.getenv("PUSH_MAX_DEVICES_PER_USER", "10"))
+
+PUSH_MAX_ATTEMPTS = 3
+PUSH_TIMEOUT_SECONDS = 10.0
+MAX_BACKOFF_SECONDS = 30.0
+
+FCM_SEND_URL = "https://fcm.googleapis.com/v1/projects/{project_id}/messages:send"
+FCM_SCOPE = "https://www.googleapis.com/auth/firebase.messaging"
+# Refresh the access token this long before it expires
+TOKEN_REFRESH_MARGIN_SECONDS = 300
+
+# FCM v1 error codes meaning the token will never work again
+INVALID_TOKEN_ERRORS = frozenset({"UNREGISTERED", "INVALID_ARGUMENT", "SENDER_ID_MISMATCH"})
+RETRYABLE_ERRORS = frozenset({"UNAVAILABLE", "INTERNAL", "QUOTA_EXCEEDED"})
+
+# Titles for several coalesced notifications of one type
+_SUMMARY_TITLES = {
+    "follow": "{count} new followers",
+    "like": "{count} new likes",
+    "comment": "{count} new comments",
+    "message": "{count} new messages",
+}
+
+
+# =============================================================================
+# DEVICE REGISTRY
+# =============================================================================
+
+async def register_device(db: AsyncSession, user_id: int, token: str, platform: str = "android") -> None:
+    """Register (or refresh) a device token for a user and commit"""
+    values = {"user_id": user_id, "platform": platform, "last_seen_at": func.now()}
+    result = await db.execute(update(DeviceToken).where(DeviceToken.token == token).values(**values))
+    if not result.rowcount:
+        db.add(DeviceToken(user_id=user_id, token=token, platform=platform))
+        try:
+            await db.flush()
+        except IntegrityError:
+            # Registered concurrently by another request
+            await db.rollback()
+            await db.execute(update(DeviceToken).where(DeviceToken.token == token).values(**values))
+
+    # Keep only the most recently seen devices
+    stale = (
+        select(DeviceToken.id)
+        .where(DeviceToken.user_id == user_id)
+        .order_by(DeviceToken.last_seen_at.desc(), DeviceToken.id.desc())
+        .offset(PUSH_MAX_DEVICES_PER_USER)
+    )
+    stale_ids = (await db.execute(stale)).scalars().all()
+    if stale_ids:
+        await db.execute(delete(DeviceToken).where(DeviceToken.id.in_(stale_ids)))
+    await db.commit()
+
+
+async def unregister_device(db: AsyncSession, user_id: int, token: str) -> bool:
+    """Remove one of a user's tokens and commit; False when it was not registered"""
+    result = await db.execute(
+        delete(DeviceToken).where(DeviceToken.user_id == user_id, DeviceToken.token == token)
+    )
+    await db.commit()
+    return bool(result.rowcount)
+
+
+async def tokens_for_users(db: AsyncSession, user_ids: Iterable[int]) -> Dict[int, List[str]]:
+    """Device tokens for many users in one query"""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+    result = await db.execute(
+        select(DeviceToken.user_id, DeviceToken.token)
+        .where(DeviceToken.user_id.in_(user_ids))
+        .order_by(DeviceToken.id)
+    )
+    tokens: Dict[int, List[str]] = {}
+    for user_id, token in result.all():
+        tokens.setdefault(user_id, []).append(token)
+    return tokens
+
+
+async def apply_feedback(db: AsyncSession, invalid: Iterable[str]) -> int:
+    """Delete tokens the provider reported as invalid; returns the tokens removed"""
+    invalid = list(set(invalid))
+    removed = 0
+    if invalid:
+        result = await db.execute(delete(DeviceToken).where(DeviceToken.token.in_(invalid)))
+        removed = result.rowcount or 0
+    await db.commit()
+    return removed
+
+
+# =============================================================================
+# PROVIDER
+# =============================================================================
+
+class PushNotification(NamedTuple):
+    title: str
+    body: str
+    notification_type: str
+    data: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class MulticastResult:
+    """Per-token outcome of one batch"""
+    sent: int = 0
+    failed: int = 0
+    invalid: List[str] = field(default_factory=list)
+    retry: List[str] = field(default_factory=list)
+    retry_after: float = 0.0
+
+
+def _retry_after(headers) -> float:
+    try:
+        return max(float(headers.get("Retry-After", 0)), 0.0)
+    except ValueError:
+        return 0.0
+
+
+def _error_code(response) -> str:
+    """FCM error code (UNREGISTERED, ...) from a v1 error response"""
+    try:
+        error = response.json().get("error", {})
+    except ValueError:
+        return ""
+    for detail in error.get("details", []):
+        if detail.get("errorCode"):
+            return detail["errorCode"]
+    return error.get("status", "")
+
+
+def load_credentials(path: str = FIREBASE_CREDENTIALS_PATH):
+    """Service account credentials scoped for FCM"""
+    from google.oauth2 import service_account
+
+    return service_account.Credentials.from_service_account_file(path, scopes=[FCM_SCOPE])
+
+
+class FCMProvider:
+    """Firebase Cloud Messaging HTTP v1 (one message per token)
+
+    ``credentials`` is a google-auth credentials object (``token``,
+    ``expiry``, ``refresh(request)``); refreshing does blocking I/O, so it
+    runs in a thread.
+    """
+
+    def __init__(
+        self,
+        credentials,
+        project_id: str = FCM_PROJECT_ID,
+        url: str = PUSH_PROVIDER_URL,
+        limit: int = PUSH_MULTICAST_LIMIT,
+        concurrency: int = PUSH_HTTP_CONCURRENCY,
+        timeout: float = PUSH_TIMEOUT_SECONDS,
+    ):
+        self.credentials = credentials
+        project_id = project_id or getattr(credentials, "project_id", "")
+        self.url = url or FCM_SEND_URL.format(project_id=project_id)
+        self.limit = limit
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self._client = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._token_lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _bind_loop(self) -> None:
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Loop-bound primitives and the connection pool belong to one loop
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._token_lock = asyncio.Lock()
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+            )
+
+    def _token_fresh(self) -> bool:
+        if not self.credentials.token:
+            return False
+        expiry = getattr(self.credentials, "expiry", None)
+        if expiry is None:
+            return True
+        remaining = expiry - datetime.now(timezone.utc).replace(tzinfo=expiry.tzinfo)
+        return remaining.total_seconds() > TOKEN_REFRESH_MARGIN_SECONDS
+
+    async def _access_token(self, stale: Optional[str] = None) -> str:
+        """Current access token, refreshed when near expiry or when ``stale`` was rejected"""
+        async with self._token_lock:
+            if not self._token_fresh() or (stale is not None and self.credentials.token == stale):
+                from google.auth.transport.requests import Request
+
+                await asyncio.to_thread(self.credentials.refresh, Request())
+            return self.credentials.token
+
+    def _message(self, token: str, notification: PushNotification) -> Dict[str, Any]:
+        data = {key: str(value) for key, value in (notification.data or {}).items()}
+        data["type"] = notification.notification_type
+        # A newer push of the same type replaces an undelivered one on the device
+        collapse = notification.notification_type
+        return {
+            "message": {
+                "token": token,
+                "notification": {"title": notification.title, "body": notification.body},
+                "data": data,
+                "android": {"collapse_key": collapse},
+                "apns": {"headers": {"apns-collapse-id": collapse}},
+            }
+        }
+
+    async def _send_one(self, token: str, notification: PushNotification):
+        """Send to one device; returns (outcome, retry_after)"""
+        import httpx
+
+        async with self._semaphore:
+            access_token = await self._access_token()
+            for attempt in range(2):
+                try:
+                    response = await self._client.post(
+                        self.url,
+                        json=self._message(token, notification),
+                        headers={"Authorization": f"Bearer {access_token}"},
+                    )
+                except httpx.HTTPError as e:
+                    logger.warning(f"Push provider request failed: {e}")
+                    return "retry", 0.0
+                if response.status_code == 401 and attempt == 0:
+                    access_token = await self._access_token(stale=access_token)
+                    continue
+                break
+
+        if response.status_code == 200:
+            return "sent", 0.0
+        code = _error_code(response)
+        if code in INVALID_TOKEN_ERRORS:
+            return "invalid", 0.0
+        if code in RETRYABLE_ERRORS or response.status_code == 429 or response.status_code >= 500:
+            return "retry", _retry_after(response.headers)
+        logger.error(f"Push provider rejected message: HTTP {response.status_code} {response.text[:200]}")
+        return "failed", 0.0
+
+    async def send_multicast(self, tokens: List[str], notification: PushNotification) -> MulticastResult:
+        """Send one notification to every token concurrently"""
+        self._bind_loop()
+        outcomes = await asyncio.gather(*(self._send_one(token, notification) for token in tokens))
+        result = MulticastResult()
+        for token, (outcome, retry_after) in zip(tokens, outcomes):
+            if outcome == "sent":
+                result.sent += 1
+            elif outcome == "invalid":
+                result.invalid.append(token)
+            elif outcome == "retry":
+                result.retry.append(token)
+                result.retry_after = max(result.retry_after, retry_after)
+            else:
+                result.failed += 1
+        return result
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
+
+
+# =============================================================================
+# DISPATCHER
+# =============================================================================
+
+def coalesce(notifications: List[PushNotification]) -> PushNotification:
+    """Merge one user's notifications from a window into a single push"""
+    latest = notifications[-1]
+    if len(notifications) == 1:
+        return latest
+    count = len(notifications)
+    types = {n.notification_type for n in notifications}
+    if len(types) == 1 and latest.notification_type in _SUMMARY_TITLES:
+        title = _SUMMARY_TITLES[latest.notification_type].format(count=count)
+        notification_type = latest.notification_type
+    else:
+        title = f"{count} new notifications"
+        notification_type = "summary"
+    # The latest notification's body and deep link stand for the group
+    data = dict(latest.data or {})
+    data["count"] = count
+    return PushNotification(title, latest.body, notification_type, data)
+
+
+class PushDispatcher:
+    """Buffers notifications per user and fans them out in multicast batches"""
+
+    def __init__(
+        self,
+        provider=None,
+        coalesce_seconds: float = PUSH_COALESCE_SECONDS,
+        max_pending: int = PUSH_MAX_PENDING,
+        concurrency: int = PUSH_CONCURRENCY,
+        max_attempts: int = PUSH_MAX_ATTEMPTS,
+        retry_seconds: float = 1.0,
+        session_factory=None,
+    ):
+        self.provider = provider
+        self.coalesce_seconds = coalesce_seconds
+        self.max_pending = max_pending
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.retry_seconds = retry_seconds
+        self._session_factory = session_factory
+        self._pending: Dict[int, List[PushNotification]] = {}
+        self._pending_count = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self.submitted = 0
+        self.dropped = 0
+        self.disabled = 0
+        self.pushes = 0
+        self.requests = 0
+        self.sent = 0
+        self.failed = 0
+        self.no_devices = 0
+        self.tokens_removed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.provider is not None
+
+    # -- producers ------------------------------------------------------
+
+    def submit(
+        self,
+        user_id: int,
+        title: str,
+        body: str,
+        notification_type: str,
+        data: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        """Buffer a notification for the next window; False when dropped"""
+        if not self.enabled:
+            self.disabled += 1
+            return False
+        if self._pending_count >= self.max_pending:
+            self.dropped += 1
+            return False
+        self._pending.setdefault(user_id, []).append(PushNotification(title, body, notification_type, data))
+        self._pending_count += 1
+        self.submitted += 1
+        self._ensure_flusher()
+        if self._wake is not None:
+            self._wake.set()
+        return True
+
+    # -- flusher ----------------------------------------------------------
+
+    def _bind_loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return None  # sync caller: delivered by the next flush on a loop
+        if loop is not self._loop:
+            # First use, or a new loop (fork, test) - loop-bound primitives are recreated
+            self._loop = loop
+            self._task = None
+            self._wake = asyncio.Event()
+            self._lock = asyncio.Lock()
+        return loop
+
+    def _ensure_flusher(self) -> None:
+        loop = self._bind_loop()
+        if loop is not None and (self._task is None or self._task.done()):
+            self._task = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await self._wake.wait()
+            # The window starts with the first notification after an idle period
+            await asyncio.sleep(self.coalesce_seconds)
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Push flush failed: {e}", exc_info=True)
+
+    async def flush(self) -> int:
+        """Deliver everything buffered now; returns the devices reached"""
+        self._bind_loop()
+        async with self._lock:
+            pending, self._pending, self._pending_count = self._pending, {}, 0
+            if not pending or not self.enabled:
+                return 0
+
+            if self._session_factory is None:
+                from app.database import AsyncSessionLocal
+                self._session_factory = AsyncSessionLocal
+            try:
+                async with self._session_factory() as db:
+                    tokens = await tokens_for_users(db, pending)
+            except Exception as e:
+                self.failed += sum(len(items) for items in pending.values())
+                logger.warning(f"Push token lookup failed, dropping {len(pending)} users' notifications: {e}")
+                return 0
+
+            # Users with identical pushes share one payload
+            groups: Dict[str, tuple] = {}
+            for user_id, items in pending.items():
+                user_tokens = tokens.get(user_id)
+                if not user_tokens:
+                    self.no_devices += len(items)
+                    continue
+                push = coalesce(items)
+                self.pushes += 1
+                key = json.dumps(push, sort_keys=True, default=str)
+                groups.setdefault(key, (push, []))[1].extend(user_tokens)
+
+            limit = self.provider.limit
+            batches = [
+                (push, group_tokens[start:start + limit])
+                for push, group_tokens in groups.values()
+                for start in range(0, len(group_tokens), limit)
+            ]
+            semaphore = asyncio.Semaphore(self.concurrency)
+
+            async def send(push, batch):
+                async with semaphore:
+                    return await self._send(push, batch)
+
+            results = await asyncio.gather(*(send(push, batch) for push, batch in batches))
+
+            invalid = [token for result in results for token in result.invalid]
+            if invalid:
+                try:
+                    async with self._session_factory() as db:
+                        self.tokens_removed += await apply_feedback(db, invalid)
+                except Exception as e:
+                    logger.warning(f"Could not apply push token feedback: {e}")
+            return sum(result.sent for result in results)
+
+    async def _send(self, push: PushNotification, tokens: List[str]) -> MulticastResult:
+        """One multicast batch, retrying tokens the provider could not take yet"""
+        total = MulticastResult()
+        for attempt in range(self.max_attempts):
+            self.requests += 1
+            try:
+                result = await self.provider.send_multicast(tokens, push)
+            except Exception as e:
+                logger.warning(f"Push multicast to {len(tokens)} devices failed: {e}")
+                result = MulticastResult(retry=list(tokens))
+            total.sent += result.sent
+            total.failed += result.failed
+            total.invalid.extend(result.invalid)
+            tokens = result.retry
+            if not tokens or attempt + 1 == self.max_attempts:
+                break
+            await asyncio.sleep(max(result.retry_after, min(self.retry_seconds * 2 ** attempt, MAX_BACKOFF_SECONDS)))
+        total.failed += len(tokens)
+        self.sent += total.sent
+        self.failed += total.failed
+        return total
+
+    async def close(self) -> None:
+        """Stop the flusher, deliver what is buffered and release the provider"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        await self.flush()
+        if self.provider is not None and hasattr(self.provider, "aclose"):
+            await self.provider.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "running": self._task is not None and not self._task.done(),
+            "pending": self._pending_count,
+            "submitted": self.submitted,
+            "dropped": self.dropped,
+            "disabled": self.disabled,
+            "pushes": self.pushes,
+            "requests": self.requests,
+            "sent": self.sent,
+            "failed": self.failed,
+            "no_devices": self.no_devices,
+            "tokens_removed": self.tokens_removed,
+        }
+
+
+def _default_provider() -> Optional[FCMProvider]:
+    if not FIREBASE_CREDENTIALS_PATH:
+        return None
+    try:
+        return FCMProvider(load_credentials())
+    except Exception as e:
+        logger.error(f"Push disabled, could not load {FIREBASE_CREDENTIALS_PATH}: {e}")
+        return None
+
+
+push_dispatcher = PushDispatcher(_default_provider())
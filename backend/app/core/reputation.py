@@ -0,0 +1,284 @@
+"""
+Reputation Aggregates
+
+Average rating, review count and star histogram for reviewees without
+aggregating reviews on every profile view, and for a whole page of users
+at once.
+
+Aggregates:
+- Kept in user_reputation, one row per reviewee: review_count,
+  rating_sum, one_star..five_star and a smoothed score.
+- record_review / record_review_deleted / record_rating_change adjust the
+  row in the same transaction as the review write, so they commit or roll
+  back together. Call them after the review change is flushed.
+- The adjustment is one INSERT ... SELECT ... ON CONFLICT DO UPDATE: an
+  existing row is incremented; a missing row is created from a full
+  recount of the reviewee's reviews (which already includes the flushed
+  change), so it never starts from a partial count.
+- Users without a row are counted from reviews on read with one grouped
+  query for the page; reconcile_reputation creates missing rows and fixes
+  drift in batches, once per boot from the background bootstrap.
+
+Score (for ranking):
+- Bayesian average (C * m + sum) / (C + n) with prior mean m =
+  REPUTATION_PRIOR_MEAN and weight C = REPUTATION_PRIOR_WEIGHT: a user
+  with one 5-star review ranks below one with forty 4.8s. Stored and
+  indexed so lists can ORDER BY user_reputation.score.
+
+Usage:
+    from app.core.reputation import get_reputations, record_review
+
+    ratings = await get_reputations(db, [u.id for u in users])  # {user_id: Reputation}
+
+    db.add(review)
+    await db.flush()
+    await record_review(db, review.reviewee_id, review.rating)
+    await db.commit()
+"""
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Integer, func, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Review, User, UserReputation
+
+logger = logging.getLogger(__name__)
+
+REPUTATION_PRIOR_MEAN = float(os.getenv("REPUTATION_PRIOR_MEAN", "3.5"))
+REPUTATION_PRIOR_WEIGHT = float(os.getenv("REPUTATION_PRIOR_WEIGHT", "5"))
+
+RECONCILE_BATCH_SIZE = int(os.getenv("REPUTATION_RECONCILE_BATCH", "1000"))
+
+# Histogram columns by star rating
+STAR_COLUMNS = ("one_star", "two_star", "three_star", "four_star", "five_star")
+
+
+def bayesian_score(count, total):
+    """Smoothed rating; works on numbers and on column expressions"""
+    return (REPUTATION_PRIOR_WEIGHT * REPUTATION_PRIOR_MEAN + total) / (REPUTATION_PRIOR_WEIGHT + count)
+
+
+@dataclass
+class Reputation:
+    count: int = 0
+    total: int = 0
+    stars: Tuple[int, int, int, int, int] = (0, 0, 0, 0, 0)  # 1..5
+
+    @property
+    def average(self) -> Optional[float]:
+        return round(self.total / self.count, 2) if self.count else None
+
+    @property
+    def score(self) -> float:
+        return round(bayesian_score(self.count, self.total), 4)
+
+    def summary(self) -> Dict[str, Any]:
+        """Compact form attached to users in lists"""
+        return {"average_rating": self.average, "total_reviews": self.count}
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "average_rating": self.average,
+            "total_reviews": self.count,
+            "score": self.score,
+            "rating_breakdown": {str(star): self.stars[star - 1] for star in range(5, 0, -1)},
+        }
+
+
+# =============================================================================
+# LOOKUPS
+# =============================================================================
+
+
+def _unique(user_ids: Iterable[int]) -> List[int]:
+    return list(dict.fromkeys(user_ids))
+
+
+async def count_from_source(db: AsyncSession, user_ids: List[int]) -> Dict[int, Reputation]:
+    """Aggregate reviews for a batch of users in one grouped query"""
+    histograms = {user_id: [0] * 5 for user_id in user_ids}
+    if user_ids:
+        result = await db.execute(
+            select(Review.reviewee_id, Review.rating, func.count())
+            .where(Review.reviewee_id.in_(user_ids))
+            .group_by(Review.reviewee_id, Review.rating)
+        )
+        for user_id, rating, count in result.all():
+            if 1 <= rating <= 5:
+                histograms[user_id][rating - 1] = count
+    return {
+        user_id: Reputation(
+            count=sum(stars),
+            total=sum(star * count for star, count in enumerate(stars, 1)),
+            stars=tuple(stars),
+        )
+        for user_id, stars in histograms.items()
+    }
+
+
+def _stored_columns():
+    return (
+        UserReputation.user_id,
+        UserReputation.review_count,
+        UserReputation.rating_sum,
+        *(getattr(UserReputation, column) for column in STAR_COLUMNS),
+    )
+
+
+def _from_row(row) -> Reputation:
+    return Reputation(count=row[1], total=row[2], stars=tuple(row[3:8]))
+
+
+async def get_reputations(db: AsyncSession, user_ids: Iterable[int]) -> Dict[int, Reputation]:
+    """Reputation for every user on a page: one query for users with a row"""
+    user_ids = _unique(user_ids)
+    if not user_ids:
+        return {}
+    result = await db.execute(select(*_stored_columns()).where(UserReputation.user_id.in_(user_ids)))
+    reputations = {row[0]: _from_row(row) for row in result.all()}
+    missing = [user_id for user_id in user_ids if user_id not in reputations]
+    if missing:
+        reputations.update(await count_from_source(db, missing))
+    return reputations
+
+
+async def get_reputation(db: AsyncSession, user_id: int) -> Reputation:
+    return (await get_reputations(db, [user_id]))[user_id]
+
+
+async def attach_ratings(db: AsyncSession, users: List[Dict[str, Any]], key: str = "id") -> List[Dict[str, Any]]:
+    """Add average_rating / total_reviews to a page of user dicts in one lookup"""
+    reputations = await get_reputations(db, (user[key] for user in users))
+    for user in users:
+        user.update(reputations[user[key]].summary())
+    return users
+
+
+# =============================================================================
+# WRITES
+# =============================================================================
+
+
+def _insert(db: AsyncSession):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"reputation aggregates do not support {dialect}")
+    return insert(UserReputation)
+
+
+async def _adjust(db: AsyncSession, user_id: int, star_deltas: Dict[int, int]) -> None:
+    count_delta = sum(star_deltas.values())
+    sum_delta = sum(star * delta for star, delta in star_deltas.items())
+
+    # A new row is the full recount, which already includes the flushed change
+    star_counts = [
+        func.count().filter(Review.rating == star)
+        for star in range(1, 6)
+    ]
+    count = func.count(Review.id)
+    total = func.coalesce(func.sum(Review.rating), 0)
+    recount = select(
+        literal(user_id, Integer),
+        count,
+        total,
+        *star_counts,
+        bayesian_score(count, total),
+    ).where(Review.reviewee_id == user_id)
+    columns = ["user_id", "review_count", "rating_sum", *STAR_COLUMNS, "score"]
+    stmt = _insert(db).from_select(columns, recount)
+
+    # An existing row is incremented
+    new_count = UserReputation.review_count + count_delta
+    new_total = UserReputation.rating_sum + sum_delta
+    set_ = {
+        "review_count": new_count,
+        "rating_sum": new_total,
+        "score": bayesian_score(new_count, new_total),
+        "updated_at": func.now(),
+    }
+    for star, delta in star_deltas.items():
+        if delta:
+            column = STAR_COLUMNS[star - 1]
+            set_[column] = getattr(UserReputation, column) + delta
+    await db.execute(stmt.on_conflict_do_update(index_elements=[UserReputation.user_id], set_=set_))
+
+
+async def record_review(db: AsyncSession, reviewee_id: int, rating: int) -> None:
+    """Count a new review; call after flushing it, in the same transaction"""
+    await _adjust(db, reviewee_id, {rating: 1})
+
+
+async def record_review_deleted(db: AsyncSession, reviewee_id: int, rating: int) -> None:
+    """Uncount a deleted review; call after flushing the delete"""
+    await _adjust(db, reviewee_id, {rating: -1})
+
+
+async def record_rating_change(db: AsyncSession, reviewee_id: int, old_rating: int, new_rating: int) -> None:
+    """Move a review between histogram buckets; call after flushing the update"""
+    if old_rating != new_rating:
+        await _adjust(db, reviewee_id, {old_rating: -1, new_rating: 1})
+
+
+# =============================================================================
+# RECONCILIATION
+# =============================================================================
+
+
+async def reconcile_reputation(db: AsyncSession, batch_size: int = RECONCILE_BATCH_SIZE) -> Dict[str, int]:
+    """Recount every user from reviews; write missing or drifted rows"""
+    started = time.perf_counter()
+    checked = written = 0
+    last_id = 0
+    while True:
+        user_ids = list((await db.execute(
+            select(User.id).where(User.id > last_id).order_by(User.id).limit(batch_size)
+        )).scalars())
+        if not user_ids:
+            break
+        last_id = user_ids[-1]
+        actual = await count_from_source(db, user_ids)
+        stored = (await db.execute(
+            select(*_stored_columns(), UserReputation.score).where(UserReputation.user_id.in_(user_ids))
+        )).all()
+        # A changed prior also counts as drift: the stored score is rewritten
+        stored = {row[0]: (_from_row(row), round(row[8], 4)) for row in stored}
+        rows = [
+            {
+                "user_id": user_id,
+                "review_count": reputation.count,
+                "rating_sum": reputation.total,
+                **dict(zip(STAR_COLUMNS, reputation.stars)),
+                "score": reputation.score,
+            }
+            for user_id, reputation in actual.items()
+            if stored.get(user_id) != (reputation, reputation.score)
+        ]
+        if rows:
+            stmt = _insert(db).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[UserReputation.user_id],
+                set_={
+                    **{
+                        column: getattr(stmt.excluded, column)
+                        for column in ("review_count", "rating_sum", *STAR_COLUMNS, "score")
+                    },
+                    "updated_at": func.now(),
+                },
+            )
+            await db.execute(stmt)
+            await db.commit()
+        checked += len(user_ids)
+        written += len(rows)
+    logger.info(
+        f"Reputation reconciled: {checked} users, {written} rows written in "
+        f"{(time.perf_counter() - started) * 1000:.1f}ms"
+    )
+    return {"users": checked, "written": written}
@@ -0,0 +1,344 @@
+"""
+Non-Blocking Request Logging
+
+Formatting a log line and writing it to stdout on the request path costs a
+syscall per line, and under bursts the pipe to the log collector fills and
+every worker blocks on ``write()``. This module moves both off the request:
+
+- LogPipeline: a bounded in-memory queue (``collections.deque``; appends
+  take no lock) drained by one background writer thread. The writer
+  formats records and writes each batch to every sink with a single
+  ``write()`` and ``flush()``. When the queue is full the record is dropped
+  and counted instead of blocking the caller.
+- QueueLogHandler: a ``logging.Handler`` that only enqueues the LogRecord;
+  formatting (including tracebacks) happens on the writer thread.
+- Pre-serialized records: ``str`` items are written verbatim and ``dict``
+  items are serialized to one JSON line by the writer.
+- RequestSampler: per-route sampling (1 in N) for high-volume health and
+  probe endpoints; errors (status >= 400) and slow requests are always
+  logged.
+- stats(): queued, written, dropped and sampled-out counters plus the
+  current queue depth, for the metrics endpoints.
+
+Configuration:
+    REQUEST_LOG_QUEUE_SIZE: Records buffered before dropping (default: 10000)
+    REQUEST_LOG_BATCH_SIZE: Records per write (default: 256)
+    REQUEST_LOG_FLUSH_SECONDS: Longest a record waits in the queue (default: 0.5)
+    REQUEST_LOG_SAMPLE_RATES: ``path=rate`` pairs, comma-separated, merged
+        over the probe defaults (e.g. ``/live=0,/api/jobs=0.1``)
+    REQUEST_LOG_SLOW_MS: Requests at least this slow are always logged (default: 1000)
+
+Only the standard library is used, so the Flask monolith can share it.
+
+Usage:
+    from app.core.request_log import install, request_logger
+
+    install([logging.StreamHandler()])       # root logger -> queue -> writer thread
+    request_logger.log("GET", "/api/jobs", 200, 12.5, request_id="ab12")
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+QUEUE_SIZE = int(os.getenv("REQUEST_LOG_QUEUE_SIZE", "10000"))
+BATCH_SIZE = int(os.getenv("REQUEST_LOG_BATCH_SIZE", "256"))
+FLUSH_SECONDS = float(os.getenv("REQUEST_LOG_FLUSH_SECONDS", "0.5"))
+SLOW_MS = float(os.getenv("REQUEST_LOG_SLOW_MS", "1000"))
+
+# Load balancer and uptime probes hit these every few seconds
+PROBE_SAMPLE_RATES = {
+    "/health": 0.01,
+    "/healthz": 0.01,
+    "/health/ping": 0.01,
+    "/live": 0.01,
+    "/ready": 0.01,
+    "/api/health": 0.01,
+    "/metrics": 0.01,
+}
+
+LogItem = Union[logging.LogRecord, Dict[str, Any], str]
+# (record, handlers): written to those handlers instead of the pipeline's sinks
+Routed = Tuple[logging.LogRecord, Sequence[logging.Handler]]
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """``"/live=0,/api/jobs=0.1"`` -> ``{"/live": 0.0, "/api/jobs": 0.1}``"""
+    rates = {}
+    for pair in value.split(","):
+        path, _, rate = pair.strip().partition("=")
+        if path and rate:
+            rates[path] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+class RequestSampler:
+    """Decides per request whether it is logged
+
+    A route with rate r logs one request in round(1 / r); rate 0 logs none.
+    Routes without a rate are always logged, and so is any request that
+    failed or took at least ``slow_ms``.
+    """
+
+    def __init__(self, rates: Optional[Dict[str, float]] = None, slow_ms: float = SLOW_MS):
+        self.slow_ms = slow_ms
+        self._every = {
+            path: (max(1, round(1 / rate)) if rate > 0 else 0)
+            for path, rate in (rates or {}).items()
+            if rate < 1
+        }
+        self._seen: Dict[str, int] = {}
+        self.sampled_out = 0
+
+    @classmethod
+    def from_env(cls, slow_ms: float = SLOW_MS) -> "RequestSampler":
+        rates = dict(PROBE_SAMPLE_RATES)
+        rates.update(parse_sample_rates(os.getenv("REQUEST_LOG_SAMPLE_RATES", "")))
+        return cls(rates, slow_ms)
+
+    def should_log(self, path: str, status: int, duration_ms: float) -> bool:
+        every = self._every.get(path)
+        if every is None or status >= 400 or duration_ms >= self.slow_ms:
+            return True
+        seen = self._seen.get(path, 0)
+        self._seen[path] = seen + 1
+        if every and seen % every == 0:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class LogPipeline:
+    """Bounded queue of log items written in batches by a background thread"""
+
+    def __init__(
+        self,
+        sinks: Optional[Iterable[logging.Handler]] = None,
+        capacity: int = QUEUE_SIZE,
+        batch_size: int = BATCH_SIZE,
+        flush_seconds: float = FLUSH_SECONDS,
+    ):
+        self.sinks: List[logging.Handler] = list(sinks or [])
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._queue: deque = deque()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self.queued = 0
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self.errors = 0
+
+    # -- producers (request threads) ------------------------------------
+
+    def submit(self, item: Union[LogItem, Routed]) -> bool:
+        """Enqueue without blocking; False (and counted) when the queue is full"""
+        if len(self._queue) >= self.capacity:
+            self.dropped += 1
+            return False
+        self._queue.append(item)
+        self.queued += 1
+        # Only wake the writer for a full batch; otherwise it wakes on its timer
+        if len(self._queue) >= self.batch_size:
+            self._wake.set()
+        return True
+
+    # -- writer thread -------------------------------------------------
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> "LogPipeline":
+        if not self.running:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="request-log-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the writer after it has written everything queued"""
+        if self.running:
+            self._stopping = True
+            self._wake.set()
+            self._thread.join(timeout)
+        self.flush()
+
+    def after_fork(self) -> None:
+        """Restart the writer in a forked child (threads do not survive fork)"""
+        was_running = self._thread is not None
+        self._thread = None
+        self._wake = threading.Event()
+        if was_running:
+            self.start()
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """Write everything queued now, in batches; returns the records written"""
+        total = 0
+        while self._queue:
+            batch = []
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self._queue.popleft())
+            except IndexError:  # drained, possibly by a concurrent flush
+                pass
+            if batch:
+                self._write(batch)
+            total += len(batch)
+        return total
+
+    def _write(self, batch: List[LogItem]) -> None:
+        self.batches += 1
+        self.written += len(batch)
+        # Items routed by a QueueLogHandler with its own targets skip the sinks
+        per_sink: Dict[int, Tuple[logging.Handler, List[LogItem]]] = {}
+        for item in batch:
+            targets = self.sinks
+            if isinstance(item, tuple):
+                item, targets = item
+            for sink in targets:
+                per_sink.setdefault(id(sink), (sink, []))[1].append(item)
+        for sink, items in per_sink.values():
+            try:
+                if isinstance(sink, logging.StreamHandler):
+                    text = "".join(self._render(sink, item) for item in items)
+                    if text:
+                        with sink.lock:
+                            sink.stream.write(text)
+                            sink.flush()
+                else:
+                    for item in items:
+                        sink.handle(item if isinstance(item, logging.LogRecord) else _as_record(item))
+            except Exception:
+                self.errors += 1
+
+    @staticmethod
+    def _render(sink: logging.StreamHandler, item: LogItem) -> str:
+        if isinstance(item, logging.LogRecord):
+            if item.levelno < sink.level or not sink.filter(item):
+                return ""
+            return sink.format(item) + sink.terminator
+        if isinstance(item, dict):
+            return json.dumps(item, separators=(",", ":"), default=str) + "\n"
+        return item + "\n"
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "queue_depth": len(self._queue),
+            "capacity": self.capacity,
+            "queued": self.queued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "write_errors": self.errors,
+        }
+
+
+def _as_record(item: Union[Dict[str, Any], str]) -> logging.LogRecord:
+    message = item if isinstance(item, str) else json.dumps(item, separators=(",", ":"), default=str)
+    return logging.makeLogRecord({"msg": message, "levelno": logging.INFO, "levelname": "INFO"})
+
+
+class QueueLogHandler(logging.Handler):
+    """Hands LogRecords to a LogPipeline; formatting happens on its writer thread
+
+    With ``targets`` the records go to those handlers rather than the
+    pipeline's sinks, so a logger with its own handlers can share the writer.
+    """
+
+    def __init__(
+        self,
+        pipeline: "LogPipeline",
+        level: int = logging.NOTSET,
+        targets: Optional[Sequence[logging.Handler]] = None,
+    ):
+        super().__init__(level)
+        self.pipeline = pipeline
+        self.targets = list(targets) if targets is not None else None
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        # No handler lock: LogPipeline.submit is safe to call concurrently
+        if self.filter(record):
+            self.emit(record)
+            return True
+        return False
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.pipeline.submit(record if self.targets is None else (record, self.targets))
+
+
+class RequestLogger:
+    """One structured record per request, sampled, through a LogPipeline"""
+
+    def __init__(self, pipeline: LogPipeline, sampler: RequestSampler):
+        self.pipeline = pipeline
+        self.sampler = sampler
+
+    def log(self, method: str, path: str, status: int, duration_ms: float, **fields: Any) -> bool:
+        """Queue a request record unless sampled out; True when queued"""
+        if not self.sampler.should_log(path, status, duration_ms):
+            return False
+        fields.update(
+            ts=round(time.time(), 3),
+            method=method,
+            path=path,
+            status=status,
+            duration_ms=round(duration_ms, 1),
+        )
+        if status >= 500:
+            fields["level"] = "error"
+        elif status >= 400 or duration_ms >= self.sampler.slow_ms:
+            fields["level"] = "warning"
+        return self.pipeline.submit(fields)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.pipeline.stats(), "sampled_out": self.sampler.sampled_out}
+
+
+pipeline = LogPipeline()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=pipeline.after_fork)
+request_logger = RequestLogger(pipeline, RequestSampler.from_env())
+
+
+def install(
+    handlers: Iterable[logging.Handler] = (),
+    level: int = logging.INFO,
+    logger: Optional[logging.Logger] = None,
+) -> LogPipeline:
+    """Put the shared pipeline between ``logger`` (default: root) and its output
+
+    Plain StreamHandler/FileHandler instances already attached (e.g. the
+    console handler from gunicorn's logconfig_dict) move behind the queue
+    along with ``handlers``; any other handler (test capture, custom
+    handlers) stays attached directly.
+    """
+    target = logger or logging.getLogger()
+    adopted = [h for h in target.handlers if type(h) in (logging.StreamHandler, logging.FileHandler)]
+    for handler in adopted:
+        target.removeHandler(handler)
+    pipeline.sinks = adopted + [h for h in handlers if h not in adopted]
+    if not any(isinstance(handler, QueueLogHandler) for handler in target.handlers):
+        target.addHandler(QueueLogHandler(pipeline))
+    target.setLevel(level)
+    pipeline.start()
+    return pipeline
+
+
+@atexit.register
+def _drain_on_exit() -> None:
+    pipeline.stop(timeout=2.0)
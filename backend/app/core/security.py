@@ -266,6 +266,8 @@ from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.database import get_db
+
 
 # Security scheme for JWT bearer tokens
 security = HTTPBearer()
@@ -393,21 +395,15 @@ def get_user_id_optional(
         return None
 
 
-# Import here to avoid circular imports
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: AsyncSession = Depends(None),  # Will be injected properly
+    db: AsyncSession = Depends(get_db),
 ):
     """Get current authenticated user"""
     try:
         # Import User model here to avoid circular imports
-        from app.database import get_async_session
         from app.models import User
 
-        if db is None:
-            async with get_async_session() as session:
-                db = session
-
         token = credentials.credentials
         payload = verify_token(token)
         user_id = payload.get("sub")
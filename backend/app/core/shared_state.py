@@ -0,0 +1,423 @@
+"""
+Shared state for running the API with more than one worker process.
+
+Everything that must agree across workers goes through one backend:
+
+- Counters with a TTL (login rate limiting)
+- Presence sets (which users have a live socket, on any worker)
+- Named locks (one-off jobs such as the startup bootstrap run in one worker)
+
+With Redis configured (REDIS_URL / REDIS_HOST, same variables as
+app.core.redis_cache) the Redis backend is used. The in-memory backend is
+only allowed when a single worker is configured; starting several workers
+without Redis raises SharedStateError instead of silently giving each
+worker its own limiter and presence.
+
+Worker count:
+    WEB_MULTI_WORKER=true Opt in to more than one worker (needs Redis).
+                          Without it WEB_CONCURRENCY is ignored and one
+                          worker runs, since platforms set WEB_CONCURRENCY
+                          on their own.
+    WEB_CONCURRENCY=<n>   Run exactly n workers
+    WEB_CONCURRENCY=auto  Size from CPU cores and available memory
+                          (see recommended_workers)
+
+    WORKER_MEMORY_MB          Expected resident memory per worker (default: 200)
+    WORKER_MEMORY_RESERVE_MB  Memory left for the master and OS (default: 256)
+
+Usage:
+    from app.core.shared_state import get_shared_state
+
+    state = get_shared_state()
+    attempts = await state.incr("login_attempts:1.2.3.4", ttl=900)
+"""
+import logging
+import os
+import time
+import uuid
+from typing import Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+WORKER_MEMORY_MB = int(os.getenv("WORKER_MEMORY_MB", "200"))
+WORKER_MEMORY_RESERVE_MB = int(os.getenv("WORKER_MEMORY_RESERVE_MB", "256"))
+
+KEY_PREFIX = "shared:"
+
+
+class SharedStateError(RuntimeError):
+    """Raised when the configured worker count needs a backend that is missing"""
+
+
+# =============================================================================
+# WORKER COUNT
+# =============================================================================
+
+def _read_int(path: str) -> Optional[int]:
+    try:
+        with open(path) as f:
+            value = f.read().split()[0]
+    except (OSError, IndexError):
+        return None
+    return int(value) if value.isdigit() else None
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on, honouring affinity and cgroup quotas"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            cpus = min(cpus, max(1, int(quota) // int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+def available_memory_mb() -> Optional[int]:
+    """Memory available to this container in MB, or None if unknown"""
+    limit = _read_int("/sys/fs/cgroup/memory.max")
+    available = None
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    available = int(line.split()[1]) // 1024
+                    break
+    except OSError:
+        pass
+    if limit is not None:
+        limit_mb = limit // (1024 * 1024)
+        return min(limit_mb, available) if available is not None else limit_mb
+    return available
+
+
+def recommended_workers(
+    cpus: Optional[int] = None,
+    memory_mb: Optional[int] = None,
+    per_worker_mb: int = WORKER_MEMORY_MB,
+    reserve_mb: int = WORKER_MEMORY_RESERVE_MB,
+) -> int:
+    """One async worker per core, capped by how many fit in memory
+
+    Each Uvicorn worker runs its own event loop, so more workers than cores
+    only adds context switching. Unknown memory leaves the CPU count as is.
+    """
+    if cpus is None:
+        cpus = available_cpus()
+    if memory_mb is None:
+        memory_mb = available_memory_mb()
+    workers = max(1, cpus)
+    if memory_mb is not None:
+        workers = min(workers, (memory_mb - reserve_mb) // per_worker_mb)
+    return max(1, workers)
+
+
+def configured_workers() -> int:
+    """Worker count from WEB_CONCURRENCY ("auto" uses recommended_workers)
+
+    Always 1 unless WEB_MULTI_WORKER=true.
+    """
+    value = os.getenv("WEB_CONCURRENCY", "1").strip().lower()
+    if value == "auto":
+        workers = recommended_workers()
+    else:
+        try:
+            workers = max(1, int(value))
+        except ValueError:
+            logger.warning(f"Invalid WEB_CONCURRENCY={value!r}, using 1 worker")
+            return 1
+    if workers > 1 and os.getenv("WEB_MULTI_WORKER", "false").lower() != "true":
+        logger.warning(
+            f"WEB_CONCURRENCY={value} ignored, running 1 worker; "
+            "set WEB_MULTI_WORKER=true (with REDIS_URL) for several"
+        )
+        return 1
+    return workers
+
+
+# =============================================================================
+# BACKENDS
+# =============================================================================
+
+class MemoryStateBackend:
+    """Process-local state, valid only when a single worker serves traffic"""
+
+    name = "memory"
+
+    def __init__(self):
+        self._values: Dict[str, Tuple[int, float]] = {}
+        self._sets: Dict[str, Set[str]] = {}
+        self._locks: Dict[str, Tuple[str, float]] = {}
+
+    def _live(self, key: str) -> Optional[int]:
+        entry = self._values.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._values[key]
+            return None
+        return value
+
+    async def incr(self, key: str, ttl: int) -> int:
+        value = (self._live(key) or 0) + 1
+        self._values[key] = (value, time.monotonic() + ttl)
+        return value
+
+    async def get_int(self, key: str) -> int:
+        return self._live(key) or 0
+
+    async def delete(self, key: str) -> None:
+        self._values.pop(key, None)
+
+    async def presence_add(self, group: str, member: str, token: str) -> bool:
+        tokens = self._sets.setdefault(f"{group}:{member}", set())
+        first = not tokens
+        tokens.add(token)
+        self._sets.setdefault(group, set()).add(member)
+        return first
+
+    async def presence_remove(self, group: str, member: str, token: str) -> bool:
+        tokens = self._sets.get(f"{group}:{member}")
+        if not tokens:
+            return False
+        tokens.discard(token)
+        if tokens:
+            return False
+        self._sets.pop(f"{group}:{member}", None)
+        self._sets.get(group, set()).discard(member)
+        return True
+
+    async def presence_members(self, group: str) -> List[str]:
+        return sorted(self._sets.get(group, set()))
+
+    async def presence_contains(self, group: str, member: str) -> bool:
+        return member in self._sets.get(group, set())
+
+    async def acquire_lock(self, name: str, owner: str, ttl: int) -> bool:
+        held = self._locks.get(name)
+        if held is not None and held[1] > time.monotonic() and held[0] != owner:
+            return False
+        self._locks[name] = (owner, time.monotonic() + ttl)
+        return True
+
+    async def release_lock(self, name: str, owner: str) -> None:
+        if self._locks.get(name, (None,))[0] == owner:
+            del self._locks[name]
+
+    async def close(self) -> None:
+        pass
+
+
+# Deletes the lock only if it is still held by the caller
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+# Drops members from a presence group whose token set is (still) gone, so a
+# member that reconnected since the caller looked stays listed
+_SWEEP_PRESENCE_SCRIPT = """
+for _, member in ipairs(ARGV) do
+    if redis.call('exists', KEYS[1] .. ':' .. member) == 0 then
+        redis.call('srem', KEYS[1], member)
+    end
+end
+return 0
+"""
+
+
+class RedisStateBackend:
+    """State kept in Redis so every worker (and instance) sees the same values"""
+
+    name = "redis"
+
+    # Presence entries for a worker that died without cleaning up expire after this.
+    # A member counts as present only while its token set exists; the group set
+    # is an index that presence_members sweeps of members whose tokens expired.
+    PRESENCE_TTL = 24 * 60 * 60
+
+    def __init__(self, url: str, client=None):
+        self.url = url
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            import redis.asyncio as aioredis
+            self._client = aioredis.from_url(
+                self.url,
+                decode_responses=True,
+                socket_timeout=3,
+                socket_connect_timeout=3,
+                health_check_interval=30,
+            )
+        return self._client
+
+    async def incr(self, key: str, ttl: int) -> int:
+        key = KEY_PREFIX + key
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.incr(key)
+            pipe.expire(key, ttl)
+            value, _ = await pipe.execute()
+        return int(value)
+
+    async def get_int(self, key: str) -> int:
+        value = await self.client.get(KEY_PREFIX + key)
+        return int(value) if value is not None else 0
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(KEY_PREFIX + key)
+
+    async def presence_add(self, group: str, member: str, token: str) -> bool:
+        tokens_key = f"{KEY_PREFIX}{group}:{member}"
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.sadd(tokens_key, token)
+            pipe.scard(tokens_key)
+            pipe.expire(tokens_key, self.PRESENCE_TTL)
+            pipe.sadd(KEY_PREFIX + group, member)
+            pipe.expire(KEY_PREFIX + group, self.PRESENCE_TTL)
+            _, count, _, _, _ = await pipe.execute()
+        return int(count) == 1
+
+    async def presence_remove(self, group: str, member: str, token: str) -> bool:
+        tokens_key = f"{KEY_PREFIX}{group}:{member}"
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.srem(tokens_key, token)
+            pipe.scard(tokens_key)
+            _, count = await pipe.execute()
+        if int(count) == 0:
+            await self.client.srem(KEY_PREFIX + group, member)
+            return True
+        return False
+
+    async def presence_members(self, group: str) -> List[str]:
+        members = sorted(await self.client.smembers(KEY_PREFIX + group))
+        if not members:
+            return []
+        async with self.client.pipeline(transaction=False) as pipe:
+            for member in members:
+                pipe.exists(f"{KEY_PREFIX}{group}:{member}")
+            alive = await pipe.execute()
+        stale = [member for member, exists in zip(members, alive) if not exists]
+        if stale:
+            await self.client.eval(_SWEEP_PRESENCE_SCRIPT, 1, KEY_PREFIX + group, *stale)
+        return [member for member, exists in zip(members, alive) if exists]
+
+    async def presence_contains(self, group: str, member: str) -> bool:
+        return bool(await self.client.exists(f"{KEY_PREFIX}{group}:{member}"))
+
+    async def acquire_lock(self, name: str, owner: str, ttl: int) -> bool:
+        key = f"{KEY_PREFIX}lock:{name}"
+        if await self.client.set(key, owner, nx=True, ex=ttl):
+            return True
+        return await self.client.get(key) == owner
+
+    async def release_lock(self, name: str, owner: str) -> None:
+        await self.client.eval(_RELEASE_LOCK_SCRIPT, 1, f"{KEY_PREFIX}lock:{name}", owner)
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+# =============================================================================
+# PROCESS-WIDE INSTANCE
+# =============================================================================
+
+_state = None
+
+
+def _redis_url() -> str:
+    from app.core.redis_cache import REDIS_URL
+    return REDIS_URL
+
+
+def create_shared_state(workers: Optional[int] = None, redis_url: Optional[str] = None):
+    """Pick the backend for the given worker count
+
+    Raises:
+        SharedStateError: More than one worker is configured without Redis
+    """
+    if workers is None:
+        workers = configured_workers()
+    if redis_url is None:
+        redis_url = _redis_url()
+    if redis_url and redis_url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisStateBackend(redis_url)
+    if workers > 1:
+        raise SharedStateError(
+            f"{workers} workers configured but no Redis URL is set. Rate limits, "
+            "presence and locks would differ per worker; set REDIS_URL or unset "
+            "WEB_MULTI_WORKER."
+        )
+    return MemoryStateBackend()
+
+
+def get_shared_state():
+    """Process-wide shared state backend, created on first use"""
+    global _state
+    if _state is None:
+        _state = create_shared_state()
+    return _state
+
+
+def reset_shared_state() -> None:
+    """Forget the backend so the next call recreates it
+
+    Called after fork (preloaded app) so a worker never reuses a Redis
+    connection opened by the master, and by tests.
+    """
+    global _state
+    _state = None
+
+
+def socketio_client_manager():
+    """Socket.IO manager that relays emits between workers through Redis
+
+    Returns None (Socket.IO's in-process manager) when Redis is not
+    configured, which is only valid with a single worker.
+    """
+    url = _redis_url()
+    if not url.startswith(("redis://", "rediss://", "unix://")):
+        return None
+    try:
+        import socketio
+        return socketio.AsyncRedisManager(url)
+    except Exception as e:
+        logger.warning(f"Socket.IO Redis manager unavailable, emits stay in-process: {e}")
+        return None
+
+
+async def run_once(name: str, coro_factory, ttl: int = 600, hold: bool = False):
+    """Run a coroutine in one worker at a time, skipping it in the others
+
+    Args:
+        name: Lock name shared by all workers
+        coro_factory: Zero-argument callable returning the coroutine to run
+        ttl: Lock lifetime in seconds, in case the holder dies
+        hold: Keep the lock until it expires, so workers that start later
+            within ``ttl`` skip the job as well
+
+    Returns:
+        The coroutine's result, or None when another worker holds the lock
+    """
+    state = get_shared_state()
+    owner = f"{os.getpid()}:{uuid.uuid4().hex}"
+    if not await state.acquire_lock(name, owner, ttl):
+        logger.info(f"Skipping {name}: running in another worker")
+        return None
+    try:
+        return await coro_factory()
+    finally:
+        if not hold:
+            await state.release_lock(name, owner)
@@ -0,0 +1,449 @@
+"""
+Skills Taxonomy and Inverted Index
+
+Canonical skills with aliases, association tables kept in sync with the
+comma-separated ``User.skills`` / ``Job.skills`` text, and an in-memory
+inverted index (skill -> user ids / job ids) so "users with plumbing AND
+tiling" is a set intersection instead of an ILIKE scan.
+
+Normalization:
+- Lower-case, trim, collapse whitespace, drop punctuation other than the
+  characters that matter in skill names (``+ # .``).
+- Aliases map to a canonical name: built-in ``SKILL_ALIASES`` plus rows in
+  the ``skill_aliases`` table (loaded when the index is built).
+
+Storage:
+    skills          canonical skill names
+    skill_aliases   alias -> skill
+    user_skills     (user_id, skill_id)
+    job_skills      (job_id, skill_id)  - every job, whatever its status
+
+The text columns stay the source of what the user typed; the association
+tables are rewritten from them on every profile/job write
+(``sync_user_skills`` / ``sync_job_skills``) and backfilled at startup
+(``backfill_skill_links``).
+
+Index:
+The index is per process, built lazily from the association tables on
+first use and rebuilt after SKILL_INDEX_REFRESH_SECONDS so writes handled
+by other workers are picked up. Job postings only contain active jobs, so
+recommendations never need a status filter.
+
+Usage:
+    from app.core.skills import ensure_skill_index, parse_skills
+
+    index = await ensure_skill_index(db)
+    user_ids = index.users_with_all(parse_skills("plumbing, tiling"))
+    total, ranked = index.rank_jobs(["python", "sql"], limit=20)  # [(job_id, overlap), ...]
+
+    await sync_user_skills(db, user); await db.commit(); index_user_skills(user)
+    await sync_job_skills(db, job);   await db.commit(); index_job_skills(job)
+"""
+import asyncio
+import logging
+import os
+import re
+import time
+from collections import Counter
+from threading import RLock
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Rebuild from the database after this many seconds (0 = never)
+SKILL_INDEX_REFRESH_SECONDS = int(os.getenv("SKILL_INDEX_REFRESH_SECONDS", "300"))
+
+MAX_SKILL_LENGTH = 100
+
+# Rows processed per batch by backfill_skill_links
+BACKFILL_BATCH_SIZE = 500
+
+# Built-in aliases: alias -> canonical name
+SKILL_ALIASES: Dict[str, str] = {
+    "plumber": "plumbing",
+    "electrician": "electrical",
+    "electrical work": "electrical",
+    "carpenter": "carpentry",
+    "mason": "masonry",
+    "painter": "painting",
+    "welder": "welding",
+    "mechanic": "auto repair",
+    "auto mechanic": "auto repair",
+    "driver": "driving",
+    "chef": "cooking",
+    "cook": "cooking",
+    "housekeeper": "housekeeping",
+    "cleaner": "cleaning",
+    "landscaper": "landscaping",
+    "gardener": "landscaping",
+    "ac repair": "hvac",
+    "air conditioning": "hvac",
+    "bartender": "bartending",
+    "js": "javascript",
+    "ts": "typescript",
+    "py": "python",
+    "reactjs": "react",
+    "react.js": "react",
+    "node": "node.js",
+    "nodejs": "node.js",
+    "postgres": "postgresql",
+    "ms excel": "excel",
+    "microsoft excel": "excel",
+    "bookkeeper": "bookkeeping",
+    "accountant": "accounting",
+    "customer support": "customer service",
+}
+
+_STRIP_RE = re.compile(r"[^\w+#. ]+")
+_SPACE_RE = re.compile(r"\s+")
+
+_aliases: Dict[str, str] = dict(SKILL_ALIASES)
+
+
+def normalize_skill(name: Any) -> Optional[str]:
+    """Canonical form of a skill name, or None if nothing is left."""
+    if name is None:
+        return None
+    value = _STRIP_RE.sub(" ", str(name).lower())
+    value = _SPACE_RE.sub(" ", value).strip(" .")
+    if not value:
+        return None
+    value = _aliases.get(value, value)
+    return value[:MAX_SKILL_LENGTH]
+
+
+def parse_skills(skills: Union[str, Iterable[Any], None]) -> List[str]:
+    """Canonical, de-duplicated skills from comma-separated text or a list.
+
+    List items may themselves be comma-separated (``?skills=a,b&skills=c``).
+    """
+    if not skills:
+        return []
+    items = skills.split(",") if isinstance(skills, str) else [
+        part for item in skills if item is not None for part in str(item).split(",")
+    ]
+    result: List[str] = []
+    for item in items:
+        skill = normalize_skill(item)
+        if skill and skill not in result:
+            result.append(skill)
+    return result
+
+
+def format_skills(skills: Union[str, Iterable[Any], None]) -> Optional[str]:
+    """Comma-separated text for the ``skills`` columns (lists are joined as typed)."""
+    if skills is None or isinstance(skills, str):
+        return skills
+    return ", ".join(str(skill).strip() for skill in skills if str(skill).strip()) or None
+
+
+def set_aliases(aliases: Dict[str, str]) -> None:
+    """Replace the alias table (built-in aliases plus ``aliases``)."""
+    global _aliases
+    merged = dict(SKILL_ALIASES)
+    for alias, canonical in aliases.items():
+        key = _SPACE_RE.sub(" ", str(alias).lower()).strip()
+        if key:
+            merged[key] = canonical
+    _aliases = merged
+
+
+class SkillIndex:
+    """Inverted index from canonical skills to user and job ids. Thread-safe."""
+
+    def __init__(self):
+        self._lock = RLock()
+        self.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._postings: Dict[str, Dict[str, Set[int]]] = {"user": {}, "job": {}}
+            self._by_owner: Dict[str, Dict[int, Set[str]]] = {"user": {}, "job": {}}
+            self.built_at: Optional[float] = None
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    def _set(self, kind: str, owner_id: int, skills: Iterable[str]) -> None:
+        new = set(skills)
+        with self._lock:
+            postings = self._postings[kind]
+            owners = self._by_owner[kind]
+            old = owners.get(owner_id, set())
+            for skill in old - new:
+                ids = postings.get(skill)
+                if ids is not None:
+                    ids.discard(owner_id)
+                    if not ids:
+                        del postings[skill]
+            for skill in new - old:
+                postings.setdefault(skill, set()).add(owner_id)
+            if new:
+                owners[owner_id] = new
+            else:
+                owners.pop(owner_id, None)
+
+    def set_user_skills(self, user_id: int, skills: Iterable[str]) -> None:
+        self._set("user", user_id, skills)
+
+    def set_job_skills(self, job_id: int, skills: Iterable[str]) -> None:
+        self._set("job", job_id, skills)
+
+    def remove_user(self, user_id: int) -> None:
+        self._set("user", user_id, ())
+
+    def remove_job(self, job_id: int) -> None:
+        self._set("job", job_id, ())
+
+    def build(self, user_rows: Iterable[Tuple[int, str]], job_rows: Iterable[Tuple[int, str]]) -> None:
+        """Replace the index contents from (owner id, skill name) pairs."""
+        users: Dict[int, Set[str]] = {}
+        for user_id, skill in user_rows:
+            users.setdefault(user_id, set()).add(skill)
+        jobs: Dict[int, Set[str]] = {}
+        for job_id, skill in job_rows:
+            jobs.setdefault(job_id, set()).add(skill)
+
+        with self._lock:
+            self.clear()
+            for user_id, skills in users.items():
+                self._set("user", user_id, skills)
+            for job_id, skills in jobs.items():
+                self._set("job", job_id, skills)
+            self.built_at = time.time()
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _with_all(self, kind: str, skills: Iterable[str]) -> List[int]:
+        skills = list(skills)
+        if not skills:
+            return []
+        with self._lock:
+            postings = self._postings[kind]
+            sets = [postings.get(skill) for skill in skills]
+            if any(not ids for ids in sets):
+                return []
+            # Intersect starting from the rarest skill
+            sets.sort(key=len)
+            result = set(sets[0])
+            for ids in sets[1:]:
+                result &= ids
+                if not result:
+                    break
+        return sorted(result)
+
+    def users_with_all(self, skills: Iterable[str]) -> List[int]:
+        """Sorted ids of users that have every one of ``skills``."""
+        return self._with_all("user", skills)
+
+    def jobs_with_all(self, skills: Iterable[str]) -> List[int]:
+        """Sorted ids of active jobs requiring every one of ``skills``."""
+        return self._with_all("job", skills)
+
+    def rank_jobs(
+        self,
+        skills: Iterable[str],
+        limit: int = 20,
+        offset: int = 0,
+        required: Iterable[str] = (),
+    ) -> Tuple[int, List[Tuple[int, int]]]:
+        """Rank active jobs by how many of ``skills`` they ask for.
+
+        Without ``required`` the candidates are jobs sharing any of
+        ``skills``; with it, only jobs requiring every required skill
+        (ranked by overlap with ``skills``, possibly zero).
+
+        Returns:
+            ``(total, [(job_id, overlap), ...])`` - most overlap, then newest first
+        """
+        wanted = set(skills)
+        required = list(required)
+        with self._lock:
+            if required:
+                owners = self._by_owner["job"]
+                scored = [(job_id, len(owners[job_id] & wanted)) for job_id in self._with_all("job", required)]
+            else:
+                counts: Counter = Counter()
+                postings = self._postings["job"]
+                for skill in wanted:
+                    counts.update(postings.get(skill, ()))
+                scored = list(counts.items())
+        scored.sort(key=lambda item: (-item[1], -item[0]))
+        return len(scored), scored[offset:offset + limit]
+
+    def skills_for_user(self, user_id: int) -> Set[str]:
+        with self._lock:
+            return set(self._by_owner["user"].get(user_id, ()))
+
+    def skill_counts(self, kind: str = "user", limit: int = 50) -> List[Tuple[str, int]]:
+        """Most common skills among users (or active jobs)."""
+        with self._lock:
+            counts = [(skill, len(ids)) for skill, ids in self._postings[kind].items()]
+        counts.sort(key=lambda item: (-item[1], item[0]))
+        return counts[:limit]
+
+
+# Process-wide index
+skill_index = SkillIndex()
+_build_lock = asyncio.Lock()
+
+
+def _is_stale(index: SkillIndex) -> bool:
+    if index.built_at is None:
+        return True
+    return SKILL_INDEX_REFRESH_SECONDS > 0 and time.time() - index.built_at > SKILL_INDEX_REFRESH_SECONDS
+
+
+async def ensure_skill_index(db) -> SkillIndex:
+    """Build (or refresh) the process-wide index from the database if needed."""
+    if not _is_stale(skill_index):
+        return skill_index
+
+    async with _build_lock:
+        if not _is_stale(skill_index):
+            return skill_index
+
+        from sqlalchemy import select
+        from app.models import Job, JobSkill, Skill, SkillAlias, UserSkill
+
+        started = time.perf_counter()
+        alias_rows = await db.execute(select(SkillAlias.alias, Skill.name).join(Skill, Skill.id == SkillAlias.skill_id))
+        set_aliases({alias: name for alias, name in alias_rows})
+
+        user_rows = await db.execute(select(UserSkill.user_id, Skill.name).join(Skill, Skill.id == UserSkill.skill_id))
+        job_rows = await db.execute(
+            select(JobSkill.job_id, Skill.name)
+            .join(Skill, Skill.id == JobSkill.skill_id)
+            .join(Job, Job.id == JobSkill.job_id)
+            .where(Job.status == "active")
+        )
+        skill_index.build(user_rows.all(), job_rows.all())
+        logger.info(
+            f"Skill index built: {len(skill_index._by_owner['user'])} users, "
+            f"{len(skill_index._by_owner['job'])} jobs in "
+            f"{(time.perf_counter() - started) * 1000:.1f}ms"
+        )
+    return skill_index
+
+
+# =============================================================================
+# ASSOCIATION TABLE SYNC
+# =============================================================================
+
+async def get_or_create_skill_ids(db, names: List[str]) -> Dict[str, int]:
+    """Skill ids for canonical ``names``, inserting missing skills."""
+    if not names:
+        return {}
+    from sqlalchemy import select
+    from sqlalchemy.exc import IntegrityError
+    from app.models import Skill
+
+    result = await db.execute(select(Skill.name, Skill.id).where(Skill.name.in_(names)))
+    ids = {name: skill_id for name, skill_id in result}
+    for name in names:
+        if name in ids:
+            continue
+        try:
+            async with db.begin_nested():
+                skill = Skill(name=name)
+                db.add(skill)
+            ids[name] = skill.id
+        except IntegrityError:
+            # Created concurrently by another request
+            existing = await db.execute(select(Skill.id).where(Skill.name == name))
+            ids[name] = existing.scalar_one()
+    return ids
+
+
+async def _replace_links(db, model, owner_column: str, owner_id: int, skills: List[str]) -> None:
+    from sqlalchemy import delete
+
+    skill_ids = await get_or_create_skill_ids(db, skills)
+    await db.execute(delete(model).where(getattr(model, owner_column) == owner_id))
+    db.add_all(model(**{owner_column: owner_id, "skill_id": skill_ids[name]}) for name in skills)
+    await db.flush()
+
+
+async def sync_user_skills(db, user: Any) -> List[str]:
+    """Rewrite ``user_skills`` rows from ``user.skills`` (caller commits)."""
+    from app.models import UserSkill
+
+    skills = parse_skills(user.skills)
+    await _replace_links(db, UserSkill, "user_id", user.id, skills)
+    return skills
+
+
+async def sync_job_skills(db, job: Any) -> List[str]:
+    """Rewrite ``job_skills`` rows from ``job.skills`` (caller commits)."""
+    from app.models import JobSkill
+
+    skills = parse_skills(job.skills)
+    await _replace_links(db, JobSkill, "job_id", job.id, skills)
+    return skills
+
+
+def index_user_skills(user: Any) -> None:
+    """Apply a user's skills to the index (no-op until first build)."""
+    if skill_index.built_at is not None:
+        skill_index.set_user_skills(user.id, parse_skills(user.skills))
+
+
+def index_job_skills(job: Any) -> None:
+    """Apply a created/updated job to the index (no-op until first build)."""
+    if skill_index.built_at is not None:
+        if job.status == "active":
+            skill_index.set_job_skills(job.id, parse_skills(job.skills))
+        else:
+            skill_index.remove_job(job.id)
+
+
+def unindex_job_skills(job_id: int) -> None:
+    """Remove a deleted job from the index."""
+    if skill_index.built_at is not None:
+        skill_index.remove_job(job_id)
+
+
+async def backfill_skill_links(db, batch_size: int = BACKFILL_BATCH_SIZE) -> Dict[str, int]:
+    """Create association rows for users and jobs that have skills text but no links.
+
+    Safe to run repeatedly; only rows without any links are touched.
+
+    Returns:
+        Number of users and jobs linked
+    """
+    from sqlalchemy import exists, select
+    from app.models import Job, JobSkill, User, UserSkill
+
+    linked = {"users": 0, "jobs": 0}
+    for key, model, link, sync in (
+        ("users", User, UserSkill, sync_user_skills),
+        ("jobs", Job, JobSkill, sync_job_skills),
+    ):
+        owner_column = link.user_id if link is UserSkill else link.job_id
+        last_id = 0
+        while True:
+            result = await db.execute(
+                select(model)
+                .where(
+                    model.id > last_id,
+                    model.skills.isnot(None),
+                    model.skills != "",
+                    ~exists().where(owner_column == model.id),
+                )
+                .order_by(model.id)
+                .limit(batch_size)
+            )
+            rows = result.scalars().all()
+            if not rows:
+                break
+            for row in rows:
+                await sync(db, row)
+            await db.commit()
+            linked[key] += len(rows)
+            last_id = rows[-1].id
+    if linked["users"] or linked["jobs"]:
+        logger.info(f"Skill links backfilled: {linked}")
+    return linked
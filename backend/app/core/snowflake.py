@@ -0,0 +1,241 @@
+"""
+K-Sortable ID Generator (Snowflake-style)
+
+Generates unique, time-ordered 53-bit integer IDs without a central
+sequence, so rows can be created on any worker (or shard) and still sort by
+creation time. IDs double as cursors: "everything after id X" is the same as
+"everything created after X's timestamp".
+
+Layout (53 bits, most significant first):
+    41 bits  milliseconds since EPOCH_MS (2024-01-01 UTC) - ~69 years
+     5 bits  worker id (0-31)
+     7 bits  per-millisecond sequence (128 IDs/ms/worker)
+
+53 bits rather than Twitter's 63 keeps every ID below
+Number.MAX_SAFE_INTEGER, so the web and mobile clients can handle IDs as
+plain JSON numbers. IDs need a BIGINT column in PostgreSQL.
+
+Writers outside this app (the Flask monolith, the serverless ``api/``
+handlers) insert without an id; PostgreSQL fills it with ``snowflake_id()``
+(see DATABASE_FUNCTION_SQL), which uses the same layout with worker id
+DATABASE_WORKER_ID, so every row on the snowflake tables sorts by time
+whichever writer created it.
+
+Worker ids must be unique across every process writing rows, otherwise two
+workers can issue the same ID in the same millisecond. They come from, in
+order:
+
+1. SNOWFLAKE_WORKER_ID, set explicitly per process.
+2. A lease in Redis (REDIS_URL / REDIS_HOST, same variables as
+   app.core.redis_cache): the first free ``snowflake:worker:<n>`` key is
+   taken with SET NX and renewed in the background until the process exits.
+3. Worker 0, only for a single development process. In production, or with
+   more than one worker, startup fails instead of guessing.
+
+Configuration:
+    SNOWFLAKE_WORKER_ID: Worker id 0-30 (default: leased from Redis; 31 is the database's)
+    SNOWFLAKE_WORKER_LEASE_TTL: Seconds a lease survives without renewal (default: 60)
+
+Usage:
+    from app.core.snowflake import next_id, id_to_datetime, min_id_for
+
+    message.id = next_id()
+    created = id_to_datetime(message.id)
+    query.where(Message.id >= min_id_for(since))  # time range via the primary key
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+
+TIMESTAMP_BITS = 41
+WORKER_BITS = 5
+SEQUENCE_BITS = 7
+
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+WORKER_SHIFT = SEQUENCE_BITS
+TIMESTAMP_SHIFT = SEQUENCE_BITS + WORKER_BITS
+
+# Reserved for ids generated by PostgreSQL's snowflake_id(); never leased
+DATABASE_WORKER_ID = MAX_WORKER_ID
+
+# Column default for writers that insert without an id. The per-millisecond
+# sequence is a shared counter modulo 128, so ids stay unique up to 128
+# database-generated rows per millisecond.
+DATABASE_FUNCTION_SQL = [
+    "CREATE SEQUENCE IF NOT EXISTS snowflake_id_seq",
+    (
+        "CREATE OR REPLACE FUNCTION snowflake_id() RETURNS bigint LANGUAGE sql VOLATILE AS $$ "
+        f"SELECT ((floor(extract(epoch FROM clock_timestamp()) * 1000)::bigint - {EPOCH_MS}) << {TIMESTAMP_SHIFT}) "
+        f"| ({DATABASE_WORKER_ID}::bigint << {WORKER_SHIFT}) "
+        f"| (nextval('snowflake_id_seq') % {MAX_SEQUENCE + 1}) $$"
+    ),
+]
+
+WORKER_LEASE_TTL = int(os.getenv("SNOWFLAKE_WORKER_LEASE_TTL", "60"))
+WORKER_LEASE_PREFIX = "snowflake:worker:"
+
+# Extends the lease if the caller still holds it, or retakes it if it expired
+# (e.g. Redis was unreachable for longer than the TTL) and nobody else has it
+_RENEW_LEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+if redis.call('set', KEYS[1], ARGV[1], 'NX', 'EX', ARGV[2]) then
+    return 1
+end
+return 0
+"""
+
+
+class WorkerIdLease:
+    """Holds one worker id in Redis for as long as the process runs."""
+
+    def __init__(self, client, ttl: int = WORKER_LEASE_TTL):
+        self.client = client
+        self.ttl = ttl
+        self.token = uuid.uuid4().hex
+        self.worker_id: int = None
+        self.lost = False
+        self._stop = threading.Event()
+
+    def _key(self) -> str:
+        return f"{WORKER_LEASE_PREFIX}{self.worker_id}"
+
+    def acquire(self) -> int:
+        """Take the first free worker id and start renewing it.
+
+        Raises:
+            RuntimeError: All worker ids are held by other processes
+        """
+        for worker_id in range(DATABASE_WORKER_ID):
+            if self.client.set(f"{WORKER_LEASE_PREFIX}{worker_id}", self.token, nx=True, ex=self.ttl):
+                self.worker_id = worker_id
+                thread = threading.Thread(target=self._renew_loop, name="snowflake-lease", daemon=True)
+                thread.start()
+                logger.info(f"Leased snowflake worker id {worker_id}")
+                return worker_id
+        raise RuntimeError(f"All {DATABASE_WORKER_ID} snowflake worker ids are leased")
+
+    def renew(self) -> bool:
+        """Extend the lease; False once another process has taken the id."""
+        held = self.client.eval(_RENEW_LEASE_SCRIPT, 1, self._key(), self.token, self.ttl)
+        if not held:
+            self.lost = True
+        return bool(held)
+
+    def _renew_loop(self) -> None:
+        while not self._stop.wait(self.ttl / 3):
+            try:
+                if not self.renew():
+                    logger.error(f"Snowflake worker id {self.worker_id} was taken over; leasing a new one")
+                    return
+            except Exception as e:
+                logger.warning(f"Could not renew snowflake worker id {self.worker_id}: {e}")
+
+
+def _redis_url() -> str:
+    from app.core.redis_cache import REDIS_URL
+    return REDIS_URL
+
+
+def _lease_client(url: str):
+    import redis
+    return redis.Redis.from_url(url, decode_responses=True, socket_timeout=3, socket_connect_timeout=3)
+
+
+def _default_worker_id() -> int:
+    """Worker id for this process (see module docstring for the order)."""
+    global _lease
+    configured = os.getenv("SNOWFLAKE_WORKER_ID")
+    if configured is not None:
+        worker_id = int(configured)
+        if not 0 <= worker_id < DATABASE_WORKER_ID:
+            raise ValueError(f"SNOWFLAKE_WORKER_ID must be between 0 and {DATABASE_WORKER_ID - 1}")
+        return worker_id
+
+    url = _redis_url()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        _lease = WorkerIdLease(_lease_client(url))
+        return _lease.acquire()
+
+    from app.core.shared_state import configured_workers
+    if os.getenv("ENVIRONMENT", "development").lower() == "production" or configured_workers() > 1:
+        raise RuntimeError(
+            "Snowflake IDs need a unique worker id per process: set SNOWFLAKE_WORKER_ID "
+            "or configure Redis so worker ids can be leased."
+        )
+    return 0
+
+
+class SnowflakeGenerator:
+    """Thread-safe generator of k-sortable IDs for one worker."""
+
+    def __init__(self, worker_id: int = None):
+        self.worker_id = _default_worker_id() if worker_id is None else worker_id
+        if not 0 <= self.worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"worker_id must be between 0 and {MAX_WORKER_ID}")
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+
+    @staticmethod
+    def _now_ms() -> int:
+        return int(time.time() * 1000) - EPOCH_MS
+
+    def next_id(self) -> int:
+        with self._lock:
+            now = self._now_ms()
+            if now < self._last_ms:
+                # Clock moved backwards: keep issuing from the last timestamp
+                now = self._last_ms
+            if now == self._last_ms:
+                self._sequence = (self._sequence + 1) & MAX_SEQUENCE
+                if self._sequence == 0:
+                    # Sequence exhausted for this millisecond - wait for the next one
+                    while now <= self._last_ms:
+                        now = self._now_ms()
+            else:
+                self._sequence = 0
+            self._last_ms = now
+            return (now << TIMESTAMP_SHIFT) | (self.worker_id << WORKER_SHIFT) | self._sequence
+
+
+_generator = None
+_generator_pid = None
+_lease = None
+
+
+def next_id() -> int:
+    """Return a new ID from the process-wide generator.
+
+    The generator is recreated after a fork, so each worker leases its own
+    worker id, and when the lease was lost to another process.
+    """
+    global _generator, _generator_pid
+    pid = os.getpid()
+    if _generator is None or _generator_pid != pid or (_lease is not None and _lease.lost):
+        _generator = SnowflakeGenerator()
+        _generator_pid = pid
+    return _generator.next_id()
+
+
+def id_to_datetime(snowflake_id: int) -> datetime:
+    """Return the UTC creation time encoded in an ID."""
+    ms = (snowflake_id >> TIMESTAMP_SHIFT) + EPOCH_MS
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+
+
+def min_id_for(moment: datetime) -> int:
+    """Smallest ID that can be generated at or after ``moment``."""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    ms = max(0, int(moment.timestamp() * 1000) - EPOCH_MS)
+    return ms << TIMESTAMP_SHIFT
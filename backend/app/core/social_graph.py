@@ -0,0 +1,335 @@
+"""
+Social Graph Stats
+
+Follower, following and post counts for user lists without per-row
+COUNT(*) queries, and is-following flags for a whole page at once.
+
+Counts:
+- Kept as denormalized counters in user_social_stats, one row per user.
+  record_follow / record_unfollow / record_post adjust them in the same
+  transaction as the write, so they commit or roll back together.
+- The adjustment is one INSERT ... SELECT ... ON CONFLICT DO UPDATE (like
+  app/core/reputation.py): an existing row is incremented; a missing row is
+  created from a full recount (which already includes the flushed change),
+  so it never starts from a partial count.
+- Reads are one query per page: users LEFT JOIN user_social_stats, with
+  COALESCE falling back to correlated counts only for users without a row
+  (nobody has followed them or posted since the last reconciliation).
+- reconcile_social_stats recounts everyone from follows and posts in
+  batches, writing rows that are missing or drifted. It runs once per boot
+  from the background bootstrap.
+
+Is-following / is-liked flags (the per-viewer overlay on shared cached
+payloads, see app/core/api_cache.py):
+- One set-membership query (follower = viewer AND followed IN page) per page.
+- With SOCIAL_GRAPH_CACHE_SECONDS > 0, a per-process adjacency bitmap per
+  viewer (bit n set = viewer follows user n, as Python ints like the job
+  facet index) answers repeat lookups without a query. Follows handled by
+  this process are applied with apply_follow once committed; follows
+  handled by other workers show up once the entry expires, so the cache
+  defaults to off with several workers.
+
+Usage:
+    from app.core.social_graph import get_social_counts, following_among, record_follow
+
+    counts = await get_social_counts(db, [u.id for u in users])  # {user_id: SocialCounts}
+    followed = await following_among(db, viewer.id, [u.id for u in users])
+
+    db.add(Follow(follower_id=a, followed_id=b))
+    await record_follow(db, a, b)
+    await db.commit()
+    apply_follow(a, b, True)
+"""
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import RLock
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Follow, Post, PostLike, User, UserSocialStats
+
+logger = logging.getLogger(__name__)
+
+
+def _default_cache_seconds() -> str:
+    from app.core.shared_state import configured_workers
+
+    return "30" if configured_workers() == 1 else "0"
+
+
+# Adjacency bitmap cache per viewer (0 = always query)
+SOCIAL_GRAPH_CACHE_SECONDS = float(os.getenv("SOCIAL_GRAPH_CACHE_SECONDS") or _default_cache_seconds())
+SOCIAL_GRAPH_CACHE_VIEWERS = int(os.getenv("SOCIAL_GRAPH_CACHE_VIEWERS", "2048"))
+
+RECONCILE_BATCH_SIZE = int(os.getenv("SOCIAL_STATS_RECONCILE_BATCH", "1000"))
+
+
+@dataclass
+class SocialCounts:
+    followers: int = 0
+    following: int = 0
+    posts: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "followers_count": self.followers,
+            "following_count": self.following,
+            "posts_count": self.posts,
+        }
+
+
+# =============================================================================
+# COUNTS
+# =============================================================================
+
+
+def _unique(user_ids: Iterable[int]) -> List[int]:
+    return list(dict.fromkeys(user_ids))
+
+
+async def count_from_source(db: AsyncSession, user_ids: List[int]) -> Dict[int, SocialCounts]:
+    """Count follows and posts for a batch of users, one grouped query each"""
+    counts = {user_id: SocialCounts() for user_id in user_ids}
+    if not user_ids:
+        return counts
+    queries = (
+        ("followers", select(Follow.followed_id, func.count()).where(Follow.followed_id.in_(user_ids)).group_by(Follow.followed_id)),
+        ("following", select(Follow.follower_id, func.count()).where(Follow.follower_id.in_(user_ids)).group_by(Follow.follower_id)),
+        ("posts", select(Post.user_id, func.count()).where(Post.user_id.in_(user_ids)).group_by(Post.user_id)),
+    )
+    for field, query in queries:
+        for user_id, count in (await db.execute(query)).all():
+            setattr(counts[user_id], field, count)
+    return counts
+
+
+def _recount_columns():
+    """Correlated follower, following and post counts for ``User.id``"""
+    return (
+        select(func.count()).where(Follow.followed_id == User.id).scalar_subquery(),
+        select(func.count()).where(Follow.follower_id == User.id).scalar_subquery(),
+        select(func.count()).where(Post.user_id == User.id).scalar_subquery(),
+    )
+
+
+async def get_social_counts(db: AsyncSession, user_ids: Iterable[int]) -> Dict[int, SocialCounts]:
+    """Counts for every user on a page in one query"""
+    user_ids = _unique(user_ids)
+    if not user_ids:
+        return {}
+    followers, following, posts = _recount_columns()
+    # COALESCE only evaluates the recount for users without a counter row
+    result = await db.execute(
+        select(
+            User.id,
+            func.coalesce(UserSocialStats.followers_count, followers),
+            func.coalesce(UserSocialStats.following_count, following),
+            func.coalesce(UserSocialStats.posts_count, posts),
+        )
+        .outerjoin(UserSocialStats, UserSocialStats.user_id == User.id)
+        .where(User.id.in_(user_ids))
+    )
+    counts = {user_id: SocialCounts() for user_id in user_ids}
+    for user_id, *row in result.all():
+        counts[user_id] = SocialCounts(*row)
+    return counts
+
+
+async def get_user_counts(db: AsyncSession, user_id: int) -> SocialCounts:
+    return (await get_social_counts(db, [user_id]))[user_id]
+
+
+def _insert(db: AsyncSession):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"social stats do not support {dialect}")
+    return insert(UserSocialStats)
+
+
+async def _adjust(db: AsyncSession, user_id: int, **deltas: int) -> None:
+    # The follow or post change must be in the recount of a new row
+    await db.flush()
+    recount = select(User.id, *_recount_columns()).where(User.id == user_id)
+    stmt = _insert(db).from_select(["user_id", "followers_count", "following_count", "posts_count"], recount)
+    set_ = {
+        column: getattr(UserSocialStats, column) + delta
+        for column, delta in deltas.items()
+    }
+    set_["updated_at"] = func.now()
+    await db.execute(stmt.on_conflict_do_update(index_elements=[UserSocialStats.user_id], set_=set_))
+
+
+async def record_follow(db: AsyncSession, follower_id: int, followed_id: int) -> None:
+    """Count a new follow; call in the transaction that adds the Follow row"""
+    await _adjust(db, followed_id, followers_count=1)
+    await _adjust(db, follower_id, following_count=1)
+
+
+async def record_unfollow(db: AsyncSession, follower_id: int, followed_id: int) -> None:
+    """Count a removed follow; call in the transaction that deletes the Follow row"""
+    await _adjust(db, followed_id, followers_count=-1)
+    await _adjust(db, follower_id, following_count=-1)
+
+
+async def record_post(db: AsyncSession, user_id: int, delta: int = 1) -> None:
+    """Count a created (+1) or deleted (-1) post in the same transaction"""
+    await _adjust(db, user_id, posts_count=delta)
+
+
+async def reconcile_social_stats(db: AsyncSession, batch_size: int = RECONCILE_BATCH_SIZE) -> Dict[str, int]:
+    """Recount every user from follows and posts; write missing or drifted rows"""
+    started = time.perf_counter()
+    checked = written = 0
+    last_id = 0
+    while True:
+        user_ids = list((await db.execute(
+            select(User.id).where(User.id > last_id).order_by(User.id).limit(batch_size)
+        )).scalars())
+        if not user_ids:
+            break
+        last_id = user_ids[-1]
+        actual = await count_from_source(db, user_ids)
+        stored = (await db.execute(
+            select(
+                UserSocialStats.user_id,
+                UserSocialStats.followers_count,
+                UserSocialStats.following_count,
+                UserSocialStats.posts_count,
+            ).where(UserSocialStats.user_id.in_(user_ids))
+        )).all()
+        stored = {row[0]: SocialCounts(row[1], row[2], row[3]) for row in stored}
+        rows = [
+            {
+                "user_id": user_id,
+                "followers_count": counts.followers,
+                "following_count": counts.following,
+                "posts_count": counts.posts,
+            }
+            for user_id, counts in actual.items()
+            if stored.get(user_id) != counts
+        ]
+        if rows:
+            stmt = _insert(db).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[UserSocialStats.user_id],
+                set_={
+                    "followers_count": stmt.excluded.followers_count,
+                    "following_count": stmt.excluded.following_count,
+                    "posts_count": stmt.excluded.posts_count,
+                    "updated_at": func.now(),
+                },
+            )
+            await db.execute(stmt)
+            await db.commit()
+        checked += len(user_ids)
+        written += len(rows)
+    logger.info(
+        f"Social stats reconciled: {checked} users, {written} rows written in "
+        f"{(time.perf_counter() - started) * 1000:.1f}ms"
+    )
+    return {"users": checked, "written": written}
+
+
+# =============================================================================
+# IS-FOLLOWING FLAGS
+# =============================================================================
+
+
+class AdjacencyCache:
+    """Per-viewer bitmaps of followed user ids, LRU-bounded with a TTL"""
+
+    def __init__(self, ttl: float = SOCIAL_GRAPH_CACHE_SECONDS, max_viewers: int = SOCIAL_GRAPH_CACHE_VIEWERS):
+        self.ttl = ttl
+        self.max_viewers = max_viewers
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = RLock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def get(self, viewer_id: int) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(viewer_id)
+            if entry is None or time.monotonic() - entry[1] > self.ttl:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(viewer_id)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, viewer_id: int, followed_ids: Iterable[int]) -> int:
+        bitmap = 0
+        for user_id in followed_ids:
+            bitmap |= 1 << user_id
+        with self._lock:
+            self._entries[viewer_id] = (bitmap, time.monotonic())
+            self._entries.move_to_end(viewer_id)
+            while len(self._entries) > self.max_viewers:
+                self._entries.popitem(last=False)
+        return bitmap
+
+    def set(self, viewer_id: int, user_id: int, following: bool) -> None:
+        """Apply a follow/unfollow to a cached entry (no-op if not cached)"""
+        with self._lock:
+            entry = self._entries.get(viewer_id)
+            if entry is not None:
+                bit = 1 << user_id
+                bitmap = entry[0] | bit if following else entry[0] & ~bit
+                self._entries[viewer_id] = (bitmap, entry[1])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+adjacency = AdjacencyCache()
+
+
+def apply_follow(follower_id: int, followed_id: int, following: bool) -> None:
+    """Update this process's is-following cache; call after the follow commits"""
+    adjacency.set(follower_id, followed_id, following)
+
+
+async def following_among(db: AsyncSession, viewer_id: int, user_ids: Iterable[int]) -> Set[int]:
+    """Which of ``user_ids`` the viewer follows: one query, or none when cached"""
+    user_ids = _unique(user_ids)
+    if not user_ids:
+        return set()
+    if adjacency.enabled:
+        bitmap = adjacency.get(viewer_id)
+        if bitmap is None:
+            followed = (await db.execute(select(Follow.followed_id).where(Follow.follower_id == viewer_id))).scalars()
+            bitmap = adjacency.put(viewer_id, followed)
+        return {user_id for user_id in user_ids if bitmap >> user_id & 1}
+    result = await db.execute(
+        select(Follow.followed_id).where(Follow.follower_id == viewer_id, Follow.followed_id.in_(user_ids))
+    )
+    return set(result.scalars())
+
+
+async def is_following(db: AsyncSession, viewer_id: int, user_id: int) -> bool:
+    return user_id in await following_among(db, viewer_id, [user_id])
+
+
+async def liked_among(db: AsyncSession, viewer_id: int, post_ids: Iterable[int]) -> Set[int]:
+    """Which of ``post_ids`` the viewer has liked, in one query"""
+    post_ids = _unique(post_ids)
+    if not post_ids:
+        return set()
+    result = await db.execute(
+        select(PostLike.post_id).where(PostLike.user_id == viewer_id, PostLike.post_id.in_(post_ids))
+    )
+    return set(result.scalars())
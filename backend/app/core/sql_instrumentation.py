@@ -0,0 +1,384 @@
+"""
+Per-Request SQL Instrumentation with N+1 Detection
+
+Hooks the database drivers instead of requiring manual decoration
+(compare ``track_query_performance`` in ``query_optimizer``):
+
+- SQLAlchemy: ``before_cursor_execute``/``after_cursor_execute`` engine events
+- psycopg2: an instrumented cursor class usable as ``cursor_factory``
+
+Every statement is fingerprinted (literals and bind parameters stripped,
+``IN (...)`` lists collapsed) and attributed to the request that issued it
+through a ``ContextVar``. At the end of a request:
+
+- statement count and DB time are observed as Prometheus histograms
+  (``core.metrics``), labelled by route template
+- fingerprints executed more than ``SQL_N_PLUS_ONE_THRESHOLD`` times are
+  flagged as N+1 patterns and logged
+- optional ``X-DB-*`` debug headers are attached to the response
+
+Only a sampled fraction of requests is tracked so production overhead stays
+low. A request sending ``X-Debug-SQL`` is always tracked and gets the
+debug headers: with ``1`` where SQL_DEBUG_HEADERS is on, or with the
+SQL_DEBUG_TOKEN secret (operators, including in production).
+
+Every statement, sampled or not, is also timed into the ``db`` latency
+histogram of ``core.latency`` by statement type (select, insert, ...), which
+costs two perf_counter() calls and a bucket increment.
+
+Configuration (environment variables):
+    SQL_INSTRUMENTATION_ENABLED      "true"/"false" (default: true)
+    SQL_INSTRUMENTATION_SAMPLE_RATE  0.0-1.0 (default: 1.0, or 0.1 in production)
+    SQL_N_PLUS_ONE_THRESHOLD         repeats before flagging (default: 5)
+    SQL_DEBUG_HEADERS                "true"/"false" (default: true outside production)
+    SQL_DEBUG_TOKEN                  secret accepted in X-Debug-SQL (default: unset)
+
+Usage:
+    from app.core.sql_instrumentation import (
+        instrument_engine, instrumented_cursor_factory, sql_instrumentation_middleware,
+    )
+
+    instrument_engine(engine)
+    app.middleware("http")(sql_instrumentation_middleware)
+
+    # psycopg2 (final_backend_postgresql.py wires this into its pool)
+    pool.ThreadedConnectionPool(..., cursor_factory=instrumented_cursor_factory(RealDictCursor))
+"""
+import hmac
+import logging
+import os
+import random
+import re
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from .latency import observe
+
+logger = logging.getLogger(__name__)
+
+_IS_PRODUCTION = os.getenv("ENVIRONMENT", "development").lower() == "production"
+
+SQL_INSTRUMENTATION_ENABLED = os.getenv("SQL_INSTRUMENTATION_ENABLED", "true").lower() == "true"
+SAMPLE_RATE = float(os.getenv(
+    "SQL_INSTRUMENTATION_SAMPLE_RATE", "0.1" if _IS_PRODUCTION else "1.0"
+))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+DEBUG_HEADERS_ENABLED = os.getenv(
+    "SQL_DEBUG_HEADERS", "false" if _IS_PRODUCTION else "true"
+).lower() == "true"
+# Shared secret that forces tracking for one request wherever it is sent
+SQL_DEBUG_TOKEN = os.getenv("SQL_DEBUG_TOKEN", "")
+
+# Process-wide fingerprint table is bounded to keep memory flat
+MAX_TRACKED_FINGERPRINTS = 1000
+
+# =============================================================================
+# FINGERPRINTING
+# =============================================================================
+
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w$.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_RE = re.compile(r"\$\d+|%\(\w+\)s|%s|(?<!:):\w+|\?")
+_IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_VALUES_LIST_RE = re.compile(r"\bVALUES\s*(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))*", re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint_sql(statement: str) -> str:
+    """Normalize a SQL statement so repeated executions share one fingerprint.
+
+    Literals and driver placeholders ($1, %s, %(name)s, :name, ?) become ``?``,
+    ``IN`` and multi-row ``VALUES`` lists collapse to a single element and
+    whitespace is collapsed.
+
+    Example:
+        >>> fingerprint_sql("SELECT * FROM users WHERE id = $1 AND name = 'x'")
+        'SELECT * FROM users WHERE id = ? AND name = ?'
+    """
+    fp = _STRING_LITERAL_RE.sub("?", statement)
+    fp = _PLACEHOLDER_RE.sub("?", fp)
+    fp = _NUMBER_RE.sub("?", fp)
+    fp = _IN_LIST_RE.sub("IN (?...)", fp)
+    fp = _VALUES_LIST_RE.sub(r"VALUES \1...", fp)
+    return _WHITESPACE_RE.sub(" ", fp).strip()
+
+
+# =============================================================================
+# PER-REQUEST STATE
+# =============================================================================
+
+@dataclass
+class FingerprintStats:
+    """Execution count and cumulative time for one fingerprint."""
+    count: int = 0
+    total_ms: float = 0.0
+
+
+@dataclass
+class RequestQueryStats:
+    """Statements issued while handling one request."""
+    endpoint: str = "unknown"
+    statement_count: int = 0
+    total_ms: float = 0.0
+    fingerprints: Dict[str, FingerprintStats] = field(default_factory=dict)
+
+    def record(self, statement: str, duration_ms: float) -> None:
+        fp = fingerprint_sql(statement)
+        stats = self.fingerprints.get(fp)
+        if stats is None:
+            stats = self.fingerprints[fp] = FingerprintStats()
+        stats.count += 1
+        stats.total_ms += duration_ms
+        self.statement_count += 1
+        self.total_ms += duration_ms
+
+    def n_plus_one(self, threshold: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Fingerprints repeated more than ``threshold`` times in this request."""
+        limit = N_PLUS_ONE_THRESHOLD if threshold is None else threshold
+        return [
+            {"fingerprint": fp, "count": s.count, "total_ms": round(s.total_ms, 3)}
+            for fp, s in self.fingerprints.items()
+            if s.count > limit
+        ]
+
+
+_current_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar(
+    "sql_instrumentation_stats", default=None
+)
+
+# Process-wide fingerprint statistics (all sampled requests)
+_global_fingerprints: Dict[str, Dict[str, Any]] = {}
+_global_lock = threading.Lock()
+
+
+def record_statement(statement: str, duration_ms: float) -> None:
+    """Attribute a statement to the current request (no-op when not sampled)."""
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, duration_ms)
+
+
+def start_request_tracking(endpoint: str = "unknown", force: bool = False) -> Optional[RequestQueryStats]:
+    """Begin tracking statements for the current request.
+
+    Args:
+        endpoint: Label for metrics (prefer the route template over the raw path)
+        force: Track regardless of the sampling rate
+
+    Returns:
+        The stats object when the request is sampled, otherwise None
+    """
+    if not SQL_INSTRUMENTATION_ENABLED:
+        return None
+    if not force and (SAMPLE_RATE <= 0 or random.random() >= SAMPLE_RATE):
+        return None
+    stats = RequestQueryStats(endpoint=endpoint)
+    _current_stats.set(stats)
+    return stats
+
+
+def finish_request_tracking(stats: Optional[RequestQueryStats], endpoint: Optional[str] = None) -> None:
+    """Stop tracking, export metrics and update global fingerprint statistics."""
+    if stats is None:
+        return
+    _current_stats.set(None)
+    if endpoint:
+        stats.endpoint = endpoint
+
+    suspects = stats.n_plus_one()
+    for suspect in suspects:
+        logger.warning(
+            f"N+1 query pattern on {stats.endpoint}: {suspect['count']}x "
+            f"{suspect['fingerprint'][:200]}"
+        )
+
+    try:
+        from app.core.metrics import record_request_queries
+        record_request_queries(stats.endpoint, stats.statement_count, stats.total_ms / 1000, len(suspects))
+    except Exception as e:
+        logger.debug(f"SQL instrumentation metrics export failed: {e}")
+
+    with _global_lock:
+        for fp, s in stats.fingerprints.items():
+            entry = _global_fingerprints.get(fp)
+            if entry is None:
+                if len(_global_fingerprints) >= MAX_TRACKED_FINGERPRINTS:
+                    continue
+                entry = _global_fingerprints[fp] = {
+                    "count": 0, "total_ms": 0.0, "max_per_request": 0, "endpoints": set(),
+                }
+            entry["count"] += s.count
+            entry["total_ms"] += s.total_ms
+            entry["max_per_request"] = max(entry["max_per_request"], s.count)
+            if len(entry["endpoints"]) < 20:
+                entry["endpoints"].add(stats.endpoint)
+
+
+def get_fingerprint_stats(top: int = 50, order_by: str = "total_ms") -> List[Dict[str, Any]]:
+    """Return the heaviest fingerprints seen across sampled requests."""
+    with _global_lock:
+        rows = [
+            {
+                "fingerprint": fp,
+                "count": e["count"],
+                "total_ms": round(e["total_ms"], 3),
+                "avg_ms": round(e["total_ms"] / e["count"], 3) if e["count"] else 0.0,
+                "max_per_request": e["max_per_request"],
+                "endpoints": sorted(e["endpoints"]),
+            }
+            for fp, e in _global_fingerprints.items()
+        ]
+    rows.sort(key=lambda r: r.get(order_by, 0), reverse=True)
+    return rows[:top]
+
+
+def reset_fingerprint_stats() -> None:
+    """Clear process-wide fingerprint statistics."""
+    with _global_lock:
+        _global_fingerprints.clear()
+
+
+# =============================================================================
+# SQLALCHEMY HOOKS
+# =============================================================================
+
+_instrumented_engines: set = set()
+
+
+_STATEMENT_KINDS = frozenset({"select", "insert", "update", "delete"})
+
+
+def _statement_kind(statement: str) -> str:
+    """First keyword of a statement, for the ``db`` latency histogram."""
+    keyword = statement.lstrip()[:6].lower()
+    return keyword if keyword in _STATEMENT_KINDS else "other"
+
+
+def _observe_statement(statement: str, duration_ms: float) -> None:
+    observe("db", _statement_kind(statement), duration_ms)
+    record_statement(statement, duration_ms)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("sql_instrumentation_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("sql_instrumentation_start")
+    if not starts:
+        return
+    _observe_statement(statement, (time.perf_counter() - starts.pop()) * 1000)
+
+
+def instrument_engine(engine) -> bool:
+    """Attach statement hooks to a SQLAlchemy engine (sync or async). Idempotent.
+
+    Returns:
+        True if hooks were attached, False if already instrumented or disabled
+    """
+    if not SQL_INSTRUMENTATION_ENABLED or engine is None:
+        return False
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if id(sync_engine) in _instrumented_engines:
+        return False
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    _instrumented_engines.add(id(sync_engine))
+    logger.info("SQL instrumentation attached to database engine")
+    return True
+
+
+# =============================================================================
+# PSYCOPG2 HOOKS
+# =============================================================================
+
+class InstrumentedCursorMixin:
+    """Mixin timing ``execute``/``executemany`` on a psycopg2 cursor class."""
+
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            _observe_statement(_query_text(query), (time.perf_counter() - start) * 1000)
+
+    def executemany(self, query, vars_list):
+        start = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            _observe_statement(_query_text(query), (time.perf_counter() - start) * 1000)
+
+
+def _query_text(query: Any) -> str:
+    if isinstance(query, bytes):
+        return query.decode("utf-8", errors="replace")
+    return str(query)
+
+
+@lru_cache(maxsize=None)
+def instrumented_cursor_factory(base_cursor_class=None):
+    """Build an instrumented psycopg2 cursor class for ``cursor_factory=``.
+
+    Args:
+        base_cursor_class: Cursor class to wrap (default: psycopg2's cursor),
+            e.g. ``psycopg2.extras.RealDictCursor``
+
+    Example:
+        pool.ThreadedConnectionPool(..., cursor_factory=instrumented_cursor_factory(RealDictCursor))
+    """
+    if base_cursor_class is None:
+        import psycopg2.extensions
+        base_cursor_class = psycopg2.extensions.cursor
+    return type(
+        f"Instrumented{base_cursor_class.__name__}",
+        (InstrumentedCursorMixin, base_cursor_class),
+        {},
+    )
+
+
+# =============================================================================
+# FASTAPI MIDDLEWARE
+# =============================================================================
+
+def _route_label(request) -> str:
+    """Route template (e.g. /api/users/{identifier}) to keep label cardinality bounded."""
+    route = request.scope.get("route")
+    path = getattr(route, "path", None)
+    return path or "unmatched"
+
+
+def _debug_requested(request) -> bool:
+    """``X-Debug-SQL: 1`` where debug headers are on, or the SQL_DEBUG_TOKEN secret anywhere."""
+    value = request.headers.get("x-debug-sql")
+    if not value:
+        return False
+    if DEBUG_HEADERS_ENABLED and value == "1":
+        return True
+    return bool(SQL_DEBUG_TOKEN) and hmac.compare_digest(value.encode(), SQL_DEBUG_TOKEN.encode())
+
+
+async def sql_instrumentation_middleware(request, call_next):
+    """Track statements per request; add ``X-DB-*`` debug headers when enabled or requested."""
+    force = _debug_requested(request)
+    stats = start_request_tracking(force=force)
+    if stats is None:
+        return await call_next(request)
+    try:
+        response = await call_next(request)
+    except Exception:
+        finish_request_tracking(stats, _route_label(request))
+        raise
+    finish_request_tracking(stats, _route_label(request))
+    if DEBUG_HEADERS_ENABLED or force:
+        response.headers["X-DB-Queries"] = str(stats.statement_count)
+        response.headers["X-DB-Time-Ms"] = f"{stats.total_ms:.2f}"
+        response.headers["X-DB-N-Plus-One"] = str(len(stats.n_plus_one()))
+    return response
@@ -1,16 +1,20 @@
 import asyncio
 import io
 import os
+import time
 import uuid
+from dataclasses import dataclass
 from datetime import timedelta
-from typing import List
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 from urllib.parse import urlparse
 
-import aiofiles
 from decouple import config
 from fastapi import HTTPException, UploadFile
 from PIL import Image
 
+from app.core.concurrent import run_in_thread
+from app.core.latency import timed
+from app.core.media import UPLOAD_DIR, is_content_hashed, store_bytes, store_upload
 from app.core.request_timeout import with_upload_timeout
 
 # Try to import GCS, but don't fail if not available
@@ -21,8 +25,7 @@ except ImportError:
     GCS_AVAILABLE = False
     storage = None
 
-# Upload configuration
-UPLOAD_DIR = "uploads"
+# Upload configuration (UPLOAD_DIR comes from core/media, which serves it)
 MAX_MB = 10  # Maximum file size in MB (for easy configuration)
 MAX_FILE_SIZE = MAX_MB * 1024 * 1024  # 10MB in bytes (derived from MAX_MB)
 ALLOWED_IMAGE_TYPES = {"image/jpeg", "image/png", "image/gif", "image/webp"}
@@ -48,6 +51,9 @@ GCS_PROJECT_ID = config("GCS_PROJECT_ID", default="")
 GCS_CREDENTIALS_PATH = config("GCS_CREDENTIALS_PATH", default="")
 GCS_MAKE_PUBLIC = config("GCS_MAKE_PUBLIC", default=False, cast=bool)
 
+# Files of one batch upload processed at once
+UPLOAD_CONCURRENCY = config("UPLOAD_CONCURRENCY", default=4, cast=int)
+
 # Ensure upload directories exist
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(f"{UPLOAD_DIR}/avatars", exist_ok=True)
@@ -151,26 +157,10 @@ async def save_file_locally(file: UploadFile, folder: str = "general") -> str:
     """
     validate_file(file)
 
-    filename = generate_filename(file.filename)
-    file_path = os.path.join(UPLOAD_DIR, folder, filename)
-
-    # Ensure folder exists
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-
     try:
-        # ✅ CRITICAL: Stream file upload (never load full file in memory)
-        async def _save_file():
-            async with aiofiles.open(file_path, "wb") as f:
-                # Stream in chunks instead of reading entire file at once
-                chunk_size = 1024 * 1024  # 1MB chunks
-                while True:
-                    chunk = await file.read(chunk_size)
-                    if not chunk:
-                        break
-                    await f.write(chunk)
-        
-        await with_upload_timeout(_save_file())
-        return f"/uploads/{folder}/{filename}"
+        # ✅ CRITICAL: Stream file upload (never load full file in memory);
+        # the name is the content hash so the URL can be cached forever
+        return await with_upload_timeout(store_upload(file, folder))
     except asyncio.TimeoutError:
         raise HTTPException(
             status_code=408,
@@ -234,35 +224,19 @@ async def upload_image(
     try:
         # Upload and process image with timeout protection (10 seconds)
         async def _process_and_save():
-            # Generate filename
-            filename = generate_filename(file.filename)
-            file_path = os.path.join(UPLOAD_DIR, folder, filename)
-
-            # Ensure folder exists
-            os.makedirs(os.path.dirname(file_path), exist_ok=True)
-
             if resize and file.content_type in ALLOWED_IMAGE_TYPES:
                 # ⚠️ NOTE: Resizing requires reading full image into memory
                 # This is acceptable for images as they're typically smaller
                 # and resizing reduces memory footprint after processing
                 content = await file.read()
-                content = resize_image(content)
-                
-                # Save resized image
-                async with aiofiles.open(file_path, "wb") as f:
-                    await f.write(content)
-            else:
-                # ✅ CRITICAL: Stream upload when not resizing
-                async with aiofiles.open(file_path, "wb") as f:
-                    chunk_size = 1024 * 1024  # 1MB chunks
-                    while True:
-                        chunk = await file.read(chunk_size)
-                        if not chunk:
-                            break
-                        await f.write(chunk)
-            
-            return f"/uploads/{folder}/{filename}"
-        
+                # Pillow work runs on the shared CPU pool, off the event loop
+                content = await run_in_thread(resize_image, content)
+
+                # resize_image always re-encodes as JPEG
+                return await store_bytes(content, folder, "image.jpg")
+            # ✅ CRITICAL: Stream upload when not resizing
+            return await store_upload(file, folder)
+
         return await with_upload_timeout(_process_and_save())
     except asyncio.TimeoutError:
         raise HTTPException(
@@ -271,26 +245,107 @@ async def upload_image(
         )
 
 
+@dataclass
+class UploadResult:
+    """Outcome of one file in a batch upload"""
+    index: int
+    filename: Optional[str]
+    content_type: Optional[str]
+    size: int = 0
+    url: Optional[str] = None
+    error: Optional[str] = None
+    status_code: int = 200
+    elapsed_ms: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def as_dict(self) -> Dict[str, Any]:
+        result = {"index": self.index, "filename": self.filename, "success": self.ok}
+        if self.ok:
+            result["file_url"] = self.url
+        else:
+            result["error"] = self.error
+            result["status_code"] = self.status_code
+        return result
+
+
+async def _store_any(file: UploadFile, folder: str) -> str:
+    if file.content_type and file.content_type.startswith("image/"):
+        return await upload_image(file, folder)
+    return await save_file_locally(file, folder)
+
+
+async def upload_batch(
+    files: List[UploadFile],
+    folder: str = "general",
+    store: Optional[Callable[[UploadFile, str], Awaitable[str]]] = None,
+    concurrency: int = UPLOAD_CONCURRENCY,
+    on_progress: Optional[Callable[[UploadResult, int, int], None]] = None,
+) -> List[UploadResult]:
+    """Upload files concurrently; one result per file, in input order
+
+    At most ``concurrency`` files are read, resized and stored at once
+    (resizing shares the CPU pool from core/concurrent). A file that fails
+    validation or storage gets an error result and the others carry on.
+    ``on_progress(result, done, total)`` is called as each file finishes.
+
+    Args:
+        files: The uploaded files
+        folder: Destination folder
+        store: Coroutine storing one file and returning its URL
+            (default: upload_image for images, save_file_locally otherwise)
+        concurrency: Files processed at once
+        on_progress: Optional callback per finished file
+    """
+    store = store or _store_any
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    done = 0
+
+    async def _one(index: int, file: UploadFile) -> UploadResult:
+        nonlocal done
+        result = UploadResult(index, file.filename, file.content_type, size=file.size or 0)
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                result.url = await store(file, folder)
+            except HTTPException as e:
+                result.error, result.status_code = str(e.detail), e.status_code
+            except Exception as e:
+                result.error, result.status_code = f"Upload failed: {e}", 500
+            result.elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        done += 1
+        if on_progress is not None:
+            on_progress(result, done, len(files))
+        return result
+
+    return list(await asyncio.gather(*(_one(i, file) for i, file in enumerate(files))))
+
+
 async def upload_multiple_files(
     files: List[UploadFile], folder: str = "general"
 ) -> List[str]:
-    """Upload multiple files"""
-    uploaded_urls = []
-
-    for file in files:
-        if file.content_type.startswith("image/"):
-            url = await upload_image(file, folder)
-        else:
-            url = await save_file_locally(file, folder)
-        uploaded_urls.append(url)
+    """Upload multiple files concurrently
 
-    return uploaded_urls
+    Every file is processed; the first failure is raised afterwards. Use
+    upload_batch to keep the successful files of a partially failed batch.
+    """
+    results = await upload_batch(files, folder)
+    for result in results:
+        if not result.ok:
+            raise HTTPException(status_code=result.status_code, detail=result.error)
+    return [result.url for result in results]
 
 
 def delete_file(file_path: str) -> bool:
-    """Delete file from local storage"""
+    """Delete file from local storage
+
+    Content-hashed files may back other records (identical uploads share
+    one file), so they are left for media.collect_unreferenced_media.
+    """
     try:
-        if file_path.startswith("/uploads/"):
+        if file_path.startswith("/uploads/") and not is_content_hashed(file_path):
             full_path = file_path[1:]  # Remove leading slash
             if os.path.exists(full_path):
                 os.remove(full_path)
@@ -363,7 +418,8 @@ async def upload_to_cloudinary(file: UploadFile, folder: str = "hirebahamas") ->
             )
             return result["secure_url"]
         
-        return await with_upload_timeout(_upload_to_cloudinary())
+        async with timed("external", "cloudinary_upload"):
+            return await with_upload_timeout(_upload_to_cloudinary())
 
     except asyncio.TimeoutError:
         print(f"Cloudinary upload timed out, falling back to local storage")
@@ -480,7 +536,8 @@ async def upload_to_gcs(file: UploadFile, folder: str = "hirebahamas") -> str:
                 )
                 return signed_url
         
-        return await with_upload_timeout(_upload_to_gcs())
+        async with timed("external", "gcs_upload"):
+            return await with_upload_timeout(_upload_to_gcs())
 
     except asyncio.TimeoutError:
         print(f"GCS upload timed out, falling back to local storage")
@@ -406,6 +406,13 @@ def get_engine():
                         echo=os.getenv("DB_ECHO", "false").lower() == "true",
                     )
                     logger.info("✅ Database engine initialized successfully (Neon-safe, no startup options)")
+
+                    # Per-request statement counting / N+1 detection (non-critical)
+                    try:
+                        from app.core.sql_instrumentation import instrument_engine
+                        instrument_engine(_engine)
+                    except Exception as e:
+                        logger.warning(f"SQL instrumentation unavailable: {e}")
                     logger.info(
                         f"Database engine created (lazy): pool_size={POOL_SIZE}, max_overflow={MAX_OVERFLOW}, "
                         f"connect_timeout={CONNECT_TIMEOUT}s, pool_recycle={POOL_RECYCLE}s"
@@ -674,6 +681,19 @@ async def close_db():
         logger.error(f"Unexpected error in close_db: {e}")
 
 
+def reset_engine_after_fork():
+    """Drop connections inherited from the parent process after fork().
+
+    With a preloaded app (GUNICORN_PRELOAD=true) each worker starts with the
+    master's engine. dispose(close=False) gives the worker a fresh pool
+    without closing sockets the parent may still be using. Engines that
+    were never created need nothing: they are built lazily per worker.
+    """
+    if _engine is not None:
+        _engine.sync_engine.dispose(close=False)
+        logger.info("Database pool reset after fork")
+
+
 async def test_db_connection() -> tuple[bool, Optional[str]]:
     """Test database connectivity with timeout.
     
@@ -14,8 +14,11 @@ from sqlalchemy.orm import selectinload
 
 from app.auth.dependencies import get_current_user
 from app.core.cache import get_cached, set_cached, invalidate_cache
+from app.core.feed_ranking import ranked_feed, record_feed_event
 from app.core.pagination import paginate_auto, format_paginated_response
 from app.core.query_timeout import set_query_timeout
+from app.core.serialization import RowMapper, json_response
+from app.core.social_graph import record_post
 from app.database import get_db
 from app.models import Post, PostLike, PostComment, User
 from app.schemas.post import (
@@ -29,6 +32,29 @@ from app.schemas.post import (
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Feed columns, selected without loading Post/User instances
+FEED_POST_ROW = RowMapper({
+    "id": Post.id,
+    "user_id": Post.user_id,
+    "user": {
+        "id": User.id,
+        "email": User.email,
+        "first_name": User.first_name,
+        "last_name": User.last_name,
+        "username": User.username,
+        "occupation": User.occupation,
+        "company_name": User.company_name,
+        "avatar_url": User.avatar_url,
+    },
+    "content": Post.content,
+    "image_url": Post.image_url,
+    "video_url": Post.video_url,
+    "post_type": Post.post_type,
+    "related_job_id": Post.related_job_id,
+    "created_at": Post.created_at,
+    "updated_at": Post.updated_at,
+})
+
 
 @router.get("/", response_model=List[PostResponse])
 async def get_feed(
@@ -52,21 +78,21 @@ async def get_feed(
     # Include current user's own posts
     followed_ids.append(current_user.id)
     
-    # Get posts from followed users
+    # Get posts from followed users as plain column rows
     query = (
-        select(Post)
+        FEED_POST_ROW.select()
+        .join(User, User.id == Post.user_id)
         .where(Post.user_id.in_(followed_ids))
-        .options(selectinload(Post.user))
         .order_by(desc(Post.created_at))
         .offset(skip)
         .limit(limit)
     )
     
     result = await db.execute(query)
-    posts = result.scalars().all()
+    posts_data = FEED_POST_ROW.map(result)
     
     # Get likes and comments count for each post
-    post_ids = [post.id for post in posts]
+    post_ids = [post["id"] for post in posts_data]
     
     # Get likes count
     likes_query = (
@@ -99,16 +125,15 @@ async def get_feed(
     comments_result = await db.execute(comments_query)
     comments_counts = {row.post_id: row.count for row in comments_result}
     
-    # Build response with metadata
-    posts_data = []
-    for post in posts:
-        post_dict = PostResponse.from_orm(post).dict()
-        post_dict['likes_count'] = likes_counts.get(post.id, 0)
-        post_dict['comments_count'] = comments_counts.get(post.id, 0)
-        post_dict['is_liked'] = post.id in user_liked_post_ids
-        posts_data.append(post_dict)
+    # Add metadata
+    for post_dict in posts_data:
+        post_id = post_dict['id']
+        post_dict['likes_count'] = likes_counts.get(post_id, 0)
+        post_dict['comments_count'] = comments_counts.get(post_id, 0)
+        post_dict['is_liked'] = post_id in user_liked_post_ids
     
-    return posts_data
+    # Encoded directly; response_model above documents the shape
+    return json_response(posts_data, model=PostResponse)
 
 
 @router.post("/", response_model=PostResponse)
@@ -125,11 +150,13 @@ async def create_post(
     )
     
     db.add(new_post)
+    await record_post(db, current_user.id)
     await db.commit()
     await db.refresh(new_post)
     
     # Invalidate feed cache
     await invalidate_cache("posts:*")
+    record_feed_event("post", new_post.id, new_post.created_at, post_type=new_post.post_type)
     
     logger.info(f"Post created: id={new_post.id}, user_id={current_user.id}")
     
@@ -226,6 +253,7 @@ async def like_post(
     
     # Invalidate cache
     await invalidate_cache(f"post:{post_id}:*")
+    record_feed_event("like", post_id)
     
     return {"message": "Post liked successfully"}
 
@@ -254,11 +282,13 @@ async def unlike_post(
             detail="Like not found"
         )
     
+    liked_at = like.created_at
     await db.delete(like)
     await db.commit()
     
     # Invalidate cache
     await invalidate_cache(f"post:{post_id}:*")
+    record_feed_event("unlike", post_id, liked_at)
     
     return {"message": "Post unliked successfully"}
 
@@ -294,6 +324,7 @@ async def create_comment(
     
     # Invalidate cache
     await invalidate_cache(f"post:{post_id}:*")
+    record_feed_event("comment", post_id, comment.created_at)
     
     return CommentResponse.from_orm(comment)
 
@@ -357,9 +388,11 @@ async def delete_post(
         )
     
     await db.delete(post)
+    await record_post(db, post.user_id, -1)
     await db.commit()
     
     # Invalidate cache
     await invalidate_cache("posts:*")
+    ranked_feed.remove(post_id)
     
     return {"message": "Post deleted successfully"}
@@ -13,6 +13,7 @@ from app.models import (
     User, Post, PostLike, PostComment, Message, Conversation,
     Notification, Job, Follow
 )
+from app.core.social_graph import apply_follow, get_user_counts, record_follow, record_unfollow
 from app.graphql.types import (
     UserType, PostType, PostAuthorType, CommentType, CommentAuthorType,
     MessageType, MessageSenderType, ConversationType, ConversationParticipantType,
@@ -156,17 +157,8 @@ async def enrich_post(
 
 async def get_user_follow_counts(user_id: int, db: AsyncSession) -> tuple[int, int]:
     """Get followers and following counts for a user."""
-    followers_result = await db.execute(
-        select(func.count()).select_from(Follow).where(Follow.followed_id == user_id)
-    )
-    followers_count = followers_result.scalar() or 0
-
-    following_result = await db.execute(
-        select(func.count()).select_from(Follow).where(Follow.follower_id == user_id)
-    )
-    following_count = following_result.scalar() or 0
-
-    return followers_count, following_count
+    counts = await get_user_counts(db, user_id)
+    return counts.followers, counts.following
 
 
 @strawberry.type
@@ -676,13 +668,17 @@ class Mutation:
         
         if existing_follow:
             await db.delete(existing_follow)
+            await record_unfollow(db, current_user.id, user_id)
             await db.commit()
+            apply_follow(current_user.id, user_id, False)
             action = "unfollow"
             following = False
         else:
             new_follow = Follow(follower_id=current_user.id, followed_id=user_id)
             db.add(new_follow)
+            await record_follow(db, current_user.id, user_id)
             await db.commit()
+            apply_follow(current_user.id, user_id, True)
             action = "follow"
             following = True
         
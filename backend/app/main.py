@@ -5,7 +5,7 @@
 # Responds in <5ms even on coldest start. Render cannot kill this.
 # =============================================================================
 import os
-import importlib
+import importlib.util
 import tracemalloc
 import logging
 from typing import Optional, List, Dict, Union, Any
@@ -18,7 +18,10 @@ from .database import get_engine
 
 # Enable tracemalloc to track memory allocations for debugging
 # This prevents RuntimeWarning: Enable tracemalloc to get the object allocation traceback
-tracemalloc.start()
+# Opt-in: tracing every allocation made importing this module ~3.5x slower
+# (8.4s vs 2.3s), the largest single cold-start cost. PYTHONTRACEMALLOC=1 also works.
+if os.getenv("ENABLE_TRACEMALLOC", "false").lower() == "true":
+    tracemalloc.start()
 
 
 def _is_prod_environment() -> bool:
@@ -144,7 +147,6 @@ from fastapi import Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.responses import Response as StarletteResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-import socketio
 
 # CRITICAL FIX: Inject typing exports into schema modules for Pydantic forward reference resolution
 # This fixes PydanticUndefinedAnnotation errors when Pydantic evaluates forward references
@@ -161,27 +163,29 @@ for _module_name in _schema_modules:
         # Skip modules that might not be available (graceful degradation)
         pass
 
-# Import APIs (with nuclear safety net)
-try:
-    # Explicit router imports to avoid circular dependencies and import-time side effects
-    from .api.hireme import router as hireme_router
-    from .api.jobs import router as jobs_router
-    from .api.messages import router as messages_router
-    from .api.notifications import router as notifications_router
-    from .api.profile_pictures import router as profile_pictures_router
-    from .api.reviews import router as reviews_router
-    from .api.upload import router as upload_router
-    from .api.monetization import router as monetization_router
-    # Import new Facebook-style modular routers
-    from .auth import routes as auth_routes
-    from .users import routes as users_routes
-    from .feed import routes as feed_routes
-    from .health import router as health_router
-    print("✅ API routers imported successfully")
-except Exception as e:
-    print(f"API router import failed: {e}")
-    auth_routes = hireme_router = jobs_router = messages_router = notifications_router = None
-    feed_routes = profile_pictures_router = reviews_router = upload_router = users_routes = health_router = monetization_router = None
+# API routers are mounted through a lazy registry (see core/lazy_routers.py).
+# They are imported at boot, except GraphQL, which always loads on its first
+# request; with BOOT_MODE=minimal every API router does, so /health answers
+# before any of them are imported.
+from .core.lazy_routers import MINIMAL_BOOT, LazyRouterMiddleware, LazyRouterRegistry
+
+# (name, "module:attribute", prefix, tags)
+API_ROUTERS = [
+    # New Facebook-style modular routers
+    ("auth", f"{__package__}.auth.routes:router", "/api/auth", ["authentication"]),
+    ("users", f"{__package__}.users.routes:router", "/api/users", ["users"]),
+    ("posts", f"{__package__}.feed.routes:router", "/api/posts", ["posts", "feed"]),
+    # Legacy API routers (will be migrated gradually)
+    ("hireme", f"{__package__}.api.hireme:router", "/api/hireme", ["hireme"]),
+    ("jobs", f"{__package__}.api.jobs:router", "/api/jobs", ["jobs"]),
+    ("messages", f"{__package__}.api.messages:router", "/api/messages", ["messages"]),
+    ("notifications", f"{__package__}.api.notifications:router", "/api/notifications", ["notifications"]),
+    ("profile_pictures", f"{__package__}.api.profile_pictures:router", "/api/profile-pictures", ["profile-pictures"]),
+    ("reviews", f"{__package__}.api.reviews:router", "/api/reviews", ["reviews"]),
+    ("upload", f"{__package__}.api.upload:router", "/api/upload", ["uploads"]),
+    ("monetization", f"{__package__}.api.monetization:router", "/api/monetization", ["monetization"]),
+    ("feed", f"{__package__}.api.feed:router", "/api/feed", ["feed"]),
+]
 
 # Global variable to store database import error details for later logging
 _db_import_error = None
@@ -204,13 +208,6 @@ except Exception as e:
     print(f"Metrics import failed: {e}")
     get_metrics_response = set_app_info = None
 
-try:
-    from .core.security import prewarm_bcrypt_async
-    print("✅ Security module imported successfully")
-except Exception as e:
-    print(f"Security import failed: {e}")
-    prewarm_bcrypt_async = None
-
 try:
     from .core.redis_cache import redis_cache, warm_cache
     print("✅ Redis cache (legacy) imported successfully")
@@ -219,6 +216,8 @@ except Exception as e:
     redis_cache = warm_cache = None
     # Note: Using new cache system from app.core.cache instead
 
+from .core.shared_state import configured_workers, get_shared_state, run_once, socketio_client_manager
+
 try:
     from .core.db_health import check_database_health, get_database_stats
     print("✅ DB health module imported successfully")
@@ -370,16 +369,66 @@ async def background_bootstrap():
             logger.warning("Database not ready, skipping index creation")
             return
         
-        # Create indexes asynchronously
-        logger.info("Creating database indexes...")
-        try:
-            success = await create_indexes_async()
-            if success:
-                logger.info("✅ Database indexes created successfully")
-            else:
-                logger.warning("⚠️ Some indexes may not have been created")
-        except Exception as e:
-            logger.error(f"Index creation failed: {e}", exc_info=True)
+        # Index creation, partitions and backfills run in one worker only;
+        # the lock is held for its TTL so workers booting later skip it too
+        async def maintenance():
+            # Create indexes asynchronously
+            logger.info("Creating database indexes...")
+            try:
+                success = await create_indexes_async()
+                if success:
+                    logger.info("✅ Database indexes created successfully")
+                else:
+                    logger.warning("⚠️ Some indexes may not have been created")
+            except Exception as e:
+                logger.error(f"Index creation failed: {e}", exc_info=True)
+
+            # Make sure this and the next months' partitions exist
+            try:
+                from .core.partitioning import ensure_partitions, ensure_snowflake_defaults
+                async with engine.begin() as conn:
+                    await ensure_partitions(conn)
+                    await ensure_snowflake_defaults(conn)
+            except Exception as e:
+                logger.warning(f"Partition maintenance skipped: {e}")
+
+            # Link skills text written before the skills taxonomy existed
+            try:
+                from .core.skills import backfill_skill_links
+                from .database import AsyncSessionLocal
+                async with AsyncSessionLocal() as db:
+                    await backfill_skill_links(db)
+            except Exception as e:
+                logger.warning(f"Skill backfill skipped: {e}")
+
+            # Recount social graph counters (creates rows for new users)
+            try:
+                from .core.social_graph import reconcile_social_stats
+                from .database import AsyncSessionLocal
+                async with AsyncSessionLocal() as db:
+                    await reconcile_social_stats(db)
+            except Exception as e:
+                logger.warning(f"Social stats reconciliation skipped: {e}")
+
+            # Recount reputation aggregates (creates rows for unreviewed users)
+            try:
+                from .core.reputation import reconcile_reputation
+                from .database import AsyncSessionLocal
+                async with AsyncSessionLocal() as db:
+                    await reconcile_reputation(db)
+            except Exception as e:
+                logger.warning(f"Reputation reconciliation skipped: {e}")
+
+            # Uploaded files whose last record was deleted (hashed files are shared)
+            try:
+                from .core.background_tasks import cleanup_unreferenced_media_task
+                from .database import AsyncSessionLocal
+                async with AsyncSessionLocal() as db:
+                    await cleanup_unreferenced_media_task(db)
+            except Exception as e:
+                logger.warning(f"Media cleanup skipped: {e}")
+
+        await run_once("background_bootstrap", maintenance, ttl=600, hold=True)
             
     except Exception as e:
         logger.error(f"Bootstrap failed: {e}", exc_info=True)
@@ -404,11 +453,17 @@ if os.path.exists(runtime_log_dir):
     except Exception as e:
         print(f"Warning: Could not create runtime log file: {e}")
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s %(levelname)s %(message)s',
-    handlers=log_handlers
-)
+# Log records are queued and written in batches by a background thread
+# (core/request_log.py), so request handlers never block on stdout
+from .core.request_log import install as install_log_pipeline, request_logger
+
+for _handler in log_handlers:
+    if _handler.formatter is None:
+        _handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+# Like basicConfig: our handlers only when nothing configured the root logger
+install_log_pipeline(log_handlers if not logging.getLogger().handlers else [], level=logging.INFO)
+# Slow requests are always logged, whatever the route's sample rate
+request_logger.sampler.slow_ms = float(os.getenv("REQUEST_LOG_SLOW_MS", SLOW_REQUEST_THRESHOLD_MS))
 logger = logging.getLogger(__name__)
 
 # =============================================================================
@@ -481,17 +536,13 @@ async def panic_handler(request: Request, exc: Exception) -> JSONResponse:
     )
 
 # GraphQL support (optional - gracefully degrades if strawberry not available)
-# Import after logger is configured
-HAS_GRAPHQL = False
-_graphql_router_factory = None
-try:
-    from .graphql.schema import create_graphql_router as _graphql_router_factory
-    HAS_GRAPHQL = True
+# Strawberry is the most expensive import of the app, so the router is only
+# registered here and built on the first /api/graphql request
+HAS_GRAPHQL = importlib.util.find_spec("strawberry") is not None
+if HAS_GRAPHQL:
     logger.info("✅ GraphQL support enabled")
-except ImportError:
+else:
     logger.info(f"ℹ️  GraphQL disabled (optional dependency 'strawberry-graphql' not installed)")
-except Exception as e:
-    logger.warning(f"⚠️  GraphQL initialization failed (non-critical): {e}")
 
 # =============================================================================
 # RECONFIGURE APP WITH FULL FEATURES (lifespan, docs, etc.)
@@ -695,6 +746,14 @@ async def add_security_headers(request: Request, call_next):
     return response
 
 
+# Per-request SQL statement counting and N+1 detection (sampled)
+try:
+    from .core.sql_instrumentation import sql_instrumentation_middleware
+    app.middleware("http")(sql_instrumentation_middleware)
+except Exception as e:
+    logger.warning(f"SQL instrumentation middleware not available: {e}")
+
+
 # Add request logging middleware
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
@@ -733,22 +792,18 @@ async def log_requests(request: Request, call_next):
             f"  Origin: {request.headers.get('origin', 'none')}\n"
             f"  Referer: {request.headers.get('referer', 'none')}"
         )
-    else:
-        # Log incoming request with more context
-        logger.info(
-            f"[{request_id}] --> {request.method} {request.url.path} "
-            f"from {client_ip} | UA: {user_agent[:50]}..."
-        )
     
     # Process request
     try:
         response = await call_next(request)
         duration_ms = int((time.time() - start_time) * 1000)
         
-        # Track performance metrics
+        # Track performance metrics by route template (bounded label set)
         try:
-            from .core.monitoring import track_request_time
-            track_request_time(request.url.path, duration_ms, response.status_code)
+            from .core.monitoring import request_label, track_request_time
+            track_request_time(
+                request_label(request), duration_ms, response.status_code
+            )
         except Exception:
             pass  # Monitoring is non-critical
         
@@ -765,14 +820,13 @@ async def log_requests(request: Request, call_next):
                     f"  Result: LOGIN SUCCESSFUL"
                 )
             else:
-                logger.info(
-                    f"[{request_id}] <-- {response.status_code} {request.method} {request.url.path} "
-                    f"in {duration_ms}ms"
+                # One structured record per request, sampled for probes
+                request_logger.log(
+                    request.method, request.url.path, response.status_code, duration_ms,
+                    request_id=request_id, client_ip=client_ip, user_agent=user_agent[:100],
                 )
         else:
             # Client/Server error - log at WARNING/ERROR level with more detail
-            log_level = logging.WARNING if response.status_code < 500 else logging.ERROR
-            
             # For authentication endpoints, capture the error body to help debug login issues
             # Only read body for JSON responses to avoid processing large files
             error_detail = ""
@@ -825,18 +879,12 @@ async def log_requests(request: Request, call_next):
                     error_detail = f" | Error reading body: {str(e)}"
             
             if not is_auth_endpoint or not error_detail:
-                # Only log here if we didn't already log enhanced auth error above
-                logger.log(
-                    log_level,
-                    f"[{request_id}] <-- {response.status_code} {request.method} {request.url.path} "
-                    f"in {duration_ms}ms from {client_ip}{error_detail}"
-                )
-            
-            # Log slow requests separately
-            if duration_ms > SLOW_REQUEST_THRESHOLD_MS:
-                logger.warning(
-                    f"[{request_id}] SLOW REQUEST: {request.method} {request.url.path} "
-                    f"took {duration_ms}ms (>{SLOW_REQUEST_THRESHOLD_MS}ms threshold)"
+                # Only log here if we didn't already log enhanced auth error above;
+                # errors are never sampled out
+                request_logger.log(
+                    request.method, request.url.path, response.status_code, duration_ms,
+                    request_id=request_id, client_ip=client_ip, user_agent=user_agent[:100],
+                    error=error_detail.lstrip(" |") or None,
                 )
         
         return response
@@ -860,7 +908,7 @@ async def startup():
     """Safe startup with non-blocking background bootstrap.
     
     ✅ PRODUCTION FASTAPI PATTERN (DO NOT EVER DO list compliant):
-    - ❌ NO Multiple Gunicorn workers (using 1 worker)
+    - ✅ Multiple workers only with Redis-backed shared state (app.core.shared_state)
     - ❌ NO Blocking DB calls at import
     - ❌ NO --reload flag
     - ❌ NO Heavy startup logic (all in background task)
@@ -874,7 +922,11 @@ async def startup():
     ✅ Gunicorn-safe
     """
     logger.info("🚀 Starting HireMeBahamas API (Production Mode)")
-    logger.info("   Workers: 1 (predictable memory)")
+    # Fails fast when several workers are configured without Redis
+    state = get_shared_state()
+    logger.info(f"   Workers: {configured_workers()} (shared state: {state.name})")
+    if set_app_info is not None:
+        set_app_info(version="1.0.0", environment=os.getenv("ENVIRONMENT", "development"))
     logger.info("   Health: /health bypass with zero database access")
     logger.info("   DB: Lazy (initializes on first real request)")
     logger.info("✅ Application startup complete (instant, no DB work)")
@@ -899,7 +951,14 @@ async def shutdown():
             await asyncio.wait(_background_tasks, timeout=SHUTDOWN_TASK_TIMEOUT)
         except Exception as e:
             logger.warning(f"Error waiting for background tasks: {e}")
-    
+
+    # Deliver push notifications still inside their coalescing window
+    try:
+        from .core.push import push_dispatcher
+        await push_dispatcher.close()
+    except Exception as e:
+        logger.warning(f"Error flushing push notifications: {e}")
+
     # Close Redis cache
     try:
         if redis_cache is not None:
@@ -908,6 +967,12 @@ async def shutdown():
     except Exception as e:
         logger.warning(f"Error disconnecting Redis cache: {e}")
     
+    # Close shared state connections
+    try:
+        await get_shared_state().close()
+    except Exception as e:
+        logger.warning(f"Error closing shared state: {e}")
+    
     # Close database connections
     try:
         if close_db is not None:
@@ -1101,66 +1166,81 @@ async def get_metrics():
 
 
 # Include routers with /api prefix to match frontend expectations (with safety checks)
-# New Facebook-style modular routers
-if auth_routes is not None:
-    app.include_router(auth_routes.router, prefix="/api/auth", tags=["authentication"])
-if users_routes is not None:
-    app.include_router(users_routes.router, prefix="/api/users", tags=["users"])
-if feed_routes is not None:
-    app.include_router(feed_routes.router, prefix="/api/posts", tags=["posts", "feed"])
-
-# Legacy API routers (will be migrated gradually)
-if hireme_router is not None:
-    app.include_router(hireme_router, prefix="/api/hireme", tags=["hireme"])
-if jobs_router is not None:
-    app.include_router(jobs_router, prefix="/api/jobs", tags=["jobs"])
-if messages_router is not None:
-    app.include_router(messages_router, prefix="/api/messages", tags=["messages"])
-if notifications_router is not None:
-    app.include_router(notifications_router, prefix="/api/notifications", tags=["notifications"])
-if profile_pictures_router is not None:
-    app.include_router(profile_pictures_router, prefix="/api/profile-pictures", tags=["profile-pictures"])
-if reviews_router is not None:
-    app.include_router(reviews_router, prefix="/api/reviews", tags=["reviews"])
-if upload_router is not None:
-    app.include_router(upload_router, prefix="/api/upload", tags=["uploads"])
-if monetization_router is not None:
-    app.include_router(monetization_router, prefix="/api/monetization", tags=["monetization"])
+lazy_routers = LazyRouterRegistry(app)
+for _name, _target, _prefix, _tags in API_ROUTERS:
+    lazy_routers.add(_name, _target, prefix=_prefix, tags=_tags, lazy=MINIMAL_BOOT)
 
 # Include health check router (no prefix as it provides /health, /ready endpoints)
-if health_router is not None:
-    app.include_router(health_router, tags=["health"])
+lazy_routers.add("health", f"{__package__}.health:router", tags=["health"], lazy=False)
 
 # Include GraphQL router (if available)
 if HAS_GRAPHQL:
-    try:
-        graphql_router = _graphql_router_factory()
-        app.include_router(graphql_router, prefix="/api", tags=["graphql"])
-        logger.info("✅ GraphQL router registered at /api/graphql")
-    except Exception as e:
-        logger.warning(f"⚠️  Failed to register GraphQL router (non-critical): {e}")
+    lazy_routers.add(
+        "graphql",
+        f"{__package__}.graphql.schema:create_graphql_router",
+        prefix="/api",
+        path="/api/graphql",
+        tags=["graphql"],
+        factory=True,
+    )
+    logger.info("✅ GraphQL router registered at /api/graphql (loads on first request)")
 else:
     logger.info("ℹ️  GraphQL API not available (optional dependency not installed)")
 
+app.add_middleware(LazyRouterMiddleware, registry=lazy_routers)
+
+# Uploaded files are answered ahead of every other middleware (see core/media.py)
+from .core.media import MediaMiddleware
+app.add_middleware(MediaMiddleware)
 
-# Initialize Socket.IO for real-time messaging
-# Reuse CORS origins from middleware configuration (excludes localhost in production)
-sio = socketio.AsyncServer(
-    async_mode='asgi',
-    cors_allowed_origins=_allowed_origins  # Uses same origins as CORS middleware
+_failed_routers = [mount.name for mount in lazy_routers.mounts if mount.error]
+if _failed_routers:
+    print(f"API router import failed: {', '.join(_failed_routers)}")
+else:
+    print("✅ API routers imported successfully")
+logger.info(
+    f"Boot mode: {'minimal' if MINIMAL_BOOT else 'full'} "
+    f"({len(lazy_routers.pending)} of {len(lazy_routers.mounts)} routers deferred to first request)"
 )
 
-# Create Socket.IO ASGI app
-socket_app = socketio.ASGIApp(sio, app)
 
-# Set up Socket.IO event handlers using the new realtime module
-try:
-    from .realtime.websocket import setup_socket_handlers
-    socket_manager = setup_socket_handlers(sio)
-    logger.info("✅ WebSocket handlers registered via realtime module")
-except Exception as e:
-    logger.warning(f"⚠️  WebSocket handlers registration failed (non-critical): {e}")
-    socket_manager = None
+def _setup_socketio():
+    """Create the Socket.IO server and the combined ASGI app"""
+    global sio, socket_app, socket_manager
+    import socketio
+
+    # Initialize Socket.IO for real-time messaging
+    # Reuse CORS origins from middleware configuration (excludes localhost in production)
+    # With Redis, emits are relayed so sockets on other workers receive them
+    sio = socketio.AsyncServer(
+        async_mode='asgi',
+        cors_allowed_origins=_allowed_origins,  # Uses same origins as CORS middleware
+        client_manager=socketio_client_manager(),
+    )
+
+    # Create Socket.IO ASGI app
+    socket_app = socketio.ASGIApp(sio, app)
+
+    # Set up Socket.IO event handlers using the new realtime module
+    try:
+        from .realtime.websocket import setup_socket_handlers
+        socket_manager = setup_socket_handlers(sio)
+        logger.info("✅ WebSocket handlers registered via realtime module")
+    except Exception as e:
+        logger.warning(f"⚠️  WebSocket handlers registration failed (non-critical): {e}")
+        socket_manager = None
+
+
+if MINIMAL_BOOT:
+    def __getattr__(name):
+        # Minimal boot: Socket.IO is created when app.main:socket_app (or sio)
+        # is first looked up rather than on import
+        if name in ("sio", "socket_app", "socket_manager"):
+            _setup_socketio()
+            return globals()[name]
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+else:
+    _setup_socketio()
 
 
 # Root endpoint
@@ -1187,11 +1267,10 @@ async def metrics():
     - Database connection pool stats
     - Authentication attempt counts
     - Application uptime
-    """
-    # Set app info on each request (idempotent)
-    environment = os.getenv("ENVIRONMENT", "development")
-    set_app_info(version="1.0.0", environment=environment)
+    - p50/p95/p99 latency per route, DB statement type, cache and external call
     
+    With several workers the values of all workers are merged.
+    """
     metrics_data, content_type = get_metrics_response()
     return StarletteResponse(content=metrics_data, media_type=content_type)
 
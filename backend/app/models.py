@@ -1,5 +1,6 @@
 from app.database import Base
-from sqlalchemy import Boolean, Column, DateTime, Enum as SQLEnum, Float, ForeignKey, Integer, String, Text
+from .core.snowflake import next_id
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, Enum as SQLEnum, Float, ForeignKey, Integer, String, Text
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -162,7 +163,8 @@ class Conversation(Base):
 class Message(Base):
     __tablename__ = "messages"
 
-    id = Column(Integer, primary_key=True, autoincrement=True)
+    # K-sortable snowflake ID: the table is time-partitioned (see core/partitioning.py)
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, default=next_id)
     conversation_id = Column(Integer, ForeignKey("conversations.id"), nullable=False)
     sender_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     receiver_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -230,7 +232,8 @@ class Follow(Base):
 class Notification(Base):
     __tablename__ = "notifications"
 
-    id = Column(Integer, primary_key=True, autoincrement=True)
+    # K-sortable snowflake ID: the table is time-partitioned (see core/partitioning.py)
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, default=next_id)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     actor_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     notification_type = Column(SQLEnum(NotificationType), nullable=False)  # Type from NotificationType enum
@@ -458,3 +461,99 @@ class EnterpriseAccount(Base):
 
     # Relationships
     user = relationship("User")
+
+
+# =============================================================================
+# SKILLS TAXONOMY (see app/core/skills.py)
+# =============================================================================
+
+
+class Skill(Base):
+    """Canonical skill name"""
+    __tablename__ = "skills"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String(100), unique=True, index=True, nullable=False)  # Normalized, lower-case
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class SkillAlias(Base):
+    """Alternative spelling that normalizes to a canonical skill"""
+    __tablename__ = "skill_aliases"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    alias = Column(String(100), unique=True, nullable=False)
+    skill_id = Column(Integer, ForeignKey("skills.id", ondelete="CASCADE"), nullable=False)
+
+    skill = relationship("Skill")
+
+
+class UserSkill(Base):
+    """User <-> skill association, kept in sync with User.skills"""
+    __tablename__ = "user_skills"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    skill_id = Column(Integer, ForeignKey("skills.id", ondelete="CASCADE"), primary_key=True, index=True)
+
+
+class JobSkill(Base):
+    """Job <-> skill association, kept in sync with Job.skills"""
+    __tablename__ = "job_skills"
+
+    job_id = Column(Integer, ForeignKey("jobs.id", ondelete="CASCADE"), primary_key=True)
+    skill_id = Column(Integer, ForeignKey("skills.id", ondelete="CASCADE"), primary_key=True, index=True)
+
+
+# =============================================================================
+# SOCIAL GRAPH STATS (see app/core/social_graph.py)
+# =============================================================================
+
+
+class UserSocialStats(Base):
+    """Denormalized follower/following/post counters for one user"""
+    __tablename__ = "user_social_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    followers_count = Column(Integer, nullable=False, default=0, server_default="0")
+    following_count = Column(Integer, nullable=False, default=0, server_default="0")
+    posts_count = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+# =============================================================================
+# REPUTATION (see app/core/reputation.py)
+# =============================================================================
+
+
+class UserReputation(Base):
+    """Review count, rating sum and star histogram for one reviewee"""
+    __tablename__ = "user_reputation"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    review_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_sum = Column(Integer, nullable=False, default=0, server_default="0")
+    one_star = Column(Integer, nullable=False, default=0, server_default="0")
+    two_star = Column(Integer, nullable=False, default=0, server_default="0")
+    three_star = Column(Integer, nullable=False, default=0, server_default="0")
+    four_star = Column(Integer, nullable=False, default=0, server_default="0")
+    five_star = Column(Integer, nullable=False, default=0, server_default="0")
+    # Bayesian-smoothed rating, kept in step with the counters for ORDER BY
+    score = Column(Float, nullable=False, default=0, server_default="0", index=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+# =============================================================================
+# PUSH DEVICE REGISTRY (see app/core/push.py)
+# =============================================================================
+
+
+class DeviceToken(Base):
+    """A push token registered by one of a user's devices"""
+    __tablename__ = "device_tokens"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    # Provider registration token; a device re-registering under another account moves it
+    token = Column(String(512), nullable=False, unique=True)
+    platform = Column(String(16), nullable=False, default="android")  # android, ios, web
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_seen_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -2,8 +2,14 @@
 WebSocket handlers for real-time features.
 
 Provides Socket.IO event handlers for real-time messaging and notifications.
+
+The connection dicts on SocketManager only describe sockets held by this
+worker. Online presence lives in shared state and every socket joins a
+``user_<id>`` room, so with several workers (and the Socket.IO Redis
+manager) presence checks and per-user emits cover all workers.
 """
 import logging
+import os
 from datetime import datetime
 from typing import Dict, List, Optional
 
@@ -11,11 +17,18 @@ import socketio
 from sqlalchemy import select
 
 from app.auth.jwt import decode_access_token
+from app.core.shared_state import get_shared_state
 from app.database import AsyncSessionLocal
 from app.models import Message, User
 
 logger = logging.getLogger(__name__)
 
+PRESENCE_GROUP = "online_users"
+
+
+def _presence_token(sid: str) -> str:
+    return f"{os.getpid()}:{sid}"
+
 
 class SocketManager:
     """Manager for Socket.IO connections and events."""
@@ -69,6 +82,9 @@ class SocketManager:
             self.user_connections[user_id_str] = []
         self.user_connections[user_id_str].append(sid)
         
+        await self.sio.enter_room(sid, f"user_{user_id_str}")
+        await get_shared_state().presence_add(PRESENCE_GROUP, user_id_str, _presence_token(sid))
+        
         logger.info(f"User {user.id} connected via socket {sid}")
 
     async def disconnect_user(self, sid: str):
@@ -85,6 +101,8 @@ class SocketManager:
             # Remove from active connections
             del self.active_connections[sid]
             
+            await get_shared_state().presence_remove(PRESENCE_GROUP, user_id, _presence_token(sid))
+            
             logger.info(f"Socket {sid} disconnected")
 
     async def join_conversation_room(self, sid: str, conversation_id: str):
@@ -113,10 +131,16 @@ class SocketManager:
         logger.info(f"Socket {sid} left conversation {conversation_id}")
 
     async def emit_to_user(self, user_id: str, event: str, data: dict):
-        """Emit an event to all sockets connected for a specific user."""
-        if user_id in self.user_connections:
-            for sid in self.user_connections[user_id]:
-                await self.sio.emit(event, data, room=sid)
+        """Emit an event to all sockets connected for a specific user, on any worker."""
+        await self.sio.emit(event, data, room=f"user_{user_id}")
+
+    async def get_online_users(self) -> List[str]:
+        """User ids with at least one live socket on any worker."""
+        return await get_shared_state().presence_members(PRESENCE_GROUP)
+
+    async def is_user_online(self, user_id: str) -> bool:
+        """Check if a user has a live socket on any worker."""
+        return await get_shared_state().presence_contains(PRESENCE_GROUP, str(user_id))
 
     async def emit_to_conversation(self, conversation_id: str, event: str, data: dict, skip_sid: Optional[str] = None):
         """Emit an event to all sockets in a conversation room."""
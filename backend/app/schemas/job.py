@@ -76,6 +76,7 @@ class ApplicantInfo(BaseModel):
     avatar_url: Optional[str] = None
     skills: Optional[List[str]] = None
     average_rating: Optional[float] = None
+    total_reviews: int = 0
 
     class Config:
         from_attributes = True
@@ -13,7 +13,16 @@ from sqlalchemy import and_, func, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth.dependencies import get_current_user
-from app.core.cache import get_cached, set_cached, invalidate_cache
+from app.core.api_cache import apply_overlay, exclude_viewer, get_shared, set_shared
+from app.core.cache import invalidate_cache
+from app.core.social_graph import (
+    apply_follow,
+    following_among,
+    get_social_counts,
+    get_user_counts,
+    record_follow,
+    record_unfollow,
+)
 from app.database import get_db
 from app.models import Follow, User
 from app.schemas.auth import UserResponse
@@ -24,6 +33,7 @@ logger = logging.getLogger(__name__)
 # Constants
 MAX_INT32 = 2147483647
 USERNAME_PATTERN = r'^[a-zA-Z0-9_-]+$'
+USER_SEARCH_FIELDS = ("first_name", "last_name", "email", "occupation", "location")
 
 
 async def resolve_user_by_identifier(
@@ -88,6 +98,33 @@ async def resolve_user_by_identifier(
     return target_user
 
 
+async def _user_rows(db: AsyncSession, users: List[User]) -> List[dict]:
+    """Viewer-independent rows: profile fields and social counts"""
+    counts = await get_social_counts(db, [user.id for user in users])
+    return [
+        {**UserResponse.from_orm(user).dict(), **counts[user.id].as_dict()}
+        for user in users
+    ]
+
+
+async def _with_following(db: AsyncSession, viewer: User, rows: List[dict]) -> List[dict]:
+    """Per-viewer overlay: is_following for the whole page in one lookup"""
+    followed_ids = await following_among(db, viewer.id, [row["id"] for row in rows])
+    return apply_overlay(rows, is_following=followed_ids)
+
+
+async def _user_page(db: AsyncSession, viewer: User, users: List[User]) -> List[dict]:
+    return await _with_following(db, viewer, await _user_rows(db, users))
+
+
+def _matches_search(user: User, search: Optional[str]) -> bool:
+    """Python equivalent of the /list search filter, for one user"""
+    if not search:
+        return True
+    needle = search.lower()
+    return any(needle in (getattr(user, field) or "").lower() for field in USER_SEARCH_FIELDS)
+
+
 @router.get("/list")
 async def get_users(
     skip: int = Query(0, ge=0),
@@ -96,64 +133,45 @@ async def get_users(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Get list of users with optional search."""
-    cache_key = f"users:list:{skip}:{limit}:{search}:{current_user.id}"
-    
-    cached_response = await get_cached(cache_key)
-    if cached_response is not None:
-        return cached_response
-    
-    query = select(User).where(User.is_active == True, User.id != current_user.id)
-
-    if search:
-        search_filter = or_(
-            User.first_name.ilike(f"%{search}%"),
-            User.last_name.ilike(f"%{search}%"),
-            User.email.ilike(f"%{search}%"),
-            User.occupation.ilike(f"%{search}%"),
-            User.location.ilike(f"%{search}%"),
-        )
-        query = query.where(search_filter)
+    """Get list of users with optional search.
 
-    # Get total count
-    count_result = await db.execute(select(func.count()).select_from(query.subquery()))
-    total = count_result.scalar()
+    The page is cached once for all viewers; the viewer's own row is
+    dropped and is_following applied per request.
+    """
+    cache_key = f"{skip}:{limit}:{search}"
+    payload = await get_shared("users:list", cache_key)
+    if payload is None:
+        query = select(User).where(User.is_active == True)
 
-    # Apply pagination
-    query = query.offset(skip).limit(limit)
-    result = await db.execute(query)
-    users = result.scalars().all()
+        if search:
+            query = query.where(or_(*(
+                getattr(User, field).ilike(f"%{search}%") for field in USER_SEARCH_FIELDS
+            )))
 
-    # Get follow status for each user
-    follow_result = await db.execute(
-        select(Follow).where(
-            and_(
-                Follow.follower_id == current_user.id,
-                Follow.followed_id.in_([u.id for u in users])
-            )
-        )
-    )
-    followed_ids = {f.followed_id for f in follow_result.scalars().all()}
+        # Get total count
+        count_result = await db.execute(select(func.count()).select_from(query.subquery()))
+        total = count_result.scalar()
 
-    users_list = [
-        {
-            **UserResponse.from_orm(user).dict(),
-            "is_following": user.id in followed_ids,
+        # Apply pagination
+        query = query.offset(skip).limit(limit)
+        result = await db.execute(query)
+        users = result.scalars().all()
+
+        payload = {
+            "users": await _user_rows(db, users),
+            "total": total,
+            "skip": skip,
+            "limit": limit,
         }
-        for user in users
-    ]
-    
-    response = {
-        "users": users_list,
-        "total": total,
-        "skip": skip,
-        "limit": limit,
+        # Cache for 3 minutes
+        await set_shared("users:list", cache_key, payload, ttl=180)
+
+    users_list = exclude_viewer(payload["users"], current_user.id)
+    return {
+        **payload,
+        "users": await _with_following(db, current_user, users_list),
+        "total": payload["total"] - (current_user.is_active and _matches_search(current_user, search)),
     }
-    
-    # Cache for 3 minutes
-    await set_cached(cache_key, response, ttl=180)
-    
-    return response
 
 
 @router.get("/{identifier}")
@@ -165,21 +183,8 @@ async def get_user_profile(
     """Get user profile by ID or username."""
     target_user = await resolve_user_by_identifier(identifier, db, current_user.id)
     
-    # Check if current user is following target user
-    follow_result = await db.execute(
-        select(Follow).where(
-            and_(
-                Follow.follower_id == current_user.id,
-                Follow.followed_id == target_user.id
-            )
-        )
-    )
-    is_following = follow_result.scalar_one_or_none() is not None
-    
-    return {
-        **UserResponse.from_orm(target_user).dict(),
-        "is_following": is_following,
-    }
+    profile, = await _user_page(db, current_user, [target_user])
+    return profile
 
 
 @router.post("/{identifier}/follow")
@@ -217,10 +222,12 @@ async def follow_user(
     # Create follow relationship
     follow = Follow(follower_id=current_user.id, followed_id=target_user.id)
     db.add(follow)
+    await record_follow(db, current_user.id, target_user.id)
     await db.commit()
+    apply_follow(current_user.id, target_user.id, True)
     
     # Invalidate cache
-    await invalidate_cache(f"users:list:*")
+    await invalidate_cache("users:list:")
     
     return {"message": "Successfully followed user"}
 
@@ -252,10 +259,12 @@ async def unfollow_user(
         )
     
     await db.delete(follow)
+    await record_unfollow(db, current_user.id, target_user.id)
     await db.commit()
+    apply_follow(current_user.id, target_user.id, False)
     
     # Invalidate cache
-    await invalidate_cache(f"users:list:*")
+    await invalidate_cache("users:list:")
     
     return {"message": "Successfully unfollowed user"}
 
@@ -282,18 +291,11 @@ async def get_user_followers(
     result = await db.execute(query)
     followers = result.scalars().all()
     
-    # Get count
-    count_query = (
-        select(func.count())
-        .select_from(Follow)
-        .where(Follow.followed_id == target_user.id)
-    )
-    count_result = await db.execute(count_query)
-    total = count_result.scalar()
+    counts = await get_user_counts(db, target_user.id)
     
     return {
-        "users": [UserResponse.from_orm(user).dict() for user in followers],
-        "total": total,
+        "users": await _user_page(db, current_user, followers),
+        "total": counts.followers,
         "skip": skip,
         "limit": limit,
     }
@@ -321,18 +323,11 @@ async def get_user_following(
     result = await db.execute(query)
     following = result.scalars().all()
     
-    # Get count
-    count_query = (
-        select(func.count())
-        .select_from(Follow)
-        .where(Follow.follower_id == target_user.id)
-    )
-    count_result = await db.execute(count_query)
-    total = count_result.scalar()
+    counts = await get_user_counts(db, target_user.id)
     
     return {
-        "users": [UserResponse.from_orm(user).dict() for user in following],
-        "total": total,
+        "users": await _user_page(db, current_user, following),
+        "total": counts.following,
         "skip": skip,
         "limit": limit,
     }
@@ -0,0 +1,11 @@
+"""
+Benchmark harnesses for the HireMeBahamas backend.
+
+Modules in this package seed synthetic, production-shaped data into a local
+database and drive the real FastAPI routers against it. They are run by hand
+or from CI, never imported by the application itself.
+
+Usage:
+    python -m benchmarks.query_plan_benchmark --users 5000
+    python -m benchmarks.feed_ranking_replay --database-url "$DATABASE_URL"
+"""
@@ -0,0 +1,283 @@
+"""
+Synthetic dataset generator for backend benchmarks.
+
+Generates a production-shaped dataset (users, follows, posts, likes,
+conversations, messages, jobs) and bulk-inserts it through SQLAlchemy so the
+same code seeds SQLite and PostgreSQL.
+
+The social graph follows a power-law: a handful of accounts (large employers,
+popular tradespeople) attract most followers while the long tail follows only
+a few people. This matters for query plans - the feed's ``IN (followed_ids)``
+list and the follower-count aggregates behave very differently on a skewed
+graph than on a uniform one.
+
+Usage:
+    from benchmarks.dataset import DatasetSpec, seed_dataset
+
+    spec = DatasetSpec(users=2000)
+    summary = await seed_dataset(session_factory, spec)
+"""
+import random
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Conversation, Follow, Job, Message, Post, PostLike, User
+
+# Rows per INSERT statement - keeps SQLite under its bound-parameter limit
+INSERT_CHUNK_SIZE = 500
+
+ISLAND_LOCATIONS = [
+    "Nassau, New Providence",
+    "Freeport, Grand Bahama",
+    "Marsh Harbour, Abaco",
+    "George Town, Exuma",
+    "Andros Town, Andros",
+    "Governor's Harbour, Eleuthera",
+    "Alice Town, Bimini",
+    "Matthew Town, Inagua",
+]
+
+JOB_CATEGORIES = [
+    "Construction",
+    "Plumbing",
+    "Electrical",
+    "Hospitality",
+    "Tourism",
+    "Marine",
+    "Landscaping",
+    "Technology",
+    "Healthcare",
+    "Retail",
+]
+
+JOB_TYPES = ["full-time", "part-time", "contract", "freelance"]
+
+OCCUPATIONS = [
+    "Electrician",
+    "Plumber",
+    "Carpenter",
+    "Chef",
+    "Boat Captain",
+    "Tour Guide",
+    "Software Developer",
+    "Nurse",
+    "Mason",
+    "Landscaper",
+]
+
+FIRST_NAMES = ["Alex", "Jordan", "Taylor", "Morgan", "Casey", "Riley", "Jamie", "Avery", "Quinn", "Drew"]
+LAST_NAMES = ["Rolle", "Smith", "Johnson", "Ferguson", "Knowles", "Bethel", "Moss", "Pinder", "Sands", "Cartwright"]
+
+
+@dataclass
+class DatasetSpec:
+    """Size and shape of a synthetic dataset.
+
+    Attributes:
+        users: Number of user accounts
+        avg_following: Mean number of accounts each user follows
+        follow_skew: Zipf exponent for followee popularity (higher = more skewed)
+        posts_per_user: Mean posts per user
+        likes_per_post: Mean likes per post
+        conversations_per_user: Mean conversations started per user
+        messages_per_conversation: Mean messages per conversation
+        jobs: Number of job postings
+        days: Spread of created_at timestamps into the past
+        seed: Random seed so runs are reproducible
+    """
+    users: int = 1000
+    avg_following: int = 25
+    follow_skew: float = 1.1
+    posts_per_user: int = 5
+    likes_per_post: int = 4
+    conversations_per_user: int = 2
+    messages_per_conversation: int = 8
+    jobs: int = 500
+    days: int = 90
+    seed: int = 42
+
+    def to_dict(self) -> Dict[str, float]:
+        return asdict(self)
+
+
+async def _bulk_insert(db: AsyncSession, model, rows: List[dict]) -> None:
+    """Insert rows in chunks using executemany-style INSERTs."""
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        chunk = rows[start:start + INSERT_CHUNK_SIZE]
+        if chunk:
+            await db.execute(insert(model), chunk)
+
+
+def _poisson_like(rng: random.Random, mean: float) -> int:
+    """Cheap non-negative integer draw centred on ``mean``."""
+    if mean <= 0:
+        return 0
+    return max(0, int(rng.expovariate(1.0 / mean) + 0.5))
+
+
+def _random_timestamp(rng: random.Random, now: datetime, days: int) -> datetime:
+    return now - timedelta(seconds=rng.randint(0, days * 86400))
+
+
+async def seed_dataset(session_factory, spec: DatasetSpec) -> Dict[str, int]:
+    """Generate and insert a synthetic dataset.
+
+    Args:
+        session_factory: Async session factory bound to the target database
+        spec: Dataset size and shape
+
+    Returns:
+        Row counts per table, e.g. ``{"users": 1000, "follows": 24873, ...}``
+    """
+    rng = random.Random(spec.seed)
+    now = datetime.now(timezone.utc)
+    counts: Dict[str, int] = {}
+
+    user_ids = list(range(1, spec.users + 1))
+
+    users = []
+    for user_id in user_ids:
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        users.append({
+            "id": user_id,
+            "email": f"bench{user_id}@example.com",
+            "hashed_password": None,
+            "first_name": first,
+            "last_name": last,
+            "username": f"{first.lower()}_{last.lower()}_{user_id}",
+            "location": rng.choice(ISLAND_LOCATIONS),
+            "occupation": rng.choice(OCCUPATIONS),
+            "skills": ", ".join(rng.sample(OCCUPATIONS, 3)),
+            "is_active": rng.random() > 0.02,
+            "is_admin": False,
+            "is_available_for_hire": rng.random() < 0.3,
+            "role": rng.choice(["user", "user", "user", "employer", "freelancer"]),
+            "created_at": _random_timestamp(rng, now, spec.days),
+        })
+    counts["users"] = len(users)
+
+    # Power-law follow graph: followee popularity ~ 1 / rank^skew
+    popularity_order = user_ids[:]
+    rng.shuffle(popularity_order)
+    weights = [1.0 / ((rank + 1) ** spec.follow_skew) for rank in range(len(popularity_order))]
+    follows = []
+    for follower_id in user_ids:
+        target = min(_poisson_like(rng, spec.avg_following), spec.users - 1)
+        followed = set()
+        # Oversample then dedupe - cheaper than sampling without replacement
+        for candidate in rng.choices(popularity_order, weights=weights, k=target * 2):
+            if len(followed) >= target:
+                break
+            if candidate != follower_id:
+                followed.add(candidate)
+        for followed_id in followed:
+            follows.append({
+                "follower_id": follower_id,
+                "followed_id": followed_id,
+                "created_at": _random_timestamp(rng, now, spec.days),
+            })
+    counts["follows"] = len(follows)
+
+    jobs = []
+    for job_id in range(1, spec.jobs + 1):
+        budget = round(rng.uniform(50, 5000), 2)
+        jobs.append({
+            "id": job_id,
+            "title": f"{rng.choice(OCCUPATIONS)} needed",
+            "company": f"{rng.choice(LAST_NAMES)} Enterprises",
+            "description": "Synthetic benchmark job posting. " * 4,
+            "category": rng.choice(JOB_CATEGORIES),
+            "job_type": rng.choice(JOB_TYPES),
+            "location": rng.choice(ISLAND_LOCATIONS),
+            "budget": budget,
+            "budget_type": rng.choice(["fixed", "hourly"]),
+            "is_remote": rng.random() < 0.15,
+            "skills": ", ".join(rng.sample(OCCUPATIONS, 2)),
+            "status": "active" if rng.random() < 0.8 else "closed",
+            "employer_id": rng.choice(popularity_order[: max(1, spec.users // 10)]),
+            "created_at": _random_timestamp(rng, now, spec.days),
+        })
+    counts["jobs"] = len(jobs)
+
+    posts = []
+    post_id = 0
+    for user_id in user_ids:
+        for _ in range(_poisson_like(rng, spec.posts_per_user)):
+            post_id += 1
+            posts.append({
+                "id": post_id,
+                "user_id": user_id,
+                "content": f"Benchmark post {post_id} from user {user_id}",
+                "post_type": "text",
+                "created_at": _random_timestamp(rng, now, spec.days),
+            })
+    counts["posts"] = len(posts)
+
+    likes = []
+    for post in posts:
+        n_likes = min(_poisson_like(rng, spec.likes_per_post), spec.users)
+        for liker_id in rng.sample(user_ids, n_likes):
+            likes.append({
+                "user_id": liker_id,
+                "post_id": post["id"],
+                "created_at": post["created_at"],
+            })
+    counts["post_likes"] = len(likes)
+
+    conversations = []
+    messages = []
+    seen_pairs = set()
+    conversation_id = 0
+    for user_id in user_ids:
+        for _ in range(_poisson_like(rng, spec.conversations_per_user)):
+            other_id = rng.choice(user_ids)
+            pair = (min(user_id, other_id), max(user_id, other_id))
+            if other_id == user_id or pair in seen_pairs:
+                continue
+            seen_pairs.add(pair)
+            conversation_id += 1
+            started = _random_timestamp(rng, now, spec.days)
+            last_activity = started
+            for _ in range(max(1, _poisson_like(rng, spec.messages_per_conversation))):
+                sender, receiver = (pair if rng.random() < 0.5 else pair[::-1])
+                last_activity = last_activity + timedelta(minutes=rng.randint(1, 600))
+                messages.append({
+                    "conversation_id": conversation_id,
+                    "sender_id": sender,
+                    "receiver_id": receiver,
+                    "content": "Benchmark message",
+                    "is_read": rng.random() < 0.7,
+                    "created_at": last_activity,
+                })
+            conversations.append({
+                "id": conversation_id,
+                "participant_1_id": pair[0],
+                "participant_2_id": pair[1],
+                "created_at": started,
+                "updated_at": last_activity,
+            })
+    counts["conversations"] = len(conversations)
+    counts["messages"] = len(messages)
+
+    async with session_factory() as db:
+        await _bulk_insert(db, User, users)
+        await _bulk_insert(db, Follow, follows)
+        await _bulk_insert(db, Job, jobs)
+        await _bulk_insert(db, Post, posts)
+        await _bulk_insert(db, PostLike, likes)
+        await _bulk_insert(db, Conversation, conversations)
+        await _bulk_insert(db, Message, messages)
+        await db.commit()
+
+    return counts
+
+
+def pick_viewer_id(spec: DatasetSpec) -> int:
+    """Pick a deterministic, typical (median-activity) viewer for benchmarks."""
+    rng = random.Random(spec.seed + 1)
+    return rng.randint(1, spec.users)
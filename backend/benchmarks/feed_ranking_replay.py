@@ -0,0 +1,191 @@
+"""
+Offline replay tool for tuning ranked feed weights.
+
+Replays historical post, like, comment and boost events through
+``RankedFeedStore`` exactly as live traffic would, and at regular checkpoints
+compares the top-K ranking with the engagement each post actually received
+afterwards. Weight sets are scored with NDCG@K (how well the ranking orders
+posts by future engagement) and precision@K (overlap with the truly most
+engaged posts).
+
+Usage:
+    # Evaluate the default weights over the last 14 days
+    python -m benchmarks.feed_ranking_replay --database-url "$DATABASE_URL" --days 14
+
+    # Grid search
+    python -m benchmarks.feed_ranking_replay --database-url "$DATABASE_URL" \\
+        --half-life 6 12 24 --like 1 --comment 1 3 5 --job-post 0 4 --output replay.json
+
+The database URL must use an async driver (sqlite+aiosqlite, postgresql+asyncpg).
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from app.core.feed_ranking import FeedEvent, RankedFeedStore, RankingWeights, load_feed_events
+
+# Engagement kinds counted as "future engagement" when judging a ranking
+ENGAGEMENT_WEIGHTS = {"like": 1.0, "comment": 2.0}
+
+
+def _ndcg(ranked: Sequence[int], gains: Dict[int, float], k: int) -> float:
+    dcg = sum(gains.get(post_id, 0.0) / math.log2(i + 2) for i, post_id in enumerate(ranked[:k]))
+    ideal = sorted(gains.values(), reverse=True)[:k]
+    idcg = sum(gain / math.log2(i + 2) for i, gain in enumerate(ideal))
+    return dcg / idcg if idcg > 0 else 0.0
+
+
+def evaluate_weights(
+    events: Iterable[FeedEvent],
+    weights: RankingWeights,
+    checkpoints: Sequence[datetime],
+    horizon: timedelta,
+    k: int = 20,
+) -> Dict[str, Any]:
+    """Replay events once and score the ranking at every checkpoint.
+
+    Args:
+        events: Historical events (any order)
+        weights: Weights to evaluate
+        checkpoints: Times at which to take a top-K snapshot
+        horizon: How far past each checkpoint engagement is counted
+        k: Ranking depth
+
+    Returns:
+        ``{"weights", "ndcg", "precision", "checkpoints"}`` with metrics
+        averaged over checkpoints that saw any future engagement.
+    """
+    ordered = sorted(events, key=lambda e: (e.at, e.kind != "post"))
+    store = RankedFeedStore(weights)
+    store.built_at = 0.0
+
+    ndcgs: List[float] = []
+    precisions: List[float] = []
+    cursor = 0
+    for checkpoint in sorted(checkpoints):
+        while cursor < len(ordered) and ordered[cursor].at < checkpoint:
+            store.apply(ordered[cursor])
+            cursor += 1
+        ranked = [post_id for post_id, _ in store.top(k, now=checkpoint)]
+
+        gains: Counter = Counter()
+        end = checkpoint + horizon
+        for event in ordered[cursor:]:
+            if event.at >= end:
+                break
+            if event.kind in ENGAGEMENT_WEIGHTS and event.post_id in store:
+                gains[event.post_id] += ENGAGEMENT_WEIGHTS[event.kind]
+        if not gains:
+            continue
+
+        ndcgs.append(_ndcg(ranked, gains, k))
+        best = {post_id for post_id, _ in gains.most_common(k)}
+        precisions.append(len(best.intersection(ranked)) / min(k, len(best)))
+
+    return {
+        "weights": {
+            "post": weights.post,
+            "like": weights.like,
+            "comment": weights.comment,
+            "job_post": weights.job_post,
+            "boosts": dict(weights.boosts),
+            "half_life_hours": weights.half_life_hours,
+        },
+        "ndcg": round(sum(ndcgs) / len(ndcgs), 4) if ndcgs else 0.0,
+        "precision": round(sum(precisions) / len(precisions), 4) if precisions else 0.0,
+        "checkpoints": len(ndcgs),
+    }
+
+
+def grid_search(
+    events: List[FeedEvent],
+    grid: Dict[str, Sequence[float]],
+    checkpoints: Sequence[datetime],
+    horizon: timedelta,
+    k: int = 20,
+) -> List[Dict[str, Any]]:
+    """Evaluate every combination in ``grid`` (RankingWeights field -> values), best first."""
+    names = list(grid)
+    results = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        weights = RankingWeights(**dict(zip(names, values)))
+        results.append(evaluate_weights(events, weights, checkpoints, horizon, k))
+    results.sort(key=lambda r: (r["ndcg"], r["precision"]), reverse=True)
+    return results
+
+
+def make_checkpoints(start: datetime, end: datetime, step: timedelta) -> List[datetime]:
+    checkpoints = []
+    current = start + step
+    while current < end:
+        checkpoints.append(current)
+        current += step
+    return checkpoints
+
+
+async def _load_events(database_url: str, start: datetime, end: datetime) -> List[FeedEvent]:
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+
+    engine = create_async_engine(database_url)
+    try:
+        session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with session_factory() as db:
+            return await load_feed_events(db, start, end)
+    finally:
+        await engine.dispose()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay feed events to tune ranking weights")
+    parser.add_argument("--database-url", required=True, help="Async SQLAlchemy database URL")
+    parser.add_argument("--days", type=float, default=14, help="History to replay")
+    parser.add_argument("--step-hours", type=float, default=6, help="Hours between checkpoints")
+    parser.add_argument("--horizon-hours", type=float, default=6, help="Future engagement window")
+    parser.add_argument("--k", type=int, default=20, help="Ranking depth")
+    defaults = RankingWeights()
+    parser.add_argument("--half-life", type=float, nargs="+", default=[defaults.half_life_hours])
+    parser.add_argument("--post", type=float, nargs="+", default=[defaults.post])
+    parser.add_argument("--like", type=float, nargs="+", default=[defaults.like])
+    parser.add_argument("--comment", type=float, nargs="+", default=[defaults.comment])
+    parser.add_argument("--job-post", type=float, nargs="+", default=[defaults.job_post])
+    parser.add_argument("--output", help="Write all results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    end = datetime.now(timezone.utc)
+    start = end - timedelta(days=args.days)
+    events = asyncio.run(_load_events(args.database_url, start, end))
+    print(f"Loaded {len(events)} events between {start:%Y-%m-%d} and {end:%Y-%m-%d}")
+
+    grid = {
+        "half_life_hours": args.half_life,
+        "post": args.post,
+        "like": args.like,
+        "comment": args.comment,
+        "job_post": args.job_post,
+    }
+    checkpoints = make_checkpoints(start, end, timedelta(hours=args.step_hours))
+    results = grid_search(events, grid, checkpoints, timedelta(hours=args.horizon_hours), args.k)
+
+    print(f"{'ndcg':>6} {'prec':>6}  weights")
+    for result in results[:10]:
+        w = result["weights"]
+        print(
+            f"{result['ndcg']:>6.3f} {result['precision']:>6.3f}  "
+            f"half_life={w['half_life_hours']} post={w['post']} like={w['like']} "
+            f"comment={w['comment']} job_post={w['job_post']}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,259 @@
+"""
+Media Serving Benchmark
+
+Serves the same upload directory three ways, each in its own server process,
+and drives them with concurrent clients:
+
+- ``flask-cached``: the monolith's former ``/uploads`` route,
+  ``send_from_directory`` wrapped in ``@cache.cached(timeout=3600)`` with
+  Flask-Caching's in-process ``SimpleCache``. The cached value is the
+  response wrapping an open file; current cachelib cannot pickle it, so
+  every request pays a failed cache write and logs a traceback
+- ``flask-sendfile``: the current monolith route, ``send_from_directory``
+  without the response cache (``wsgi.file_wrapper``, i.e. sendfile under
+  gunicorn), conditional and range requests handled by Werkzeug
+- ``fastapi-media``: ``app.core.media.MediaMiddleware`` under Uvicorn
+
+Workloads: many small images, a few large videos fetched whole, and 256 KiB
+byte ranges of those videos (seeking).
+
+For each server and workload the report shows requests/sec, MB/s, and the
+server's resident memory (Linux ``/proc``) after the run.
+
+Usage:
+    python -m benchmarks.media_serving --duration 10 --concurrency 16
+
+Run from the ``backend/`` directory.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.worker_scaling import _free_port, _wait_ready
+
+SERVERS = ("flask-cached", "flask-sendfile", "fastapi-media")
+RANGE_SIZE = 256 * 1024
+
+
+def create_flask_app():
+    """The monolith's /uploads route; MEDIA_BENCH_CACHED=1 restores the response cache"""
+    import re
+
+    from flask import Flask, send_from_directory
+    from flask_caching import Cache
+
+    app = Flask(__name__)
+    app.config["UPLOAD_FOLDER"] = os.environ["MEDIA_BENCH_DIR"]
+    hashed_upload_name = re.compile(r"^[0-9a-f]{32}\.[a-z0-9]+$")
+
+    if os.environ.get("MEDIA_BENCH_CACHED") == "1":
+        cache = Cache(app, config={"CACHE_TYPE": "SimpleCache", "CACHE_THRESHOLD": 100000})
+
+        @app.route("/uploads/<path:filename>")
+        @cache.cached(timeout=3600)
+        def uploaded_file(filename):
+            return send_from_directory(app.config["UPLOAD_FOLDER"], filename)
+    else:
+        @app.route("/uploads/<path:filename>")
+        def uploaded_file(filename):
+            immutable = bool(hashed_upload_name.match(os.path.basename(filename)))
+            response = send_from_directory(
+                app.config["UPLOAD_FOLDER"], filename, max_age=31536000 if immutable else 3600
+            )
+            response.cache_control.immutable = immutable or None
+            return response
+
+    return app
+
+
+def create_asgi_app():
+    from fastapi import FastAPI
+
+    from app.core import media
+
+    media.UPLOAD_DIR = os.environ["MEDIA_BENCH_DIR"]
+    app = FastAPI()
+    app.add_middleware(media.MediaMiddleware)
+    return app
+
+
+def seed_files(directory: str, small: int, small_kb: int, large: int, large_mb: int) -> Dict[str, List[str]]:
+    """Content-hashed files on disk; returns their URLs per workload"""
+    from app.core import media
+
+    media.UPLOAD_DIR = directory
+    rng = random.Random(7)
+    urls: Dict[str, List[str]] = {"small": [], "large": []}
+    for kind, count, size, name in (("small", small, small_kb * 1024, "photo.jpg"),
+                                    ("large", large, large_mb * 1024 * 1024, "clip.mp4")):
+        for _ in range(count):
+            body = rng.randbytes(size)
+            urls[kind].append(asyncio.run(media.store_bytes(body, kind, name)))
+    return urls
+
+
+def _start_server(kind: str, directory: str, port: int, threads: int) -> subprocess.Popen:
+    env = dict(os.environ, MEDIA_BENCH_DIR=directory, MEDIA_BENCH_CACHED="1" if kind == "flask-cached" else "0")
+    if kind == "fastapi-media":
+        worker = ["benchmarks.media_serving:create_asgi_app()", "-k", "uvicorn.workers.UvicornWorker"]
+    else:
+        worker = ["benchmarks.media_serving:create_flask_app()", "-k", "gthread", "--threads", str(threads)]
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "gunicorn", *worker,
+            "--workers", "1",
+            "--bind", f"127.0.0.1:{port}",
+            "--log-level", "warning",
+            "--config", os.devnull,
+        ],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def _rss_mb(pid: int) -> Optional[float]:
+    """Resident memory of ``pid`` and its children, in MB (Linux only)"""
+    if not os.path.isdir("/proc"):
+        return None
+    total_kb = 0
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as fh:
+                ppid = int(fh.read().rsplit(")", 1)[1].split()[1])
+            if int(entry) != pid and ppid != pid:
+                continue
+            with open(f"/proc/{entry}/status") as fh:
+                total_kb += next(int(line.split()[1]) for line in fh if line.startswith("VmRSS:"))
+        except (OSError, StopIteration, ValueError):
+            continue
+    return round(total_kb / 1024, 1)
+
+
+async def _drive(base_url: str, urls: List[str], ranged: bool, concurrency: int, duration: float,
+                 file_size: int) -> Dict[str, Any]:
+    done = errors = received = 0
+    rng = random.Random(11)
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        async def worker():
+            nonlocal done, errors, received
+            while time.monotonic() < deadline:
+                headers = {}
+                if ranged:
+                    start = rng.randrange(0, file_size - RANGE_SIZE)
+                    headers["Range"] = f"bytes={start}-{start + RANGE_SIZE - 1}"
+                try:
+                    response = await client.get(rng.choice(urls), headers=headers)
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                if response.status_code in (200, 206):
+                    done += 1
+                    received += len(response.content)
+                else:
+                    errors += 1
+
+        started = time.monotonic()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.monotonic() - started
+    return {
+        "requests": done,
+        "errors": errors,
+        "rps": round(done / elapsed, 1),
+        "mb_per_s": round(received / elapsed / 1024 / 1024, 1),
+        "bytes_per_request": received // done if done else 0,
+    }
+
+
+def run_benchmark(servers=SERVERS, duration: float = 10.0, concurrency: int = 16, threads: int = 8,
+                  small: int = 200, small_kb: int = 24, large: int = 4, large_mb: int = 8) -> Dict[str, Any]:
+    directory = tempfile.mkdtemp(prefix="hmb-media-")
+    urls = seed_files(directory, small, small_kb, large, large_mb)
+    workloads = {
+        "small": (urls["small"], False, small_kb * 1024),
+        "large": (urls["large"], False, large_mb * 1024 * 1024),
+        "range": (urls["large"], True, large_mb * 1024 * 1024),
+    }
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for kind in servers:
+        port = _free_port()
+        server = _start_server(kind, directory, port, threads)
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            _wait_ready(f"{base_url}{urls['small'][0]}")
+            results[kind] = {"rss_mb_idle": _rss_mb(server.pid)}
+            for workload, (paths, ranged, size) in workloads.items():
+                results[kind][workload] = asyncio.run(_drive(base_url, paths, ranged, concurrency, duration, size))
+            results[kind]["rss_mb_after"] = _rss_mb(server.pid)
+        finally:
+            os.killpg(server.pid, signal.SIGTERM)
+            server.wait(timeout=30)
+
+    return {
+        "duration": duration,
+        "concurrency": concurrency,
+        "files": {"small": f"{small} x {small_kb} KiB", "large": f"{large} x {large_mb} MiB"},
+        "servers": results,
+    }
+
+
+def _format_report(report: Dict[str, Any]) -> str:
+    lines = [
+        f"Media serving ({report['duration']:.0f}s per workload, {report['concurrency']} connections; "
+        f"small {report['files']['small']}, large {report['files']['large']})",
+        f"{'server':<16} {'workload':<8} {'req/s':>9} {'MB/s':>8} {'bytes/req':>10} {'errors':>7}",
+    ]
+    for kind, result in report["servers"].items():
+        for workload in ("small", "large", "range"):
+            row = result[workload]
+            lines.append(
+                f"{kind:<16} {workload:<8} {row['rps']:>9.1f} {row['mb_per_s']:>8.1f} "
+                f"{row['bytes_per_request']:>10} {row['errors']:>7}"
+            )
+        lines.append(f"{kind:<16} RSS {result['rss_mb_idle']} MB idle -> {result['rss_mb_after']} MB after")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--servers", nargs="+", choices=SERVERS, default=list(SERVERS))
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per workload")
+    parser.add_argument("--concurrency", type=int, default=16, help="Client connections")
+    parser.add_argument("--threads", type=int, default=8, help="gthread threads for the Flask servers")
+    parser.add_argument("--small", type=int, default=200, help="Number of small files")
+    parser.add_argument("--small-kb", type=int, default=24)
+    parser.add_argument("--large", type=int, default=4, help="Number of large files")
+    parser.add_argument("--large-mb", type=int, default=8)
+    parser.add_argument("--output", default=None, help="Write the JSON report here")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(servers=args.servers, duration=args.duration, concurrency=args.concurrency,
+                           threads=args.threads, small=args.small, small_kb=args.small_kb,
+                           large=args.large, large_mb=args.large_mb)
+
+    print(_format_report(report))
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,278 @@
+"""
+List Serialization Benchmark
+
+Compares the ORM + Pydantic serialization path the list endpoints used to
+take with the fast path in ``app.core.serialization`` on 100-item pages,
+against a seeded local database (see ``benchmarks.dataset``):
+
+- posts   GET /api/posts/?limit=100
+- jobs    GET /api/jobs/?limit=100
+
+For each endpoint it reports:
+
+- The full request latency (p50/p95) through the real router
+- The query + serialization stage alone, both ways, on the same page:
+  ``orm``  select(Model) + selectinload, copy into Pydantic models, validate
+           against the response model and encode with the stdlib encoder
+  ``fast`` select of plain columns, RowMapper dicts, orjson
+
+Usage:
+    python -m benchmarks.serialization_benchmark --users 2000 --iterations 50
+
+Run from the ``backend/`` directory.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# Allow running as a script from backend/ or the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import desc, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import selectinload, sessionmaker
+
+from benchmarks.dataset import DatasetSpec
+from benchmarks.query_plan_benchmark import (
+    _clear_response_caches,
+    _prepare_database,
+    _resolve_context,
+    build_app,
+    percentile,
+)
+
+PAGE_SIZE = 100
+
+
+async def _followed_ids(db: AsyncSession, viewer_id: int) -> List[int]:
+    from app.models import Follow
+
+    result = await db.execute(select(Follow.followed_id).where(Follow.follower_id == viewer_id))
+    return [row[0] for row in result] + [viewer_id]
+
+
+async def _posts_orm(db: AsyncSession, user_ids: List[int]) -> bytes:
+    from pydantic import TypeAdapter
+
+    from app.models import Post
+    from app.schemas.post import PostResponse
+
+    result = await db.execute(
+        select(Post)
+        .where(Post.user_id.in_(user_ids))
+        .options(selectinload(Post.user))
+        .order_by(desc(Post.created_at))
+        .limit(PAGE_SIZE)
+    )
+    data = [PostResponse.model_validate(post).model_dump() for post in result.scalars().all()]
+    # What FastAPI does with response_model=List[PostResponse]
+    adapter = TypeAdapter(List[PostResponse])
+    return json.dumps(adapter.dump_python(adapter.validate_python(data), mode="json")).encode()
+
+
+async def _posts_fast(db: AsyncSession, user_ids: List[int]) -> bytes:
+    from app.core.serialization import dumps
+    from app.feed.routes import FEED_POST_ROW
+    from app.models import Post, User
+
+    result = await db.execute(
+        FEED_POST_ROW.select()
+        .join(User, User.id == Post.user_id)
+        .where(Post.user_id.in_(user_ids))
+        .order_by(desc(Post.created_at))
+        .limit(PAGE_SIZE)
+    )
+    return dumps(FEED_POST_ROW.map(result))
+
+
+async def _jobs_orm(db: AsyncSession) -> bytes:
+    from fastapi.encoders import jsonable_encoder
+
+    from app.models import Job
+
+    result = await db.execute(
+        select(Job)
+        .options(selectinload(Job.employer))
+        .where(Job.status == "active")
+        .order_by(desc(Job.created_at), desc(Job.id))
+        .limit(PAGE_SIZE)
+    )
+    data = []
+    for job in result.scalars().all():
+        employer = job.employer
+        data.append({
+            "id": job.id, "title": job.title, "company": job.company,
+            "description": job.description, "location": job.location,
+            "is_remote": job.is_remote, "job_type": job.job_type,
+            "category": job.category, "budget": job.budget, "status": job.status,
+            "employer_id": job.employer_id,
+            "employer": {
+                "id": employer.id, "first_name": employer.first_name,
+                "last_name": employer.last_name, "username": employer.username,
+                "avatar_url": employer.avatar_url, "company_name": employer.company_name,
+            },
+            "created_at": job.created_at.isoformat() if job.created_at else None,
+            "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+        })
+    # What FastAPI does with a plain dict return value
+    return json.dumps(jsonable_encoder({"success": True, "data": data})).encode()
+
+
+async def _jobs_fast(db: AsyncSession) -> bytes:
+    from app.api.jobs import JOB_LIST_ROW, _job_rows
+    from app.core.serialization import dumps
+    from app.models import Job
+
+    result = await db.execute(
+        _job_rows()
+        .where(Job.status == "active")
+        .order_by(desc(Job.created_at), desc(Job.id))
+        .limit(PAGE_SIZE)
+    )
+    return dumps({"success": True, "data": JOB_LIST_ROW.map(result)})
+
+
+async def _time_stage(
+    session_factory, stage: Callable[[AsyncSession], Awaitable[bytes]], iterations: int, warmup: int
+) -> Dict[str, float]:
+    timings = []
+    size = 0
+    async with session_factory() as db:
+        for i in range(warmup + iterations):
+            started = time.perf_counter()
+            body = await stage(db)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            # Fresh identity map each time, as a new request would have
+            db.expunge_all()
+            if i >= warmup:
+                timings.append(elapsed_ms)
+                size = len(body)
+    return {"median_ms": round(statistics.median(timings), 3), "bytes": size}
+
+
+async def run_benchmark(
+    database_url: str,
+    spec: DatasetSpec,
+    iterations: int = 50,
+    warmup: int = 5,
+    seed: bool = True,
+) -> Dict[str, Any]:
+    """Seed the database, then time both endpoints and both serialization paths."""
+    import httpx
+
+    engine = create_async_engine(database_url)
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    if engine.dialect.name != "postgresql":
+        logging.getLogger("app.core.query_timeout").setLevel(logging.ERROR)
+
+    report: Dict[str, Any] = {"dialect": engine.dialect.name, "dataset": spec.to_dict(), "endpoints": []}
+    try:
+        if seed:
+            report["rows"] = await _prepare_database(engine, spec)
+        context = await _resolve_context(session_factory, spec)
+        async with session_factory() as db:
+            user_ids = await _followed_ids(db, context["viewer_id"])
+
+        stages = {
+            "posts": (f"/api/posts/?limit={PAGE_SIZE}",
+                      lambda db: _posts_orm(db, user_ids), lambda db: _posts_fast(db, user_ids)),
+            "jobs": (f"/api/jobs/?limit={PAGE_SIZE}", _jobs_orm, _jobs_fast),
+        }
+
+        app = build_app(session_factory, context["viewer_id"])
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name, (path, orm_stage, fast_stage) in stages.items():
+                latencies = []
+                items = 0
+                for i in range(warmup + iterations):
+                    _clear_response_caches()
+                    started = time.perf_counter()
+                    response = await client.get(path)
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                    response.raise_for_status()
+                    if i >= warmup:
+                        latencies.append(elapsed_ms)
+                        body = response.json()
+                        items = len(body if isinstance(body, list) else body["data"])
+
+                orm = await _time_stage(session_factory, orm_stage, iterations, warmup)
+                fast = await _time_stage(session_factory, fast_stage, iterations, warmup)
+                report["endpoints"].append({
+                    "name": name,
+                    "path": path,
+                    "items": items,
+                    "p50_ms": round(percentile(latencies, 50), 3),
+                    "p95_ms": round(percentile(latencies, 95), 3),
+                    "orm": orm,
+                    "fast": fast,
+                    "speedup": round(orm["median_ms"] / fast["median_ms"], 2) if fast["median_ms"] else 0.0,
+                })
+    finally:
+        await engine.dispose()
+    return report
+
+
+def _format_report(report: Dict[str, Any]) -> str:
+    lines = [
+        f"List serialization benchmark ({report['dialect']}, {report['dataset']['users']} users)",
+        f"{'endpoint':<8} {'items':>5} {'p50':>9} {'p95':>9} {'orm':>9} {'fast':>9} {'speedup':>8}",
+    ]
+    for e in report["endpoints"]:
+        lines.append(
+            f"{e['name']:<8} {e['items']:>5} {e['p50_ms']:>7.1f}ms {e['p95_ms']:>7.1f}ms "
+            f"{e['orm']['median_ms']:>7.1f}ms {e['fast']['median_ms']:>7.1f}ms {e['speedup']:>7.2f}x"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--database-url", default=None,
+                        help="Async SQLAlchemy URL (default: temporary SQLite file)")
+    parser.add_argument("--users", type=int, default=DatasetSpec.users)
+    parser.add_argument("--jobs", type=int, default=DatasetSpec.jobs)
+    parser.add_argument("--avg-following", type=int, default=DatasetSpec.avg_following)
+    parser.add_argument("--posts-per-user", type=int, default=DatasetSpec.posts_per_user)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--no-seed", action="store_true", help="Reuse an already seeded database")
+    parser.add_argument("--output", default=None, help="Write the JSON report here")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+
+    database_url = args.database_url
+    if database_url is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix="hmb-bench-"), "bench.db")
+        database_url = f"sqlite+aiosqlite:///{db_path}"
+    elif database_url.startswith("postgresql://"):
+        database_url = database_url.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+    spec = DatasetSpec(
+        users=args.users,
+        jobs=args.jobs,
+        avg_following=args.avg_following,
+        posts_per_user=args.posts_per_user,
+    )
+    report = asyncio.run(run_benchmark(
+        database_url, spec, iterations=args.iterations, warmup=args.warmup, seed=not args.no_seed,
+    ))
+
+    print(_format_report(report))
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2, default=str)
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+"""
+Shared Response Cache Benchmark
+
+Replays a request stream from many viewers against the cached list
+endpoints (``/api/users/list``, ``/api/hireme/available``, ``/api/posts/``)
+on a seeded SQLite database. Payloads are cached once per query with the
+per-viewer fields applied at response time (see app/core/api_cache.py).
+
+For the same stream the report shows:
+
+- the measured hit rate and cache entries with shared payloads
+- the hit rate and entries that per-viewer cache keys would have had
+  (a request only hits if the same viewer asked for the same page before)
+- request latency for hits and misses
+
+Usage:
+    python -m benchmarks.shared_cache --viewers 200 --requests 2000 --pages 5
+
+Run from the ``backend/`` directory.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.dataset import DatasetSpec, seed_dataset
+
+ENDPOINTS = {
+    "users:list": ("/api/users/list", lambda page, limit: {"skip": page * limit, "limit": limit}),
+    "hireme:available": ("/api/hireme/available", lambda page, limit: {"skip": page * limit, "limit": limit}),
+    "posts:list": ("/api/posts/", lambda page, limit: {"skip": page * limit, "limit": limit}),
+}
+
+
+def build_stream(requests: int, viewers: int, pages: int, seed: int = 7) -> List[tuple]:
+    """(viewer, namespace, page) triples; early pages are requested most"""
+    rng = random.Random(seed)
+    weights = [1 / (page + 1) for page in range(pages)]
+    return [
+        (rng.randint(1, viewers), rng.choice(list(ENDPOINTS)), rng.choices(range(pages), weights)[0])
+        for _ in range(requests)
+    ]
+
+
+def per_viewer_baseline(stream: List[tuple]) -> Dict[str, Dict[str, Any]]:
+    """Hit rate and entries had every (viewer, page) been cached separately"""
+    seen = set()
+    report: Dict[str, Dict[str, Any]] = {}
+    for viewer, namespace, page in stream:
+        entry = report.setdefault(namespace, {"hits": 0, "misses": 0})
+        key = (viewer, namespace, page)
+        entry["hits" if key in seen else "misses"] += 1
+        seen.add(key)
+    for namespace, entry in report.items():
+        entry["hit_rate"] = round(entry["hits"] / (entry["hits"] + entry["misses"]) * 100, 2)
+        entry["entries"] = sum(1 for key in seen if key[1] == namespace)
+    return report
+
+
+def _build_app(session_factory):
+    from fastapi import Depends, FastAPI, Header
+    from sqlalchemy import select
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    from app.api.hireme import router as hireme_router
+    from app.api.posts import router as posts_router
+    from app.auth import dependencies as auth_dependencies
+    from app.core import security
+    from app.database import get_db
+    from app.models import User
+    from app.users.routes import router as users_router
+
+    app = FastAPI()
+    app.include_router(users_router, prefix="/api/users")
+    app.include_router(hireme_router, prefix="/api/hireme")
+    app.include_router(posts_router, prefix="/api/posts")
+
+    async def bench_get_db():
+        async with session_factory() as session:
+            yield session
+
+    async def bench_current_user(x_viewer: int = Header(...), db: AsyncSession = Depends(get_db)):
+        result = await db.execute(select(User).where(User.id == x_viewer))
+        return result.scalar_one()
+
+    app.dependency_overrides[get_db] = bench_get_db
+    app.dependency_overrides[auth_dependencies.get_current_user] = bench_current_user
+    app.dependency_overrides[security.get_current_user] = bench_current_user
+    return app
+
+
+async def run_benchmark(viewers: int = 200, requests: int = 2000, pages: int = 5, limit: int = 20,
+                        users: int = 400) -> Dict[str, Any]:
+    import httpx
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+
+    import app.models  # noqa: F401 - register models on Base.metadata
+    from app.core import cache, latency
+    from app.core.api_cache import shared_cache_stats
+    from app.database import Base
+
+    workdir = tempfile.mkdtemp(prefix="hmb-shared-cache-")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(workdir, 'bench.db')}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await seed_dataset(session_factory, DatasetSpec(users=users, avg_following=10, posts_per_user=2,
+                                                    conversations_per_user=0, jobs=0))
+
+    stream = build_stream(requests, min(viewers, users), pages)
+    cache.clear_cache()
+    latency.reset()
+    timings: Dict[str, List[float]] = {"hit": [], "miss": []}
+    try:
+        transport = httpx.ASGITransport(app=_build_app(session_factory))
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for viewer, namespace, page in stream:
+                path, params = ENDPOINTS[namespace]
+                before = shared_cache_stats().get(namespace, {}).get("hits", 0)
+                started = time.perf_counter()
+                response = await client.get(path, params=params(page, limit), headers={"X-Viewer": str(viewer)})
+                elapsed = (time.perf_counter() - started) * 1000
+                assert response.status_code == 200, response.text
+                hit = shared_cache_stats()[namespace]["hits"] > before
+                timings["hit" if hit else "miss"].append(elapsed)
+        shared = shared_cache_stats()
+        for namespace, entry in shared.items():
+            entry["entries"] = sum(1 for key in cache._cache if key.startswith(f"{namespace}:"))
+    finally:
+        cache.clear_cache()
+        await engine.dispose()
+
+    return {
+        "viewers": viewers,
+        "requests": requests,
+        "pages": pages,
+        "shared": shared,
+        "per_viewer": per_viewer_baseline(stream),
+        "latency_ms": {
+            outcome: {"count": len(values), "p50": round(statistics.median(values), 2) if values else None}
+            for outcome, values in timings.items()
+        },
+    }
+
+
+def _format_report(report: Dict[str, Any]) -> str:
+    lines = [
+        f"Shared response cache ({report['requests']} requests, {report['viewers']} viewers, "
+        f"{report['pages']} pages per list)",
+        f"{'namespace':<18} {'shared hit':>10} {'entries':>8} {'per-viewer hit':>15} {'entries':>8}",
+    ]
+    for namespace, shared in sorted(report["shared"].items()):
+        baseline = report["per_viewer"].get(namespace, {})
+        lines.append(
+            f"{namespace:<18} {shared['hit_rate']:>9.2f}% {shared['entries']:>8} "
+            f"{baseline.get('hit_rate', 0):>14.2f}% {baseline.get('entries', 0):>8}"
+        )
+    hit, miss = report["latency_ms"]["hit"], report["latency_ms"]["miss"]
+    lines.append(f"latency p50: hit {hit['p50']}ms ({hit['count']}), miss {miss['p50']}ms ({miss['count']})")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--viewers", type=int, default=200, help="Distinct viewers in the stream")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--pages", type=int, default=5, help="Pages requested per list")
+    parser.add_argument("--limit", type=int, default=20, help="Page size")
+    parser.add_argument("--users", type=int, default=400, help="Seeded users")
+    parser.add_argument("--output", default=None, help="Write the JSON report here")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run_benchmark(viewers=args.viewers, requests=args.requests, pages=args.pages,
+                                       limit=args.limit, users=args.users))
+
+    print(_format_report(report))
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2, default=str)
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
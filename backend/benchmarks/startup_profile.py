@@ -0,0 +1,182 @@
+"""
+Startup Import Profile
+
+Reports what a cold start of ``app.main`` spends its time on, in fresh
+interpreters so nothing is already imported:
+
+- Import cost per module from ``python -X importtime``: the slowest modules
+  by cumulative time, the app's own modules, and self time summed per
+  top-level package (strawberry, jose, socketio, PIL, sqlalchemy, ...)
+- Boot latency per boot mode: ``import app.main`` plus the first ``/health``
+  response, ``full`` (GraphQL lazy) against ``minimal`` (every API
+  router lazy, Socket.IO on first use); see ``app.core.lazy_routers``
+
+Usage:
+    python -m benchmarks.startup_profile --top 25 --repeat 3
+
+Run from the ``backend/`` directory.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+BOOT_SCRIPT = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+import app.main as main
+imported = time.perf_counter()
+import httpx
+
+async def first_health():
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://boot") as client:
+        return (await client.get("/health")).status_code
+
+status = asyncio.run(first_health())
+served = time.perf_counter()
+print("BOOT " + json.dumps({
+    "status": status,
+    "import_ms": (imported - started) * 1000,
+    "first_health_ms": (served - started) * 1000,
+    "modules": len(sys.modules),
+    "heavy_modules": sorted(m for m in %r if m in sys.modules),
+}))
+"""
+
+# Top-level packages worth calling out when checking what a boot mode avoids
+HEAVY_PACKAGES = ("strawberry", "graphql", "PIL", "socketio", "engineio", "jose", "cloudinary", "google")
+
+
+def parse_importtime(output: str) -> List[Dict[str, Any]]:
+    """Parse ``-X importtime`` stderr into one entry per module (times in ms)"""
+    modules = []
+    for line in output.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append({
+                "module": name,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+                "depth": len(indent) // 2,
+            })
+    return modules
+
+
+def summarize_imports(modules: List[Dict[str, Any]], top: int = 20, app_package: str = "app") -> Dict[str, Any]:
+    """Slowest modules, the app's own modules and self time per package"""
+    by_package: Dict[str, float] = defaultdict(float)
+    for entry in modules:
+        by_package[entry["module"].split(".")[0]] += entry["self_ms"]
+    app_modules = [m for m in modules if m["module"] == app_package or m["module"].startswith(app_package + ".")]
+    return {
+        "modules": len(modules),
+        "total_ms": round(sum(m["self_ms"] for m in modules), 1),
+        "slowest": sorted(modules, key=lambda m: m["cumulative_ms"], reverse=True)[:top],
+        "app_modules": sorted(app_modules, key=lambda m: m["cumulative_ms"], reverse=True)[:top],
+        "packages": [
+            {"package": name, "self_ms": round(ms, 1)}
+            for name, ms in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+        ],
+    }
+
+
+def _environment(boot_mode: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env["BOOT_MODE"] = boot_mode
+    env.pop("ENABLE_TRACEMALLOC", None)
+    env.pop("PYTHONTRACEMALLOC", None)
+    return env
+
+
+def profile_imports(boot_mode: str = "full", target: str = "app.main") -> List[Dict[str, Any]]:
+    """Import ``target`` in a fresh interpreter under ``-X importtime``"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=BACKEND_DIR, env=_environment(boot_mode), capture_output=True, text=True, timeout=300,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {target} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def measure_boot(boot_mode: str) -> Dict[str, Any]:
+    """Time ``import app.main`` and the first /health response in a fresh interpreter"""
+    result = subprocess.run(
+        [sys.executable, "-c", BOOT_SCRIPT % (HEAVY_PACKAGES,)],
+        cwd=BACKEND_DIR, env=_environment(boot_mode), capture_output=True, text=True, timeout=300,
+    )
+    for line in result.stdout.splitlines():
+        if line.startswith("BOOT "):
+            return json.loads(line[len("BOOT "):])
+    raise RuntimeError(f"boot ({boot_mode}) failed:\n{result.stderr[-2000:]}")
+
+
+def run_profile(modes: List[str], top: int = 20, repeat: int = 3) -> Dict[str, Any]:
+    report: Dict[str, Any] = {"python": sys.version.split()[0], "modes": []}
+    for mode in modes:
+        boots = [measure_boot(mode) for _ in range(repeat)]
+        report["modes"].append({
+            "mode": mode,
+            "imports": summarize_imports(profile_imports(mode), top=top),
+            "import_ms": round(statistics.median(b["import_ms"] for b in boots), 1),
+            "first_health_ms": round(statistics.median(b["first_health_ms"] for b in boots), 1),
+            "first_health_min_ms": round(min(b["first_health_ms"] for b in boots), 1),
+            "modules_loaded": boots[-1]["modules"],
+            "heavy_modules": boots[-1]["heavy_modules"],
+        })
+    return report
+
+
+def _format_report(report: Dict[str, Any]) -> str:
+    lines = [f"Startup import profile (Python {report['python']})"]
+    for mode in report["modes"]:
+        imports = mode["imports"]
+        lines += [
+            "",
+            f"[{mode['mode']}] first /health {mode['first_health_ms']:.0f}ms "
+            f"(min {mode['first_health_min_ms']:.0f}ms, import {mode['import_ms']:.0f}ms), "
+            f"{mode['modules_loaded']} modules, heavy: {', '.join(mode['heavy_modules']) or 'none'}",
+            f"{'slowest modules':<48} {'self':>9} {'cumulative':>11}",
+        ]
+        for entry in imports["slowest"]:
+            lines.append(f"{entry['module']:<48} {entry['self_ms']:>7.1f}ms {entry['cumulative_ms']:>9.1f}ms")
+        lines.append(f"{'app modules':<48} {'self':>9} {'cumulative':>11}")
+        for entry in imports["app_modules"]:
+            lines.append(f"{entry['module']:<48} {entry['self_ms']:>7.1f}ms {entry['cumulative_ms']:>9.1f}ms")
+        lines.append(f"{'package (self time)':<48} {'self':>9}")
+        for entry in imports["packages"]:
+            lines.append(f"{entry['package']:<48} {entry['self_ms']:>7.1f}ms")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--modes", nargs="+", default=["full", "minimal"], choices=["full", "minimal"])
+    parser.add_argument("--top", type=int, default=20, help="Rows per table")
+    parser.add_argument("--repeat", type=int, default=3, help="Boots per mode (median reported)")
+    parser.add_argument("--output", default=None, help="Write the JSON report here")
+    args = parser.parse_args(argv)
+
+    report = run_profile(args.modes, top=args.top, repeat=args.repeat)
+
+    print(_format_report(report))
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2, default=str)
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
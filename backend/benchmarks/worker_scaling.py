@@ -0,0 +1,226 @@
+"""
+Worker Scaling Load Test
+
+Starts Gunicorn with Uvicorn workers at several worker counts and measures
+requests/sec for a CPU-bound endpoint, to check that throughput scales
+close to linearly with workers (each worker owns one event loop, so a
+single worker saturates one core).
+
+The default target is a small app defined here (``/work`` hashes a payload
+for about 1ms of CPU per request). Point ``--app`` and ``--path`` at the
+real application to measure it instead; multi-worker runs of app.main
+need REDIS_URL (see app.core.shared_state).
+
+The load generator runs in separate processes so the client is not the
+bottleneck. Give it at least as many cores as the largest worker count;
+on a machine with fewer cores than workers no scaling can be observed.
+
+Usage:
+    python -m benchmarks.worker_scaling --workers 1 2 4 --duration 10
+
+    python -m benchmarks.worker_scaling --app app.main:app --path /health \\
+        --workers 1 2 4 --output scaling.json
+
+Run from the ``backend/`` directory.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+WORK_ROUNDS = int(os.getenv("WORKER_SCALING_ROUNDS", "2000"))
+
+
+async def app(scope, receive, send):
+    """Minimal ASGI app: /work burns CPU, anything else answers immediately"""
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    digest = b"hiremebahamas"
+    if scope["path"] == "/work":
+        for _ in range(WORK_ROUNDS):
+            digest = hashlib.sha256(digest).digest()
+    body = json.dumps({"digest": digest.hex()}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"application/json")],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(app_path: str, workers: int, port: int) -> subprocess.Popen:
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), WEB_MULTI_WORKER="true")
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "gunicorn", app_path,
+            "-k", "uvicorn.workers.UvicornWorker",
+            "--workers", str(workers),
+            "--bind", f"127.0.0.1:{port}",
+            "--log-level", "warning",
+            # Skip ./gunicorn.conf.py so its hooks and logging do not apply
+            "--config", os.devnull,
+        ],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def _wait_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server at {url} did not become ready in {timeout:.0f}s")
+
+
+async def _client_loop(url: str, concurrency: int, duration: float) -> Dict[str, int]:
+    done = errors = 0
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=10.0) as client:
+        async def worker():
+            nonlocal done, errors
+            while time.monotonic() < deadline:
+                try:
+                    response = await client.get(url)
+                    if response.status_code == 200:
+                        done += 1
+                    else:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return {"requests": done, "errors": errors}
+
+
+def _client_process(url: str, concurrency: int, duration: float, results) -> None:
+    results.put(asyncio.run(_client_loop(url, concurrency, duration)))
+
+
+def measure(url: str, clients: int, concurrency: int, duration: float) -> Dict[str, float]:
+    """Drive ``url`` from several client processes and return requests/sec"""
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=_client_process, args=(url, concurrency, duration, results))
+        for _ in range(clients)
+    ]
+    started = time.monotonic()
+    for process in processes:
+        process.start()
+    totals = {"requests": 0, "errors": 0}
+    for _ in processes:
+        for key, value in results.get().items():
+            totals[key] += value
+    for process in processes:
+        process.join()
+    elapsed = time.monotonic() - started
+    return {
+        "requests": totals["requests"],
+        "errors": totals["errors"],
+        "seconds": round(elapsed, 2),
+        "rps": round(totals["requests"] / elapsed, 1),
+    }
+
+
+def run(
+    app_path: str,
+    path: str,
+    worker_counts: List[int],
+    clients: int,
+    concurrency: int,
+    duration: float,
+    warmup: float,
+) -> List[Dict[str, float]]:
+    rows = []
+    for workers in worker_counts:
+        port = _free_port()
+        server = _start_server(app_path, workers, port)
+        try:
+            url = f"http://127.0.0.1:{port}{path}"
+            _wait_ready(url)
+            if warmup > 0:
+                measure(url, clients, concurrency, warmup)
+            row = {"workers": workers, **measure(url, clients, concurrency, duration)}
+        finally:
+            os.killpg(server.pid, signal.SIGTERM)
+            server.wait(timeout=30)
+        rows.append(row)
+
+    baseline = rows[0]["rps"] / rows[0]["workers"] if rows and rows[0]["rps"] else 0
+    for row in rows:
+        row["speedup"] = round(row["rps"] / rows[0]["rps"], 2) if rows[0]["rps"] else 0.0
+        row["efficiency"] = round(row["rps"] / (baseline * row["workers"]), 2) if baseline else 0.0
+    return rows
+
+
+def _format_report(rows: List[Dict[str, float]]) -> str:
+    lines = [f"{'workers':>7} {'req/s':>10} {'speedup':>8} {'efficiency':>10} {'errors':>7}"]
+    for row in rows:
+        lines.append(
+            f"{row['workers']:>7} {row['rps']:>10.1f} {row['speedup']:>7.2f}x "
+            f"{row['efficiency']:>10.0%} {row['errors']:>7}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--app", default="benchmarks.worker_scaling:app",
+                        help="ASGI app import path passed to gunicorn")
+    parser.add_argument("--path", default="/work", help="Request path to load")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=multiprocessing.cpu_count(),
+                        help="Load generator processes (default: CPU count)")
+    parser.add_argument("--concurrency", type=int, default=16,
+                        help="In-flight requests per load generator process")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--min-efficiency", type=float, default=None,
+                        help="Exit 1 if any run scales below this fraction of linear")
+    parser.add_argument("--output", default=None, help="Write the JSON report here")
+    args = parser.parse_args(argv)
+
+    rows = run(args.app, args.path, sorted(args.workers), args.clients,
+               args.concurrency, args.duration, args.warmup)
+    print(_format_report(rows))
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump({"app": args.app, "path": args.path, "runs": rows}, fh, indent=2)
+        print(f"Report written to {args.output}")
+
+    if args.min_efficiency is not None:
+        return 0 if all(row["efficiency"] >= args.min_efficiency for row in rows) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
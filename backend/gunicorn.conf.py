@@ -55,26 +55,40 @@ if _port_int == 5432:
 bind = f"0.0.0.0:{_port}"
 
 # ============================================================================
-# WORKER CONFIGURATION (Optimized for Render Small Instances)
+# WORKER CONFIGURATION
 # ============================================================================
-# Optimized for Render and similar PaaS platforms with small instance sizes
-# CRITICAL: Render does NOT like many workers on small instances
-# 
-# Configuration for Render (AGGRESSIVE FOREVER FIX):
-# - workers=1: Single worker is faster + safer on small instances
-# - threads=2: Minimal threading for request handling
-# - Total capacity: 1 worker with async event loop (handles many concurrent connections)
-# 
-# Benefits of single worker:
-# - Lower memory footprint
-# - Faster startup times
-# - More predictable behavior on small instances
-# - Prevents worker timeout issues on constrained resources
+# One worker (in-memory shared state allowed) unless WEB_MULTI_WORKER=true.
+# Platforms such as Heroku and Render set WEB_CONCURRENCY themselves, so it
+# only takes effect with that explicit opt-in.
+# WEB_MULTI_WORKER=true with WEB_CONCURRENCY=<n> or "auto": multi-worker
+# mode. "auto" runs one async worker per available core, capped by
+# WORKER_MEMORY_MB per worker.
+#
+# Multi-worker mode REQUIRES Redis (REDIS_URL): login rate limits, socket
+# presence, Socket.IO emits and one-off startup jobs go through
+# app.core.shared_state. Startup is refused when workers > 1 and Redis is
+# not configured, instead of letting every worker keep its own state.
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from app.core.shared_state import create_shared_state, recommended_workers
+
 cpu_count = multiprocessing.cpu_count()
 
-# Workers: 1 for optimal performance on Render small instances (CRITICAL)
-# Use WEB_CONCURRENCY env var to override (but keep it at 1 for Render)
-workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+if os.environ.get("WEB_MULTI_WORKER", "false").lower() != "true":
+    workers = 1
+elif os.environ.get("WEB_CONCURRENCY", "1").strip().lower() == "auto":
+    workers = recommended_workers()
+else:
+    workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+
+# Prometheus multiprocess mode: with several workers each one writes its
+# metric values (and latency histograms, see app.core.latency) to mmap files
+# in this directory and /metrics merges them. Must be set before any worker
+# imports prometheus_client.
+if workers > 1 and not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    import tempfile
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = os.path.join(
+        tempfile.gettempdir(), "hiremebahamas-metrics"
+    )
 
 # Worker class: uvicorn.workers.UvicornWorker for FastAPI async support
 # Uvicorn workers provide ASGI support with excellent async/await performance
@@ -110,28 +124,20 @@ max_requests = 1000
 max_requests_jitter = 100
 
 # ============================================================================
-# PRELOAD & PERFORMANCE (DATABASE SAFETY - CRITICAL)
+# PRELOAD & PERFORMANCE (DATABASE SAFETY)
 # ============================================================================
-# ⚠️ CRITICAL WARNING: Never use --preload with databases!
-#
-# Preload app setting:
-# - True: Load app once before forking (DANGEROUS with databases)
-# - False: Each worker loads app independently (SAFE with databases)
+# GUNICORN_PRELOAD=true imports the app once in the master so workers fork
+# with modules already loaded (faster boot, shared copy-on-write memory).
 #
-# Why preload_app = False is critical for database applications:
-# 1. Database connection pools cannot be safely shared across fork()
-# 2. Each worker needs its own database connections
-# 3. Prevents health check failures during initialization
-# 4. Allows /health endpoint to respond while workers initialize
-# 5. Avoids worker synchronization issues with shared state
+# This is safe because nothing connects at import time: the database engine
+# and Redis clients are created lazily on first use. post_fork() below also
+# resets any engine or shared-state client that exists in the master, so
+# connection pools are never shared across fork().
 #
-# ⚠️ NEVER override this with --preload on the command line!
-# Command line: poetry run gunicorn final_backend_postgresql:application --config gunicorn.conf.py
-# Do NOT add: --preload (this would override the safe setting below)
-#
-# SAFE COMMAND:   gunicorn final_backend_postgresql:application --config gunicorn.conf.py
-# UNSAFE COMMAND: gunicorn final_backend_postgresql:application --config gunicorn.conf.py --preload
+# Default stays False: each worker imports the app independently.
 preload_app = False
+if os.environ.get("GUNICORN_PRELOAD", "false").lower() == "true":
+    preload_app = True
 
 # ============================================================================
 # LOGGING (Production-grade)
@@ -264,20 +270,34 @@ def _get_worker_timeout():
 
 
 def on_starting(server):
-    """Log startup configuration"""
+    """Log startup configuration and refuse multi-worker mode without Redis"""
     global _master_start_time
     _master_start_time = time.time()
+    try:
+        state = create_shared_state(workers)
+    except RuntimeError as e:
+        print(f"❌ CRITICAL ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+    metrics_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if metrics_dir:
+        # Values left by a previous run would be merged into this one
+        import shutil
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir, exist_ok=True)
     print("")
     print("="*80)
     print("  HireMeBahamas API - Production Configuration")
     print("="*80)
-    print(f"  Workers: {workers} (single worker = predictable memory)")
+    print(f"  Workers: {workers} (WEB_CONCURRENCY={os.environ.get('WEB_CONCURRENCY', '1')}, "
+          f"WEB_MULTI_WORKER={os.environ.get('WEB_MULTI_WORKER', 'false')})")
     print(f"  Threads: {threads} (async event loop handles concurrency)")
     print(f"  Timeout: {timeout}s (prevents premature SIGTERM)")
     print(f"  Graceful: {graceful_timeout}s (clean shutdown)")
     print(f"  Keepalive: {keepalive}s (connection persistence)")
-    print(f"  Preload: {preload_app} (safe for database apps)")
+    print(f"  Preload: {preload_app} (lazy DB engine, reset after fork)")
     print(f"  Worker Class: {worker_class} (async)")
+    print(f"  Shared state: {state.name}")
+    print(f"  Metrics: {'multiprocess (' + metrics_dir + ')' if metrics_dir else 'single process'}")
     print("")
     print("  This is how production FastAPI apps actually run.")
     print("="*80)
@@ -303,6 +323,17 @@ def on_exit(server):
     print("🛑 Gunicorn shutting down...")
 
 
+def child_exit(server, worker):
+    """Drop a dead worker's live gauges from the merged Prometheus metrics"""
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return
+    try:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+    except Exception as e:
+        print(f"⚠️  Could not clean up metrics for worker {worker.pid}: {e}", file=sys.stderr)
+
+
 def worker_exit(server, worker):
     """Called when a worker exits.
     
@@ -428,6 +459,11 @@ def worker_abort(worker):
 
 
 def post_fork(server, worker):
-    """Called after worker fork"""
+    """Called after worker fork - drop connections inherited from the master"""
     print(f"👶 Booting worker with pid {worker.pid}")
+    if preload_app:
+        from app.core.shared_state import reset_shared_state
+        from app.database import reset_engine_after_fork
+        reset_engine_after_fork()
+        reset_shared_state()
 
@@ -0,0 +1,228 @@
+"""
+Tests for the availability-for-hire index.
+
+Tests cover:
+- Resolving free-text locations to island, settlement and coordinates
+- Radius, island, skill and text filters over the in-memory index
+- Rating, distance and newest ordering, and incremental updates
+- /api/hireme/available location filters against a SQLite database
+- toggle_availability and profile edits applied to the index at once
+"""
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent
+sys.path.insert(0, str(backend_path))
+
+import pytest
+import pytest_asyncio
+
+from app.core.availability import (
+    AvailabilityIndex,
+    AvailableUser,
+    canonical_island,
+    distance_km,
+    resolve_location,
+)
+
+
+def test_resolve_location():
+    """Test settlements win over islands and island-only text gets a position"""
+    place = resolve_location("Lucaya, Grand Bahama")
+    assert (place.island, place.settlement) == ("Grand Bahama", "Lucaya")
+    assert resolve_location("governors harbour").settlement == "Governor's Harbour"
+    assert resolve_location("Exumas") == resolve_location("Great Exuma")
+    assert resolve_location("The Abacos").island == "Abaco"
+    assert resolve_location("Harbour Island").island == "Harbour Island"
+    assert resolve_location("Miami, FL") is None
+    assert resolve_location(None) is None
+
+    assert canonical_island("grand bahama") == "Grand Bahama"
+    assert canonical_island("Great Abaco") == "Abaco"
+    assert canonical_island("Atlantis") is None
+
+    freeport, lucaya = resolve_location("Freeport"), resolve_location("Lucaya")
+    assert 5 < distance_km(freeport.lat, freeport.lon, lucaya.lat, lucaya.lon) < 6
+
+
+def _entry(user_id, location, skills=(), score=3.5, created_at=0.0, text=""):
+    return AvailableUser(user_id, resolve_location(location), frozenset(skills), score, created_at, text)
+
+
+@pytest.fixture
+def index():
+    index = AvailabilityIndex()
+    index.build([
+        _entry(1, "Freeport", ["electrical"], score=4.0, created_at=1),
+        _entry(2, "Lucaya", ["electrical", "hvac"], score=4.5, created_at=2),
+        _entry(3, "West End, Grand Bahama", ["electrical"], score=4.9, created_at=3),
+        _entry(4, "Freeport", ["plumbing"], score=5.0, created_at=4, text="ann solar plumbing"),
+        _entry(5, "Nassau", ["electrical"], score=4.8, created_at=5),
+        _entry(6, "Somewhere", ["electrical"], score=3.0, created_at=6),
+    ])
+    return index
+
+
+def test_radius_island_and_skill_filters(index):
+    """Test "electricians within 10 km of Freeport, best rated first" and friends"""
+    freeport = resolve_location("Freeport")
+    near = (freeport.lat, freeport.lon)
+
+    total, page = index.search(skills=["electrical"], near=near, radius_km=10)
+    assert total == 2
+    assert [user_id for user_id, _ in page] == [2, 1]
+    assert page[1][1] == 0.0 and 5 < page[0][1] < 6
+
+    assert index.search(skills=["electrical"], near=near, radius_km=10, sort="distance")[1][0] == (1, 0.0)
+    assert [u for u, _ in index.search(skills=["electrical"], island="Grand Bahama")[1]] == [3, 2, 1]
+    assert [u for u, _ in index.search(island="Grand Bahama", sort="newest")[1]] == [4, 3, 2, 1]
+
+    # Users without a known location are listed, but never matched by place
+    total, page = index.search(skills=["electrical"], near=near)
+    assert total == 5 and page[-1] == (6, None)
+    assert 6 not in [u for u, _ in index.search(near=near, radius_km=500)[1]]
+
+    assert index.search(text="SOLAR")[1] == [(4, None)]
+    assert index.search(skills=["electrical", "hvac"])[1] == [(2, None)]
+    assert index.search(skills=["welding"]) == (0, [])
+    assert [u for u, _ in index.search(skills=["electrical"], exclude=[5], limit=2, offset=1)[1]] == [2, 1]
+
+    with pytest.raises(ValueError):
+        index.search(radius_km=5)
+
+
+def test_incremental_updates(index):
+    """Test moving, re-skilling and removing users updates every posting"""
+    index.put(_entry(1, "Nassau", ["hvac"], score=4.0))
+    assert [u for u, _ in index.search(island="Grand Bahama")[1]] == [4, 3, 2]
+    assert [u for u, _ in index.search(skills=["hvac"], island="New Providence")[1]] == [1]
+
+    index.remove(2)
+    index.remove(99)
+    assert index.search(skills=["hvac"])[1] == [(1, None)]
+    assert index.island_counts() == [("Grand Bahama", 2), ("New Providence", 2)]
+    assert len(index) == 5
+
+
+USERS = [
+    # id, location, skills, available
+    (1, "Nassau", "Electrician", True),  # the viewer
+    (2, "Freeport, Grand Bahama", "Electrician", True),
+    (3, "Lucaya", "Electrical work, Solar", True),
+    (4, "West End, Grand Bahama", "electrician", True),
+    (5, "Freeport", "Plumber", True),
+    (6, "Freeport", "Electrician", False),
+    (7, "Nassau, New Providence", "Electrician", True),
+]
+
+
+@pytest_asyncio.fixture
+async def hireme_app(tmp_path):
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.api.hireme import router as hireme_router
+    from app.core import availability
+    from app.core.cache import clear_cache
+    from app.core.reputation import bayesian_score
+    from app.database import Base
+    from app.models import User, UserReputation
+    from benchmarks.query_plan_benchmark import build_app
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'availability.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as db:
+        db.add_all(
+            User(id=user_id, email=f"u{user_id}@example.com", username=f"user{user_id}", first_name="U",
+                 last_name=str(user_id), location=location, skills=skills, is_active=True,
+                 is_available_for_hire=available)
+            for user_id, location, skills, available in USERS
+        )
+        # One glowing review for 2; many good ones for 3
+        db.add_all([
+            UserReputation(user_id=2, review_count=1, rating_sum=5, five_star=1, score=bayesian_score(1, 5)),
+            UserReputation(user_id=3, review_count=10, rating_sum=48, four_star=2, five_star=8,
+                           score=bayesian_score(10, 48)),
+        ])
+        await db.commit()
+
+    app = build_app(session_factory, viewer_id=1)
+    app.include_router(hireme_router, prefix="/api/hireme")
+    availability.availability_index.clear()
+    clear_cache()
+    yield session_factory, app
+    availability.availability_index.clear()
+    clear_cache()
+    await engine.dispose()
+
+
+async def _available(app, **params):
+    import httpx
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        return await client.get("/api/hireme/available", params=params)
+
+
+@pytest.mark.asyncio
+async def test_hireme_location_search(hireme_app):
+    """Test the endpoint answers radius, island and distance queries from the index"""
+    _, app = hireme_app
+
+    response = await _available(app, skills="electrician", near="Freeport", radius_km=10)
+    assert response.status_code == 200
+    data = response.json()
+    assert [u["id"] for u in data["data"]] == [3, 2]
+    assert data["data"][0]["settlement"] == "Lucaya" and data["data"][0]["total_reviews"] == 10
+    assert data["data"][1]["distance_km"] == 0.0
+    assert data["pagination"] == {"total": 2, "page": 1, "per_page": 20, "has_next": False, "has_previous": False}
+
+    response = await _available(app, skills="electrician", near="Freeport", sort="distance")
+    assert [u["id"] for u in response.json()["data"]] == [2, 3, 4, 7]
+
+    response = await _available(app, island="grand bahama", sort="newest", limit=2, page=2)
+    assert [u["id"] for u in response.json()["data"]] == [3, 2]
+    assert response.json()["pagination"]["has_previous"]
+
+    # The viewer is dropped from the shared page
+    response = await _available(app, island="New Providence")
+    assert [u["id"] for u in response.json()["data"]] == [7]
+
+    for params in ({"island": "Atlantis"}, {"near": "Miami"}, {"radius_km": 5}, {"lat": 25.0},
+                   {"sort": "distance"}):
+        assert (await _available(app, **params)).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_toggle_and_profile_edit_update_index(hireme_app):
+    """Test availability and location changes show up without a rebuild"""
+    from app.api import auth, hireme
+    from app.core.availability import availability_index
+    from app.core.cache import clear_cache
+    from app.models import User
+    from app.schemas.auth import UserUpdate
+
+    session_factory, app = hireme_app
+    response = await _available(app, skills="electrician", near="Freeport", radius_km=10)
+    assert [u["id"] for u in response.json()["data"]] == [3, 2]
+    built_at = availability_index.built_at
+
+    async with session_factory() as db:
+        user = await db.get(User, 6)
+        assert (await hireme.toggle_availability(current_user=user, db=db))["is_available"]
+    async with session_factory() as db:
+        user = await db.get(User, 3)
+        await auth.update_profile(UserUpdate(location="Marsh Harbour, Abaco"), current_user=user, db=db)
+
+    clear_cache()
+    response = await _available(app, skills="electrician", near="Freeport", radius_km=10)
+    assert [u["id"] for u in response.json()["data"]] == [2, 6]
+    assert availability_index.built_at == built_at
+    assert [u for u, _ in availability_index.search(island="Abaco")[1]] == [3]
+
+    async with session_factory() as db:
+        user = await db.get(User, 2)
+        await hireme.toggle_availability(current_user=user, db=db)
+    assert availability_index.score_for(2) is None
@@ -0,0 +1,196 @@
+"""
+Tests for the ranked feed scoring engine.
+
+Tests cover:
+- Time decay and engagement weights
+- Incremental updates matching a full rebuild
+- Exact removal of likes
+- Lazy-deletion heap top-K reads
+- Offline replay evaluation
+- /api/feed?mode=ranked against a SQLite database
+"""
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent
+sys.path.insert(0, str(backend_path))
+
+import pytest
+
+from app.core.feed_ranking import FeedEvent, RankedFeedStore, RankingWeights
+
+T0 = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def _at(hours):
+    return T0 + timedelta(hours=hours)
+
+
+def test_decay_halves_score_every_half_life():
+    """Test a post's score halves after one half-life"""
+    store = RankedFeedStore(RankingWeights(post=8.0, half_life_hours=10))
+    store.apply(FeedEvent("post", 1, T0))
+    assert store.score(1, now=T0) == pytest.approx(8.0)
+    assert store.score(1, now=_at(10)) == pytest.approx(4.0)
+    assert store.score(1, now=_at(30)) == pytest.approx(1.0)
+
+
+def test_engagement_outranks_recency():
+    """Test an engaged older post beats a fresh post without engagement"""
+    store = RankedFeedStore(RankingWeights(half_life_hours=12))
+    store.apply(FeedEvent("post", 1, T0))
+    for minute in range(10):
+        store.apply(FeedEvent("like", 1, _at(1 + minute / 60)))
+    store.apply(FeedEvent("post", 2, _at(3)))
+
+    assert [post_id for post_id, _ in store.top(2, now=_at(3))] == [1, 2]
+
+
+def test_job_posts_and_boosts_are_weighted():
+    """Test job-post and boost weights lift a post"""
+    weights = RankingWeights(post=1.0, job_post=4.0, boosts={"featured": 50.0})
+    store = RankedFeedStore(weights)
+    store.apply(FeedEvent("post", 1, T0))
+    store.apply(FeedEvent("post", 2, T0, post_type="job"))
+    store.apply(FeedEvent("post", 3, T0))
+    store.apply(FeedEvent("boost", 3, T0, boost_type="featured"))
+
+    assert store.score(2, now=T0) == pytest.approx(5.0)
+    assert [post_id for post_id, _ in store.top(3, now=T0)] == [3, 2, 1]
+
+
+def test_incremental_updates_match_rebuild():
+    """Test applying events one by one equals building from the same events"""
+    events = [FeedEvent("post", i, _at(i)) for i in range(1, 30)]
+    events += [FeedEvent("like", i % 29 + 1, _at(i % 29 + 1.5)) for i in range(200)]
+    events += [FeedEvent("comment", i, _at(i + 2)) for i in range(1, 30, 3)]
+
+    incremental = RankedFeedStore()
+    for event in events:
+        incremental.apply(event)
+    rebuilt = RankedFeedStore()
+    rebuilt.build(events)
+
+    now = _at(40)
+    inc_top = incremental.top(10, now=now)
+    reb_top = rebuilt.top(10, now=now)
+    assert [p for p, _ in inc_top] == [p for p, _ in reb_top]
+    for (_, a), (_, b) in zip(inc_top, reb_top):
+        assert a == pytest.approx(b)
+
+
+def test_unlike_removes_exact_contribution():
+    """Test unlike at a later time removes the original like's weight"""
+    store = RankedFeedStore(RankingWeights(post=1.0, like=1.0, half_life_hours=12))
+    store.apply(FeedEvent("post", 1, T0))
+    store.apply(FeedEvent("like", 1, _at(6)))
+    store.apply(FeedEvent("unlike", 1, _at(6)))
+    assert store.score(1, now=_at(6)) == pytest.approx(2 ** -0.5)
+
+
+def test_top_k_skips_stale_entries_and_paginates():
+    """Test lazy-deletion heap returns each post once with its latest score"""
+    store = RankedFeedStore()
+    for post_id in range(1, 6):
+        store.apply(FeedEvent("post", post_id, T0))
+    for _ in range(3):
+        store.apply(FeedEvent("like", 4, T0))
+    store.remove(5)
+
+    top = store.top(10, now=T0)
+    ids = [post_id for post_id, _ in top]
+    assert ids[0] == 4
+    assert sorted(ids) == [1, 2, 3, 4]
+    assert store.top(2, offset=1, now=T0) == top[1:3]
+    # Reading does not consume the heap
+    assert store.top(10, now=T0) == top
+
+
+def test_engagement_on_unknown_posts_is_ignored():
+    """Test likes for posts outside the window do not create entries"""
+    store = RankedFeedStore()
+    store.apply(FeedEvent("like", 99, T0))
+    assert 99 not in store
+    assert len(store) == 0
+
+
+def test_replay_prefers_engagement_aware_weights():
+    """Test the replay tool scores a useful weight set above a recency-only one"""
+    from benchmarks.feed_ranking_replay import evaluate_weights, grid_search, make_checkpoints
+
+    events = []
+    for post_id in range(1, 21):
+        created = _at(post_id * 0.5)
+        events.append(FeedEvent("post", post_id, created))
+        # Even-numbered posts keep attracting likes; popularity persists
+        if post_id % 2 == 0:
+            events += [FeedEvent("like", post_id, created + timedelta(minutes=10 * n)) for n in range(1, 40)]
+
+    checkpoints = make_checkpoints(_at(2), _at(14), timedelta(hours=2))
+    horizon = timedelta(hours=2)
+    engaged = evaluate_weights(events, RankingWeights(like=1.0), checkpoints, horizon, k=5)
+    recency = evaluate_weights(events, RankingWeights(like=0.0, comment=0.0), checkpoints, horizon, k=5)
+    assert engaged["checkpoints"] > 0
+    assert engaged["ndcg"] > recency["ndcg"]
+
+    results = grid_search(events, {"like": [0.0, 1.0]}, checkpoints, horizon, k=5)
+    assert results[0]["weights"]["like"] == 1.0
+
+
+@pytest.mark.asyncio
+async def test_ranked_feed_endpoint(tmp_path):
+    """Test /api/feed?mode=ranked serves engaged posts first"""
+    import httpx
+    from fastapi import FastAPI
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.api.feed import router as feed_router
+    from app.core import feed_ranking
+    from app.core.memory_cache import cache_clear
+    from app.database import Base, get_db
+    from app.models import Post, PostLike, User
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'feed.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    now = datetime.now(timezone.utc)
+    async with session_factory() as db:
+        db.add_all([User(id=i, email=f"u{i}@example.com", first_name="U", last_name=str(i)) for i in range(1, 6)])
+        db.add_all([
+            Post(id=1, user_id=1, content="older, popular", created_at=now - timedelta(hours=3)),
+            Post(id=2, user_id=1, content="newest, quiet", created_at=now - timedelta(minutes=5)),
+        ])
+        db.add_all([PostLike(user_id=i, post_id=1, created_at=now - timedelta(hours=1)) for i in range(1, 6)])
+        await db.commit()
+
+    app = FastAPI()
+    app.include_router(feed_router, prefix="/api/feed")
+
+    async def test_get_db():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = test_get_db
+    feed_ranking.ranked_feed.clear()
+    cache_clear()
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            ranked = (await client.get("/api/feed/", params={"mode": "ranked"})).json()
+            recent = (await client.get("/api/feed/")).json()
+
+        assert [p["id"] for p in ranked["posts"]] == ["1", "2"]
+        assert ranked["posts"][0]["score"] > ranked["posts"][1]["score"]
+        assert [p["id"] for p in recent["posts"]] == ["2", "1"]
+
+        # Live events are applied once the store is built
+        feed_ranking.record_feed_event("post", 3)
+        assert 3 in feed_ranking.ranked_feed
+    finally:
+        feed_ranking.ranked_feed.clear()
+        cache_clear()
+        await engine.dispose()
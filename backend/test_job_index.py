@@ -0,0 +1,229 @@
+"""
+Tests for the in-memory faceted job index.
+
+Tests cover:
+- Filtering across and within facets
+- Budget ranges and buckets
+- Incremental facet counts on create/update/close/delete
+- Newest-first ordering and pagination
+- /api/jobs/search against a seeded SQLite database
+- /api/jobs/ listing filters served through the index
+"""
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent
+sys.path.insert(0, str(backend_path))
+
+import pytest
+
+from app.core.job_index import JobFacetIndex, budget_bucket
+
+NOW = datetime(2026, 1, 1)
+
+
+def _job(job_id, category="Plumbing", location="Nassau, New Providence", job_type="full-time",
+         is_remote=False, budget=250.0, status="active"):
+    return {
+        "id": job_id,
+        "category": category,
+        "location": location,
+        "job_type": job_type,
+        "is_remote": is_remote,
+        "budget": budget,
+        "status": status,
+        "created_at": NOW + timedelta(minutes=job_id),
+    }
+
+
+@pytest.fixture
+def index():
+    idx = JobFacetIndex()
+    idx.build([
+        _job(1, category="Plumbing", budget=80),
+        _job(2, category="Electrical", location="Freeport, Grand Bahama", budget=450),
+        _job(3, category="Plumbing", job_type="contract", is_remote=True, budget=1200),
+        _job(4, category="Construction", location="Freeport, Grand Bahama", budget=7000),
+        _job(5, category="Plumbing", status="closed", budget=300),
+    ])
+    return idx
+
+
+def test_budget_buckets():
+    """Test budget bucket boundaries"""
+    assert budget_bucket(None) is None
+    assert budget_bucket(99.99) == "under_100"
+    assert budget_bucket(100) == "100_500"
+    assert budget_bucket(5000) == "5000_plus"
+
+
+def test_filters_and_within_or_across(index):
+    """Test facets AND together while values within a facet OR together"""
+    result = index.search({"status": "active", "category": ["plumbing"]})
+    assert result["ids"] == [3, 1]
+    assert result["total"] == 2
+
+    result = index.search({"status": "active", "category": ["plumbing", "electrical"], "location": "freeport"})
+    assert result["ids"] == [2]
+
+    result = index.search({"status": "active", "is_remote": True})
+    assert result["ids"] == [3]
+
+
+def test_budget_range_and_bucket(index):
+    """Test exact budget ranges and bucket facets"""
+    assert index.search({"status": "active", "budget_min": 100, "budget_max": 1200})["ids"] == [3, 2]
+    assert index.search({"status": "active", "budget": "5000_plus"})["ids"] == [4]
+
+
+def test_disjunctive_facet_counts(index):
+    """Test that a facet's counts ignore its own filter but honour the others"""
+    facets = index.search({"status": "active", "category": "plumbing", "location": "freeport"})["facets"]
+    # Category counts are restricted by location only
+    assert facets["category"] == {"electrical": 1, "construction": 1}
+    # Location counts are restricted by category only
+    assert facets["location"] == {"nassau, new providence": 2}
+
+
+def test_incremental_counts_on_lifecycle(index):
+    """Test counters follow create, update, close and delete"""
+    counts = index.active_counts()
+    assert counts["category"]["plumbing"] == 2
+
+    index.upsert(_job(6, category="Plumbing"))
+    assert index.active_counts()["category"]["plumbing"] == 3
+
+    index.upsert(_job(6, category="Electrical"))
+    counts = index.active_counts()
+    assert counts["category"]["plumbing"] == 2
+    assert counts["category"]["electrical"] == 2
+
+    index.upsert(_job(6, category="Electrical", status="closed"))
+    assert index.active_counts()["category"]["electrical"] == 1
+
+    assert index.remove(3) is True
+    assert index.remove(3) is False
+    assert "contract" not in index.active_counts()["job_type"]
+    assert index.search({"status": "active"})["ids"] == [4, 2, 1]
+
+    # Unfiltered active listing is answered from the counters
+    assert index.search({"status": "active"})["facets"]["category"] == {"construction": 1, "electrical": 1, "plumbing": 1}
+
+
+def test_pagination_newest_first(index):
+    """Test offset/limit pagination over the match bitmap"""
+    assert index.search({"status": "active"}, limit=2)["ids"] == [4, 3]
+    assert index.search({"status": "active"}, limit=2, offset=2)["ids"] == [2, 1]
+    assert index.search({"status": "active"}, limit=2, offset=4)["ids"] == []
+
+
+def test_matching_ids_returns_every_match(index):
+    """Test matching_ids lists all matches newest first"""
+    assert index.matching_ids({"category": "plumb", "status": "active"}) == [3, 1]
+    assert index.matching_ids({"location": "freeport", "budget_min": 500}) == [4]
+    assert index.matching_ids({"category": "carpentry"}) == []
+
+
+@pytest.mark.asyncio
+async def test_search_endpoint_matches_database(tmp_path):
+    """Test /api/jobs/search agrees with a direct database count"""
+    import httpx
+    from sqlalchemy import func, select
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.core import job_index as job_index_module
+    from app.database import Base
+    from app.models import Job
+    from benchmarks.dataset import DatasetSpec, seed_dataset
+    from benchmarks.query_plan_benchmark import build_app
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'jobs.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await seed_dataset(session_factory, DatasetSpec(users=40, jobs=200, avg_following=3))
+
+    job_index_module.job_index.clear()
+    app = build_app(session_factory, viewer_id=1)
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get(
+                "/api/jobs/search",
+                params={"category": ["Plumbing", "Marine"], "budget_min": 500, "limit": 5},
+            )
+        assert response.status_code == 200
+        data = response.json()
+
+        async with session_factory() as db:
+            expected = (await db.execute(
+                select(func.count()).select_from(Job).where(
+                    Job.status == "active",
+                    Job.category.in_(["Plumbing", "Marine"]),
+                    Job.budget >= 500,
+                )
+            )).scalar()
+
+        assert data["total"] == expected
+        assert len(data["jobs"]) == min(5, expected)
+        assert {job["category"] for job in data["jobs"]} <= {"Plumbing", "Marine"}
+        created = [job["created_at"] for job in data["jobs"]]
+        assert created == sorted(created, reverse=True)
+        assert sum(data["facets"]["category"].values()) >= expected
+    finally:
+        job_index_module.job_index.clear()
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_listing_filters_use_index(tmp_path, monkeypatch):
+    """Test /api/jobs/ filters agree with ILIKE queries and are not cached per filter"""
+    import httpx
+    from sqlalchemy import select
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.api import jobs as jobs_module
+    from app.core import job_index as job_index_module
+    from app.database import Base
+    from app.models import Job
+    from benchmarks.dataset import DatasetSpec, seed_dataset
+    from benchmarks.query_plan_benchmark import build_app
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'jobs.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await seed_dataset(session_factory, DatasetSpec(users=40, jobs=200, avg_following=3))
+
+    cached_keys = []
+    monkeypatch.setattr(jobs_module, "cache_set", lambda key, value: cached_keys.append(key))
+    job_index_module.job_index.clear()
+    app = build_app(session_factory, viewer_id=1)
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get(
+                "/api/jobs/",
+                params={"category": "plumb", "budget_min": 500, "limit": 100},
+            )
+        assert response.status_code == 200
+        returned = [job["id"] for job in response.json()["data"]]
+
+        async with session_factory() as db:
+            expected = (await db.execute(
+                select(Job.id).where(
+                    Job.status == "active",
+                    Job.category.ilike("%plumb%"),
+                    Job.budget >= 500,
+                ).order_by(Job.created_at.desc(), Job.id.desc()).limit(100)
+            )).scalars().all()
+
+        assert expected
+        assert returned == list(expected)
+        assert job_index_module.job_index.built_at is not None
+        assert cached_keys == []
+    finally:
+        job_index_module.job_index.clear()
+        await engine.dispose()
@@ -0,0 +1,132 @@
+"""
+Tests for latency histograms and multiprocess-safe metrics.
+
+Tests cover:
+- Bucket bounds and the 6.25% relative error bound
+- Percentiles against exact values
+- Folding names past the per-kind series cap into "other"
+- Merging per-worker mmap files
+- Prometheus exposition of latency quantiles and event counters
+- /api/performance/metrics summaries with p95 per route template
+"""
+import random
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent
+sys.path.insert(0, str(backend_path))
+
+import pytest
+
+from app.core import latency
+from app.core.latency import (
+    BUCKET_COUNT,
+    MAX_VALUE_US,
+    LatencyHistogram,
+    LatencyStore,
+    bucket_index,
+    bucket_upper_bound,
+)
+
+
+def test_bucket_bounds():
+    """Test every value falls in a bucket whose bound is within 6.25%"""
+    values = sorted(list(range(0, 5000)) + [random.randrange(MAX_VALUE_US) for _ in range(5000)])
+    indexes = [bucket_index(value) for value in values]
+    assert indexes == sorted(indexes)
+    for value, index in zip(values, indexes):
+        assert 0 <= index < BUCKET_COUNT
+        assert value <= bucket_upper_bound(index) <= value * 1.0625 + 1
+    assert bucket_index(MAX_VALUE_US * 4) == BUCKET_COUNT - 1
+
+
+def test_percentiles_match_exact_values():
+    """Test p50/p95/p99 agree with sorted samples within the bucket error"""
+    rng = random.Random(7)
+    samples_ms = [rng.lognormvariate(3, 1) for _ in range(20000)]
+    histogram = LatencyHistogram()
+    for value in samples_ms:
+        histogram.record(int(value * 1000))
+
+    ordered = sorted(samples_ms)
+    for pct in (50, 95, 99):
+        exact = ordered[int(len(ordered) * pct / 100) - 1]
+        assert histogram.percentile(pct) == pytest.approx(exact, rel=0.07)
+    summary = histogram.summary()
+    assert summary["count"] == len(samples_ms)
+    assert summary["max_ms"] == pytest.approx(max(samples_ms), abs=0.001)
+    assert LatencyHistogram().summary()["p99_ms"] == 0.0
+
+
+def test_series_cap_folds_into_other(monkeypatch):
+    """Test names beyond the cap share one series"""
+    monkeypatch.setattr(latency, "MAX_SERIES_PER_KIND", 3)
+    store = LatencyStore()
+    for i in range(10):
+        store.observe("http", f"GET /random/{i}", 5)
+    histograms, _ = store.snapshot()
+    assert sorted(histograms["http"]) == ["GET /random/0", "GET /random/1", "GET /random/2", "other"]
+    assert histograms["http"]["other"].count == 7
+
+
+def test_multiprocess_files_are_merged(tmp_path, monkeypatch):
+    """Test a snapshot in any worker sees every worker's values"""
+    workers = []
+    for pid in (1001, 1002):
+        monkeypatch.setattr(latency.os, "getpid", lambda pid=pid: pid)
+        store = LatencyStore(str(tmp_path))
+        for _ in range(100):
+            store.observe("http", "GET /api/jobs/", 10 if pid == 1001 else 200)
+        store.increment("errors", "5xx", 2)
+        workers.append(store)
+
+    histograms, counters = workers[0].snapshot()
+    jobs = histograms["http"]["GET /api/jobs/"]
+    assert jobs.count == 200
+    assert jobs.percentile(50) == pytest.approx(10, rel=0.07)
+    assert jobs.percentile(95) == pytest.approx(200, rel=0.07)
+    assert counters["errors"]["5xx"] == 4
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["latency_1001.db", "latency_1002.db"]
+
+
+def test_collector_exposes_quantiles(monkeypatch):
+    """Test the Prometheus text output carries quantiles and counters"""
+    from prometheus_client import CollectorRegistry, generate_latest
+
+    monkeypatch.setattr(latency, "_store", LatencyStore())
+    for value in (1, 2, 3, 400):
+        latency.observe("db", "select", value)
+    latency.increment("cache", "hits")
+
+    registry = CollectorRegistry()
+    registry.register(latency.LatencyCollector())
+    text = generate_latest(registry).decode()
+    assert 'hiremebahamas_latency_seconds{kind="db",name="select",quantile="0.99"}' in text
+    assert 'hiremebahamas_latency_seconds_count{kind="db",name="select"} 4.0' in text
+    assert 'hiremebahamas_events_total{kind="cache",name="hits"} 1.0' in text
+
+
+def test_performance_metrics_report_percentiles(monkeypatch):
+    """Test request, error, cache and timer summaries"""
+    from app.core import monitoring
+
+    monkeypatch.setattr(latency, "_store", LatencyStore())
+    for i in range(100):
+        monitoring.track_request_time("GET /api/jobs/{job_id}", 10 + i, 200 if i < 98 else 500)
+    monitoring.track_cache_hit()
+    monitoring.track_cache_miss()
+    with latency.timed("external", "cloudinary_upload"):
+        pass
+
+    metrics = monitoring.get_performance_metrics()
+    endpoint = metrics["endpoints"]["GET /api/jobs/{job_id}"]
+    assert endpoint["count"] == 100
+    assert endpoint["p95_ms"] == pytest.approx(104, rel=0.07)
+    assert metrics["requests"]["total"] == 100
+    assert metrics["errors"] == {"4xx": 0, "5xx": 2}
+    assert metrics["cache"]["hit_rate"] == 50.0
+    assert metrics["timers"]["external"]["cloudinary_upload"]["count"] == 1
+
+    monitoring.reset_metrics()
+    assert monitoring.get_performance_metrics()["requests"]["total"] == 0
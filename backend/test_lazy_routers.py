@@ -0,0 +1,165 @@
+"""
+Tests for lazy router mounting and the minimal boot mode.
+
+Tests cover:
+- Importing and mounting a lazy router on its first request only
+- Loading every pending router for the OpenAPI schema
+- Recording (not retrying) a router that fails to import
+- Parsing and summarizing -X importtime output
+- Minimal boot: /health served without GraphQL, Pillow, Socket.IO or jose,
+  faster than a full boot, with lazily mounted API routes still answering
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent
+sys.path.insert(0, str(backend_path))
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.core.lazy_routers import LazyRouterMiddleware, LazyRouterRegistry
+from benchmarks.startup_profile import BACKEND_DIR, measure_boot, parse_importtime, summarize_imports
+
+# Generous so slow CI machines pass; locally minimal boot is ~1.4s
+MINIMAL_BOOT_BUDGET_MS = float(os.getenv("MINIMAL_BOOT_BUDGET_MS", "5000"))
+
+ROUTER_MODULE = """
+from fastapi import APIRouter
+
+router = APIRouter()
+
+
+@router.get("/ping")
+async def ping():
+    return {"pong": True}
+"""
+
+
+@pytest.fixture
+def router_module(tmp_path, monkeypatch):
+    """A throwaway router module importable as lazy_fixture_router"""
+    (tmp_path / "lazy_fixture_router.py").write_text(ROUTER_MODULE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield "lazy_fixture_router"
+    sys.modules.pop("lazy_fixture_router", None)
+
+
+def make_app(**app_kwargs):
+    app = FastAPI(**app_kwargs)
+    registry = LazyRouterRegistry(app)
+    app.add_middleware(LazyRouterMiddleware, registry=registry)
+    return app, registry
+
+
+def client_for(app):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_router_mounted_on_first_request(router_module):
+    """Test the module is imported by the first matching request only"""
+    app, registry = make_app()
+    mount = registry.add("fixture", f"{router_module}:router", prefix="/api/fixture")
+    assert router_module not in sys.modules
+
+    async with client_for(app) as client:
+        assert (await client.get("/api/other")).status_code == 404
+        assert router_module not in sys.modules
+
+        response = await client.get("/api/fixture/ping")
+        assert response.status_code == 200
+        assert response.json() == {"pong": True}
+        assert (await client.get("/api/fixture/ping")).status_code == 200
+
+    assert mount.loaded and mount.error is None and mount.load_ms is not None
+    assert registry.pending == []
+
+
+@pytest.mark.asyncio
+async def test_openapi_loads_every_pending_router(router_module):
+    """Test the schema includes lazily mounted routes"""
+    app, registry = make_app()
+    registry.add("fixture", f"{router_module}:router", prefix="/api/fixture", tags=["fixture"])
+
+    async with client_for(app) as client:
+        schema = (await client.get("/openapi.json")).json()
+
+    assert "/api/fixture/ping" in schema["paths"]
+    assert schema["paths"]["/api/fixture/ping"]["get"]["tags"] == ["fixture"]
+
+
+@pytest.mark.asyncio
+async def test_failed_router_recorded_once():
+    """Test an import error is recorded and the prefix answers 404"""
+    app, registry = make_app()
+    mount = registry.add("broken", "app.does_not_exist:router", prefix="/api/broken")
+
+    async with client_for(app) as client:
+        assert (await client.get("/api/broken/x")).status_code == 404
+        assert (await client.get("/api/broken/y")).status_code == 404
+
+    assert mount.loaded
+    assert mount.error.startswith("ModuleNotFoundError")
+    assert registry.status()[0]["error"] == mount.error
+
+
+def test_parse_importtime():
+    """Test -X importtime lines become per-module entries and package totals"""
+    output = "\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:       120 |        120 |     graphql.error",
+        "import time:      3000 |       3120 |   strawberry.types",
+        "import time:       500 |       3620 | strawberry",
+        "import time:       250 |       3870 | app.main",
+        "unrelated warning line",
+    ])
+    modules = parse_importtime(output)
+    assert [m["module"] for m in modules] == ["graphql.error", "strawberry.types", "strawberry", "app.main"]
+    assert modules[0]["depth"] == 2 and modules[3]["depth"] == 0
+    assert modules[1]["self_ms"] == 3.0
+
+    summary = summarize_imports(modules, top=2)
+    assert summary["total_ms"] == 3.9
+    assert [m["module"] for m in summary["slowest"]] == ["app.main", "strawberry"]
+    assert summary["packages"][0] == {"package": "strawberry", "self_ms": 3.5}
+    assert [m["module"] for m in summary["app_modules"]] == ["app.main"]
+
+
+def test_minimal_boot_latency():
+    """Test minimal boot serves /health within budget and imports less than full boot"""
+    minimal = measure_boot("minimal")
+    full = measure_boot("full")
+
+    assert minimal["status"] == 200
+    assert minimal["heavy_modules"] == []
+    assert minimal["first_health_ms"] < MINIMAL_BOOT_BUDGET_MS
+    assert minimal["modules"] < full["modules"]
+    # Full boot keeps GraphQL lazy too; uploads (Pillow) are imported at boot
+    assert "strawberry" not in full["heavy_modules"]
+
+
+def test_minimal_boot_mounts_routes_on_demand():
+    """Test a lazily mounted API route answers in minimal boot mode"""
+    script = """
+import asyncio, sys, httpx
+import app.main as main
+
+async def request():
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://boot") as client:
+        return (await client.get("/api/notifications/list")).status_code
+
+print("RESULT", "app.api.notifications" in sys.modules, asyncio.run(request()),
+      "app.api.notifications" in sys.modules, "app.api.jobs" in sys.modules)
+"""
+    env = dict(os.environ, BOOT_MODE="minimal")
+    result = subprocess.run([sys.executable, "-c", script], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, timeout=300)
+    line = next(l for l in result.stdout.splitlines() if l.startswith("RESULT"))
+    # Not imported at boot, mounted by the request (unauthenticated -> 403), others untouched
+    assert line.split()[1:] == ["False", "403", "True", "False"]
@@ -0,0 +1,158 @@
+"""
+Tests for serving uploaded media from disk.
+
+Tests cover:
+- Content-hashed upload names (identical bodies share a file)
+- 200 with ETag and immutable Cache-Control for hashed names, revalidation
+  for legacy names, 304 on If-None-Match
+- Single byte ranges (206), suffix ranges, If-Range, unsatisfiable (416)
+- HEAD without a body, path traversal and dotfiles rejected
+- Zero-copy send when the server advertises ``http.response.zerocopy``
+"""
+import hashlib
+import io
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent
+sys.path.insert(0, str(backend_path))
+
+import pytest
+import pytest_asyncio
+
+from app.core import media
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(media, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(media, "CHUNK_SIZE", 1000)
+    return tmp_path / "uploads"
+
+
+@pytest_asyncio.fixture
+async def client(upload_dir):
+    import httpx
+    from fastapi import FastAPI
+
+    app = FastAPI()
+    app.add_middleware(media.MediaMiddleware)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+
+
+async def _store(name, body, folder="videos"):
+    from starlette.datastructures import UploadFile
+
+    return await media.store_upload(UploadFile(io.BytesIO(body), filename=name), folder, chunk_size=1024)
+
+
+@pytest.mark.asyncio
+async def test_store_upload_names_files_by_content(upload_dir):
+    """Test uploads are named by sha256 and identical bodies are stored once"""
+    body = b"frame" * 1000
+    url = await _store("Clip.MP4", body)
+    digest = hashlib.sha256(body).hexdigest()[:media.HASH_LENGTH]
+
+    assert url == f"/uploads/videos/{digest}.mp4"
+    assert await _store("again.mp4", body) == url
+    assert await media.store_bytes(body, "videos", "x.mp4") == url
+    assert sorted(p.name for p in (upload_dir / "videos").iterdir()) == [f"{digest}.mp4"]
+    assert media.is_content_hashed(url)
+    assert (await _store("notes", b"x")).endswith(".bin")
+
+
+@pytest.mark.asyncio
+async def test_full_response_and_validation(client, upload_dir):
+    """Test hashed names are immutable and a matching ETag answers 304"""
+    body = bytes(range(256)) * 20
+    url = await _store("clip.mp4", body)
+
+    response = await client.get(url)
+    assert response.status_code == 200
+    assert response.content == body
+    assert response.headers["content-type"] == "video/mp4"
+    assert response.headers["cache-control"] == media.IMMUTABLE_CACHE_CONTROL
+    assert response.headers["accept-ranges"] == "bytes"
+    etag = response.headers["etag"]
+    assert etag == f'"{url.rsplit("/", 1)[1].split(".")[0]}"'
+
+    not_modified = await client.get(url, headers={"If-None-Match": f'"other", {etag}'})
+    assert not_modified.status_code == 304 and not_modified.content == b""
+
+    (upload_dir / "legacy").mkdir()
+    (upload_dir / "legacy" / "3f2c-uuid.png").write_bytes(b"png")
+    legacy = await client.get("/uploads/legacy/3f2c-uuid.png")
+    assert legacy.headers["cache-control"] == f"public, max-age={media.MEDIA_MAX_AGE}"
+    assert (await client.get("/uploads/legacy/3f2c-uuid.png",
+                             headers={"If-None-Match": legacy.headers["etag"]})).status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_byte_ranges(client):
+    """Test 206 for single ranges, If-Range, and 416 past the end"""
+    body = bytes(range(256)) * 20  # 5120 bytes, streamed in 1000-byte chunks
+    url = await _store("clip.mp4", body)
+
+    ranged = await client.get(url, headers={"Range": "bytes=1000-2999"})
+    assert ranged.status_code == 206
+    assert ranged.content == body[1000:3000]
+    assert ranged.headers["content-range"] == "bytes 1000-2999/5120"
+    assert ranged.headers["content-length"] == "2000"
+
+    suffix = await client.get(url, headers={"Range": "bytes=-100"})
+    assert suffix.content == body[-100:] and suffix.headers["content-range"] == "bytes 5020-5119/5120"
+    open_ended = await client.get(url, headers={"Range": "bytes=5000-"})
+    assert open_ended.content == body[5000:]
+
+    stale = await client.get(url, headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert stale.status_code == 200 and stale.content == body
+    multi = await client.get(url, headers={"Range": "bytes=0-9,20-29"})
+    assert multi.status_code == 200
+
+    unsatisfiable = await client.get(url, headers={"Range": "bytes=6000-"})
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["content-range"] == "bytes */5120"
+
+
+@pytest.mark.asyncio
+async def test_head_and_rejected_paths(client, upload_dir):
+    """Test HEAD sends headers only and nothing outside UPLOAD_DIR is served"""
+    url = await _store("a.pdf", b"%PDF" * 100)
+    head = await client.head(url)
+    assert head.status_code == 200 and head.content == b""
+    assert head.headers["content-length"] == "400"
+
+    (upload_dir.parent / "secret.txt").write_text("secret")
+    (upload_dir / "videos" / ".x.part").write_bytes(b"partial")
+    for path in ("/uploads/../secret.txt", "/uploads/%2e%2e/secret.txt", "/uploads/videos/.x.part",
+                 "/uploads/videos", "/uploads/missing.png"):
+        assert (await client.get(path)).status_code == 404, path
+
+
+@pytest.mark.asyncio
+async def test_zero_copy_when_server_supports_it(upload_dir):
+    """Test the file descriptor is handed to the server instead of read in Python"""
+    body = b"v" * 4096
+    url = await _store("clip.mp4", body)
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.zerocopy":
+            message["file"].seek(message["offset"])
+            message = {**message, "data": message["file"].read(message["count"])}
+        sent.append(message)
+
+    scope = {
+        "type": "http", "method": "GET", "path": url, "raw_path": url.encode(), "query_string": b"",
+        "headers": [(b"range", b"bytes=100-199")], "extensions": {"http.response.zerocopy": {}},
+    }
+    await media.MediaMiddleware(app=None)(scope, receive, send)
+
+    assert sent[0]["status"] == 206
+    assert [m["type"] for m in sent[1:]] == ["http.response.zerocopy"]
+    assert sent[1]["offset"] == 100 and sent[1]["count"] == 100 and sent[1]["data"] == body[100:200]
@@ -0,0 +1,242 @@
+"""
+Tests for time-partitioned tables and snowflake IDs.
+
+Tests cover:
+- Snowflake ID ordering, uniqueness and timestamp round trip
+- Worker ids leased from Redis, and refused in production without one
+- Monthly partition arithmetic and SQL generation
+- Retention cutoffs
+- Batched DELETE retention fallback on SQLite
+- Models receiving snowflake IDs
+"""
+import sys
+import threading
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent
+sys.path.insert(0, str(backend_path))
+
+import pytest
+
+from app.core import partitioning
+from app.core.partitioning import (
+    PartitionSpec,
+    add_months,
+    convert_to_partitioned_sql,
+    create_partition_sql,
+    parse_partition_name,
+    partition_name,
+    retention_cutoff,
+)
+from app.core.snowflake import SnowflakeGenerator, id_to_datetime, min_id_for
+
+
+def test_snowflake_ids_are_unique_and_increasing():
+    """Test IDs increase monotonically, even across threads"""
+    generator = SnowflakeGenerator(worker_id=3)
+    ids = []
+    lock = threading.Lock()
+
+    def worker():
+        local = [generator.next_id() for _ in range(2000)]
+        with lock:
+            ids.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(set(ids)) == 8000
+    sequential = [generator.next_id() for _ in range(500)]
+    assert sequential == sorted(sequential)
+
+
+def test_snowflake_ids_fit_javascript_numbers():
+    """Test IDs stay below Number.MAX_SAFE_INTEGER"""
+    assert SnowflakeGenerator(worker_id=31).next_id() < 2 ** 53
+
+
+def test_snowflake_timestamp_round_trip():
+    """Test the creation time is recoverable and usable for range queries"""
+    before = datetime.now(timezone.utc) - timedelta(milliseconds=1)
+    snowflake_id = SnowflakeGenerator(worker_id=0).next_id()
+    created = id_to_datetime(snowflake_id)
+    assert abs((created - before).total_seconds()) < 1
+    assert min_id_for(before) <= snowflake_id
+    assert min_id_for(before + timedelta(seconds=5)) > snowflake_id
+
+
+def test_snowflake_rejects_invalid_worker():
+    """Test worker ids outside 0-31 are rejected"""
+    with pytest.raises(ValueError):
+        SnowflakeGenerator(worker_id=32)
+
+
+class FakeLeaseRedis:
+    """Just enough of a sync Redis client for SET NX leases"""
+
+    def __init__(self):
+        self.values = {}
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+
+
+def test_worker_ids_are_leased(monkeypatch):
+    """Test each process leases a distinct worker id and fails once all are taken"""
+    from app.core import snowflake
+
+    client = FakeLeaseRedis()
+    monkeypatch.setattr(snowflake, "_lease", None)
+    monkeypatch.setattr(snowflake.WorkerIdLease, "_renew_loop", lambda self: None)
+    # Worker id 31 belongs to the database's snowflake_id()
+    leases = [snowflake.WorkerIdLease(client) for _ in range(31)]
+    assert [lease.acquire() for lease in leases] == list(range(31))
+    assert client.values["snowflake:worker:5"] == leases[5].token
+    with pytest.raises(RuntimeError):
+        snowflake.WorkerIdLease(client).acquire()
+
+    monkeypatch.delenv("SNOWFLAKE_WORKER_ID", raising=False)
+    monkeypatch.setattr(snowflake, "_redis_url", lambda: "redis://cache:6379")
+    monkeypatch.setattr(snowflake, "_lease_client", lambda url: FakeLeaseRedis())
+    assert SnowflakeGenerator().worker_id == 0
+
+
+def test_worker_id_required_in_production(monkeypatch):
+    """Test production refuses to guess a worker id without Redis"""
+    from app.core import snowflake
+
+    monkeypatch.delenv("SNOWFLAKE_WORKER_ID", raising=False)
+    monkeypatch.setattr(snowflake, "_redis_url", lambda: "")
+    monkeypatch.setenv("ENVIRONMENT", "production")
+    with pytest.raises(RuntimeError):
+        SnowflakeGenerator()
+
+    monkeypatch.setenv("SNOWFLAKE_WORKER_ID", "7")
+    assert SnowflakeGenerator().worker_id == 7
+    monkeypatch.setenv("SNOWFLAKE_WORKER_ID", str(snowflake.DATABASE_WORKER_ID))
+    with pytest.raises(ValueError):
+        SnowflakeGenerator()
+
+    monkeypatch.delenv("SNOWFLAKE_WORKER_ID")
+    monkeypatch.setenv("ENVIRONMENT", "development")
+    monkeypatch.setenv("WEB_CONCURRENCY", "1")
+    assert SnowflakeGenerator().worker_id == 0
+
+
+def test_database_snowflake_function_matches_layout():
+    """Test snowflake_id() in PostgreSQL builds ids with the Python layout"""
+    from app.core import snowflake
+
+    sql = snowflake.DATABASE_FUNCTION_SQL[1]
+    assert f"- {snowflake.EPOCH_MS}) << {snowflake.TIMESTAMP_SHIFT})" in sql
+    assert f"({snowflake.DATABASE_WORKER_ID}::bigint << {snowflake.WORKER_SHIFT})" in sql
+    assert f"% {snowflake.MAX_SEQUENCE + 1})" in sql
+    assert partitioning.SNOWFLAKE_ID_TABLES == ("messages", "notifications")
+
+
+def test_month_arithmetic_and_names():
+    """Test partition names and month stepping across year boundaries"""
+    assert add_months(date(2026, 11, 1), 3) == date(2027, 2, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    name = partition_name("notifications", date(2026, 3, 1))
+    assert name == "notifications_p2026_03"
+    assert parse_partition_name(name) == date(2026, 3, 1)
+    assert parse_partition_name("notifications_default") is None
+
+
+def test_partition_sql():
+    """Test generated DDL for a monthly partition and a table conversion"""
+    spec = PartitionSpec("messages")
+    assert create_partition_sql(spec, date(2026, 12, 1)) == (
+        "CREATE TABLE IF NOT EXISTS messages_p2026_12 PARTITION OF messages "
+        "FOR VALUES FROM ('2026-12-01') TO ('2027-01-01')"
+    )
+    statements = convert_to_partitioned_sql(spec, date(2026, 1, 1), date(2026, 3, 1))
+    joined = "\n".join(statements)
+    assert "PARTITION BY RANGE (created_at)" in joined
+    assert "ADD PRIMARY KEY (id, created_at)" in joined
+    assert "ALTER COLUMN id TYPE BIGINT" in joined
+    assert sum("PARTITION OF messages FOR VALUES" in s for s in statements) == 3
+    assert "messages_default PARTITION OF messages DEFAULT" in joined
+    # Writers inserting without an id get snowflake ids from the database
+    function = next(i for i, s in enumerate(statements) if "FUNCTION snowflake_id()" in s)
+    default = statements.index("ALTER TABLE messages ALTER COLUMN id SET DEFAULT snowflake_id()")
+    assert function < default
+    assert "OWNED BY" not in joined
+    # Secondary indexes move to the new table after the copy, under their names
+    copy = statements.index("INSERT INTO messages SELECT * FROM messages_legacy")
+    recreate = next(i for i, s in enumerate(statements) if "pg_get_indexdef" in s)
+    assert recreate > copy and "_legacy" in statements[recreate]
+    # Unique indexes are never downgraded to plain ones
+    assert "CREATE INDEX'" not in statements[recreate]
+    # post_likes keeps its unique (post_id, user_id) index, so it stays a plain table
+    assert "post_likes" not in partitioning.PARTITIONED_TABLES
+
+
+def test_retention_cutoff():
+    """Test retention keeps whole months"""
+    now = datetime(2026, 10, 18, tzinfo=timezone.utc)
+    assert retention_cutoff(PartitionSpec("notifications", retention_months=3), now) == date(2026, 7, 1)
+    assert retention_cutoff(PartitionSpec("messages"), now) is None
+
+
+@pytest.mark.asyncio
+async def test_retention_delete_fallback_on_sqlite(tmp_path, monkeypatch):
+    """Test plain tables fall back to batched deletes of every expired row, like partition drops"""
+    from sqlalchemy import func, select
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.database import Base
+    from app.models import Notification, NotificationType, User
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'retention.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    now = datetime.now(timezone.utc)
+    old = now - timedelta(days=200)
+    async with session_factory() as db:
+        db.add(User(id=1, email="u@example.com", first_name="U", last_name="One"))
+        for is_read, created in [(True, old), (True, old), (False, old), (True, now)]:
+            db.add(Notification(
+                user_id=1,
+                notification_type=NotificationType.LIKE,
+                content="x",
+                is_read=is_read,
+                created_at=created,
+            ))
+        await db.commit()
+
+        ids = (await db.execute(select(Notification.id))).scalars().all()
+        assert all(i > 2 ** 32 for i in ids)  # snowflake ids, not a sequence
+
+    try:
+        # Off by default: nothing is removed until retention is configured
+        async with engine.begin() as conn:
+            assert await partitioning.apply_retention(conn) == {}
+        monkeypatch.setitem(
+            partitioning.PARTITIONED_TABLES, "notifications",
+            PartitionSpec("notifications", retention_months=3),
+        )
+        async with engine.begin() as conn:
+            assert await partitioning.ensure_partitions(conn) == []
+            assert await partitioning.ensure_snowflake_defaults(conn) == []
+            report = await partitioning.apply_retention(conn)
+        assert report["notifications"] == {"deleted": 3}
+        assert "messages" not in report
+
+        async with session_factory() as db:
+            remaining = (await db.execute(select(func.count()).select_from(Notification))).scalar()
+        assert remaining == 1
+    finally:
+        await engine.dispose()
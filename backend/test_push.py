@@ -0,0 +1,342 @@
+"""
+Tests for push notification fan-out against a local fake provider.
+
+Tests cover:
+- Device registry: re-registration moves a token, per-user cap, unregister
+- Notifications coalesced per user within the window
+- Identical pushes sent together in batches split at the limit, one FCM v1 message per token
+- Service account access token reused, and refreshed after a 401
+- UNREGISTERED / INVALID_ARGUMENT / SENDER_ID_MISMATCH tokens deleted
+- UNAVAILABLE (503) and QUOTA_EXCEEDED (429) tokens retried
+- The flusher sending one push per window, and a disabled dispatcher
+"""
+import asyncio
+import json
+import sys
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent
+sys.path.insert(0, str(backend_path))
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+
+from app.core import push
+from app.core.push import FCMProvider, PushDispatcher, PushNotification, coalesce
+
+
+# FCM v1 error code -> HTTP status
+_ERROR_STATUS = {
+    "UNREGISTERED": 404,
+    "INVALID_ARGUMENT": 400,
+    "SENDER_ID_MISMATCH": 403,
+    "PERMISSION_DENIED": 403,
+    "QUOTA_EXCEEDED": 429,
+    "INTERNAL": 500,
+    "UNAVAILABLE": 503,
+}
+
+
+class _ProviderHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, payload, headers=()):
+        payload = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        server = self.server
+        message = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["message"]
+        token = message["token"]
+        with server.lock:
+            server.requests.append({"auth": self.headers["Authorization"], "path": self.path, **message})
+            if self.headers["Authorization"] != f"Bearer {server.access_token}":
+                self._reply(401, {"error": {"code": 401, "status": "UNAUTHENTICATED"}})
+                return
+            outcome = server.errors.get(token)
+            if isinstance(outcome, list):
+                outcome = outcome.pop(0) if outcome else None
+            if outcome is None:
+                server.delivered.append((token, message["notification"]["title"]))
+
+        if outcome is None:
+            self._reply(200, {"name": f"projects/test/messages/m{len(server.delivered)}"})
+            return
+        status = _ERROR_STATUS[outcome]
+        self._reply(
+            status,
+            {"error": {
+                "code": status,
+                "status": outcome if outcome in ("INVALID_ARGUMENT", "PERMISSION_DENIED") else "NOT_FOUND",
+                "details": [{"@type": "type.googleapis.com/google.firebase.fcm.v1.FcmError", "errorCode": outcome}],
+            }},
+            headers=[("Retry-After", "0")] if status in (429, 503) else (),
+        )
+
+
+class FakeFCMServer(ThreadingHTTPServer):
+    """Local FCM HTTP v1 endpoint recording every request
+
+    ``errors`` maps a token to an FCM error code, or a list of outcomes
+    consumed one per request. Requests must carry ``access_token``.
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _ProviderHandler)
+        self.lock = threading.Lock()
+        self.requests = []
+        self.delivered = []
+        self.errors = {}
+        self.access_token = "token-1"
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1/projects/test/messages:send"
+
+
+class FakeCredentials:
+    """google-auth credentials stand-in handing out token-1, token-2, ..."""
+
+    project_id = "test"
+
+    def __init__(self):
+        self.token = None
+        self.expiry = None
+        self.refreshes = 0
+
+    def refresh(self, request):
+        self.refreshes += 1
+        self.token = f"token-{self.refreshes}"
+        self.expiry = datetime.now(timezone.utc) + timedelta(hours=1)
+
+
+@pytest.fixture
+def provider_server():
+    server = FakeFCMServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path):
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.database import Base
+    from app.models import DeviceToken, User
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'push.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[User.__table__, DeviceToken.__table__])
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as db:
+        db.add_all([
+            User(id=i, email=f"u{i}@example.com", username=f"user{i}", first_name="U", last_name=str(i))
+            for i in range(1, 7)
+        ])
+        await db.commit()
+    yield factory
+    await engine.dispose()
+
+
+async def _register(session_factory, devices):
+    for user_id, token in devices:
+        async with session_factory() as db:
+            await push.register_device(db, user_id, token)
+
+
+async def _tokens(session_factory):
+    from app.models import DeviceToken
+
+    async with session_factory() as db:
+        result = await db.execute(select(DeviceToken.user_id, DeviceToken.token).order_by(DeviceToken.token))
+        return [tuple(row) for row in result.all()]
+
+
+def _dispatcher(provider_server, session_factory, limit=500, **kwargs):
+    provider = FCMProvider(FakeCredentials(), url=provider_server.url, limit=limit)
+    return PushDispatcher(provider, coalesce_seconds=60, retry_seconds=0, session_factory=session_factory, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_device_registry(session_factory, monkeypatch):
+    """Test registration is idempotent, moves tokens between users and is capped"""
+    from fastapi import HTTPException
+
+    from app.api import notifications
+    from app.models import User
+    from app.schemas.notification import DeviceRegister
+
+    monkeypatch.setattr(push, "PUSH_MAX_DEVICES_PER_USER", 3)
+    await _register(session_factory, [(1, "a"), (1, "a"), (2, "b")])
+    assert await _tokens(session_factory) == [(1, "a"), (2, "b")]
+
+    # The same device signing in to another account
+    await _register(session_factory, [(2, "a")])
+    assert await _tokens(session_factory) == [(2, "a"), (2, "b")]
+
+    await _register(session_factory, [(3, "c1"), (3, "c2"), (3, "c3"), (3, "c4")])
+    assert [t for u, t in await _tokens(session_factory) if u == 3] == ["c2", "c3", "c4"]
+
+    async with session_factory() as db:
+        assert await push.tokens_for_users(db, [2, 3, 4]) == {2: ["a", "b"], 3: ["c2", "c3", "c4"]}
+
+    async with session_factory() as db:
+        response = await notifications.register_push_device(
+            DeviceRegister(token="web-1", platform="web"), db=db, current_user=User(id=4)
+        )
+    assert response["success"]
+    async with session_factory() as db:
+        assert (await notifications.unregister_push_device("web-1", db=db, current_user=User(id=4)))["success"]
+    async with session_factory() as db:
+        with pytest.raises(HTTPException) as missing:
+            await notifications.unregister_push_device("b", db=db, current_user=User(id=4))
+    assert missing.value.status_code == 404
+
+
+def test_coalesce():
+    """Test a user's notifications within a window collapse into one push"""
+    likes = [PushNotification("New Like", f"U{i} liked your post", "like", {"post_id": i}) for i in range(3)]
+    assert coalesce(likes[:1]) == likes[0]
+    assert coalesce(likes) == PushNotification("3 new likes", "U2 liked your post", "like", {"post_id": 2, "count": 3})
+
+    mixed = coalesce(likes[:1] + [PushNotification("New Follower", "U9 started following you", "follow")])
+    assert mixed.title == "2 new notifications" and mixed.notification_type == "summary"
+    assert mixed.body == "U9 started following you"
+
+
+@pytest.mark.asyncio
+async def test_coalesced_multicast_batches(provider_server, session_factory):
+    """Test one push per user and identical pushes sent together up to the limit"""
+    await _register(session_factory, [(1, "t1a"), (1, "t1b"), (2, "t2"), (3, "t3"), (4, "t4")])
+    dispatcher = _dispatcher(provider_server, session_factory, limit=2)
+
+    for i in range(3):
+        dispatcher.submit(1, "New Like", f"U{i} liked your post", "like", {"post_id": 9})
+    for user_id in (2, 3, 4):
+        dispatcher.submit(user_id, "Announcement", "New jobs this week", "system")
+    dispatcher.submit(5, "New Follower", "U1 started following you", "follow")  # no devices
+
+    assert await dispatcher.flush() == 5
+    assert sorted(provider_server.delivered) == [
+        ("t1a", "3 new likes"), ("t1b", "3 new likes"),
+        ("t2", "Announcement"), ("t3", "Announcement"), ("t4", "Announcement"),
+    ]
+    request = provider_server.requests[0]
+    assert request["auth"] == "Bearer token-1" and request["path"] == "/v1/projects/test/messages:send"
+    like = next(r for r in provider_server.requests if r["token"] == "t1a")
+    assert like["data"] == {"post_id": "9", "count": "3", "type": "like"}
+    assert like["android"] == {"collapse_key": "like"}
+    assert like["apns"] == {"headers": {"apns-collapse-id": "like"}}
+
+    stats = dispatcher.stats()
+    assert stats["submitted"] == 7 and stats["pushes"] == 4 and stats["requests"] == 3
+    assert stats["sent"] == 5 and stats["no_devices"] == 1 and stats["pending"] == 0
+    # One access token for every message
+    assert dispatcher.provider.credentials.refreshes == 1
+    await dispatcher.close()
+
+
+@pytest.mark.asyncio
+async def test_access_token_refreshed_after_401(provider_server, session_factory):
+    """Test a rejected access token is refreshed once and the message resent"""
+    await _register(session_factory, [(1, "t1"), (1, "t2")])
+    dispatcher = _dispatcher(provider_server, session_factory)
+    dispatcher.submit(1, "Hi", "one", "message")
+    assert await dispatcher.flush() == 2
+
+    provider_server.access_token = "token-2"  # token-1 revoked
+    dispatcher.submit(1, "Hi", "two", "message")
+    assert await dispatcher.flush() == 2
+    assert dispatcher.provider.credentials.refreshes == 2
+    assert [r["auth"] for r in provider_server.requests[2:4]] == ["Bearer token-1"] * 2
+    assert {r["auth"] for r in provider_server.requests[4:]} == {"Bearer token-2"}
+    await dispatcher.close()
+
+
+@pytest.mark.asyncio
+async def test_provider_feedback_cleans_tokens(provider_server, session_factory):
+    """Test tokens FCM reports as unregistered or invalid are deleted"""
+    await _register(session_factory, [(1, "gone"), (1, "bad"), (1, "ok"), (2, "other"), (2, "fine")])
+    provider_server.errors = {
+        "gone": "UNREGISTERED",
+        "bad": "INVALID_ARGUMENT",
+        "other": "SENDER_ID_MISMATCH",
+        "ok": "PERMISSION_DENIED",
+    }
+    dispatcher = _dispatcher(provider_server, session_factory)
+    dispatcher.submit(1, "Hi", "one", "message")
+    dispatcher.submit(2, "Hi", "two", "message")
+
+    assert await dispatcher.flush() == 1
+    assert await _tokens(session_factory) == [(2, "fine"), (1, "ok")]
+    stats = dispatcher.stats()
+    assert stats["tokens_removed"] == 3 and stats["failed"] == 1
+    await dispatcher.close()
+
+
+@pytest.mark.asyncio
+async def test_unavailable_retried(provider_server, session_factory):
+    """Test UNAVAILABLE and QUOTA_EXCEEDED tokens are retried, then given up"""
+    await _register(session_factory, [(1, "flaky"), (1, "down"), (1, "fine"), (1, "busy")])
+    provider_server.errors = {"flaky": ["UNAVAILABLE"], "down": ["UNAVAILABLE"] * 5, "busy": ["QUOTA_EXCEEDED"]}
+    dispatcher = _dispatcher(provider_server, session_factory)
+    dispatcher.submit(1, "Hi", "there", "message")
+
+    assert await dispatcher.flush() == 3
+    assert Counter(r["token"] for r in provider_server.requests) == {"flaky": 2, "down": 3, "fine": 1, "busy": 2}
+    assert sorted(token for token, _ in provider_server.delivered) == ["busy", "fine", "flaky"]
+    assert dispatcher.stats()["failed"] == 1 and dispatcher.stats()["requests"] == 3
+    assert len(await _tokens(session_factory)) == 4  # unavailable is not invalid
+    await dispatcher.close()
+
+
+@pytest.mark.asyncio
+async def test_flusher_window(provider_server, session_factory):
+    """Test the flusher sends once per window and close() delivers the rest"""
+    await _register(session_factory, [(1, "t1")])
+    dispatcher = _dispatcher(provider_server, session_factory)
+    dispatcher.coalesce_seconds = 0.05
+    dispatcher.submit(1, "New Like", "a", "like")
+    dispatcher.submit(1, "New Like", "b", "like")
+    assert dispatcher.stats()["running"]
+    for _ in range(100):
+        if dispatcher.stats()["sent"]:
+            break
+        await asyncio.sleep(0.01)
+    assert [title for _, title in provider_server.delivered] == ["2 new likes"]
+
+    dispatcher.coalesce_seconds = 60
+    dispatcher.submit(1, "New Comment", "c", "comment")
+    await dispatcher.close()
+    assert [title for _, title in provider_server.delivered] == ["2 new likes", "New Comment"]
+    assert not dispatcher.stats()["running"]
+
+
+@pytest.mark.asyncio
+async def test_disabled_without_provider(monkeypatch):
+    """Test notification tasks are dropped quietly when no provider is configured"""
+    from app.core.background_tasks import notify_new_like_task
+
+    dispatcher = PushDispatcher(None)
+    monkeypatch.setattr(push, "push_dispatcher", dispatcher)
+    await notify_new_like_task(liker_id=1, liker_name="Ann", post_owner_id=2, post_id=3)
+    assert dispatcher.stats()["disabled"] == 1 and not dispatcher.stats()["running"]
+    assert await dispatcher.flush() == 0
@@ -0,0 +1,123 @@
+"""
+Tests for the query-plan regression benchmark harness.
+
+Tests cover:
+- Percentile calculation
+- Sequential-scan detection for SQLite and PostgreSQL plans
+- Power-law dataset generation
+- End-to-end run against a temporary SQLite database
+"""
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent
+sys.path.insert(0, str(backend_path))
+
+import pytest
+
+from benchmarks.dataset import DatasetSpec
+from benchmarks.query_plan_benchmark import (
+    DEFAULT_SCENARIOS,
+    Scenario,
+    find_sequential_scans,
+    percentile,
+    run_benchmark,
+)
+
+
+def test_percentile_nearest_rank():
+    """Test nearest-rank percentiles on a known distribution"""
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([], 95) == 0.0
+    assert percentile([7.0], 99) == 7.0
+
+
+def test_sqlite_seq_scan_detection():
+    """Test that SQLite full scans are flagged but index scans are not"""
+    plan = [
+        "SCAN posts",
+        "SCAN users_1",
+        "SCAN posts USING INDEX idx_posts_feed",
+        "SCAN follows USING COVERING INDEX idx_follows_follower",
+        "SEARCH users USING INTEGER PRIMARY KEY (rowid=?)",
+        "USE TEMP B-TREE FOR ORDER BY",
+    ]
+    assert find_sequential_scans("sqlite", plan) == ["posts", "users"]
+
+
+def test_postgres_seq_scan_detection():
+    """Test that nested PostgreSQL Seq Scan nodes are found"""
+    plan = [{
+        "Plan": {
+            "Node Type": "Nested Loop",
+            "Plans": [
+                {"Node Type": "Index Scan", "Relation Name": "users"},
+                {"Node Type": "Seq Scan", "Relation Name": "follows"},
+            ],
+        }
+    }]
+    assert find_sequential_scans("postgresql", plan) == ["follows"]
+
+
+@pytest.mark.asyncio
+async def test_benchmark_end_to_end_sqlite(tmp_path):
+    """Test a small benchmark run seeds data, drives endpoints and checks plans"""
+    spec = DatasetSpec(users=120, jobs=40, avg_following=10, posts_per_user=3)
+    # Generous latency budgets: this test checks plans and query counts, not speed
+    scenarios = [
+        Scenario(
+            name=s.name,
+            path=s.path,
+            p95_budget_ms=10_000,
+            max_queries=s.max_queries,
+            allowed_seq_scans=s.allowed_seq_scans,
+        )
+        for s in DEFAULT_SCENARIOS
+    ]
+
+    report = await run_benchmark(
+        f"sqlite+aiosqlite:///{tmp_path / 'bench.db'}",
+        spec,
+        iterations=3,
+        warmup=1,
+        scenarios=scenarios,
+    )
+
+    assert report["rows"]["users"] == 120
+    assert report["rows"]["follows"] > 0
+    assert report["rows"]["indexes"] > 0
+    names = [s["name"] for s in report["scenarios"]]
+    assert names == ["feed", "search", "inbox", "jobs", "profile"]
+    for scenario in report["scenarios"]:
+        assert scenario["statuses"] == [200], scenario
+        assert scenario["queries_per_request"] > 0
+        assert scenario["plans"], scenario["name"]
+        assert scenario["p50_ms"] <= scenario["p95_ms"] <= scenario["p99_ms"]
+    assert report["passed"], [s["violations"] for s in report["scenarios"]]
+
+
+@pytest.mark.asyncio
+async def test_benchmark_flags_budget_violation(tmp_path):
+    """Test that an impossible query budget fails the run"""
+    spec = DatasetSpec(users=50, jobs=10, avg_following=5, posts_per_user=2)
+    scenario = Scenario(
+        name="profile",
+        path=lambda ctx: f"/api/users/{ctx['profile_id']}",
+        p95_budget_ms=10_000,
+        max_queries=0,
+    )
+
+    report = await run_benchmark(
+        f"sqlite+aiosqlite:///{tmp_path / 'bench.db'}",
+        spec,
+        iterations=2,
+        warmup=0,
+        scenarios=[scenario],
+    )
+
+    assert report["passed"] is False
+    assert "queries per request exceeds budget" in report["scenarios"][0]["violations"][0]
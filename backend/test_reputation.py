@@ -0,0 +1,194 @@
+"""
+Tests for precomputed reputation aggregates.
+
+Tests cover:
+- Aggregates kept in step with review create, rating change and delete
+- A missing row created from a full recount by the next review write
+- Users without a row counted from reviews, a page in one lookup
+- Bayesian score ordering and the stats endpoints
+- Reconciliation creating missing rows and correcting drift
+"""
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent
+sys.path.insert(0, str(backend_path))
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, update
+
+from app.core import reputation
+from app.core.reputation import Reputation
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path):
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.database import Base
+    from app.models import Job, Review, User, UserReputation
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'reputation.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            Base.metadata.create_all,
+            tables=[User.__table__, Job.__table__, Review.__table__, UserReputation.__table__],
+        )
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as db:
+        db.add_all([
+            User(id=i, email=f"u{i}@example.com", username=f"user{i}", first_name="U", last_name=str(i))
+            for i in range(1, 6)
+        ])
+        db.add(Job(id=1, title="Tiling", company="C", description="D", category="trades", location="Nassau", employer_id=1))
+        await db.commit()
+    factory.engine = engine
+    yield factory
+    await engine.dispose()
+
+
+async def _add_review(db, reviewee_id, rating, reviewer_id=1, record=True):
+    from app.models import Review
+
+    review = Review(job_id=1, reviewer_id=reviewer_id, reviewee_id=reviewee_id, rating=rating)
+    db.add(review)
+    await db.flush()
+    if record:
+        await reputation.record_review(db, reviewee_id, rating)
+    await db.commit()
+    return review
+
+
+async def _stored(session_factory, user_id):
+    from app.models import UserReputation
+
+    async with session_factory() as db:
+        return await db.get(UserReputation, user_id)
+
+
+@pytest.mark.asyncio
+async def test_review_writes_maintain_aggregate(session_factory):
+    """Test create, rating change and delete adjust the row in their transaction"""
+    from app.api import reviews
+    from app.models import User
+    from app.schemas.review import ReviewUpdate
+
+    async with session_factory() as db:
+        first = await _add_review(db, 2, 5)
+        await _add_review(db, 2, 3)
+    row = await _stored(session_factory, 2)
+    assert (row.review_count, row.rating_sum, row.three_star, row.five_star) == (2, 8, 1, 1)
+
+    async with session_factory() as db:
+        await reviews.update_review(first.id, ReviewUpdate(rating=4), current_user=User(id=1), db=db)
+    row = await _stored(session_factory, 2)
+    assert (row.review_count, row.rating_sum, row.four_star, row.five_star) == (2, 7, 1, 0)
+    assert row.score == pytest.approx((5 * 3.5 + 7) / 7)
+
+    async with session_factory() as db:
+        await reviews.delete_review(first.id, current_user=User(id=1), db=db)
+    async with session_factory() as db:
+        stats = await reviews.get_user_review_stats(2, db=db)
+    assert stats == {
+        "user_id": "2",
+        "average_rating": 3.0,
+        "total_reviews": 1,
+        "score": pytest.approx(3.4167, abs=1e-4),
+        "rating_breakdown": {"5": 0, "4": 0, "3": 1, "2": 0, "1": 0},
+    }
+
+
+@pytest.mark.asyncio
+async def test_missing_row_created_from_recount(session_factory):
+    """Test reviews written before the aggregate existed are counted once"""
+    async with session_factory() as db:
+        await _add_review(db, 3, 2, record=False)
+        await _add_review(db, 3, 4, record=False)
+    assert await _stored(session_factory, 3) is None
+
+    async with session_factory() as db:
+        assert (await reputation.get_reputation(db, 3)).stars == (0, 1, 0, 1, 0)
+        await _add_review(db, 3, 5)
+    row = await _stored(session_factory, 3)
+    assert (row.review_count, row.rating_sum, row.two_star, row.four_star, row.five_star) == (3, 11, 1, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_page_lookup_and_score(session_factory):
+    """Test a page of users is served by one stored lookup and one recount"""
+    from app.core import sql_instrumentation
+
+    async with session_factory() as db:
+        await _add_review(db, 2, 5)  # one glowing review
+        for _ in range(20):
+            await _add_review(db, 3, 4)
+        await _add_review(db, 4, 4, record=False)  # no row yet
+
+    sql_instrumentation.instrument_engine(session_factory.engine)
+    stats = sql_instrumentation.start_request_tracking("ratings", force=True)
+    async with session_factory() as db:
+        users = await reputation.attach_ratings(db, [{"id": i} for i in (2, 3, 4, 5)])
+    sql_instrumentation._current_stats.set(None)
+    assert stats.statement_count == 2
+    assert users == [
+        {"id": 2, "average_rating": 5.0, "total_reviews": 1},
+        {"id": 3, "average_rating": 4.0, "total_reviews": 20},
+        {"id": 4, "average_rating": 4.0, "total_reviews": 1},
+        {"id": 5, "average_rating": None, "total_reviews": 0},
+    ]
+
+    # Twenty 4s outrank a single 5; nothing reviewed sits at the prior
+    scores = {user_id: Reputation(count, total).score for user_id, (count, total) in
+              {2: (1, 5), 3: (20, 80), 5: (0, 0)}.items()}
+    assert scores[3] > scores[2] > scores[5] == 3.5
+
+    from app.models import UserReputation
+    async with session_factory() as db:
+        ranked = (await db.execute(
+            select(UserReputation.user_id).order_by(UserReputation.score.desc())
+        )).scalars().all()
+    assert ranked == [3, 2]
+
+
+@pytest.mark.asyncio
+async def test_batch_stats_endpoint(session_factory):
+    """Test the batch endpoint answers for every requested user and caps the batch"""
+    from fastapi import HTTPException
+
+    from app.api import reviews
+
+    async with session_factory() as db:
+        await _add_review(db, 2, 4)
+        stats = await reviews.get_review_stats_batch(user_ids=[2, 5, 2], db=db)
+    assert list(stats) == ["2", "5"]
+    assert stats["2"]["total_reviews"] == 1 and stats["5"]["average_rating"] is None
+
+    async with session_factory() as db:
+        with pytest.raises(HTTPException) as too_many:
+            await reviews.get_review_stats_batch(user_ids=list(range(101)), db=db)
+    assert too_many.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_reconcile(session_factory):
+    """Test reconciliation writes missing rows, fixes drift and is then a no-op"""
+    from app.models import UserReputation
+
+    async with session_factory() as db:
+        await _add_review(db, 2, 5)
+        await _add_review(db, 3, 1, record=False)
+        await db.execute(update(UserReputation).where(UserReputation.user_id == 2).values(review_count=9))
+        await db.commit()
+
+    async with session_factory() as db:
+        assert await reputation.reconcile_reputation(db, batch_size=2) == {"users": 5, "written": 5}
+    row = await _stored(session_factory, 2)
+    assert (row.review_count, row.rating_sum, row.five_star) == (1, 5, 1)
+    row = await _stored(session_factory, 3)
+    assert (row.review_count, row.one_star, row.score) == (1, 1, pytest.approx((17.5 + 1) / 6, abs=1e-4))
+
+    async with session_factory() as db:
+        assert await reputation.reconcile_reputation(db) == {"users": 5, "written": 0}
@@ -0,0 +1,154 @@
+"""
+Tests for the non-blocking request log pipeline.
+
+Tests cover:
+- Records written in batches, one write() per batch and sink
+- Bounded queue: records dropped and counted instead of blocking
+- Per-route sampling with errors and slow requests always logged
+- LogRecords formatted on the writer thread, routed handler targets
+- Pre-serialized str/dict records written as JSON lines
+- install() moving plain console handlers behind the queue
+"""
+import io
+import json
+import logging
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent
+sys.path.insert(0, str(backend_path))
+
+from app.core.request_log import (
+    LogPipeline,
+    QueueLogHandler,
+    RequestLogger,
+    RequestSampler,
+    install,
+    parse_sample_rates,
+)
+
+
+class CountingStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_batches_one_write_per_sink():
+    """Test 600 records reach the stream in three writes of at most 256"""
+    stream = CountingStream()
+    pipeline = LogPipeline([logging.StreamHandler(stream)], batch_size=256)
+    for i in range(600):
+        assert pipeline.submit(f"line {i}")
+
+    assert pipeline.flush() == 600
+    assert stream.writes == 3
+    assert stream.getvalue().splitlines() == [f"line {i}" for i in range(600)]
+    assert pipeline.stats()["batches"] == 3 and pipeline.stats()["written"] == 600
+
+
+def test_full_queue_drops_and_counts():
+    """Test submit never blocks: overflow is dropped and reported"""
+    pipeline = LogPipeline([logging.StreamHandler(io.StringIO())], capacity=3)
+    assert [pipeline.submit({"n": i}) for i in range(5)] == [True, True, True, False, False]
+
+    stats = pipeline.stats()
+    assert stats["queue_depth"] == 3 and stats["queued"] == 3 and stats["dropped"] == 2
+    pipeline.flush()
+    assert pipeline.submit({"n": 5}) and pipeline.stats()["dropped"] == 2
+
+
+def test_sampling_keeps_errors_and_slow_requests():
+    """Test probe routes are sampled 1 in N while failures are always kept"""
+    sampler = RequestSampler(parse_sample_rates("/live=0.1, /ready=0, /api/jobs=1"), slow_ms=500)
+
+    assert sum(sampler.should_log("/live", 200, 1) for _ in range(100)) == 10
+    assert not any(sampler.should_log("/ready", 200, 1) for _ in range(10))
+    assert all(sampler.should_log("/api/jobs", 200, 1) for _ in range(10))
+    assert sampler.should_log("/ready", 503, 1)
+    assert sampler.should_log("/ready", 200, 750)
+    assert sampler.sampled_out == 100
+
+    stream = io.StringIO()
+    pipeline = LogPipeline([logging.StreamHandler(stream)])
+    request_logger = RequestLogger(pipeline, sampler)
+    assert request_logger.log("GET", "/api/jobs", 500, 12.34, request_id="r1")
+    assert not request_logger.log("GET", "/ready", 200, 3)
+    pipeline.flush()
+    record = json.loads(stream.getvalue())
+    assert record["path"] == "/api/jobs" and record["status"] == 500
+    assert record["level"] == "error" and record["request_id"] == "r1" and record["duration_ms"] == 12.3
+    assert request_logger.stats()["sampled_out"] == 101
+
+
+def test_records_formatted_on_writer_thread():
+    """Test the calling thread only enqueues; the writer formats and writes"""
+    formatted_on = []
+
+    class ThreadFormatter(logging.Formatter):
+        def format(self, record):
+            formatted_on.append(threading.current_thread().name)
+            return super().format(record)
+
+    shared, own = io.StringIO(), io.StringIO()
+    shared_handler, own_handler = logging.StreamHandler(shared), logging.StreamHandler(own)
+    own_handler.setFormatter(ThreadFormatter("%(levelname)s %(message)s"))
+    pipeline = LogPipeline([shared_handler], flush_seconds=0.05).start()
+    logger = logging.getLogger("test_request_log.writer")
+    logger.propagate = False
+    handler = QueueLogHandler(pipeline, targets=[own_handler])
+    logger.addHandler(handler)
+    try:
+        logger.warning("slow %s", "query")
+        pipeline.submit({"shared": True})
+        assert _wait_for(lambda: own.getvalue() and shared.getvalue())
+    finally:
+        logger.removeHandler(handler)
+        pipeline.stop()
+
+    assert own.getvalue() == "WARNING slow query\n"
+    assert shared.getvalue() == '{"shared":true}\n'
+    assert formatted_on == ["request-log-writer"]
+    assert not pipeline.running
+
+
+def test_install_moves_plain_handlers_behind_queue():
+    """Test console handlers become sinks while other handlers stay attached"""
+    logger = logging.getLogger("test_request_log.install")
+    logger.propagate = False
+    console = logging.StreamHandler(io.StringIO())
+
+    class CaptureHandler(logging.StreamHandler):
+        pass
+
+    capture = CaptureHandler(io.StringIO())
+    logger.addHandler(console)
+    logger.addHandler(capture)
+    extra = logging.StreamHandler(io.StringIO())
+    try:
+        pipeline = install([extra], logger=logger)
+        assert pipeline.sinks == [console, extra]
+        assert capture in logger.handlers and console not in logger.handlers
+        assert sum(isinstance(h, QueueLogHandler) for h in logger.handlers) == 1
+
+        logger.info("hello")
+        assert capture.stream.getvalue() == "hello\n"
+        assert _wait_for(lambda: console.stream.getvalue() == "hello\n" and extra.stream.getvalue() == "hello\n")
+    finally:
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+        pipeline.sinks = []
@@ -0,0 +1,143 @@
+"""
+Tests for the fast JSON serialization path.
+
+Tests cover:
+- RowMapper dicts, nested objects and outer-join misses
+- orjson encoding of datetimes, decimals and non-string keys
+- Optional validation of fast-path items
+- /api/posts/ and /api/jobs/ at limit=100 against a seeded SQLite database
+"""
+import sys
+from datetime import datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent
+sys.path.insert(0, str(backend_path))
+
+import orjson
+import pytest
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import Column, ForeignKey, Integer, MetaData, String, Table
+
+from app.core import serialization
+from app.core.serialization import RowMapper, dumps, json_response
+
+metadata = MetaData()
+owners = Table("owners", metadata, Column("id", Integer, primary_key=True), Column("name", String))
+pets = Table(
+    "pets", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String),
+    Column("owner_id", Integer, ForeignKey("owners.id")),
+)
+
+
+def test_row_mapper_builds_nested_dicts():
+    """Test columns map to keys, nested objects and NULL outer joins"""
+    mapper = RowMapper({
+        "id": pets.c.id,
+        "name": pets.c.name,
+        "owner": {"id": owners.c.id, "name": owners.c.name},
+    })
+    assert [column.name for column in mapper.columns] == ["id", "name", "owner__id", "owner__name"]
+    assert mapper((1, "Rex", 7, "Sam")) == {"id": 1, "name": "Rex", "owner": {"id": 7, "name": "Sam"}}
+    assert mapper.map([(2, "Tom", None, None)]) == [{"id": 2, "name": "Tom", "owner": None}]
+
+    with pytest.raises(ValueError):
+        RowMapper({"owner": {}})
+    with pytest.raises(TypeError):
+        RowMapper({1: pets.c.id})
+
+
+def test_dumps_types():
+    """Test encoding matches what Pydantic emits for the rest of the API"""
+    payload = {
+        "at": datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+        "naive": datetime(2026, 1, 2, 3, 4, 5, 600000),
+        "budget": Decimal("12.50"),
+        "facets": {3: 1},
+    }
+    assert orjson.loads(dumps(payload)) == {
+        "at": "2026-01-02T03:04:05Z",
+        "naive": "2026-01-02T03:04:05.600000",
+        "budget": 12.5,
+        "facets": {"3": 1},
+    }
+
+
+class _Item(BaseModel):
+    id: int
+
+
+def test_json_response_validation_is_optional(monkeypatch):
+    """Test items are checked only when VALIDATE_RESPONSES is on"""
+    monkeypatch.setattr(serialization, "VALIDATE_RESPONSES", True)
+    assert json_response([{"id": 1}], model=_Item).body == b'[{"id":1}]'
+    with pytest.raises(ValidationError):
+        json_response({"data": [{"id": "x"}]}, model=_Item, items=[{"id": "x"}])
+
+    monkeypatch.setattr(serialization, "VALIDATE_RESPONSES", False)
+    assert json_response([{"id": "x"}], model=_Item).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_list_endpoints_match_database(tmp_path, monkeypatch):
+    """Test /api/posts/ and /api/jobs/ pages agree with ORM queries"""
+    import httpx
+    from sqlalchemy import desc, func, select
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.database import Base
+    from app.models import Follow, Job, Post, PostLike
+    from benchmarks.dataset import DatasetSpec, seed_dataset
+    from benchmarks.query_plan_benchmark import _clear_response_caches, build_app
+
+    monkeypatch.setattr(serialization, "VALIDATE_RESPONSES", True)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'lists.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await seed_dataset(session_factory, DatasetSpec(users=60, jobs=150, avg_following=20))
+
+    _clear_response_caches()
+    app = build_app(session_factory, viewer_id=1)
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            posts_response = await client.get("/api/posts/", params={"limit": 100})
+            jobs_response = await client.get("/api/jobs/", params={"limit": 100})
+            cached_jobs = await client.get("/api/jobs/", params={"limit": 100})
+
+        assert posts_response.status_code == 200
+        assert jobs_response.headers["content-type"] == "application/json"
+        posts = posts_response.json()
+        jobs = jobs_response.json()
+        assert cached_jobs.content == jobs_response.content
+
+        async with session_factory() as db:
+            followed = [row[0] for row in await db.execute(
+                select(Follow.followed_id).where(Follow.follower_id == 1)
+            )] + [1]
+            expected_posts = (await db.execute(
+                select(Post).where(Post.user_id.in_(followed)).order_by(desc(Post.created_at)).limit(100)
+            )).scalars().all()
+            first_likes = (await db.execute(
+                select(func.count()).select_from(PostLike).where(PostLike.post_id == expected_posts[0].id)
+            )).scalar()
+            expected_jobs = (await db.execute(
+                select(Job.id).where(Job.status == "active").order_by(desc(Job.created_at), desc(Job.id)).limit(100)
+            )).scalars().all()
+
+        assert [post["id"] for post in posts] == [post.id for post in expected_posts]
+        assert posts[0]["user"]["id"] == expected_posts[0].user_id
+        assert posts[0]["likes_count"] == first_likes
+        assert set(posts[0]) >= {"comments_count", "is_liked", "created_at"}
+
+        assert [job["id"] for job in jobs["data"]] == list(expected_jobs)
+        assert all(job["employer"]["id"] == job["employer_id"] for job in jobs["data"])
+        assert jobs["pagination"]["has_next"] is (len(expected_jobs) == 100)
+    finally:
+        _clear_response_caches()
+        await engine.dispose()
@@ -0,0 +1,153 @@
+"""
+Tests for shared response payloads with per-viewer overlays.
+
+Tests cover:
+- /api/users/list cached once for all viewers, with the viewer's own row
+  dropped and is_following applied per request
+- /api/hireme/available pages shared across viewers without overlap
+- /api/posts/ is_liked applied per viewer on a shared page
+- Hit rate per shared namespace in the performance metrics
+- Prefix invalidation accepting a trailing ``*``
+"""
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent
+sys.path.insert(0, str(backend_path))
+
+import pytest
+import pytest_asyncio
+
+from app.core import latency
+from app.core.api_cache import apply_overlay, exclude_viewer, shared_cache_stats
+from app.core.cache import clear_cache, get_cached, invalidate_cache, set_cached
+
+
+@pytest_asyncio.fixture
+async def shared_app(tmp_path):
+    """Users/hireme/posts routers over SQLite; the viewer comes from ``X-Viewer``"""
+    import httpx
+    from fastapi import Depends, FastAPI, Header
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.api.hireme import router as hireme_router
+    from app.api.posts import router as posts_router
+    from app.auth import dependencies as auth_dependencies
+    from app.core import security, social_graph
+    from app.database import Base, get_db
+    from app.models import Follow, Post, PostLike, User
+    from app.users.routes import router as users_router
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'shared.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with factory() as db:
+        db.add_all([
+            User(id=i, email=f"u{i}@example.com", username=f"user{i}", first_name="U", last_name=str(i),
+                 is_available_for_hire=True)
+            for i in range(1, 7)
+        ])
+        db.add_all([Follow(follower_id=1, followed_id=2), Follow(follower_id=3, followed_id=4)])
+        db.add_all([Post(id=i, user_id=i, content=f"post {i}") for i in range(1, 4)])
+        db.add_all([PostLike(user_id=1, post_id=2), PostLike(user_id=2, post_id=3)])
+        await db.commit()
+
+    app = FastAPI()
+    app.include_router(users_router, prefix="/api/users")
+    app.include_router(hireme_router, prefix="/api/hireme")
+    app.include_router(posts_router, prefix="/api/posts")
+
+    async def test_get_db():
+        async with factory() as session:
+            yield session
+
+    async def test_current_user(x_viewer: int = Header(...), db: AsyncSession = Depends(get_db)):
+        return await db.get(User, x_viewer)
+
+    app.dependency_overrides[get_db] = test_get_db
+    app.dependency_overrides[auth_dependencies.get_current_user] = test_current_user
+    app.dependency_overrides[security.get_current_user] = test_current_user
+
+    clear_cache()
+    latency.reset()
+    social_graph.adjacency.clear()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+    clear_cache()
+    latency.reset()
+    await engine.dispose()
+
+
+def _get(client, path, viewer, **params):
+    return client.get(path, params=params, headers={"X-Viewer": str(viewer)})
+
+
+@pytest.mark.asyncio
+async def test_users_list_shared_across_viewers(shared_app):
+    """Test one cached page serves every viewer with their own overlay"""
+    first = (await _get(shared_app, "/api/users/list", 1)).json()
+    second = (await _get(shared_app, "/api/users/list", 3)).json()
+
+    assert [u["id"] for u in first["users"]] == [2, 3, 4, 5, 6]
+    assert [u["id"] for u in second["users"]] == [1, 2, 4, 5, 6]
+    assert first["total"] == second["total"] == 5
+    assert {u["id"] for u in first["users"] if u["is_following"]} == {2}
+    assert {u["id"] for u in second["users"] if u["is_following"]} == {4}
+    assert next(u for u in second["users"] if u["id"] == 2)["followers_count"] == 1
+
+    # A search the viewer doesn't match keeps the full total
+    searched = (await _get(shared_app, "/api/users/list", 1, search="u5@")).json()
+    assert [u["id"] for u in searched["users"]] == [5] and searched["total"] == 1
+
+    assert shared_cache_stats()["users:list"] == {"hits": 1, "misses": 2, "hit_rate": 33.33}
+
+
+@pytest.mark.asyncio
+async def test_hireme_pages_drop_only_the_viewer(shared_app):
+    """Test offset pages are shared and the viewer's page is one shorter"""
+    pages = {}
+    for viewer in (2, 5):
+        pages[viewer] = [
+            [u["id"] for u in (await _get(shared_app, "/api/hireme/available", viewer, skip=skip, limit=3)).json()["data"]]
+            for skip in (0, 3)
+        ]
+    everyone = pages[2][0] + pages[2][1] + [2]
+    assert sorted(everyone) == [1, 2, 3, 4, 5, 6]
+    assert sorted(pages[5][0] + pages[5][1] + [5]) == [1, 2, 3, 4, 5, 6]
+    assert shared_cache_stats()["hireme:available"]["hits"] == 2
+
+
+@pytest.mark.asyncio
+async def test_posts_is_liked_overlay(shared_app):
+    """Test is_liked follows the viewer while the page is cached once"""
+    liked = {}
+    for viewer in (1, 2, 1):
+        data = (await _get(shared_app, "/api/posts/", viewer)).json()["data"]
+        liked[viewer] = {p["id"] for p in data if p["is_liked"]}
+        assert {p["id"] for p in data} == {1, 2, 3}
+    assert liked == {1: {2}, 2: {3}}
+    assert shared_cache_stats()["posts:list"] == {"hits": 2, "misses": 1, "hit_rate": 66.67}
+
+
+def test_overlay_helpers_do_not_mutate_cached_items():
+    """Test overlays copy cached rows instead of modifying them"""
+    rows = [{"id": 1}, {"id": 2}]
+    assert apply_overlay(exclude_viewer(rows, 1), is_following={2}) == [{"id": 2, "is_following": True}]
+    assert rows == [{"id": 1}, {"id": 2}]
+    assert exclude_viewer(rows, None) == rows
+
+
+@pytest.mark.asyncio
+async def test_invalidate_accepts_glob_suffix():
+    """Test ``posts:*`` clears in-memory entries like the Redis pattern does"""
+    clear_cache()
+    await set_cached("posts:list:a", 1)
+    await set_cached("jobs:list:a", 2)
+    await invalidate_cache("posts:*")
+    assert await get_cached("posts:list:a") is None
+    assert await get_cached("jobs:list:a") == 2
+    clear_cache()
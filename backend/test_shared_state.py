@@ -0,0 +1,204 @@
+"""
+Tests for multi-worker shared state.
+
+Tests cover:
+- Worker count heuristic from cores and memory, and WEB_CONCURRENCY parsing
+  behind the WEB_MULTI_WORKER opt-in
+- Refusing several workers without Redis
+- The backend contract (TTL counters, presence, locks) on the in-memory
+  backend, and on Redis when TEST_REDIS_URL is set
+- Redis presence dropping members whose token set expired
+- run_once skipping a job that another worker is running
+- Login rate limiting through shared state
+"""
+import asyncio
+import os
+import sys
+import uuid
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent
+sys.path.insert(0, str(backend_path))
+
+import pytest
+
+from app.core import shared_state
+from app.core.shared_state import (
+    MemoryStateBackend,
+    RedisStateBackend,
+    SharedStateError,
+    configured_workers,
+    create_shared_state,
+    recommended_workers,
+    run_once,
+)
+
+TEST_REDIS_URL = os.getenv("TEST_REDIS_URL")
+
+
+def test_recommended_workers():
+    """Test one worker per core, capped by memory"""
+    assert recommended_workers(cpus=8, memory_mb=None) == 8
+    assert recommended_workers(cpus=8, memory_mb=1024, per_worker_mb=200, reserve_mb=256) == 3
+    assert recommended_workers(cpus=2, memory_mb=4096, per_worker_mb=200, reserve_mb=256) == 2
+    assert recommended_workers(cpus=4, memory_mb=128, per_worker_mb=200, reserve_mb=256) == 1
+
+
+def test_configured_workers(monkeypatch):
+    """Test WEB_CONCURRENCY numbers, "auto" and invalid values"""
+    monkeypatch.setenv("WEB_MULTI_WORKER", "true")
+    monkeypatch.setenv("WEB_CONCURRENCY", "3")
+    assert configured_workers() == 3
+    monkeypatch.setenv("WEB_CONCURRENCY", "auto")
+    assert configured_workers() == recommended_workers()
+    monkeypatch.setenv("WEB_CONCURRENCY", "many")
+    assert configured_workers() == 1
+    monkeypatch.delenv("WEB_CONCURRENCY")
+    assert configured_workers() == 1
+
+
+def test_multi_worker_needs_opt_in(monkeypatch):
+    """Test a platform-set WEB_CONCURRENCY alone keeps one worker"""
+    monkeypatch.delenv("WEB_MULTI_WORKER", raising=False)
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    assert configured_workers() == 1
+    monkeypatch.setenv("WEB_MULTI_WORKER", "false")
+    assert configured_workers() == 1
+    monkeypatch.setenv("WEB_MULTI_WORKER", "true")
+    assert configured_workers() == 4
+
+
+def test_backend_selection():
+    """Test memory only for one worker, Redis whenever it is configured"""
+    assert isinstance(create_shared_state(workers=1, redis_url=""), MemoryStateBackend)
+    assert isinstance(create_shared_state(workers=4, redis_url="redis://cache:6379/0"), RedisStateBackend)
+    with pytest.raises(SharedStateError):
+        create_shared_state(workers=2, redis_url="")
+
+
+@pytest.fixture(params=["memory", "redis"])
+async def state(request):
+    if request.param == "memory":
+        yield MemoryStateBackend()
+        return
+    if not TEST_REDIS_URL:
+        pytest.skip("TEST_REDIS_URL not set")
+    backend = RedisStateBackend(TEST_REDIS_URL)
+    yield backend
+    await backend.close()
+
+
+@pytest.mark.asyncio
+async def test_counters(state):
+    """Test counters increment, expire and reset"""
+    key = f"test:{uuid.uuid4().hex}"
+    assert await state.get_int(key) == 0
+    assert await state.incr(key, ttl=60) == 1
+    assert await state.incr(key, ttl=60) == 2
+    assert await state.get_int(key) == 2
+    await state.delete(key)
+    assert await state.get_int(key) == 0
+
+    await state.incr(key, ttl=1)
+    await asyncio.sleep(1.1)
+    assert await state.get_int(key) == 0
+
+
+@pytest.mark.asyncio
+async def test_presence(state):
+    """Test a member stays present until its last token is removed"""
+    group = f"online:{uuid.uuid4().hex}"
+    assert await state.presence_add(group, "7", "w1:a") is True
+    assert await state.presence_add(group, "7", "w2:b") is False
+    assert await state.presence_add(group, "9", "w1:c") is True
+    assert await state.presence_members(group) == ["7", "9"]
+
+    assert await state.presence_remove(group, "7", "w1:a") is False
+    assert await state.presence_contains(group, "7")
+    assert await state.presence_remove(group, "7", "w2:b") is True
+    assert not await state.presence_contains(group, "7")
+    assert await state.presence_remove(group, "7", "w2:b") is False
+    assert await state.presence_members(group) == ["9"]
+
+
+@pytest.mark.asyncio
+async def test_redis_presence_drops_expired_members():
+    """Test a member whose tokens expired (dead worker) is no longer online"""
+    if not TEST_REDIS_URL:
+        pytest.skip("TEST_REDIS_URL not set")
+    state = RedisStateBackend(TEST_REDIS_URL)
+    group = f"online:{uuid.uuid4().hex}"
+    try:
+        await state.presence_add(group, "7", "w1:a")
+        await state.presence_add(group, "9", "w2:b")
+        assert await state.client.ttl(shared_state.KEY_PREFIX + group) > 0
+
+        # The worker holding 7's only socket died; its token set expired
+        await state.client.delete(f"{shared_state.KEY_PREFIX}{group}:7")
+        assert not await state.presence_contains(group, "7")
+        assert await state.presence_members(group) == ["9"]
+        assert await state.client.smembers(shared_state.KEY_PREFIX + group) == {"9"}
+
+        assert await state.presence_add(group, "7", "w3:c") is True
+        assert await state.presence_members(group) == ["7", "9"]
+    finally:
+        await state.client.delete(shared_state.KEY_PREFIX + group, *(
+            f"{shared_state.KEY_PREFIX}{group}:{member}" for member in ("7", "9")
+        ))
+        await state.close()
+
+
+@pytest.mark.asyncio
+async def test_locks(state):
+    """Test a lock has one owner until it is released"""
+    name = f"job:{uuid.uuid4().hex}"
+    assert await state.acquire_lock(name, "worker-1", ttl=60)
+    assert not await state.acquire_lock(name, "worker-2", ttl=60)
+    await state.release_lock(name, "worker-2")
+    assert not await state.acquire_lock(name, "worker-2", ttl=60)
+    await state.release_lock(name, "worker-1")
+    assert await state.acquire_lock(name, "worker-2", ttl=60)
+    await state.release_lock(name, "worker-2")
+
+
+@pytest.mark.asyncio
+async def test_run_once(monkeypatch):
+    """Test concurrent callers run a job once and hold keeps later callers out"""
+    monkeypatch.setattr(shared_state, "_state", MemoryStateBackend())
+    runs = []
+
+    async def job():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    results = await asyncio.gather(run_once("reindex", job), run_once("reindex", job))
+    assert sorted(results, key=str) == [None, "done"]
+    assert await run_once("reindex", job) == "done"
+    assert len(runs) == 2
+
+    assert await run_once("bootstrap", job, hold=True) == "done"
+    assert await run_once("bootstrap", job, hold=True) is None
+    assert len(runs) == 3
+
+
+@pytest.mark.asyncio
+async def test_login_rate_limit_uses_shared_state(monkeypatch):
+    """Test lockout after repeated failures and reset on success"""
+    from app.auth import routes
+
+    state = MemoryStateBackend()
+    monkeypatch.setattr(shared_state, "_state", state)
+
+    for _ in range(routes.MAX_LOGIN_ATTEMPTS):
+        assert await routes.check_rate_limit("10.0.0.1")
+        await routes.record_login_attempt("10.0.0.1", False)
+    assert not await routes.check_rate_limit("10.0.0.1")
+    assert await routes.check_rate_limit("10.0.0.2")
+
+    # Another worker sees the same counter
+    assert await state.get_int("login_attempts:10.0.0.1") == routes.MAX_LOGIN_ATTEMPTS
+
+    await routes.record_login_attempt("10.0.0.1", True)
+    assert await routes.check_rate_limit("10.0.0.1")
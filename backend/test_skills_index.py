@@ -0,0 +1,195 @@
+"""
+Tests for the skills taxonomy and inverted index.
+
+Tests cover:
+- Skill normalization and aliases
+- Intersection and ranking over the inverted index
+- Incremental index updates for users and jobs
+- Backfilling association tables from skills text
+- /api/hireme/available skill filter against a seeded SQLite database
+- Job writes syncing job_skills and /api/jobs/recommended
+"""
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent
+sys.path.insert(0, str(backend_path))
+
+import pytest
+
+from app.core.skills import SkillIndex, format_skills, normalize_skill, parse_skills
+
+
+def test_normalize_and_aliases():
+    """Test case, punctuation, whitespace and aliases collapse to one name"""
+    assert normalize_skill("  Plumber ") == "plumbing"
+    assert normalize_skill("Electrical   Work!") == "electrical"
+    assert normalize_skill("C++") == "c++"
+    assert normalize_skill("Node.js") == "node.js"
+    assert normalize_skill(" , ") is None
+    assert parse_skills("Plumber, plumbing, Tiling,") == ["plumbing", "tiling"]
+    assert parse_skills(["python,SQL", "py"]) == ["python", "sql"]
+    assert format_skills(["Wiring", " Solar "]) == "Wiring, Solar"
+
+
+def test_intersection_and_ranking():
+    """Test AND lookups and overlap ranking"""
+    index = SkillIndex()
+    index.build(
+        [(1, "plumbing"), (1, "tiling"), (2, "plumbing"), (3, "tiling"), (4, "plumbing"), (4, "tiling")],
+        [(10, "python"), (10, "sql"), (11, "python"), (12, "sql"), (12, "excel")],
+    )
+
+    assert index.users_with_all(["plumbing"]) == [1, 2, 4]
+    assert index.users_with_all(["plumbing", "tiling"]) == [1, 4]
+    assert index.users_with_all(["plumbing", "welding"]) == []
+    assert index.users_with_all([]) == []
+
+    total, ranked = index.rank_jobs(["python", "sql"])
+    assert total == 3
+    assert ranked == [(10, 2), (12, 1), (11, 1)]
+    assert index.rank_jobs(["python", "sql"], limit=1, offset=1) == (3, [(12, 1)])
+    assert index.rank_jobs(["python"], required=["sql"]) == (2, [(10, 1), (12, 0)])
+
+
+def test_incremental_updates():
+    """Test users and jobs move between postings as their skills change"""
+    index = SkillIndex()
+    index.build([], [])
+    index.set_user_skills(1, ["plumbing"])
+    index.set_user_skills(1, ["tiling", "masonry"])
+    assert index.users_with_all(["plumbing"]) == []
+    assert index.users_with_all(["masonry", "tiling"]) == [1]
+
+    index.set_job_skills(5, ["python"])
+    index.remove_job(5)
+    assert index.rank_jobs(["python"]) == (0, [])
+    assert index.skill_counts() == [("masonry", 1), ("tiling", 1)]
+
+
+async def _seeded_app(tmp_path, viewer_id=1):
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.api.hireme import router as hireme_router
+    from app.database import Base
+    from benchmarks.dataset import DatasetSpec, seed_dataset
+    from benchmarks.query_plan_benchmark import build_app
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'skills.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await seed_dataset(session_factory, DatasetSpec(users=120, jobs=150, avg_following=2))
+
+    app = build_app(session_factory, viewer_id=viewer_id)
+    app.include_router(hireme_router, prefix="/api/hireme")
+    return engine, session_factory, app
+
+
+@pytest.mark.asyncio
+async def test_backfill_and_hireme_skill_filter(tmp_path):
+    """Test backfilled links drive the HireMe filter and match the skills text"""
+    import httpx
+    from sqlalchemy import func, select
+
+    from app.core import skills as skills_module
+    from app.models import User, UserSkill
+
+    engine, session_factory, app = await _seeded_app(tmp_path)
+    skills_module.skill_index.clear()
+    try:
+        async with session_factory() as db:
+            linked = await skills_module.backfill_skill_links(db)
+            assert linked["users"] == 120
+            assert (await skills_module.backfill_skill_links(db)) == {"users": 0, "jobs": 0}
+            assert (await db.execute(select(func.count()).select_from(UserSkill))).scalar() == 360
+
+            users = (await db.execute(select(User))).scalars().all()
+        expected = sorted(
+            (u for u in users
+             if u.is_active and u.is_available_for_hire and u.id != 1
+             and {"plumbing", "electrical"} <= set(parse_skills(u.skills))),
+            key=lambda u: u.created_at,
+            reverse=True,
+        )
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get(
+                "/api/hireme/available",
+                params={"skills": ["Plumber", "electrician"], "limit": 100},
+            )
+        assert response.status_code == 200
+        returned = [user["id"] for user in response.json()["data"]]
+        assert returned == [user.id for user in expected]
+    finally:
+        skills_module.skill_index.clear()
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_job_writes_sync_links_and_recommend(tmp_path):
+    """Test new jobs are linked, indexed and ranked for the viewer"""
+    import httpx
+    from sqlalchemy import select
+
+    from app.core import skills as skills_module
+    from app.models import Job, JobSkill, Skill, User
+
+    engine, session_factory, app = await _seeded_app(tmp_path)
+    skills_module.skill_index.clear()
+    try:
+        async with session_factory() as db:
+            viewer = (await db.execute(select(User).where(User.id == 1))).scalar_one()
+            viewer.skills = "Underwater Welding, Boat Captain"
+            await db.commit()
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            # Build the index first so the write hooks update it incrementally
+            await client.get("/api/jobs/recommended")
+
+            # Same sync/index sequence create_job and update_job run
+            async with session_factory() as db:
+                job = Job(
+                    title="Salvage diver",
+                    company="Reef Works",
+                    description="Hull repairs",
+                    category="Marine",
+                    location="Nassau",
+                    budget=900,
+                    skills=format_skills(["underwater welding", "Boat Captain"]),
+                    employer_id=2,
+                )
+                db.add(job)
+                await db.flush()
+                await skills_module.sync_job_skills(db, job)
+                await db.commit()
+                skills_module.index_job_skills(job)
+                job_id = job.id
+
+            response = await client.get("/api/jobs/recommended", params={"limit": 3})
+            data = response.json()
+            assert data["jobs"][0]["id"] == job_id
+            assert data["jobs"][0]["matching_skills"] == 2
+
+            response = await client.get("/api/jobs/recommended", params={"skills": "underwater welding"})
+            assert [job["id"] for job in response.json()["jobs"]] == [job_id]
+
+            # Closing the job drops it from recommendations
+            async with session_factory() as db:
+                job = (await db.execute(select(Job).where(Job.id == job_id))).scalar_one()
+                job.status = "closed"
+                await db.commit()
+                skills_module.index_job_skills(job)
+            response = await client.get("/api/jobs/recommended", params={"skills": "underwater welding"})
+            assert response.json()["jobs"] == []
+
+        async with session_factory() as db:
+            linked = await db.execute(
+                select(Skill.name).join(JobSkill, JobSkill.skill_id == Skill.id).where(JobSkill.job_id == job_id)
+            )
+            assert sorted(linked.scalars().all()) == ["boat captain", "underwater welding"]
+    finally:
+        skills_module.skill_index.clear()
+        await engine.dispose()
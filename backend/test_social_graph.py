@@ -0,0 +1,217 @@
+"""
+Tests for the social graph stats service.
+
+Tests cover:
+- A 20-user page served with a constant number of queries
+- Counters maintained by follow/unfollow and post create/delete
+- Users without a counter row counted from the source tables in the same query
+- A missing counter row created from a full recount on the first write
+- Reconciliation creating missing rows and correcting drift
+- Adjacency bitmap cache for is-following flags, updated after commit
+"""
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent
+sys.path.insert(0, str(backend_path))
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, update
+
+from app.core import social_graph
+from app.core.social_graph import AdjacencyCache, SocialCounts
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path):
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.database import Base
+    from app.models import Follow, Post, User
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'social.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    # User 1 follows users 2..21; each of them follows user 1 and has a post
+    async with factory() as db:
+        db.add_all([
+            User(id=i, email=f"u{i}@example.com", username=f"user{i}", first_name="U", last_name=str(i))
+            for i in range(1, 23)
+        ])
+        db.add_all([Follow(follower_id=1, followed_id=i) for i in range(2, 22)])
+        db.add_all([Follow(follower_id=i, followed_id=1) for i in range(2, 22)])
+        db.add_all([Post(user_id=i, content=f"post {i}") for i in range(2, 22)])
+        await db.commit()
+
+    factory.engine = engine
+    social_graph.adjacency.clear()
+    yield factory
+    social_graph.adjacency.clear()
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_user_page_uses_constant_queries(session_factory, monkeypatch):
+    """Test /api/users/list for 20 users issues the same queries with or without counter rows"""
+    import httpx
+    from fastapi import FastAPI
+
+    from app.auth.dependencies import get_current_user
+    from app.core import sql_instrumentation
+    from app.database import get_db
+    from app.models import User
+    from app.users.routes import router as users_router
+
+    app = FastAPI()
+    app.include_router(users_router, prefix="/api/users")
+
+    async def test_get_db():
+        async with session_factory() as session:
+            yield session
+
+    async def test_current_user():
+        async with session_factory() as session:
+            return await session.get(User, 1)
+
+    app.dependency_overrides[get_db] = test_get_db
+    app.dependency_overrides[get_current_user] = test_current_user
+    sql_instrumentation.instrument_engine(session_factory.engine)
+    monkeypatch.setattr(social_graph, "adjacency", AdjacencyCache(ttl=0))
+
+    async def list_page(search, limit=20):
+        stats = sql_instrumentation.start_request_tracking("users_list", force=True)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            # skip=1 leaves out the viewer (user 1), whose row the page would drop
+            response = await client.get("/api/users/list", params={"skip": 1, "limit": limit, "search": search})
+        sql_instrumentation._current_stats.set(None)
+        return response.json(), stats.statement_count
+
+    # No counter rows yet: counted from follows/posts in the same query
+    page, unreconciled = await list_page("U")
+    assert len(page["users"]) == 20
+    first = page["users"][0]
+    assert first["is_following"] is True
+    assert (first["followers_count"], first["following_count"], first["posts_count"]) == (1, 1, 1)
+    # Independent of page size (was 2 queries per user)
+    assert (await list_page("example", limit=5))[1] == unreconciled
+
+    async with session_factory() as db:
+        assert (await social_graph.reconcile_social_stats(db, batch_size=8))["written"] == 22
+
+    page, reconciled = await list_page("u")  # New cache key
+    assert page["users"][0]["followers_count"] == 1
+    assert reconciled == unreconciled
+
+
+@pytest.mark.asyncio
+async def test_counters_follow_writes(session_factory):
+    """Test follow/unfollow/post deltas land with the transaction"""
+    from app.models import Follow
+
+    async with session_factory() as db:
+        await social_graph.reconcile_social_stats(db)
+
+    async with session_factory() as db:
+        db.add(Follow(follower_id=22, followed_id=1))
+        await social_graph.record_follow(db, 22, 1)
+        await social_graph.record_post(db, 22)
+        await db.rollback()
+        assert (await social_graph.get_user_counts(db, 22)) == SocialCounts(0, 0, 0)
+
+        db.add(Follow(follower_id=22, followed_id=1))
+        await social_graph.record_follow(db, 22, 1)
+        await social_graph.record_post(db, 22)
+        await db.commit()
+        assert (await social_graph.get_user_counts(db, 1)) == SocialCounts(21, 20, 0)
+        assert (await social_graph.get_user_counts(db, 22)) == SocialCounts(0, 1, 1)
+
+        await social_graph.record_unfollow(db, 1, 2)
+        await db.commit()
+        counts = await social_graph.get_social_counts(db, [1, 2, 2])
+        assert counts[1].following == 19 and counts[2].followers == 0
+        assert counts[2].as_dict() == {"followers_count": 0, "following_count": 1, "posts_count": 1}
+
+
+@pytest.mark.asyncio
+async def test_first_write_creates_row_from_recount(session_factory):
+    """Test a user without a counter row gets the full count, not just the delta"""
+    from app.models import Follow, UserSocialStats
+
+    async with session_factory() as db:
+        db.add(Follow(follower_id=22, followed_id=1))
+        await social_graph.record_follow(db, 22, 1)
+        await db.commit()
+
+        rows = (await db.execute(select(UserSocialStats.user_id).order_by(UserSocialStats.user_id))).scalars().all()
+        assert rows == [1, 22]
+        assert (await social_graph.get_user_counts(db, 1)) == SocialCounts(21, 20, 0)
+        assert (await social_graph.get_user_counts(db, 22)) == SocialCounts(0, 1, 0)
+
+        # Existing rows are incremented (22 now drifts from its zero posts)
+        await social_graph.record_post(db, 22)
+        await db.commit()
+        assert (await social_graph.get_user_counts(db, 22)).posts == 1
+        assert await social_graph.reconcile_social_stats(db) == {"users": 22, "written": 21}
+
+
+@pytest.mark.asyncio
+async def test_reconcile_corrects_drift(session_factory):
+    """Test reconciliation rewrites drifted rows only"""
+    from app.models import UserSocialStats
+
+    async with session_factory() as db:
+        assert await social_graph.reconcile_social_stats(db) == {"users": 22, "written": 22}
+        await db.execute(update(UserSocialStats).where(UserSocialStats.user_id == 1).values(followers_count=999))
+        await db.commit()
+        assert (await social_graph.get_user_counts(db, 1)).followers == 999
+
+        assert await social_graph.reconcile_social_stats(db, batch_size=5) == {"users": 22, "written": 1}
+        assert (await social_graph.get_user_counts(db, 1)) == SocialCounts(20, 20, 0)
+
+
+@pytest.mark.asyncio
+async def test_following_among_with_adjacency_cache(session_factory, monkeypatch):
+    """Test cached bitmaps answer repeat lookups and committed follows patch them"""
+    from app.models import Follow
+
+    cache = AdjacencyCache(ttl=60)
+    monkeypatch.setattr(social_graph, "adjacency", cache)
+
+    async with session_factory() as db:
+        assert await social_graph.following_among(db, 1, [2, 3, 22, 500]) == {2, 3}
+        assert await social_graph.following_among(db, 1, range(1, 30)) == set(range(2, 22))
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        db.add(Follow(follower_id=1, followed_id=22))
+        await social_graph.record_follow(db, 1, 22)
+        # Not applied until the follow commits
+        assert not await social_graph.is_following(db, 1, 22)
+        await db.commit()
+        social_graph.apply_follow(1, 22, True)
+        social_graph.apply_follow(1, 2, False)
+        assert await social_graph.is_following(db, 1, 22)
+        assert not await social_graph.is_following(db, 1, 2)
+
+    cache.clear()
+    monkeypatch.setattr(social_graph, "adjacency", AdjacencyCache(ttl=0))
+    async with session_factory() as db:
+        assert await social_graph.following_among(db, 22, [1, 2]) == set()
+        assert await social_graph.following_among(db, 5, [1, 2]) == {1}
+
+
+def test_adjacency_cache_is_bounded():
+    """Test least recently used viewers are evicted"""
+    cache = AdjacencyCache(ttl=60, max_viewers=2)
+    cache.put(1, [5])
+    cache.put(2, [6])
+    cache.get(1)
+    cache.put(3, [7])
+    assert cache.get(2) is None
+    assert cache.get(1) == 1 << 5
+    cache.set(3, 8, True)
+    assert cache.get(3) == (1 << 7) | (1 << 8)
@@ -0,0 +1,207 @@
+"""
+Tests for per-request SQL instrumentation.
+
+Tests cover:
+- Statement fingerprinting (literals, placeholders, IN lists)
+- N+1 detection per request
+- SQLAlchemy engine hooks through the FastAPI middleware
+- psycopg2 cursor instrumentation
+- Importing the module as backend.app.core (the Flask monolith pool)
+- Sampling
+"""
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent
+sys.path.insert(0, str(backend_path))
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core import sql_instrumentation
+from app.core.sql_instrumentation import (
+    RequestQueryStats,
+    finish_request_tracking,
+    fingerprint_sql,
+    get_fingerprint_stats,
+    instrument_engine,
+    instrumented_cursor_factory,
+    reset_fingerprint_stats,
+    sql_instrumentation_middleware,
+    start_request_tracking,
+)
+
+
+def setup_function():
+    """Clear process-wide fingerprint statistics before each test"""
+    reset_fingerprint_stats()
+
+
+def test_fingerprint_strips_parameters_and_literals():
+    """Test that different parameter values share one fingerprint"""
+    a = fingerprint_sql("SELECT * FROM users WHERE id = $1 AND email = 'a@b.com'")
+    b = fingerprint_sql("SELECT *  FROM users\n WHERE id = $2 AND email = 'other@x.org'")
+    assert a == b == "SELECT * FROM users WHERE id = ? AND email = ?"
+
+
+def test_fingerprint_driver_placeholder_styles():
+    """Test asyncpg, psycopg2, named and qmark placeholders normalize alike"""
+    expected = "SELECT id FROM posts WHERE user_id = ?"
+    assert fingerprint_sql("SELECT id FROM posts WHERE user_id = %s") == expected
+    assert fingerprint_sql("SELECT id FROM posts WHERE user_id = %(user_id)s") == expected
+    assert fingerprint_sql("SELECT id FROM posts WHERE user_id = :user_id") == expected
+    assert fingerprint_sql("SELECT id FROM posts WHERE user_id = ?") == expected
+    assert fingerprint_sql("SELECT id FROM posts WHERE user_id = 42") == expected
+
+
+def test_fingerprint_collapses_in_lists_and_keeps_identifiers():
+    """Test IN lists of any length collapse and numbered aliases survive"""
+    short = fingerprint_sql("SELECT users_1.id FROM users AS users_1 WHERE users_1.id IN (?, ?)")
+    long = fingerprint_sql("SELECT users_1.id FROM users AS users_1 WHERE users_1.id IN ($1, $2, $3, $4)")
+    assert short == long
+    assert "users_1" in short
+    assert "IN (?...)" in short
+
+
+def test_n_plus_one_detection_threshold():
+    """Test that only fingerprints above the threshold are flagged"""
+    stats = RequestQueryStats(endpoint="/api/users/list")
+    for user_id in range(6):
+        stats.record(f"SELECT count(*) FROM follows WHERE followed_id = {user_id}", 1.0)
+    stats.record("SELECT * FROM users LIMIT 20", 2.0)
+
+    assert stats.statement_count == 7
+    assert stats.total_ms == pytest.approx(8.0)
+    suspects = stats.n_plus_one(threshold=5)
+    assert len(suspects) == 1
+    assert suspects[0]["count"] == 6
+    assert "follows" in suspects[0]["fingerprint"]
+    assert stats.n_plus_one(threshold=6) == []
+
+
+def test_sampling_rate_zero_skips_tracking(monkeypatch):
+    """Test that unsampled requests are not tracked unless forced"""
+    monkeypatch.setattr(sql_instrumentation, "SAMPLE_RATE", 0.0)
+    assert start_request_tracking("/x") is None
+    stats = start_request_tracking("/x", force=True)
+    assert stats is not None
+    finish_request_tracking(stats)
+
+
+def test_global_fingerprint_stats_aggregate():
+    """Test that finished requests feed process-wide fingerprint statistics"""
+    for _ in range(2):
+        stats = start_request_tracking("/api/jobs/", force=True)
+        sql_instrumentation.record_statement("SELECT * FROM jobs WHERE id = 1", 3.0)
+        sql_instrumentation.record_statement("SELECT * FROM jobs WHERE id = 2", 3.0)
+        finish_request_tracking(stats)
+
+    rows = get_fingerprint_stats()
+    assert rows[0]["fingerprint"] == "SELECT * FROM jobs WHERE id = ?"
+    assert rows[0]["count"] == 4
+    assert rows[0]["max_per_request"] == 2
+    assert rows[0]["endpoints"] == ["/api/jobs/"]
+
+
+def test_psycopg2_cursor_instrumentation():
+    """Test the cursor mixin records statements executed while tracking"""
+    class FakeCursor:
+        def execute(self, query, vars=None):
+            return "executed"
+
+        def executemany(self, query, vars_list):
+            return "executed-many"
+
+    cursor_class = instrumented_cursor_factory(FakeCursor)
+    cursor = cursor_class()
+
+    # Not tracked: no stats recorded, call passes through
+    assert cursor.execute("SELECT 1") == "executed"
+
+    stats = start_request_tracking("/legacy", force=True)
+    cursor.execute("SELECT * FROM users WHERE id = %s", (1,))
+    cursor.executemany(b"INSERT INTO follows VALUES (%s, %s)", [(1, 2), (1, 3)])
+    finish_request_tracking(stats)
+
+    assert stats.statement_count == 2
+    assert "SELECT * FROM users WHERE id = ?" in stats.fingerprints
+
+
+def test_cursor_factory_importable_from_repo_root():
+    """Test the Flask monolith can build its pool cursor class from the repo root"""
+    import subprocess
+
+    code = (
+        "from psycopg2.extras import RealDictCursor\n"
+        "from backend.app.core.sql_instrumentation import instrumented_cursor_factory\n"
+        "cursor_class = instrumented_cursor_factory(RealDictCursor)\n"
+        "assert issubclass(cursor_class, RealDictCursor)\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=backend_path.parent, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+
+
+@pytest.mark.asyncio
+async def test_middleware_counts_statements_and_flags_n_plus_one(tmp_path, monkeypatch):
+    """Test engine hooks + middleware end to end with debug headers"""
+    monkeypatch.setattr(sql_instrumentation, "SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(sql_instrumentation, "DEBUG_HEADERS_ENABLED", True)
+    monkeypatch.setattr(sql_instrumentation, "N_PLUS_ONE_THRESHOLD", 3)
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'instr.db'}")
+    assert instrument_engine(engine) is True
+    assert instrument_engine(engine) is False  # idempotent
+
+    app = FastAPI()
+    app.middleware("http")(sql_instrumentation_middleware)
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        async with engine.connect() as conn:
+            for i in range(5):
+                await conn.execute(text("SELECT :i"), {"i": i})
+        return {"ok": True}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/items/1")
+
+    await engine.dispose()
+
+    assert response.status_code == 200
+    assert response.headers["X-DB-Queries"] == "5"
+    assert response.headers["X-DB-N-Plus-One"] == "1"
+    assert float(response.headers["X-DB-Time-Ms"]) >= 0
+    rows = get_fingerprint_stats()
+    assert rows[0]["endpoints"] == ["/items/{item_id}"]
+
+
+@pytest.mark.asyncio
+async def test_debug_header_forces_tracking_in_production(monkeypatch):
+    """Test X-Debug-SQL needs the token once debug headers are off"""
+    monkeypatch.setattr(sql_instrumentation, "SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(sql_instrumentation, "DEBUG_HEADERS_ENABLED", False)
+    monkeypatch.setattr(sql_instrumentation, "SQL_DEBUG_TOKEN", "s3cret")
+
+    app = FastAPI()
+    app.middleware("http")(sql_instrumentation_middleware)
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        plain = await client.get("/ping", headers={"X-Debug-SQL": "1"})
+        wrong = await client.get("/ping", headers={"X-Debug-SQL": "guess"})
+        forced = await client.get("/ping", headers={"X-Debug-SQL": "s3cret"})
+
+    assert "X-DB-Queries" not in plain.headers
+    assert "X-DB-Queries" not in wrong.headers
+    assert forced.headers["X-DB-Queries"] == "0"
@@ -0,0 +1,235 @@
+"""
+Tests for concurrent batch uploads.
+
+Tests cover:
+- At most UPLOAD_CONCURRENCY files stored at once, results in input order
+- A failing file reported on its own without stopping the rest
+- Per-file progress callbacks
+- upload_multiple_files raising the first failure after the batch
+- Multi-picture upload resizing real images and saving rows in one commit
+- Shared content-hashed files surviving a record delete until unreferenced
+"""
+import asyncio
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent
+sys.path.insert(0, str(backend_path))
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from PIL import Image
+from sqlalchemy import select
+
+from app.core import media, upload
+from app.core.upload import upload_batch
+
+
+class MockUploadFile:
+    """Minimal UploadFile stand-in"""
+
+    def __init__(self, filename: str, content_type: str, content: bytes = b"data"):
+        self.filename = filename
+        self.content_type = content_type
+        self.size = len(content)
+        self.file = io.BytesIO(content)
+
+    async def read(self, size: int = -1) -> bytes:
+        return self.file.read(size)
+
+    async def seek(self, offset: int) -> None:
+        self.file.seek(offset)
+
+
+def _jpeg(width=1600, height=1200) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (30, 120, 200)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(media, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    return tmp_path / "uploads"
+
+
+@pytest.mark.asyncio
+async def test_bounded_concurrency_and_order():
+    """Test no more than `concurrency` files are in flight and order is kept"""
+    in_flight = peak = 0
+
+    async def store(file, folder):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        # Later files finish first
+        await asyncio.sleep(0.02 / (int(file.filename) + 1))
+        in_flight -= 1
+        return f"/uploads/{folder}/{file.filename}"
+
+    files = [MockUploadFile(str(i), "text/plain") for i in range(9)]
+    results = await upload_batch(files, "docs", store=store, concurrency=3)
+
+    assert peak == 3
+    assert [r.url for r in results] == [f"/uploads/docs/{i}" for i in range(9)]
+    assert all(r.ok and r.size == 4 for r in results)
+
+
+@pytest.mark.asyncio
+async def test_partial_failure_and_progress():
+    """Test one bad file gets its own error while the others are stored"""
+    progress = []
+
+    async def store(file, folder):
+        if file.filename == "huge.png":
+            raise HTTPException(status_code=413, detail="File too large")
+        if file.filename == "broken.png":
+            raise OSError("disk full")
+        return f"/uploads/{folder}/{file.filename}"
+
+    files = [MockUploadFile(name, "image/png") for name in ("a.png", "huge.png", "broken.png", "b.png")]
+    results = await upload_batch(
+        files, "general", store=store,
+        on_progress=lambda result, done, total: progress.append((result.filename, done, total)),
+    )
+
+    assert [r.ok for r in results] == [True, False, False, True]
+    assert results[1].as_dict() == {
+        "index": 1, "filename": "huge.png", "success": False, "error": "File too large", "status_code": 413,
+    }
+    assert results[2].status_code == 500 and "disk full" in results[2].error
+    assert results[3].as_dict()["file_url"] == "/uploads/general/b.png"
+    assert [(done, total) for _, done, total in progress] == [(1, 4), (2, 4), (3, 4), (4, 4)]
+    assert {name for name, _, _ in progress} == {f.filename for f in files}
+
+
+@pytest.mark.asyncio
+async def test_upload_multiple_files_raises_first_failure(upload_dir):
+    """Test the list API stores every file, then raises the first error"""
+    good = MockUploadFile("notes.txt", "text/plain", b"hello")
+    bad = MockUploadFile("script.exe", "application/x-msdownload")
+    with pytest.raises(HTTPException) as failed:
+        await upload.upload_multiple_files([good, bad], "docs")
+    assert failed.value.status_code == 400
+    assert len(list((upload_dir / "docs").iterdir())) == 1
+
+    urls = await upload.upload_multiple_files(
+        [MockUploadFile("a.txt", "text/plain", b"a"), MockUploadFile("b.jpg", "image/jpeg", _jpeg())], "docs"
+    )
+    assert len(urls) == 2 and urls[1].endswith(".jpg")
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path):
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.database import Base
+    from app.models import User
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'pictures.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as db:
+        db.add(User(id=1, email="u1@example.com", username="user1", first_name="U", last_name="1"))
+        await db.commit()
+    yield factory
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_profile_pictures_batch(upload_dir, session_factory):
+    """Test pictures are resized, saved in one commit and failures reported per file"""
+    from app.api import profile_pictures
+    from app.models import ProfilePicture, User
+
+    files = [
+        MockUploadFile("one.jpg", "image/jpeg", _jpeg()),
+        MockUploadFile("cv.pdf", "application/pdf"),
+        MockUploadFile("two.jpg", "image/jpeg", _jpeg(400, 300)),
+    ]
+    async with session_factory() as db:
+        user = await db.get(User, 1)
+        commits = 0
+        commit = db.commit
+
+        async def counting_commit():
+            nonlocal commits
+            commits += 1
+            await commit()
+
+        db.commit = counting_commit
+        response = await profile_pictures.upload_multiple_profile_pictures(files, current_user=user, db=db)
+
+    assert commits == 1
+    assert [r["success"] for r in response["results"]] == [True, False, True]
+    assert response["results"][1]["status_code"] == 400
+    assert response["message"] == "2 profile pictures uploaded successfully, 1 failed"
+    assert [p["is_current"] for p in response["pictures"]] == [True, False]
+    assert all(p["created_at"] for p in response["pictures"])
+
+    # Resized on the shared pool to fit 800x600
+    stored = upload_dir / response["pictures"][0]["file_url"].split("/uploads/", 1)[1]
+    with Image.open(stored) as image:
+        assert max(image.size) == 800
+
+    async with session_factory() as db:
+        assert (await db.get(User, 1)).avatar_url == response["pictures"][0]["file_url"]
+        assert len((await db.execute(select(ProfilePicture))).scalars().all()) == 2
+
+    async with session_factory() as db:
+        with pytest.raises(HTTPException) as nothing:
+            await profile_pictures.upload_multiple_profile_pictures(
+                [MockUploadFile("cv.pdf", "application/pdf")], current_user=await db.get(User, 1), db=db
+            )
+    assert nothing.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_shared_file_kept_until_unreferenced(upload_dir, session_factory, monkeypatch):
+    """Test deleting one of two identical pictures keeps the file; GC removes orphans"""
+    from app.api import profile_pictures
+    from app.models import ProfilePicture, User
+
+    monkeypatch.chdir(upload_dir.parent)  # delete_file resolves "uploads/..." from the cwd
+    content = _jpeg(400, 300)
+    async with session_factory() as db:
+        response = await profile_pictures.upload_multiple_profile_pictures(
+            [MockUploadFile("a.jpg", "image/jpeg", content), MockUploadFile("b.jpg", "image/jpeg", content)],
+            current_user=await db.get(User, 1), db=db,
+        )
+    first, second = response["pictures"]
+    assert first["file_url"] == second["file_url"]
+    shared = upload_dir / first["file_url"].split("/uploads/", 1)[1]
+
+    async with session_factory() as db:
+        await profile_pictures.delete_profile_picture(first["id"], current_user=await db.get(User, 1), db=db)
+    assert shared.exists()
+    assert not upload.delete_file(second["file_url"]) and shared.exists()
+
+    orphan_url = await media.store_bytes(b"orphan", "avatars", "old.png")
+    fresh_url = await media.store_bytes(b"fresh", "avatars", "new.png")
+    orphan = upload_dir / orphan_url.split("/uploads/", 1)[1]
+    long_ago = time.time() - 2 * media.MEDIA_GC_GRACE
+    os.utime(orphan, (long_ago, long_ago))
+
+    async with session_factory() as db:
+        assert await media.collect_unreferenced_media(db) == 1
+    assert shared.exists() and not orphan.exists()
+    assert (upload_dir / fresh_url.split("/uploads/", 1)[1]).exists()
+
+    # Once no row names it, the shared file goes too
+    async with session_factory() as db:
+        user = await db.get(User, 1)
+        user.avatar_url = None
+        await db.delete(await db.get(ProfilePicture, second["id"]))
+        await db.commit()
+        os.utime(shared, (long_ago, long_ago))
+        assert await media.collect_unreferenced_media(db) == 1
+    assert not shared.exists()
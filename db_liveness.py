@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Traffic-Aware Database Liveness Scheduler for HireBahamas
+
+The keepalive worker in ``final_backend_postgresql.py`` used to run
+``SELECT 1`` on a fixed interval whatever the traffic, borrowing a pool
+connection each time, and every checkout ran another ``SELECT 1`` to
+validate the connection. This module decides when that work is actually
+needed:
+
+- Skip keepalive pings while real queries keep the database awake: a
+  connection returned to the pool without error counts as a successful
+  query, and a ping only runs once none has happened for a keepalive
+  interval.
+- Validate lazily: a checked-out connection is only pinged when it has sat
+  idle longer than ``DB_VALIDATE_IDLE_SECONDS``. When the keepalive does
+  run, it validates all idle pooled connections in parallel, so the next
+  burst of requests does not find stale connections one at a time.
+- Pre-warm ahead of predicted traffic: request counts are kept per 5-minute
+  slot of the week (exponentially averaged over past weeks). When the rate
+  expected ``DB_PREWARM_LEAD_SECONDS`` from now needs more connections than
+  are open, they are opened before the traffic arrives.
+- Publish keepalive cost: pings, skipped pings, validations, discarded
+  connections, pre-warmed connections and the time spent on all of it
+  (``stats()``, ``prometheus_lines()``).
+
+Configuration:
+    DB_LIVENESS_IDLE_SECONDS: Default quiet period before a ping is due (default: 120)
+    DB_VALIDATE_IDLE_SECONDS: Validate a checkout idle longer than this (default: 30)
+    DB_PREWARM_LEAD_SECONDS: How far ahead to pre-warm (default: 600)
+    DB_PREWARM_REQUESTS_PER_CONNECTION: Requests per minute one connection serves (default: 120)
+    DB_LIVENESS_MAX_PARALLEL: Parallel validations / connection opens (default: 4)
+
+Usage:
+    from db_liveness import LivenessScheduler
+
+    liveness = LivenessScheduler()
+    liveness.record_request()                  # per request
+    liveness.record_success(conn)              # connection returned healthy
+    if liveness.needs_validation(conn): ...    # on checkout
+    if liveness.should_ping(): ...             # keepalive tick
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IDLE_SECONDS = float(os.getenv("DB_LIVENESS_IDLE_SECONDS", "120"))
+DEFAULT_VALIDATE_IDLE_SECONDS = float(os.getenv("DB_VALIDATE_IDLE_SECONDS", "30"))
+DEFAULT_PREWARM_LEAD_SECONDS = float(os.getenv("DB_PREWARM_LEAD_SECONDS", "600"))
+DEFAULT_REQUESTS_PER_CONNECTION = float(os.getenv("DB_PREWARM_REQUESTS_PER_CONNECTION", "120"))
+DEFAULT_MAX_PARALLEL = int(os.getenv("DB_LIVENESS_MAX_PARALLEL", "4"))
+
+WEEK_SECONDS = 7 * 24 * 3600
+
+
+class TrafficHistory:
+    """Request counts per slot of the week, averaged across weeks.
+
+    Counts accumulate in the current slot; when the clock moves past it the
+    slot's requests-per-minute is folded into that slot-of-week's average
+    (exponential, weight ``alpha`` for the newest week). Slots without any
+    request fold in as zero, so a quiet period is learned as quiet.
+    Memory is one float per slot (2016 with 5-minute slots).
+    """
+
+    def __init__(self, slot_seconds: int = 300, alpha: float = 0.5, clock: Callable[[], float] = time.time):
+        if WEEK_SECONDS % slot_seconds:
+            raise ValueError("slot_seconds must divide a week evenly")
+        self.slot_seconds = slot_seconds
+        self.slots_per_week = WEEK_SECONDS // slot_seconds
+        self.alpha = alpha
+        self._clock = clock
+        self._averages: List[Optional[float]] = [None] * self.slots_per_week
+        self._slot: Optional[int] = None
+        self._count = 0
+        self._previous_rate = 0.0
+        self._lock = threading.Lock()
+
+    def _advance(self, now: float) -> None:
+        slot = int(now // self.slot_seconds)
+        if self._slot is None:
+            self._slot = slot
+            return
+        if slot <= self._slot:
+            return
+        rate = self._count * 60.0 / self.slot_seconds
+        # At most one week of slots needs folding; older gaps are overwritten anyway
+        for index, absolute in enumerate(range(self._slot, min(slot, self._slot + self.slots_per_week))):
+            self._fold(absolute % self.slots_per_week, rate if index == 0 else 0.0)
+        self._previous_rate = rate if slot == self._slot + 1 else 0.0
+        self._slot = slot
+        self._count = 0
+
+    def _fold(self, index: int, rate: float) -> None:
+        average = self._averages[index]
+        self._averages[index] = rate if average is None else self.alpha * rate + (1 - self.alpha) * average
+
+    def record(self, count: int = 1) -> None:
+        with self._lock:
+            self._advance(self._clock())
+            self._count += count
+
+    def predicted_rate(self, at: float) -> float:
+        """Expected requests per minute at wall-clock time ``at`` (0 if never seen)"""
+        with self._lock:
+            self._advance(self._clock())
+            return self._averages[int(at // self.slot_seconds) % self.slots_per_week] or 0.0
+
+    def current_rate(self) -> float:
+        """Requests per minute over the current and previous slot"""
+        with self._lock:
+            now = self._clock()
+            self._advance(now)
+            elapsed = now - self._slot * self.slot_seconds
+            # Blend in the previous slot so the rate does not drop to zero at a slot boundary
+            window = elapsed + self.slot_seconds
+            return (self._count + self._previous_rate * self.slot_seconds / 60.0) * 60.0 / window
+
+
+class LivenessScheduler:
+    """Decides when to ping, validate and pre-warm database connections.
+
+    Thread-safe; meant to be a single module-level instance shared by the
+    request path and the keepalive thread. The scheduler never touches the
+    database itself: callers pass the validate/open functions in.
+    """
+
+    def __init__(
+        self,
+        history: Optional[TrafficHistory] = None,
+        idle_seconds: float = DEFAULT_IDLE_SECONDS,
+        validate_idle_seconds: float = DEFAULT_VALIDATE_IDLE_SECONDS,
+        prewarm_lead_seconds: float = DEFAULT_PREWARM_LEAD_SECONDS,
+        requests_per_connection: float = DEFAULT_REQUESTS_PER_CONNECTION,
+        max_parallel: int = DEFAULT_MAX_PARALLEL,
+        clock: Callable[[], float] = time.monotonic,
+        wall_clock: Callable[[], float] = time.time,
+    ):
+        self.history = history or TrafficHistory(clock=wall_clock)
+        self.idle_seconds = idle_seconds
+        self.validate_idle_seconds = validate_idle_seconds
+        self.prewarm_lead_seconds = prewarm_lead_seconds
+        self.requests_per_connection = requests_per_connection
+        self.max_parallel = max(1, max_parallel)
+        self._clock = clock
+        self._wall_clock = wall_clock
+        self._lock = threading.Lock()
+        self._last_success: Optional[float] = None
+        self._last_used: Dict[int, float] = {}
+        self._counters = {
+            "pings": 0,
+            "ping_failures": 0,
+            "pings_skipped": 0,
+            "checkout_validations": 0,
+            "checkout_validations_skipped": 0,
+            "idle_validations": 0,
+            "connections_discarded": 0,
+            "connections_prewarmed": 0,
+        }
+        self._cost_ms = 0.0
+
+    # ---- request path -------------------------------------------------
+
+    def record_request(self) -> None:
+        self.history.record()
+
+    def record_success(self, conn: Any = None) -> None:
+        """A query completed (or a connection went back to the pool healthy)"""
+        now = self._clock()
+        with self._lock:
+            self._last_success = now
+            if conn is not None:
+                self._last_used[id(conn)] = now
+
+    def forget(self, conn: Any) -> None:
+        """Stop tracking a closed connection"""
+        with self._lock:
+            self._last_used.pop(id(conn), None)
+
+    def needs_validation(self, conn: Any) -> bool:
+        """Whether a checked-out connection has been idle long enough to ping first"""
+        now = self._clock()
+        with self._lock:
+            last = self._last_used.get(id(conn))
+            needed = last is None or now - last >= self.validate_idle_seconds
+            self._counters["checkout_validations" if needed else "checkout_validations_skipped"] += 1
+            return needed
+
+    # ---- keepalive tick -----------------------------------------------
+
+    def should_ping(self, idle_seconds: Optional[float] = None) -> bool:
+        """False while real queries have kept the database awake recently
+
+        Args:
+            idle_seconds: Quiet period before a ping is due (default: the
+                scheduler's idle_seconds), e.g. the keepalive interval
+        """
+        threshold = self.idle_seconds if idle_seconds is None else idle_seconds
+        now = self._clock()
+        with self._lock:
+            if self._last_success is not None and now - self._last_success < threshold:
+                self._counters["pings_skipped"] += 1
+                return False
+            return True
+
+    def record_ping(self, duration_ms: float, ok: bool) -> None:
+        with self._lock:
+            self._counters["pings"] += 1
+            self._cost_ms += duration_ms
+            if not ok:
+                self._counters["ping_failures"] += 1
+        if ok:
+            self.record_success()
+
+    def _parallel(self, fn: Callable[[Any], Any], items: Sequence[Any]) -> List[Any]:
+        if len(items) <= 1:
+            return [fn(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(len(items), self.max_parallel), thread_name_prefix="db-liveness") as pool:
+            return list(pool.map(fn, items))
+
+    def validate_idle(self, connections: Sequence[Any], validate: Callable[[Any], bool]) -> Tuple[List[Any], List[Any]]:
+        """Validate idle connections in parallel.
+
+        The caller reports the whole round with record_ping().
+
+        Returns:
+            (alive, dead) connection lists; alive ones count as just used
+        """
+        def check(conn):
+            try:
+                return bool(validate(conn))
+            except Exception as e:
+                logger.debug("Idle connection validation failed: %s", e)
+                return False
+
+        results = self._parallel(check, list(connections))
+        alive = [conn for conn, ok in zip(connections, results) if ok]
+        dead = [conn for conn, ok in zip(connections, results) if not ok]
+        with self._lock:
+            self._counters["idle_validations"] += len(results)
+            self._counters["connections_discarded"] += len(dead)
+        for conn in alive:
+            self.record_success(conn)
+        for conn in dead:
+            self.forget(conn)
+        return alive, dead
+
+    def prewarm_target(self, max_connections: int) -> int:
+        """Connections to keep open for the traffic expected one lead time ahead"""
+        expected = max(
+            self.history.predicted_rate(self._wall_clock() + self.prewarm_lead_seconds),
+            self.history.current_rate(),
+        )
+        return min(max_connections, math.ceil(expected / self.requests_per_connection))
+
+    def prewarm_needed(self, open_connections: int, max_connections: int) -> int:
+        """Connections to open now for the traffic expected one lead time ahead"""
+        return max(0, self.prewarm_target(max_connections) - open_connections)
+
+    def prewarm(self, count: int, open_connection: Callable[[], Any]) -> List[Any]:
+        """Open ``count`` connections in parallel; failures are skipped"""
+        started = time.perf_counter()
+
+        def open_one(_):
+            try:
+                return open_connection()
+            except Exception as e:
+                logger.debug("Pre-warm connection failed: %s", e)
+                return None
+
+        opened = [conn for conn in self._parallel(open_one, range(count)) if conn is not None]
+        with self._lock:
+            self._counters["connections_prewarmed"] += len(opened)
+            self._cost_ms += (time.perf_counter() - started) * 1000
+        for conn in opened:
+            self.record_success(conn)
+        return opened
+
+    # ---- reporting ----------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        now = self._clock()
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counters)
+            stats["keepalive_cost_ms"] = round(self._cost_ms, 3)
+            stats["seconds_since_last_success"] = (
+                round(now - self._last_success, 1) if self._last_success is not None else None
+            )
+        stats["current_requests_per_minute"] = round(self.history.current_rate(), 2)
+        stats["predicted_requests_per_minute"] = round(
+            self.history.predicted_rate(self._wall_clock() + self.prewarm_lead_seconds), 2
+        )
+        return stats
+
+    def prometheus_lines(self, prefix: str = "hiremebahamas_db_keepalive") -> str:
+        """Counters and cost in Prometheus text format"""
+        stats = self.stats()
+        lines = []
+        for name in self._counters:
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {stats[name]}")
+        lines.append(f"# TYPE {prefix}_cost_seconds_total counter")
+        lines.append(f"{prefix}_cost_seconds_total {stats['keepalive_cost_ms'] / 1000:.6f}")
+        lines.append(f"# TYPE {prefix}_predicted_requests_per_minute gauge")
+        lines.append(f"{prefix}_predicted_requests_per_minute {stats['predicted_requests_per_minute']}")
+        return "\n".join(lines) + "\n"
@@ -1,4 +1,5 @@
 import os
+import re
 import sqlite3
 import sys
 import threading
@@ -144,11 +145,22 @@ def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-# Serve uploaded files with caching
+# Upload names that are content hashes (see backend/app/core/media.py) never
+# change content, so browsers and CDNs may keep them forever
+HASHED_UPLOAD_NAME = re.compile(r"^[0-9a-f]{32}\.[a-z0-9]+$")
+
+
+# Serve uploaded files straight from disk: send_from_directory answers
+# If-None-Match/Range (304/206) and hands the file to wsgi.file_wrapper
+# (sendfile under gunicorn); bodies are never cached in process memory
 @app.route("/uploads/<path:filename>")
-@cache.cached(timeout=3600)
 def uploaded_file(filename):
-    return send_from_directory(app.config["UPLOAD_FOLDER"], filename)
+    immutable = bool(HASHED_UPLOAD_NAME.match(os.path.basename(filename)))
+    response = send_from_directory(
+        app.config["UPLOAD_FOLDER"], filename, max_age=31536000 if immutable else 3600
+    )
+    response.cache_control.immutable = immutable or None
+    return response
 
 
 # ==========================================
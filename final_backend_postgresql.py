@@ -29,6 +29,16 @@ from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
+from db_liveness import LivenessScheduler
+from backend.app.core.request_log import RequestSampler, request_logger
+from backend.app.core.sql_instrumentation import SQL_INSTRUMENTATION_ENABLED, instrumented_cursor_factory
+
+# Cursor class for pooled and direct connections: RealDictCursor, timed per
+# statement into the ``db`` latency histogram unless SQL_INSTRUMENTATION_ENABLED=false
+DB_CURSOR_FACTORY = (
+    instrumented_cursor_factory(RealDictCursor) if SQL_INSTRUMENTATION_ENABLED else RealDictCursor
+)
+
 # Import database URL normalizer for sync connections
 # Add api directory to path if needed
 api_dir = os.path.join(os.path.dirname(__file__), 'api')
@@ -587,11 +597,22 @@ def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-# Serve uploaded files with caching
+# Upload names that are content hashes (see backend/app/core/media.py) never
+# change content, so browsers and CDNs may keep them forever
+HASHED_UPLOAD_NAME = re.compile(r"^[0-9a-f]{32}\.[a-z0-9]+$")
+
+
+# Serve uploaded files straight from disk: send_from_directory answers
+# If-None-Match/Range (304/206) and hands the file to wsgi.file_wrapper
+# (sendfile under gunicorn); bodies are never cached in process memory
 @app.route("/uploads/<path:filename>")
-@cache.cached(timeout=3600)
 def uploaded_file(filename):
-    return send_from_directory(app.config["UPLOAD_FOLDER"], filename)
+    immutable = bool(HASHED_UPLOAD_NAME.match(os.path.basename(filename)))
+    response = send_from_directory(
+        app.config["UPLOAD_FOLDER"], filename, max_age=31536000 if immutable else 3600
+    )
+    response.cache_control.immutable = immutable or None
+    return response
 
 
 # ==========================================
@@ -607,6 +628,12 @@ SLOW_REGISTRATION_THRESHOLD_MS = 1000  # 1 second - trigger warning for slow reg
 # User agent display configuration
 USER_AGENT_MAX_DISPLAY_LENGTH = 100  # Maximum characters to display in logs
 
+# Request logs: one JSON line per request on stdout, queued and written in
+# batches by a background thread instead of print() on the request thread
+request_logger.sampler = RequestSampler.from_env(slow_ms=SLOW_REQUEST_THRESHOLD_MS)
+request_logger.pipeline.sinks = [logging.StreamHandler(sys.stdout)]
+request_logger.pipeline.start()
+
 # Cold start detection configuration
 # Requests arriving within this time after app startup are considered cold start requests
 COLD_START_THRESHOLD_SECONDS = 5
@@ -671,7 +698,7 @@ def _detect_client_type(user_agent: str) -> str:
 @app.before_request
 def log_request_start():
     """
-    Log incoming requests and track timing information.
+    Track timing and client information for the request's log record.
     
     This middleware captures detailed information about each request to help diagnose
     performance issues like HTTP 499 (Client Closed Request) errors that occur when
@@ -684,16 +711,16 @@ def log_request_start():
     - Host for correlation with infrastructure logs (e.g., Render)
     - Client type (mobile-ios, mobile-android, mobile, desktop) for timeout analysis
     - Cold start detection for diagnosing slow first requests
+    
+    Nothing is written here; log_request_end emits one record per request.
     """
     # Generate unique request ID (use longer format for better correlation with external logs)
     g.request_id = str(uuid.uuid4())[:12]
     g.start_time = time.time()
+    # Request-rate history drives keepalive pre-warming
+    _liveness.record_request()
     
-    # Get client information
-    client_ip = request.remote_addr or 'unknown'
     user_agent = request.headers.get('User-Agent', 'unknown')
-    # Get host for correlation with infrastructure logs (e.g., Render's logs)
-    host = request.host or 'unknown'
     
     # Detect client type for timeout analysis
     # Mobile clients often have shorter timeout settings than desktop browsers
@@ -707,22 +734,8 @@ def log_request_start():
         if time_since_startup < COLD_START_THRESHOLD_SECONDS:
             is_cold_start = True
     
-    # Log incoming request with context (truncate long user agents)
-    user_agent_display = (
-        user_agent if len(user_agent) <= USER_AGENT_MAX_DISPLAY_LENGTH 
-        else f"{user_agent[:USER_AGENT_MAX_DISPLAY_LENGTH]}..."
-    )
-    
-    # Build log parts and join to avoid extra spaces with optional fields
-    log_parts = [
-        f"[{g.request_id}] --> {request.method} {host}{request.path}",
-        f"clientIP=\"{client_ip}\"",
-        f"clientType=\"{g.client_type}\"",
-    ]
-    if is_cold_start:
-        log_parts.append("coldStart=\"true\"")
-    log_parts.append(f"userAgent=\"{user_agent_display}\"")
-    print(" ".join(log_parts))
+    g.cold_start = is_cold_start
+    # The request is logged once, on completion (log_request_end)
 
 
 @app.after_request
@@ -734,7 +747,8 @@ def log_request_end(response):
     that may cause timeout issues. For authentication endpoints, it provides additional
     context to help diagnose login failures.
     
-    Log format matches Render's infrastructure logs for easier correlation:
+    Each request becomes one JSON line (see backend/app/core/request_log.py),
+    queued and written by a background thread, with:
     - Host for identifying the target service
     - Request ID for tracing across log entries
     - Response status code
@@ -744,6 +758,9 @@ def log_request_end(response):
     - Client type for mobile client timeout analysis
     - Warnings for slow requests (> 3 seconds)
     - Critical warnings for very slow requests (> 10 seconds)
+    
+    Health and probe endpoints are sampled; failed and slow requests are
+    always logged.
     """
     if not hasattr(g, 'request_id') or not hasattr(g, 'start_time'):
         # Request logging was bypassed (e.g., for static files or middleware chain broken)
@@ -753,75 +770,44 @@ def log_request_end(response):
         return response
     
     duration_ms = int((time.time() - g.start_time) * 1000)
-    client_ip = request.remote_addr or 'unknown'
-    host = request.host or 'unknown'
     user_agent = request.headers.get('User-Agent', 'unknown')
     client_type = getattr(g, 'client_type', 'unknown')
+    fields = {
+        "host": request.host or 'unknown',
+        "request_id": g.request_id,
+        "client_ip": request.remote_addr or 'unknown',
+        "client_type": client_type,
+        "response_bytes": response.content_length or 0,
+        # Truncate long user agents for log readability
+        "user_agent": user_agent[:USER_AGENT_MAX_DISPLAY_LENGTH],
+    }
+    if getattr(g, 'cold_start', False):
+        fields["cold_start"] = True
     
-    # Truncate long user agents for log readability
-    user_agent_display = (
-        user_agent if len(user_agent) <= USER_AGENT_MAX_DISPLAY_LENGTH 
-        else f"{user_agent[:USER_AGENT_MAX_DISPLAY_LENGTH]}..."
-    )
-    
-    # Determine log level based on status code
-    if response.status_code < 400:
-        # Success - log at INFO level with full context for correlation
-        print(
-            f"[{request.method}]{response.status_code} {host}{request.path} "
-            f"clientIP=\"{client_ip}\" clientType=\"{client_type}\" "
-            f"requestID=\"{g.request_id}\" "
-            f"responseTimeMS={duration_ms} responseBytes={response.content_length or 0} "
-            f"userAgent=\"{user_agent_display}\""
-        )
-    else:
-        # Client/Server error - log with more detail
-        error_detail = ""
-        
-        # For authentication endpoints, try to extract error message
-        if request.path.startswith(AUTH_ENDPOINTS_PREFIX):
-            try:
-                # Try to get error detail from response JSON (parse once)
-                if response.is_json:
-                    error_data = response.get_json(silent=True)
-                    if isinstance(error_data, dict) and 'message' in error_data:
-                        error_detail = f" errorDetail=\"{error_data['message']}\""
-            except Exception:
-                pass
-        
-        print(
-            f"[{request.method}]{response.status_code} {host}{request.path} "
-            f"clientIP=\"{client_ip}\" clientType=\"{client_type}\" "
-            f"requestID=\"{g.request_id}\" "
-            f"responseTimeMS={duration_ms} responseBytes={response.content_length or 0} "
-            f"userAgent=\"{user_agent_display}\"{error_detail}"
-        )
+    # For failed authentication requests, include the error message
+    if response.status_code >= 400 and request.path.startswith(AUTH_ENDPOINTS_PREFIX):
+        try:
+            if response.is_json:
+                error_data = response.get_json(silent=True)
+                if isinstance(error_data, dict) and 'message' in error_data:
+                    fields["error_detail"] = error_data['message']
+        except Exception:
+            pass
     
     # Warn about slow requests with appropriate severity level
     # Mobile clients often have shorter timeout settings (typically 30 seconds)
     # so we add extra warnings for mobile clients
-    is_slow = duration_ms > SLOW_REQUEST_THRESHOLD_MS
-    is_very_slow = duration_ms > VERY_SLOW_REQUEST_THRESHOLD_MS
-    is_mobile = client_type.startswith('mobile')
-    
-    if is_slow:
-        severity = "VERY SLOW REQUEST" if is_very_slow else "SLOW REQUEST"
-        threshold_note = f">{SLOW_REQUEST_THRESHOLD_MS}ms threshold"
-        
-        # Add mobile client warning if applicable
-        mobile_warning = ""
-        if is_mobile:
-            mobile_warning = (
-                f" Mobile client ({client_type}) detected - "
-                "these often have 30s timeout limits which may cause HTTP 499 errors."
+    if duration_ms > SLOW_REQUEST_THRESHOLD_MS:
+        fields["slow"] = "very slow" if duration_ms > VERY_SLOW_REQUEST_THRESHOLD_MS else "slow"
+        if client_type.startswith('mobile'):
+            fields["note"] = (
+                f"Mobile client ({client_type}) - these often have 30s timeout limits "
+                "which may cause HTTP 499 errors"
             )
-        
-        print(
-            f"[{g.request_id}] ⚠️ {severity}: {request.method} {host}{request.path} "
-            f"took {duration_ms}ms ({threshold_note}).{mobile_warning} "
-            f"Check database connection pool, bcrypt rounds, and query performance."
-        )
     
+    # One JSON line per request, written by a background thread; probe
+    # endpoints are sampled, errors and slow requests always logged
+    request_logger.log(request.method, request.path, response.status_code, duration_ms, **fields)
     return response
 
 
@@ -1147,6 +1133,11 @@ _pool_lock = threading.Lock()
 _connection_ages = {}
 _connection_ages_lock = threading.Lock()
 
+# Traffic-aware liveness: skips keepalive pings and checkout validation while
+# real queries keep connections fresh, and pre-warms the pool ahead of
+# predicted traffic (see db_liveness.py)
+_liveness = LivenessScheduler()
+
 # Connection pool timeout in seconds
 # This prevents requests from blocking indefinitely waiting for a connection
 # If no connection is available within this time, fall back to direct connection
@@ -1658,7 +1649,7 @@ def _is_stale_ssl_connection_error(error: Exception) -> bool:
     return any(pattern in error_msg for pattern in stale_ssl_patterns)
 
 
-def _validate_connection(conn) -> bool:
+def _validate_connection(conn, lazy: bool = False) -> bool:
     """
     Validate that a database connection is still usable.
     
@@ -1668,6 +1659,8 @@ def _validate_connection(conn) -> bool:
     
     Args:
         conn: A psycopg2 connection object
+        lazy: Skip the query when the connection was used successfully within
+            DB_VALIDATE_IDLE_SECONDS (the age check still applies)
         
     Returns:
         True if the connection is valid, False otherwise
@@ -1686,6 +1679,9 @@ def _validate_connection(conn) -> bool:
                 logger.info(f"Connection {conn_id} is {conn_age:.0f}s old (recycle at {DB_POOL_RECYCLE_SECONDS}s), recycling")
                 return False
         
+        if lazy and not _liveness.needs_validation(conn):
+            return True
+        
         # Use a lightweight query to check connection health
         # This is similar to SQLAlchemy's pool_pre_ping feature
         cursor = conn.cursor()
@@ -1750,6 +1746,7 @@ def _discard_connection(conn):
     try:
         # Clear age tracking to prevent memory leaks
         _clear_connection_age(conn)
+        _liveness.forget(conn)
         # Close the connection properly
         conn.close()
     except Exception:
@@ -1804,7 +1801,7 @@ def _get_connection_pool():
                         minconn=DB_POOL_MIN_CONNECTIONS,
                         maxconn=DB_POOL_MAX_CONNECTIONS,
                         dsn=DATABASE_URL,  # Use DATABASE_URL directly (includes ?sslmode=require)
-                        cursor_factory=RealDictCursor,
+                        cursor_factory=DB_CURSOR_FACTORY,
                         # FIX #1: Increased to 30s for cloud databases with higher latency
                         connect_timeout=DB_CONNECT_TIMEOUT,
                         # TCP keepalive settings to prevent SSL EOF errors on idle connections
@@ -2112,7 +2109,7 @@ def _create_direct_postgresql_connection(use_fallback_ssl: bool = False):
     
     return psycopg2.connect(
         dsn=connection_url,
-        cursor_factory=RealDictCursor,
+        cursor_factory=DB_CURSOR_FACTORY,
         # FIX #1: 30s timeout for cloud databases with higher latency
         connect_timeout=DB_CONNECT_TIMEOUT,
         # TCP keepalive settings to prevent SSL EOF errors on idle connections
@@ -2164,7 +2161,8 @@ def get_db_connection():
                     # This prevents "SSL error: decryption failed or bad record mac" errors
                     # that occur when using stale connections from the pool
                     # Also enforces pool_recycle by checking connection age
-                    if _validate_connection(conn):
+                    # Skipped for connections used successfully moments ago
+                    if _validate_connection(conn, lazy=True):
                         return conn
                     else:
                         # Connection is stale, discard it and get another
@@ -2306,6 +2304,11 @@ def return_db_connection(conn, discard=False):
             try:
                 # Try to return to pool - will fail for non-pooled connections
                 conn_pool.putconn(conn)
+                # putconn() closes connections beyond the pool's minconn
+                if conn.closed:
+                    _liveness.forget(conn)
+                else:
+                    _liveness.record_success(conn)
                 return
             except Exception:
                 # Connection wasn't from pool (fallback connection)
@@ -2316,6 +2319,7 @@ def return_db_connection(conn, discard=False):
     
     # Close the connection if not using pool, not PostgreSQL, 
     # pool return failed, or discard was requested
+    _liveness.forget(conn)
     try:
         conn.close()
     except Exception:
@@ -4458,6 +4462,7 @@ SUPPRESS_EXTENSION_CLEANUP_WARNINGS = os.getenv("SUPPRESS_EXTENSION_CLEANUP_WARN
 _keepalive_thread = None
 _keepalive_running = False
 _keepalive_last_ping = None
+_keepalive_last_tick = None  # Last loop iteration, pinged or skipped (thread health)
 _keepalive_consecutive_failures = 0
 _keepalive_start_time = None  # Track when keepalive started for aggressive mode
 _keepalive_total_pings = 0  # Track total successful pings for monitoring
@@ -4620,6 +4625,109 @@ def periodic_extension_cleanup():
             return_db_connection(conn)
 
 
+def _single_ping():
+    """SELECT 1 on a connection from get_db_connection(); raises on failure"""
+    conn = None
+    started = time.perf_counter()
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+        cursor.close()
+    except Exception:
+        _liveness.record_ping((time.perf_counter() - started) * 1000, ok=False)
+        if conn:
+            try:
+                return_db_connection(conn, discard=True)
+            except Exception:
+                pass
+        raise
+    return_db_connection(conn)
+    _liveness.record_ping((time.perf_counter() - started) * 1000, ok=True)
+
+
+def _keepalive_ping():
+    """
+    Validate all idle pooled connections in parallel, discarding dead ones.
+    
+    Only runs after a quiet period (see db_liveness), so checking out the
+    idle connections does not compete with requests. Falls back to a single
+    SELECT 1 when there is no pool or nothing idle in it.
+    
+    Returns:
+        Number of connections checked
+    
+    Raises:
+        Exception: If no connection could be validated
+    """
+    conn_pool = _get_connection_pool() if USE_POSTGRESQL else None
+    idle = []
+    if conn_pool is not None:
+        # Snapshot of the idle count; getconn() only pops idle connections
+        # while there are some, so this never opens new ones
+        for _ in range(len(getattr(conn_pool, '_pool', []))):
+            try:
+                idle.append(conn_pool.getconn())
+            except pool.PoolError:
+                break
+    if not idle:
+        _single_ping()
+        return 1
+    
+    started = time.perf_counter()
+    alive, dead = _liveness.validate_idle(idle, _validate_connection)
+    for conn in alive:
+        return_db_connection(conn)
+    for conn in dead:
+        _clear_connection_age(conn)
+        try:
+            conn_pool.putconn(conn, close=True)
+        except Exception:
+            _discard_connection(conn)
+    _liveness.record_ping((time.perf_counter() - started) * 1000, ok=bool(alive))
+    if dead:
+        print(f"🧹 Keepalive discarded {len(dead)} dead idle connection(s)")
+    if not alive:
+        raise OperationalError("No idle pooled connection passed validation")
+    return len(idle)
+
+
+def _keepalive_prewarm():
+    """Open pool connections ahead of the traffic predicted from request history"""
+    conn_pool = _get_connection_pool() if USE_POSTGRESQL else None
+    if conn_pool is None:
+        return
+    try:
+        # psycopg2 keeps at most minconn idle connections and closes the rest
+        # as they are returned, so the predicted need becomes the pool's floor
+        # (and drops back to DB_POOL_MIN_CONNECTIONS as traffic falls off)
+        target = max(DB_POOL_MIN_CONNECTIONS, _liveness.prewarm_target(DB_POOL_MAX_CONNECTIONS))
+        with conn_pool._lock:
+            conn_pool.minconn = target
+        open_count = len(getattr(conn_pool, '_used', {})) + len(getattr(conn_pool, '_pool', []))
+        needed = max(0, target - open_count)
+        if not needed:
+            return
+        # Holding the idle connections makes getconn() open new ones;
+        # returning everything leaves the new connections idle and warm
+        held = []
+        try:
+            for _ in range(len(getattr(conn_pool, '_pool', []))):
+                held.append(conn_pool.getconn())
+            opened = _liveness.prewarm(needed, conn_pool.getconn)
+        finally:
+            for conn in held:
+                conn_pool.putconn(conn)
+        for conn in opened:
+            _track_connection_age(conn)
+            return_db_connection(conn)
+        if opened:
+            print(f"🔥 Pre-warmed {len(opened)} database connection(s) for predicted traffic")
+    except Exception as e:
+        print(f"⚠️ Connection pre-warm skipped: {str(e)[:100]}")
+
+
 def database_keepalive_worker():
     """
     Background worker that periodically pings the database to prevent it from sleeping.
@@ -4629,17 +4737,20 @@ def database_keepalive_worker():
     - Aggressive mode (first 4 hours): Ping every 1 minute to ensure database stays awake
     - Normal mode (after 4 hours): Ping every 2 minutes for maintenance
     
-    The keepalive uses a simple SELECT 1 query that:
-    - Wakes up sleeping connections
-    - Verifies connection pool health
-    - Minimal resource overhead
-    - Non-intrusive to production operations
+    Each tick is traffic-aware (see db_liveness.py):
+    - Skipped when real queries returned healthy connections within the
+      interval, since traffic already keeps the database awake
+    - Otherwise validates every idle pooled connection in parallel with
+      SELECT 1, discarding dead ones (a single ping when nothing is idle)
+    - Pre-warms pool connections ahead of traffic predicted from the
+      request-rate history
     
     Additionally, the worker periodically cleans up orphaned PostgreSQL extensions
     (like pg_stat_statements) that cause errors in Render's monitoring dashboard.
     """
     global _keepalive_running, _keepalive_last_ping, _keepalive_consecutive_failures
     global _keepalive_start_time, _keepalive_total_pings, _last_extension_cleanup
+    global _keepalive_last_tick
     
     _keepalive_running = True
     _keepalive_start_time = datetime.now(timezone.utc)
@@ -4721,15 +4832,19 @@ def database_keepalive_worker():
             if not _keepalive_running:
                 break
             
-            # Ping the database
-            conn = None
+            _keepalive_last_tick = datetime.now(timezone.utc)
+            
+            # Real queries returned healthy connections within the interval,
+            # so the database is awake and a ping would only borrow a connection
+            if not _liveness.should_ping(idle_seconds=current_interval):
+                _keepalive_prewarm()
+                if should_run_extension_cleanup():
+                    periodic_extension_cleanup()
+                continue
+            
+            # Ping the database (validates every idle pooled connection)
             try:
-                conn = get_db_connection()
-                cursor = conn.cursor()
-                cursor.execute("SELECT 1")
-                cursor.fetchone()
-                cursor.close()
-                return_db_connection(conn)
+                checked = _keepalive_ping()
                 
                 # Update success status
                 _keepalive_last_ping = datetime.now(timezone.utc)
@@ -4738,7 +4853,9 @@ def database_keepalive_worker():
                 
                 # Log every ping to ensure visibility
                 elapsed_hours = elapsed_seconds / 3600
-                print(f"✅ Database keepalive ping #{_keepalive_total_pings} [{mode}] at {_keepalive_last_ping.isoformat()} (uptime: {elapsed_hours:.1f}h)")
+                print(f"✅ Database keepalive ping #{_keepalive_total_pings} [{mode}] at {_keepalive_last_ping.isoformat()} ({checked} connection(s), uptime: {elapsed_hours:.1f}h)")
+                
+                _keepalive_prewarm()
                 
                 # Perform periodic extension cleanup to remove pg_stat_statements
                 # This prevents errors in Render's monitoring dashboard
@@ -4750,13 +4867,6 @@ def database_keepalive_worker():
                 error_msg = str(e)[:100]  # Truncate long errors
                 print(f"⚠️ Database keepalive ping failed (attempt {_keepalive_consecutive_failures}): {error_msg}")
                 
-                # Return connection to pool even on error
-                if conn:
-                    try:
-                        return_db_connection(conn)
-                    except Exception:
-                        pass
-                
                 # If we have multiple consecutive failures, log warning
                 if _keepalive_consecutive_failures >= DB_KEEPALIVE_FAILURE_THRESHOLD:
                     print("⚠️ Multiple keepalive failures, connection pool may need refresh")
@@ -4850,9 +4960,11 @@ def ensure_keepalive_running():
     
     # Check if thread is alive
     if thread_alive:
-        # Check if last ping is too old (thread might be stuck)
-        if _keepalive_last_ping:
-            seconds_since_ping = (datetime.now(timezone.utc) - _keepalive_last_ping).total_seconds()
+        # Check if the last loop iteration is too old (thread might be stuck).
+        # Ticks that skip the ping because of real traffic count as activity.
+        last_activity = _keepalive_last_tick or _keepalive_last_ping
+        if last_activity:
+            seconds_since_ping = (datetime.now(timezone.utc) - last_activity).total_seconds()
             if seconds_since_ping > DB_KEEPALIVE_MAX_PING_AGE_SECONDS:
                 print(f"⚠️ Keepalive thread appears stuck (no ping for {seconds_since_ping:.0f}s), restarting...")
                 _keepalive_running = False
@@ -5260,6 +5372,7 @@ def api_health_check():
                 "aggressive_interval_seconds": DB_KEEPALIVE_AGGRESSIVE_INTERVAL_SECONDS,
                 "consecutive_failures": _keepalive_consecutive_failures,
                 "total_pings": _keepalive_total_pings,
+                "scheduler": _liveness.stats(),
             }
             
             if time_until_normal is not None and time_until_normal > 0:
@@ -5393,6 +5506,7 @@ def database_ping_endpoint():
     if DB_KEEPALIVE_ENABLED:
         keepalive_status["total_pings"] = _keepalive_total_pings
         keepalive_status["consecutive_failures"] = _keepalive_consecutive_failures
+        keepalive_status["scheduler"] = _liveness.stats()
         if _keepalive_last_ping:
             keepalive_status["last_ping"] = _keepalive_last_ping.isoformat()
             keepalive_status["seconds_since_last_ping"] = (
@@ -5441,6 +5555,7 @@ def prometheus_metrics():
     - Database connection pool stats
     - Authentication attempt counts
     - Application uptime
+    - Database keepalive cost (pings sent/skipped, validations, pre-warming)
     
     This endpoint is exempt from rate limiting to allow monitoring services
     to scrape metrics frequently (typically every 15-30 seconds).
@@ -5467,6 +5582,8 @@ def prometheus_metrics():
         set_app_info(version="1.0.0", environment=ENVIRONMENT)
         
         metrics_data, content_type = get_metrics_response()
+        # Keepalive cost: pings sent and skipped, validations, pre-warming
+        metrics_data += _liveness.prometheus_lines().encode()
         return Response(metrics_data, mimetype=content_type)
     except ImportError:
         # Fallback if prometheus_client is not available
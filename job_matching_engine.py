@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Vectorized Job Matching Engine for HireBahamas
+
+Scores candidates against every open job with a single matrix product
+instead of encoding each job text per request.
+
+- Job embeddings live in one L2-normalized float32 matrix, so cosine
+  similarity for a candidate is ``matrix @ candidate``.
+- Job skills live in a sparse column index (skill -> job rows); a
+  candidate's skill overlap with every job is one ``np.bincount`` over the
+  postings of the candidate's skills.
+- Jobs are added, updated and removed incrementally; a job is only
+  re-encoded when its text changes. The corpus is bounded: past
+  ``max_jobs`` the least recently synced jobs are evicted, and
+  ``sync_jobs`` drops jobs marked ``is_active: False``.
+- Top-K uses ``np.argpartition`` (O(n)) and only sorts the K winners.
+- ``match_many`` scores a batch of candidates with one (m x d) @ (d x n)
+  product.
+
+The embedder is pluggable: the orchestrator passes its SentenceTransformer,
+and ``HashingEmbedder`` gives deterministic embeddings with no model
+download for tests and lightweight deployments.
+
+Usage:
+    from job_matching_engine import HashingEmbedder, JobMatchingEngine
+
+    engine = JobMatchingEngine(HashingEmbedder())
+    engine.upsert_jobs([{"id": 1, "title": "Electrician", "description": "...", "skills": "wiring, solar"}])
+    matches = engine.match(skills=["wiring"], text="licensed electrician", k=10)
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9+#]+")
+
+# Jobs kept in memory; the least recently synced are evicted past this
+MAX_JOBS = int(os.getenv("JOB_MATCHING_MAX_JOBS", "20000"))
+
+
+def normalize_skills(skills: Union[str, Iterable[str], None]) -> List[str]:
+    """Lower-case, de-duplicated skills from a list or comma-separated string"""
+    if not skills:
+        return []
+    if isinstance(skills, str):
+        skills = skills.split(",")
+    seen = []
+    for skill in skills:
+        skill = str(skill).strip().lower()
+        if skill and skill not in seen:
+            seen.append(skill)
+    return seen
+
+
+def job_key(job: Dict[str, Any]) -> Any:
+    """Job id, or a content hash for jobs submitted without one"""
+    job_id = job.get("id")
+    if job_id is None:
+        job_id = "h:" + hashlib.sha1(repr(sorted(job.items())).encode()).hexdigest()
+    return job_id
+
+
+def job_text(job: Dict[str, Any]) -> str:
+    """Text used to embed a job (same fields the orchestrator used)"""
+    return f"{job.get('title', '')} {job.get('description', '')}"
+
+
+class HashingEmbedder:
+    """Deterministic bag-of-words embedder using the hashing trick.
+
+    Tokens and token bigrams are hashed into ``dim`` buckets with a signed
+    hash, then L2-normalized. No vocabulary, no model download, and the
+    same text always produces the same vector across processes.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def _bucket(self, token: str) -> tuple:
+        digest = hashlib.blake2b(token.encode(), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        return value % self.dim, 1.0 if (value >> 63) & 1 else -1.0
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = _TOKEN_RE.findall(text.lower())
+            features = tokens + [f"{a}_{b}" for a, b in zip(tokens, tokens[1:])]
+            for feature in features:
+                bucket, sign = self._bucket(feature)
+                vectors[row, bucket] += sign
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+@dataclass
+class MatchWeights:
+    """Relative weight of skill overlap vs. semantic similarity"""
+
+    skill: float = 0.55
+    embedding: float = 0.45
+
+
+class JobMatchingEngine:
+    """Incrementally maintained job matrices with vectorized scoring"""
+
+    def __init__(
+        self,
+        embedder=None,
+        weights: Optional[MatchWeights] = None,
+        initial_capacity: int = 1024,
+        max_jobs: int = MAX_JOBS,
+    ):
+        self.embedder = embedder or HashingEmbedder()
+        self.weights = weights or MatchWeights()
+        self.max_jobs = max_jobs
+        self._lock = threading.RLock()
+        self._dim: Optional[int] = None
+        self._capacity = initial_capacity
+        self._embeddings: Optional[np.ndarray] = None
+        self._active = np.zeros(initial_capacity, dtype=bool)
+        self._skill_counts = np.zeros(initial_capacity, dtype=np.float32)
+        self._row_by_id: Dict[Any, int] = {}
+        self._id_by_row: List[Any] = []
+        self._free_rows: List[int] = []
+        self._text_hash: Dict[Any, str] = {}
+        self._skills_by_row: Dict[int, List[str]] = {}
+        self._postings: Dict[str, set] = {}
+        self._posting_arrays: Dict[str, np.ndarray] = {}
+        self._jobs: Dict[Any, Dict[str, Any]] = {}
+        # Job ids, least recently synced first
+        self._recency: "OrderedDict[Any, None]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._row_by_id)
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    def _grow(self, needed: int) -> None:
+        if needed <= self._capacity:
+            return
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        if self._embeddings is not None:
+            grown = np.zeros((capacity, self._dim), dtype=np.float32)
+            grown[: self._capacity] = self._embeddings
+            self._embeddings = grown
+        self._active = np.concatenate([self._active, np.zeros(capacity - self._capacity, dtype=bool)])
+        self._skill_counts = np.concatenate(
+            [self._skill_counts, np.zeros(capacity - self._capacity, dtype=np.float32)]
+        )
+        self._capacity = capacity
+
+    def _allocate_row(self, job_id: Any) -> int:
+        if self._free_rows:
+            row = self._free_rows.pop()
+            self._id_by_row[row] = job_id
+        else:
+            row = len(self._id_by_row)
+            self._grow(row + 1)
+            self._id_by_row.append(job_id)
+        self._row_by_id[job_id] = row
+        return row
+
+    def _set_skills(self, row: int, skills: List[str]) -> None:
+        if self._skills_by_row.get(row) == skills:
+            return
+        for skill in self._skills_by_row.pop(row, []):
+            self._postings[skill].discard(row)
+            self._posting_arrays.pop(skill, None)
+        for skill in skills:
+            self._postings.setdefault(skill, set()).add(row)
+            self._posting_arrays.pop(skill, None)
+        self._skills_by_row[row] = skills
+        self._skill_counts[row] = len(skills)
+
+    def upsert_jobs(self, jobs: Iterable[Dict[str, Any]]) -> int:
+        """Add or update jobs. Returns how many jobs were (re-)embedded.
+
+        Jobs without an ``id`` are keyed by a hash of their content. If the
+        corpus then exceeds ``max_jobs``, the least recently synced jobs not
+        in this call are evicted.
+        """
+        to_embed = []
+        with self._lock:
+            synced = set()
+            for job in jobs:
+                job_id = job_key(job)
+                synced.add(job_id)
+                self._recency[job_id] = None
+                self._recency.move_to_end(job_id)
+                text = job_text(job)
+                text_hash = hashlib.sha1(text.encode()).hexdigest()
+
+                row = self._row_by_id.get(job_id)
+                if row is None:
+                    # Make room first so evicted rows are reused
+                    self._evict(synced, self.max_jobs - 1)
+                    row = self._allocate_row(job_id)
+                self._set_skills(row, normalize_skills(job.get("skills")))
+                self._active[row] = True
+                self._jobs[job_id] = job
+
+                if self._text_hash.get(job_id) != text_hash:
+                    self._text_hash[job_id] = text_hash
+                    to_embed.append((job_id, row, text_hash, text))
+
+        if to_embed:
+            # Encode outside the lock - model inference can be slow
+            vectors = np.asarray(self.embedder.encode([item[3] for item in to_embed]), dtype=np.float32)
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            with self._lock:
+                if self._embeddings is None:
+                    self._dim = vectors.shape[1]
+                    self._embeddings = np.zeros((self._capacity, self._dim), dtype=np.float32)
+                for (job_id, row, text_hash, _), vector in zip(to_embed, vectors):
+                    # Meanwhile the job may have been evicted (its row reused by
+                    # another job) or re-synced with new text by another call
+                    if self._row_by_id.get(job_id) == row and self._text_hash.get(job_id) == text_hash:
+                        self._embeddings[row] = vector
+        return len(to_embed)
+
+    def _evict(self, keep: set, limit: int) -> None:
+        """Remove the least recently synced jobs (not in ``keep``) until at most ``limit`` remain"""
+        while len(self._row_by_id) > limit:
+            oldest = next(iter(self._recency))
+            if oldest in keep:
+                break
+            self.remove_job(oldest)
+
+    def remove_job(self, job_id: Any) -> bool:
+        with self._lock:
+            self._recency.pop(job_id, None)
+            row = self._row_by_id.pop(job_id, None)
+            if row is None:
+                return False
+            self._set_skills(row, [])
+            self._active[row] = False
+            if self._embeddings is not None:
+                self._embeddings[row] = 0.0
+            self._text_hash.pop(job_id, None)
+            self._jobs.pop(job_id, None)
+            self._id_by_row[row] = None
+            self._free_rows.append(row)
+            return True
+
+    def sync_jobs(self, jobs: Sequence[Dict[str, Any]]) -> List[Any]:
+        """Upsert active ``jobs``, drop inactive ones, and return the active ids (in input order)"""
+        active = []
+        for job in jobs:
+            if job.get("is_active", True) is False:
+                self.remove_job(job_key(job))
+            else:
+                active.append(job)
+        self.upsert_jobs(active)
+        return [job_key(job) for job in active]
+
+    # ------------------------------------------------------------------
+    # Scoring
+    # ------------------------------------------------------------------
+
+    def _posting_array(self, skill: str) -> np.ndarray:
+        array = self._posting_arrays.get(skill)
+        if array is None:
+            array = np.fromiter(self._postings.get(skill, ()), dtype=np.int64)
+            self._posting_arrays[skill] = array
+        return array
+
+    def _skill_scores(self, skills: List[str], size: int) -> np.ndarray:
+        """Fraction of each job's required skills the candidate has"""
+        postings = [self._posting_array(skill) for skill in skills if skill in self._postings]
+        if not postings:
+            return np.zeros(size, dtype=np.float32)
+        overlap = np.bincount(np.concatenate(postings), minlength=size)[:size].astype(np.float32)
+        required = self._skill_counts[:size]
+        return np.divide(overlap, required, out=np.zeros(size, dtype=np.float32), where=required > 0)
+
+    def _candidate_vectors(self, embeddings: Sequence[Optional[np.ndarray]], texts: Sequence[str]) -> np.ndarray:
+        """Normalized candidate vectors; missing/mismatched embeddings are encoded from text"""
+        vectors = np.zeros((len(texts), self._dim), dtype=np.float32)
+        missing = []
+        for i, embedding in enumerate(embeddings):
+            embedding = None if embedding is None else np.asarray(embedding, dtype=np.float32).ravel()
+            if embedding is not None and embedding.shape == (self._dim,):
+                vectors[i] = embedding
+            else:
+                missing.append(i)
+        if missing:
+            vectors[missing] = np.asarray(self.embedder.encode([texts[i] for i in missing]), dtype=np.float32)
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+    def _restrict_mask(self, size: int, restrict_to: Optional[Iterable[Any]]) -> np.ndarray:
+        mask = self._active[:size].copy()
+        if restrict_to is not None:
+            allowed = np.zeros(size, dtype=bool)
+            rows = [self._row_by_id[job_id] for job_id in restrict_to if job_id in self._row_by_id]
+            allowed[rows] = True
+            mask &= allowed
+        return mask
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+        """Indices of the k highest scores, best first (argpartition + small sort)"""
+        k = min(k, scores.shape[-1])
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top], kind="stable")]
+
+    def match_many(
+        self,
+        candidates: Sequence[Dict[str, Any]],
+        k: int = 20,
+        restrict_to: Optional[Iterable[Any]] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """Score many candidates against every job at once.
+
+        Args:
+            candidates: Dicts with optional ``skills``, ``embedding`` and ``text``
+            k: Matches per candidate
+            restrict_to: Optional job ids to consider (default: all active jobs)
+
+        Returns:
+            One list of matches per candidate, best first. Each match has
+            ``job_id``, ``job``, ``match_score``, ``skill_match`` and
+            ``embedding_similarity``.
+        """
+        with self._lock:
+            size = len(self._id_by_row)
+            if size == 0 or self._embeddings is None or not candidates:
+                return [[] for _ in candidates]
+            mask = self._restrict_mask(size, restrict_to)
+            if not mask.any():
+                return [[] for _ in candidates]
+
+            skill_lists = [normalize_skills(c.get("skills")) for c in candidates]
+            texts = [c.get("text") or " ".join(skills) for c, skills in zip(candidates, skill_lists)]
+            vectors = self._candidate_vectors([c.get("embedding") for c in candidates], texts)
+
+            # (m x d) @ (d x n): cosine similarity of every candidate with every job
+            similarity = vectors @ self._embeddings[:size].T
+            skill = np.vstack([self._skill_scores(skills, size) for skills in skill_lists])
+            scores = self.weights.skill * skill + self.weights.embedding * similarity
+            scores[:, ~mask] = -np.inf
+
+            k = min(k, int(mask.sum()))
+            results = []
+            for i in range(len(candidates)):
+                matches = []
+                for row in self._top_k(scores[i], k):
+                    job_id = self._id_by_row[row]
+                    matches.append({
+                        "job_id": job_id,
+                        "job": self._jobs[job_id],
+                        "match_score": float(scores[i, row]),
+                        "skill_match": float(skill[i, row]),
+                        "embedding_similarity": float(similarity[i, row]),
+                    })
+                results.append(matches)
+            return results
+
+    def match(
+        self,
+        skills: Union[str, Iterable[str], None] = None,
+        embedding: Optional[np.ndarray] = None,
+        text: Optional[str] = None,
+        k: int = 20,
+        restrict_to: Optional[Iterable[Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Top-K jobs for one candidate (see ``match_many``)"""
+        candidate = {"skills": skills, "embedding": embedding, "text": text}
+        return self.match_many([candidate], k=k, restrict_to=restrict_to)[0]
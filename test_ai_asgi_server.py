@@ -0,0 +1,233 @@
+"""
+Tests for the async AI API server and provider gateway.
+
+Tests cover:
+- Request coalescing of identical in-flight prompts
+- Bounded concurrency per provider
+- Response cache hits and TTL expiry
+- Streaming and caching of streamed responses
+- Providers must implement complete()
+- Chat and content endpoints (JSON and SSE) with the stub provider
+- Local model inference in worker threads, bounded per model
+- Orchestrator endpoints sharing the app's gateway
+"""
+import asyncio
+import json
+import threading
+import time
+
+import httpx
+import pytest
+
+from ai_asgi_server import CHAT_UNAVAILABLE_MESSAGE, create_app
+from ai_gateway import AIGateway, AIProvider, CompletionRequest, StubProvider
+
+
+def make_gateway(delay=0.0, **kwargs):
+    stub = StubProvider(delay=delay)
+    return AIGateway({"stub": stub}, **kwargs), stub
+
+
+def client_for(app):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def parse_sse(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = None, None
+        for line in block.split("\n"):
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+        events.append((event, data))
+    return events
+
+
+@pytest.mark.asyncio
+async def test_identical_requests_are_coalesced():
+    """Test concurrent identical prompts share one provider call"""
+    gateway, stub = make_gateway(delay=0.05)
+    request = CompletionRequest(system="s", prompt="hello")
+
+    results = await asyncio.gather(*[gateway.complete(request) for _ in range(10)])
+
+    assert results == ["[stub] hello"] * 10
+    assert stub.calls == 1
+    assert gateway.stats["coalesced"] == 9
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_bounded_per_provider():
+    """Test no more than the configured number of calls run at once"""
+    gateway, stub = make_gateway(delay=0.02, max_concurrency={"stub": 3})
+
+    await asyncio.gather(*[
+        gateway.complete(CompletionRequest(system="s", prompt=f"p{i}")) for i in range(12)
+    ])
+
+    assert stub.calls == 12
+    assert stub.max_active == 3
+
+
+@pytest.mark.asyncio
+async def test_cache_hits_and_ttl_expiry():
+    """Test repeated prompts are served from cache until the TTL passes"""
+    gateway, stub = make_gateway(cache_ttl_seconds=0.05)
+    request = CompletionRequest(system="s", prompt="cached")
+
+    await gateway.complete(request)
+    await gateway.complete(request)
+    assert stub.calls == 1
+    assert gateway.stats["cache_hits"] == 1
+
+    await asyncio.sleep(0.06)
+    await gateway.complete(request)
+    assert stub.calls == 2
+
+    # Different parameters are a different cache entry
+    await gateway.complete(CompletionRequest(system="s", prompt="cached", temperature=0.1))
+    assert stub.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_stream_yields_chunks_and_caches_result():
+    """Test streaming returns incremental chunks and caches the full text"""
+    gateway, stub = make_gateway()
+    request = CompletionRequest(system="s", prompt="one two three")
+
+    chunks = [chunk async for chunk in gateway.stream(request)]
+    assert len(chunks) > 1
+    assert "".join(chunks) == "[stub] one two three"
+
+    assert await gateway.complete(request) == "[stub] one two three"
+    assert stub.calls == 1
+
+
+def test_provider_must_implement_complete():
+    """Test the provider base class is abstract over complete()"""
+
+    class Incomplete(AIProvider):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+@pytest.mark.asyncio
+async def test_inference_runs_off_loop_bounded_per_model():
+    """Test blocking inference runs in threads, one at a time per model by default"""
+    gateway, _ = make_gateway(model_concurrency={"ocr": 2})
+    active = {"embedding": 0, "ocr": 0}
+    peak = {"embedding": 0, "ocr": 0}
+    lock = threading.Lock()
+
+    def encode(model, text):
+        with lock:
+            active[model] += 1
+            peak[model] = max(peak[model], active[model])
+        time.sleep(0.02)  # blocking, like SentenceTransformer.encode
+        with lock:
+            active[model] -= 1
+        return f"{model}:{text}"
+
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.005)
+
+    ticking = asyncio.ensure_future(ticker())
+    results = await asyncio.gather(
+        *[gateway.infer("embedding", encode, "embedding", i) for i in range(4)],
+        *[gateway.infer("ocr", encode, "ocr", text=i) for i in range(4)],
+    )
+    ticking.cancel()
+
+    assert results == [f"embedding:{i}" for i in range(4)] + [f"ocr:{i}" for i in range(4)]
+    assert peak == {"embedding": 1, "ocr": 2}
+    assert ticks >= 5  # the loop kept running while models were busy
+    assert gateway.snapshot()["inferences"] == 8
+    assert gateway.snapshot()["models"] == ["embedding", "ocr"]
+
+
+@pytest.mark.asyncio
+async def test_chat_endpoint_json_and_sse():
+    """Test chat returns JSON by default and SSE when asked to stream"""
+    gateway, stub = make_gateway()
+    async with client_for(create_app(gateway=gateway)) as client:
+        response = await client.post("/api/ai/chat", json={"message": "find me a job"})
+        assert response.status_code == 200
+        assert response.json()["response"] == "[stub] find me a job"
+
+        response = await client.post("/api/ai/chat", json={"message": "stream this", "stream": True})
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = parse_sse(response.text)
+        assert "".join(data["delta"] for event, data in events if event is None) == "[stub] stream this"
+        assert events[-1] == ("done", {"available": True})
+
+        response = await client.post("/api/ai/chat", json={})
+        assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_chat_without_provider_returns_fallback():
+    """Test chat keeps the Flask server's fallback reply when no provider is configured"""
+    async with client_for(create_app(gateway=AIGateway({}))) as client:
+        response = await client.post("/api/ai/chat", json={"message": "hi"})
+    assert response.json()["response"] == CHAT_UNAVAILABLE_MESSAGE
+
+
+@pytest.mark.asyncio
+async def test_generate_content_uses_content_prompts():
+    """Test content generation builds the orchestrator's prompt and streams"""
+    gateway, stub = make_gateway()
+    async with client_for(create_app(gateway=gateway)) as client:
+        response = await client.post(
+            "/api/ai/generate-content",
+            json={"content_type": "cover_letter", "context": "electrician"},
+        )
+        assert response.json()["content"] == "[stub] Generate a cover letter for: electrician"
+
+        response = await client.post(
+            "/api/ai/generate-content",
+            json={"content_type": "cover_letter", "context": "electrician"},
+            headers={"Accept": "text/event-stream"},
+        )
+        events = parse_sse(response.text)
+        assert events[0] == (None, {"delta": "[stub] Generate a cover letter for: electrician"})
+        assert stub.calls == 1  # second request replayed from cache
+
+
+@pytest.mark.asyncio
+async def test_orchestrator_endpoints_share_one_instance():
+    """Test a lazily built orchestrator gets the app's gateway for its inference"""
+    built = []
+
+    class FakeOrchestrator:
+        user_cache = {}
+        job_cache = {}
+        gateway = None
+
+        async def real_time_recommendations(self, user_id, context):
+            score = await self.gateway.infer("ranker", lambda: 0.9)
+            return [{"type": "job", "user_id": user_id, "score": score}]
+
+    def factory():
+        built.append(1)
+        return FakeOrchestrator()
+
+    gateway, _ = make_gateway()
+    async with client_for(create_app(gateway=gateway, orchestrator_factory=factory)) as client:
+        responses = await asyncio.gather(*[
+            client.post("/api/ai/recommendations", json={"user_id": 7}) for _ in range(5)
+        ])
+        health = await client.get("/api/ai/health")
+
+    assert all(r.json()["recommendations"][0]["score"] == 0.9 for r in responses)
+    assert built == [1]
+    assert gateway.stats["inferences"] == 5
+    assert health.json()["orchestrator_loaded"] is True
@@ -0,0 +1,265 @@
+"""
+Tests for the incremental analytics rollups behind /api/analytics.
+
+Tests cover:
+- HyperLogLog accuracy, merging and serialization
+- Incremental refresh advancing the watermark without double counting
+- Rows newer than the settle window waiting for a later refresh
+- Role and location counts following user updates
+- /user-logins and /login-activity values against the raw tables
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+API_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api')
+
+_ALIASES = ['app', 'app.core', 'app.database', 'app.models', 'app.api']
+
+
+@pytest.fixture
+def backend():
+    """Alias backend_app as app for the duration of a test"""
+    saved = {name: sys.modules.get(name) for name in _ALIASES}
+    sys.path.insert(0, API_PATH)
+    try:
+        import backend_app
+        sys.modules['app'] = backend_app
+        import backend_app.core
+        sys.modules['app.core'] = backend_app.core
+        import backend_app.database
+        sys.modules['app.database'] = backend_app.database
+        import backend_app.models
+        sys.modules['app.models'] = backend_app.models
+        import backend_app.api
+        sys.modules['app.api'] = backend_app.api
+        from backend_app.core import analytics_rollups
+        yield backend_app, analytics_rollups
+    finally:
+        sys.path.remove(API_PATH)
+        for name, module in saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+
+
+async def _session_factory(tmp_path, backend_app):
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+
+    models = backend_app.models
+    tables = [
+        models.User.__table__,
+        models.LoginAttempt.__table__,
+        models.AnalyticsEvent.__table__,
+        models.AnalyticsRollup.__table__,
+        models.AnalyticsSketch.__table__,
+        models.AnalyticsWatermark.__table__,
+    ]
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'analytics.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(backend_app.database.Base.metadata.create_all, tables=tables)
+    return engine, sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+def _seed_users(models, now, count=60):
+    users = []
+    for i in range(count):
+        users.append(models.User(
+            id=i + 1,
+            email=f"user{i}@example.com",
+            first_name="Test",
+            last_name=str(i),
+            hashed_password=None if i % 4 == 0 else "hash",
+            oauth_provider="google" if i % 4 == 0 else None,
+            role="employer" if i % 3 == 0 else "user",
+            location="Nassau" if i % 2 else "Freeport",
+            last_login=None if i % 5 == 0 else now - timedelta(days=i),
+            created_at=now - timedelta(days=90 - i),
+        ))
+    return users
+
+
+def _seed_attempts(models, now, users):
+    attempts = []
+    for user in users:
+        if user.last_login is None:
+            continue
+        attempts.append(models.LoginAttempt(
+            user_id=user.id, email_attempted=user.email, success=True, timestamp=user.last_login,
+        ))
+        attempts.append(models.LoginAttempt(
+            user_id=user.id, email_attempted=user.email, success=True,
+            timestamp=user.last_login - timedelta(hours=3),
+        ))
+        if user.id % 7 == 0:
+            attempts.append(models.LoginAttempt(
+                user_id=user.id, email_attempted=user.email, success=False,
+                failure_reason="Incorrect password", timestamp=now - timedelta(days=2),
+            ))
+    attempts.append(models.LoginAttempt(
+        user_id=None, email_attempted="nobody@example.com", success=False,
+        failure_reason="User not found", timestamp=now - timedelta(days=1),
+    ))
+    return attempts
+
+
+def test_hyperloglog_accuracy_and_merge(backend):
+    """Test estimates stay within a few percent and merges are unions"""
+    _, rollups = backend
+    first, second = rollups.HyperLogLog(), rollups.HyperLogLog()
+    for i in range(20000):
+        first.add(i)
+    for i in range(10000, 30000):
+        second.add(i)
+
+    assert abs(first.count() - 20000) / 20000 < 0.05
+    restored = rollups.HyperLogLog.from_bytes(first.to_bytes())
+    assert restored.count() == first.count()
+    assert abs(restored.merge(second).count() - 30000) / 30000 < 0.05
+
+    small = rollups.HyperLogLog()
+    for value in [1, 2, 3, 3, 3]:
+        small.add(value)
+    assert small.count() == 3
+    with pytest.raises(ValueError):
+        small.merge(rollups.HyperLogLog(precision=10))
+
+
+@pytest.mark.asyncio
+async def test_refresh_is_incremental(tmp_path, backend):
+    """Test repeated refreshes fold each row once and respect the settle window"""
+    backend_app, rollups = backend
+    models = backend_app.models
+    now = datetime.utcnow()
+    engine, session_factory = await _session_factory(tmp_path, backend_app)
+    try:
+        async with session_factory() as db:
+            users = _seed_users(models, now, count=10)
+            db.add_all(users)
+            db.add_all(_seed_attempts(models, now, users))
+            await db.commit()
+
+            folded = await rollups.refresh_rollups(db, batch_size=4)
+            assert folded["users"] == 10
+            assert await rollups.refresh_rollups(db) == {"users": 0, "login_attempts": 0, "analytics_events": 0}
+            assert (await rollups.sum_counters(db, "signups")) == {"": 10}
+
+            # A just-created user waits for the settle window
+            db.add(models.User(
+                id=11, email="late@example.com", first_name="Late", last_name="User",
+                location="Exuma", created_at=now,
+            ))
+            await db.commit()
+            assert (await rollups.refresh_rollups(db, settle_seconds=60))["users"] == 0
+            assert (await rollups.refresh_rollups(db, settle_seconds=0))["users"] == 1
+
+            by_location = await rollups.sum_counters(db, "signups_by_location")
+            assert by_location == {"Freeport": 5, "Nassau": 5, "Exuma": 1}
+            hourly = await rollups.counter_series(db, "signups", now - timedelta(hours=1), granularity=rollups.HOUR)
+            assert hourly == [(rollups.hour_bucket(now), 1)]
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_user_updates_move_dimension_counts(tmp_path, backend):
+    """Test role/location changes move folded users' counts and leave unfolded ones alone"""
+    backend_app, rollups = backend
+    models = backend_app.models
+    now = datetime.utcnow()
+    engine, session_factory = await _session_factory(tmp_path, backend_app)
+    try:
+        async with session_factory() as db:
+            users = _seed_users(models, now, count=10)
+            db.add_all(users)
+            await db.commit()
+            await rollups.refresh_rollups(db)
+            assert await rollups.sum_counters(db, "signups_by_location") == {"Freeport": 5, "Nassau": 5}
+
+            users[0].location = "Exuma"
+            users[1].role = "employer"
+            users[3].location = None
+            await db.commit()
+            assert await rollups.sum_counters(db, "signups_by_location") == {
+                "Freeport": 4, "Nassau": 4, "Exuma": 1,
+            }
+            assert await rollups.sum_counters(db, "signups_by_role") == {"employer": 5, "user": 5}
+            # The count moves within the user's signup day
+            signup_day = users[0].created_at.date()
+            assert await rollups.sum_counters(db, "signups_by_location", signup_day, signup_day) == {
+                "Freeport": 0, "Exuma": 1,
+            }
+
+            # Not folded yet: the refresh reads the current value once
+            db.add(models.User(
+                id=11, email="late@example.com", first_name="Late", last_name="User",
+                location="Exuma", created_at=now - timedelta(minutes=5),
+            ))
+            await db.commit()
+            late = await db.get(models.User, 11)
+            late.location = "Bimini"
+            await db.commit()
+            await rollups.refresh_rollups(db, settle_seconds=0)
+            by_location = await rollups.sum_counters(db, "signups_by_location")
+            assert by_location["Bimini"] == 1 and by_location["Exuma"] == 1
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_analytics_endpoints_match_raw_counts(tmp_path, backend):
+    """Test rollup-backed endpoints agree with counts over the raw tables"""
+    backend_app, rollups = backend
+    from backend_app.api import analytics
+
+    models = backend_app.models
+    now = datetime.utcnow()
+    engine, session_factory = await _session_factory(tmp_path, backend_app)
+    rollups.reset_refresh_throttle()
+    try:
+        async with session_factory() as db:
+            users = _seed_users(models, now)
+            attempts = _seed_attempts(models, now, users)
+            db.add_all(users)
+            db.add_all(attempts)
+            await db.commit()
+
+            admin = models.User(id=0, is_admin=True)
+            data = await analytics.get_user_login_analytics(db=db, current_user=admin)
+
+            cutoff_30 = now - timedelta(days=29)
+            active_30 = {u.id for u in users if u.last_login and u.last_login.date() >= cutoff_30.date()}
+            assert data["total_users"] == 60
+            assert data["authentication_methods"]["oauth_users"] == 15
+            assert data["authentication_methods"]["password_users"] == 45
+            assert data["authentication_methods"]["distribution"] == {"google": 15, "password": 45}
+            assert data["never_logged_in"] == 12
+            assert data["active_users"]["last_30_days"] == len(active_30)
+            assert data["inactive_users_30d"] == 60 - 12 - len(active_30)
+            assert data["failed_login_attempts"]["users_with_failures_30d"] == len(
+                {u.id for u in users if u.last_login and u.id % 7 == 0}
+            )
+            successes_30d = [
+                a for a in attempts if a.success and a.timestamp.date() >= cutoff_30.date()
+            ]
+            assert data["login_activity"]["total_logins_30d"] == len(successes_30d)
+
+            timeline = await analytics.get_login_activity_timeline(
+                days=7, granularity="day", db=db, current_user=admin
+            )
+            start = (now - timedelta(days=7)).date()
+            expected = {}
+            for attempt in attempts:
+                if attempt.success and attempt.timestamp.date() >= start:
+                    day = attempt.timestamp.date().isoformat()
+                    expected[day] = expected.get(day, 0) + 1
+            assert timeline["daily_logins"] == [
+                {"date": day, "count": count} for day, count in sorted(expected.items())
+            ]
+    finally:
+        rollups.reset_refresh_throttle()
+        await engine.dispose()
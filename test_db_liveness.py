@@ -0,0 +1,159 @@
+"""
+Tests for the traffic-aware database liveness scheduler.
+
+Tests cover:
+- Skipping keepalive pings while real queries keep the database awake
+- Lazy checkout validation of recently used connections
+- Parallel validation of idle connections
+- Learning the weekly request pattern and pre-warming ahead of it
+- Keepalive cost reporting (stats and Prometheus lines)
+"""
+import threading
+import time
+
+from db_liveness import WEEK_SECONDS, LivenessScheduler, TrafficHistory
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_scheduler(**kwargs):
+    clock = FakeClock(1000.0)
+    wall = FakeClock(WEEK_SECONDS * 10.0)
+    scheduler = LivenessScheduler(clock=clock, wall_clock=wall, **kwargs)
+    return scheduler, clock, wall
+
+
+def test_pings_skipped_while_traffic_keeps_database_awake():
+    """Test a ping is due only after a quiet interval"""
+    scheduler, clock, _ = make_scheduler(idle_seconds=60)
+    assert scheduler.should_ping()
+
+    scheduler.record_success(object())
+    clock.now += 30
+    assert not scheduler.should_ping()
+    assert scheduler.should_ping(idle_seconds=20)
+
+    clock.now += 31
+    assert scheduler.should_ping()
+    scheduler.record_ping(2.5, ok=True)
+    assert not scheduler.should_ping()
+
+    stats = scheduler.stats()
+    assert stats["pings"] == 1
+    assert stats["pings_skipped"] == 2
+    assert stats["keepalive_cost_ms"] == 2.5
+
+
+def test_checkout_validation_is_lazy():
+    """Test only connections idle past the threshold are pinged on checkout"""
+    scheduler, clock, _ = make_scheduler(validate_idle_seconds=30)
+    fresh, stale, unknown = object(), object(), object()
+    scheduler.record_success(stale)
+    clock.now += 20
+    scheduler.record_success(fresh)
+    clock.now += 15
+
+    assert not scheduler.needs_validation(fresh)
+    assert scheduler.needs_validation(stale)
+    assert scheduler.needs_validation(unknown)
+
+    scheduler.forget(fresh)
+    assert scheduler.needs_validation(fresh)
+    stats = scheduler.stats()
+    assert stats["checkout_validations"] == 3
+    assert stats["checkout_validations_skipped"] == 1
+
+
+def test_idle_connections_validated_in_parallel():
+    """Test validations overlap and dead connections are reported"""
+    scheduler, _, _ = make_scheduler(max_parallel=4)
+    connections = [object() for _ in range(4)]
+    dead_conn = connections[2]
+    barrier = threading.Barrier(4, timeout=2)
+
+    def validate(conn):
+        # Deadlocks (BrokenBarrierError -> dead) unless all four run at once
+        barrier.wait()
+        if conn is dead_conn:
+            raise RuntimeError("server closed the connection")
+        return True
+
+    alive, dead = scheduler.validate_idle(connections, validate)
+    assert dead == [dead_conn]
+    assert len(alive) == 3
+    assert not scheduler.needs_validation(alive[0])
+    stats = scheduler.stats()
+    assert stats["idle_validations"] == 4
+    assert stats["connections_discarded"] == 1
+
+
+def test_traffic_history_learns_weekly_pattern():
+    """Test the rate seen in a slot is predicted for the same slot next week"""
+    wall = FakeClock(WEEK_SECONDS * 10.0)
+    history = TrafficHistory(slot_seconds=300, alpha=0.5, clock=wall)
+    start = wall.now
+
+    # Busy slot (600 requests in 5 minutes), then quiet
+    history.record(600)
+    wall.now += 300
+    history.record(5)
+    assert history.current_rate() == (600 + 5) * 60 / 300
+
+    wall.now += 3600
+    assert history.predicted_rate(start + WEEK_SECONDS) == 120.0
+    assert history.predicted_rate(start + WEEK_SECONDS + 900) == 0.0
+
+    # A quieter week pulls the average down
+    wall.now = start + WEEK_SECONDS
+    history.record(300)
+    wall.now += 300
+    assert history.predicted_rate(start + 2 * WEEK_SECONDS) == 90.0
+
+
+def test_prewarm_ahead_of_predicted_traffic():
+    """Test connections are opened before a slot that was busy last week"""
+    scheduler, _, wall = make_scheduler(prewarm_lead_seconds=600, requests_per_connection=100)
+    history = scheduler.history
+    busy_start = wall.now + 600
+
+    # Last week: 450 requests/minute in the slot starting 10 minutes from now
+    wall.now = busy_start - WEEK_SECONDS
+    history.record(450 * 5)
+    wall.now += 300
+    history.record(0)
+    wall.now = busy_start - 600
+
+    assert scheduler.prewarm_target(max_connections=10) == 5
+    assert scheduler.prewarm_needed(open_connections=2, max_connections=10) == 3
+    assert scheduler.prewarm_needed(open_connections=5, max_connections=10) == 0
+    assert scheduler.prewarm_needed(open_connections=0, max_connections=4) == 4
+
+    opened = []
+    lock = threading.Lock()
+
+    def open_connection():
+        time.sleep(0.01)
+        with lock:
+            if len(opened) >= 2:
+                raise OSError("too many connections")
+            opened.append(object())
+            return opened[-1]
+
+    assert len(scheduler.prewarm(3, open_connection)) == 2
+    assert scheduler.stats()["connections_prewarmed"] == 2
+
+
+def test_prometheus_lines():
+    """Test counters and cost are exposed in Prometheus text format"""
+    scheduler, _, _ = make_scheduler()
+    scheduler.record_ping(1500.0, ok=False)
+    text = scheduler.prometheus_lines()
+    assert "hiremebahamas_db_keepalive_pings_total 1" in text
+    assert "hiremebahamas_db_keepalive_ping_failures_total 1" in text
+    assert "hiremebahamas_db_keepalive_cost_seconds_total 1.500000" in text
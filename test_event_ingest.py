@@ -0,0 +1,246 @@
+"""
+Tests for batched analytics event ingestion.
+
+Tests cover:
+- Size-bounded batches written as multi-row inserts
+- Backpressure: a full buffer refuses events and counts them
+- Failed batches retried in order; redelivered events stored once
+- Spooling unwritten events at shutdown and recovery by the next process
+- The flusher task writing a full batch without waiting for its timer
+- Events folded into rollups and served by /api/analytics/events
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+API_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api')
+
+_ALIASES = ['app', 'app.core', 'app.database', 'app.models', 'app.api', 'app.schemas']
+
+
+@pytest.fixture
+def backend():
+    """Alias backend_app as app for the duration of a test"""
+    saved = {name: sys.modules.get(name) for name in _ALIASES}
+    sys.path.insert(0, API_PATH)
+    try:
+        import backend_app
+        sys.modules['app'] = backend_app
+        for name in _ALIASES[1:]:
+            module = __import__(f"backend_app.{name[4:]}", fromlist=['_'])
+            sys.modules[name] = module
+        from backend_app.core import event_ingest
+        yield backend_app, event_ingest
+    finally:
+        sys.path.remove(API_PATH)
+        for name, module in saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+
+
+async def _session_factory(tmp_path, backend_app):
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+
+    models = backend_app.models
+    tables = [
+        models.User.__table__,
+        models.LoginAttempt.__table__,
+        models.AnalyticsEvent.__table__,
+        models.AnalyticsRollup.__table__,
+        models.AnalyticsSketch.__table__,
+        models.AnalyticsWatermark.__table__,
+    ]
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'events.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(backend_app.database.Base.metadata.create_all, tables=tables)
+    return engine, sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+class FlakySessions:
+    """Session factory whose sessions fail to open while ``down`` is set"""
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self.down = False
+        self.opened = 0
+
+    def __call__(self):
+        self.opened += 1
+        if self.down:
+            raise ConnectionError("database unavailable")
+        return self.session_factory()
+
+
+async def _stored(session_factory, backend_app):
+    from sqlalchemy import select
+
+    event = backend_app.models.AnalyticsEvent
+    async with session_factory() as db:
+        result = await db.execute(select(event.event_type, event.user_id, event.data).order_by(event.id))
+        return [tuple(row) for row in result.all()]
+
+
+@pytest.mark.asyncio
+async def test_batches_and_backpressure(tmp_path, backend):
+    """Test events are written in bounded batches and overflow is refused"""
+    backend_app, event_ingest = backend
+    engine, session_factory = await _session_factory(tmp_path, backend_app)
+    try:
+        ingestor = event_ingest.EventIngestor(
+            capacity=5, batch_size=2, flush_seconds=60, spool_dir=None, session_factory=session_factory
+        )
+        assert ingestor.submit_many([("page_view", 1, {"path": "/jobs"}, None)] * 3)
+        assert not ingestor.submit_many([("click", 2, None, None)] * 3)
+        assert ingestor.submit("search", 2, {"query": "chef"})
+
+        assert await ingestor.flush() == 4
+        stats = ingestor.stats()
+        assert stats["batches"] == 2 and stats["written"] == 4
+        assert stats["accepted"] == 4 and stats["rejected"] == 3 and stats["buffered"] == 0
+        assert await _stored(session_factory, backend_app) == [
+            ("page_view", 1, {"path": "/jobs"}),
+            ("page_view", 1, {"path": "/jobs"}),
+            ("page_view", 1, {"path": "/jobs"}),
+            ("search", 2, {"query": "chef"}),
+        ]
+        await ingestor.close()
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_retried_and_deduplicated(tmp_path, backend):
+    """Test a failed batch stays buffered in order and redelivery is idempotent"""
+    backend_app, event_ingest = backend
+    engine, session_factory = await _session_factory(tmp_path, backend_app)
+    try:
+        sessions = FlakySessions(session_factory)
+        ingestor = event_ingest.EventIngestor(batch_size=10, spool_dir=None, session_factory=sessions)
+        for i in range(3):
+            ingestor.submit("click", i)
+
+        sessions.down = True
+        assert await ingestor.flush() == 0
+        assert ingestor.stats()["buffered"] == 3 and ingestor.stats()["failed_batches"] == 1
+
+        sessions.down = False
+        events = list(ingestor._buffer)
+        assert await ingestor.flush() == 3
+        # A batch whose commit was not acknowledged is sent again
+        await ingestor._write(events)
+        assert await _stored(session_factory, backend_app) == [("click", i, None) for i in range(3)]
+        await ingestor.close()
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_spool_and_recover(tmp_path, backend):
+    """Test events left at shutdown are spooled and written by the next process"""
+    backend_app, event_ingest = backend
+    engine, session_factory = await _session_factory(tmp_path, backend_app)
+    spool_dir = str(tmp_path / 'spool')
+    try:
+        sessions = FlakySessions(session_factory)
+        sessions.down = True
+        old = datetime.utcnow() - timedelta(hours=5)
+        first = event_ingest.EventIngestor(spool_dir=spool_dir, session_factory=sessions)
+        first.submit("search", 7, {"query": "nurse"}, created_at=old)
+        first.submit("page_view", 8)
+        await first.close()
+        assert first.stats()["spooled"] == 2 and first.stats()["buffered"] == 0
+        assert len(os.listdir(spool_dir)) == 1
+
+        second = event_ingest.EventIngestor(spool_dir=spool_dir, session_factory=session_factory)
+        assert await second.recover_spool() == 2
+        assert os.listdir(spool_dir) == []
+        assert await _stored(session_factory, backend_app) == [
+            ("search", 7, {"query": "nurse"}),
+            ("page_view", 8, None),
+        ]
+
+        from sqlalchemy import select
+        async with session_factory() as db:
+            created = await db.scalar(select(backend_app.models.AnalyticsEvent.created_at).limit(1))
+        assert created == old
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_flusher_writes_full_batch(tmp_path, backend):
+    """Test a full batch wakes the flusher before its timer"""
+    backend_app, event_ingest = backend
+    engine, session_factory = await _session_factory(tmp_path, backend_app)
+    try:
+        ingestor = event_ingest.EventIngestor(
+            batch_size=3, flush_seconds=60, spool_dir=str(tmp_path / 'spool'), session_factory=session_factory
+        )
+        ingestor.submit("click", 1)
+        ingestor.submit("click", 2)
+        assert ingestor.stats()["running"]
+        ingestor.submit("click", 3)
+        for _ in range(100):
+            if ingestor.stats()["written"] == 3:
+                break
+            await asyncio.sleep(0.01)
+        assert ingestor.stats()["written"] == 3 and ingestor.stats()["batches"] == 1
+
+        await ingestor.close()
+        assert not ingestor.stats()["running"]
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_events_endpoints(tmp_path, backend, monkeypatch):
+    """Test posted events are folded into rollups and read back as aggregates"""
+    backend_app, event_ingest = backend
+    from fastapi import HTTPException
+    from backend_app.api import analytics
+    from backend_app.core import analytics_rollups
+    from backend_app.schemas.analytics import EventBatch
+
+    engine, session_factory = await _session_factory(tmp_path, backend_app)
+    ingestor = event_ingest.EventIngestor(
+        capacity=4, flush_seconds=60, spool_dir=None, session_factory=session_factory
+    )
+    monkeypatch.setattr(analytics, "event_ingestor", ingestor)
+    monkeypatch.setattr(analytics_rollups, "ROLLUP_SETTLE_SECONDS", 0)
+    analytics_rollups.reset_refresh_throttle()
+    models = backend_app.models
+    try:
+        batch = EventBatch(events=[
+            {"event_type": "search", "data": {"query": "chef"}},
+            {"event_type": "page_view"},
+            {"event_type": "page_view"},
+        ])
+        assert await analytics.ingest_events(batch, current_user=models.User(id=1)) == {"accepted": 3}
+        with pytest.raises(HTTPException) as refused:
+            await analytics.ingest_events(batch, current_user=models.User(id=2))
+        assert refused.value.status_code == 429 and "Retry-After" in refused.value.headers
+        await ingestor.flush()
+        await analytics.ingest_events(
+            EventBatch(events=[{"event_type": "page_view"}]), current_user=models.User(id=2)
+        )
+        await ingestor.flush()
+
+        async with session_factory() as db:
+            data = await analytics.get_event_analytics(
+                days=7, event_type="page_view", db=db, current_user=models.User(id=0, is_admin=True)
+            )
+        assert data["events_by_type"] == {"page_view": 3, "search": 1}
+        assert data["total_events"] == 4
+        assert data["distinct_users"] == 2
+        assert data["daily_events"] == [{"date": datetime.utcnow().date().isoformat(), "count": 3}]
+        assert data["ingest"]["written"] == 4 and data["ingest"]["rejected"] == 3
+        await ingestor.close()
+    finally:
+        analytics_rollups.reset_refresh_throttle()
+        await engine.dispose()
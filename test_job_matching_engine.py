@@ -0,0 +1,210 @@
+"""
+Tests for the vectorized job matching engine.
+
+Tests cover:
+- Deterministic hashing embeddings
+- Scores matching a brute-force cosine + skill overlap computation
+- Incremental upserts re-embedding only changed jobs
+- Removing jobs and reusing their rows
+- Restricting matches to a subset of jobs
+- Dropping inactive jobs and evicting the least recently synced past max_jobs
+- Vectors computed outside the lock never landing on a reused row
+- Batch matching agreeing with single-candidate matching
+"""
+import numpy as np
+import pytest
+
+from job_matching_engine import (
+    HashingEmbedder,
+    JobMatchingEngine,
+    MatchWeights,
+    normalize_skills,
+)
+
+
+class CountingEmbedder(HashingEmbedder):
+    """Hashing embedder that records how many texts it encoded"""
+
+    def __init__(self, dim: int = 64):
+        super().__init__(dim)
+        self.encoded = 0
+
+    def encode(self, texts):
+        self.encoded += len(texts)
+        return super().encode(texts)
+
+
+def make_jobs(count: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    skills = ["wiring", "solar", "plumbing", "python", "sql", "cooking", "driving", "sales"]
+    words = ["senior", "junior", "remote", "nassau", "freeport", "contract", "lead", "assistant"]
+    jobs = []
+    for job_id in range(count):
+        jobs.append({
+            "id": job_id,
+            "title": " ".join(rng.choice(words, 2)),
+            "description": " ".join(rng.choice(words + skills, 6)),
+            "skills": ", ".join(rng.choice(skills, rng.integers(1, 4), replace=False)),
+        })
+    return jobs
+
+
+def brute_force(jobs, skills, text, embedder, weights):
+    candidate = embedder.encode([text])[0]
+    user_skills = set(normalize_skills(skills))
+    scores = {}
+    for job in jobs:
+        job_skills = set(normalize_skills(job["skills"]))
+        skill = len(user_skills & job_skills) / len(job_skills) if job_skills else 0.0
+        vector = embedder.encode([f"{job['title']} {job['description']}"])[0]
+        scores[job["id"]] = weights.skill * skill + weights.embedding * float(vector @ candidate)
+    return scores
+
+
+def test_hashing_embedder_is_deterministic_and_normalized():
+    """Test equal texts give equal unit vectors"""
+    embedder = HashingEmbedder(dim=128)
+    first, second, other = embedder.encode(["Solar electrician", "solar ELECTRICIAN", "line cook"])
+    assert np.allclose(first, second)
+    assert np.isclose(np.linalg.norm(first), 1.0)
+    assert not np.allclose(first, other)
+
+
+def test_matches_agree_with_brute_force():
+    """Test vectorized scores equal per-job scoring"""
+    embedder = HashingEmbedder(dim=64)
+    jobs = make_jobs(60)
+    engine = JobMatchingEngine(embedder, initial_capacity=8)
+    engine.upsert_jobs(jobs)
+
+    matches = engine.match(skills=["Solar", "wiring"], text="solar wiring lead", k=10)
+    expected = brute_force(jobs, ["solar", "wiring"], "solar wiring lead", embedder, MatchWeights())
+
+    assert len(matches) == 10
+    for match in matches:
+        assert match["match_score"] == pytest.approx(expected[match["job_id"]], abs=1e-5)
+    best = sorted(expected.values(), reverse=True)[:10]
+    assert [m["match_score"] for m in matches] == pytest.approx(best, abs=1e-5)
+
+
+def test_upsert_only_reembeds_changed_jobs():
+    """Test unchanged jobs are not encoded again"""
+    embedder = CountingEmbedder()
+    engine = JobMatchingEngine(embedder)
+    jobs = make_jobs(20)
+
+    assert engine.upsert_jobs(jobs) == 20
+    assert engine.upsert_jobs(jobs) == 0
+
+    jobs[3] = dict(jobs[3], description="commercial solar installer")
+    jobs[4] = dict(jobs[4], skills="cooking")  # skills only - no re-embedding
+    assert engine.upsert_jobs(jobs) == 1
+    assert embedder.encoded == 21
+
+    match = engine.match(skills=["cooking"], text="cooking", k=20)
+    assert any(m["job_id"] == 4 and m["skill_match"] == 1.0 for m in match)
+
+
+def test_remove_job_frees_row():
+    """Test removed jobs are never returned and their rows are reused"""
+    engine = JobMatchingEngine(HashingEmbedder(dim=32))
+    engine.upsert_jobs(make_jobs(5))
+
+    assert engine.remove_job(2)
+    assert not engine.remove_job(2)
+    assert len(engine) == 4
+    assert all(m["job_id"] != 2 for m in engine.match(text="senior lead", k=10))
+
+    engine.upsert_jobs([{"id": "new", "title": "Chef", "description": "cooking", "skills": "cooking"}])
+    assert len(engine) == 5
+    assert engine._row_by_id["new"] == 2
+
+
+def test_restrict_to_subset():
+    """Test matches only come from the requested job ids"""
+    engine = JobMatchingEngine(HashingEmbedder(dim=32))
+    engine.upsert_jobs(make_jobs(30))
+
+    matches = engine.match(skills=["python"], text="python", k=10, restrict_to=[1, 5, 9])
+    assert {m["job_id"] for m in matches} <= {1, 5, 9}
+    assert len(matches) == 3
+    assert engine.match(text="python", restrict_to=["missing"]) == []
+
+
+def test_sync_jobs_without_ids():
+    """Test jobs without ids are keyed by content"""
+    engine = JobMatchingEngine(HashingEmbedder(dim=32))
+    jobs = [{"title": "Driver", "description": "delivery", "skills": "driving"}]
+    ids = engine.sync_jobs(jobs)
+    assert ids == engine.sync_jobs(jobs)
+    assert engine.match(skills=["driving"], restrict_to=ids)[0]["job"] is jobs[0]
+
+
+def test_sync_bounds_corpus_and_drops_inactive():
+    """Test the process-wide engine does not grow with every request"""
+    engine = JobMatchingEngine(HashingEmbedder(dim=32), max_jobs=10)
+    jobs = make_jobs(25)
+    engine.sync_jobs(jobs[:10])
+    engine.sync_jobs(jobs[:3])  # 0-2 used again, 3-9 are now the oldest
+    ids = engine.sync_jobs(jobs[10:15])
+    assert ids == list(range(10, 15))
+    assert len(engine) == 10
+    assert sorted(engine._row_by_id) == [0, 1, 2, 8, 9, 10, 11, 12, 13, 14]
+    assert len(engine._id_by_row) == 10  # evicted rows were reused
+
+    # A single sync larger than the bound keeps all of its own jobs
+    assert len(engine.sync_jobs(jobs[:12])) == 12 and len(engine) == 12
+
+    closed = dict(jobs[1], is_active=False)
+    assert engine.sync_jobs([jobs[0], closed]) == [0]
+    assert 1 not in engine._row_by_id
+    assert [m["job_id"] for m in engine.match(skills=["python"], k=20)].count(1) == 0
+
+
+def test_slow_embedding_does_not_overwrite_reused_row():
+    """Test a vector computed outside the lock is dropped if its row changed hands"""
+    embedder = HashingEmbedder(dim=32)
+    engine = JobMatchingEngine(embedder, max_jobs=1)
+    old, new = {"id": "old", "title": "Cook"}, {"id": "new", "title": "Electrician"}
+
+    class SlowEmbedder:
+        calls = 0
+
+        def encode(self, texts):
+            SlowEmbedder.calls += 1
+            if SlowEmbedder.calls == 1:
+                # Another request evicts "old" and takes its row while we encode
+                engine.upsert_jobs([new])
+            return embedder.encode(texts)
+
+    engine.embedder = SlowEmbedder()
+    engine.upsert_jobs([old])
+    assert list(engine._row_by_id) == ["new"]
+    row = engine._row_by_id["new"]
+    assert np.allclose(engine._embeddings[row], embedder.encode(["Electrician "])[0])
+
+
+def test_match_many_equals_individual_matches():
+    """Test batch scoring returns the same results as one-at-a-time"""
+    engine = JobMatchingEngine(HashingEmbedder(dim=64))
+    engine.upsert_jobs(make_jobs(80))
+    rng = np.random.default_rng(1)
+    candidates = [
+        {"skills": ["sql", "python"], "text": "remote python lead"},
+        {"skills": "driving, sales", "embedding": rng.normal(size=64)},
+        {"skills": [], "text": "assistant cook nassau"},
+    ]
+
+    batch = engine.match_many(candidates, k=7)
+    for candidate, matches in zip(candidates, batch):
+        single = engine.match(k=7, **candidate)
+        assert [m["job_id"] for m in matches] == [m["job_id"] for m in single]
+        assert [m["match_score"] for m in matches] == pytest.approx([m["match_score"] for m in single])
+
+
+def test_top_k_ordering():
+    """Test argpartition top-k returns the k best, best first"""
+    scores = np.array([0.1, 0.9, 0.3, 0.7, 0.5])
+    assert list(JobMatchingEngine._top_k(scores, 3)) == [1, 3, 4]
+    assert list(JobMatchingEngine._top_k(scores, 10)) == [1, 3, 4, 2, 0]
+    assert len(JobMatchingEngine._top_k(scores, 0)) == 0